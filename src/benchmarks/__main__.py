@@ -0,0 +1,108 @@
+import argparse
+import json
+import sys
+
+from benchmarks.suite import BACKENDS, QUICK_SIZES, SIZES, compare, run_suite
+
+
+def parse_list(value: str) -> list[str]:
+    return [item for item in value.split(",") if item]
+
+
+def cmd_run(args) -> int:
+    sizes = QUICK_SIZES if args.quick else SIZES
+    if args.sizes:
+        sizes = [int(size) for size in parse_list(args.sizes)]
+    results = run_suite(
+        sizes=sizes,
+        backends=parse_list(args.backends),
+        repeat=args.repeat,
+        only=args.only,
+        progress=lambda name: print(f"running {name}", file=sys.stderr),
+    )
+    text = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+def cmd_compare(args) -> int:
+    with open(args.baseline, encoding="utf-8") as file:
+        baseline = json.load(file)
+    with open(args.current, encoding="utf-8") as file:
+        current = json.load(file)
+    rows = compare(baseline, current, args.threshold)
+    for row in rows:
+        print(
+            f"{row['name']:<48} {row['baseline'] * 1e6:>12.3f}us "
+            f"{row['current'] * 1e6:>12.3f}us {row['ratio']:>6.2f}x  {row['status']}"
+        )
+    regressions = [row for row in rows if row["status"] == "regression"]
+    print(
+        f"{len(rows)} compared, {len(regressions)} regressions "
+        f"(threshold {args.threshold:.0%})"
+    )
+    return 1 if regressions else 0
+
+
+def cmd_replay(args) -> int:
+    from benchmarks.replay import replay
+
+    report = replay(args.trace, args.db, args.tasks)
+    if not args.frames:
+        del report["frames"]
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Парсер аргументов набора замеров производительности.
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Замеры производительности модели, базы данных и отрисовки.",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="выполнить замеры и вывести JSON")
+    run.add_argument("-o", "--output", help="файл результатов (по умолчанию stdout)")
+    run.add_argument("--sizes", help="размеры таблицы через запятую")
+    run.add_argument("--quick", action="store_true", help="только малые размеры")
+    run.add_argument("--backends", default=",".join(BACKENDS))
+    run.add_argument("--repeat", type=int, default=5, help="количество серий")
+    run.add_argument("--only", help="только группы с этой подстрокой в названии")
+    run.set_defaults(handler=cmd_run)
+
+    compare_ = commands.add_parser(
+        "compare", help="сравнить результаты с базовой линией"
+    )
+    compare_.add_argument("baseline")
+    compare_.add_argument("current")
+    compare_.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="допустимое замедление (0.1 — 10%%)",
+    )
+    compare_.set_defaults(handler=cmd_compare)
+
+    replay = commands.add_parser(
+        "replay", help="воспроизвести сессию, записанную main.py --record"
+    )
+    replay.add_argument("trace", help="файл трассы")
+    replay.add_argument(
+        "--db", help="URL хранилища (будет изменено; по умолчанию временная база)"
+    )
+    replay.add_argument("--tasks", type=int, help="количество задач временной базы")
+    replay.add_argument("--frames", action="store_true", help="вывести все кадры")
+    replay.set_defaults(handler=cmd_replay)
+    return parser
+
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    sys.exit(args.handler(args))
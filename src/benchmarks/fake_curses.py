@@ -0,0 +1,92 @@
+import curses
+from contextlib import contextmanager
+
+
+class FakeWindow:
+    """
+    Окно curses в памяти для замеров и проверки отрисовки без терминала.
+    Хранит содержимое экрана построчно и считает количество вызовов вывода.
+    """
+
+    def __init__(self, lines=50, columns=120):
+        """
+        :param lines: Высота окна
+        :param columns: Ширина окна
+        """
+        self.lines = lines
+        self.columns = columns
+        self.writes = 0
+        self.screen = [[" "] * columns for _ in range(lines)]
+
+    def getmaxyx(self) -> tuple[int, int]:
+        return self.lines, self.columns
+
+    def addstr(self, y: int, x: int, text: str, attr=0):
+        if not (0 <= y < self.lines and 0 <= x < self.columns):
+            raise curses.error("addstr() returned ERR")
+        text = text[: self.columns - x]
+        self.screen[y][x : x + len(text)] = text
+        self.writes += 1
+
+    def addch(self, y: int, x: int, char, attr=0):
+        self.addstr(y, x, char if isinstance(char, str) else chr(char), attr)
+
+    def hline(self, y: int, x: int, char, count: int):
+        self.addstr(y, x, (char if isinstance(char, str) else chr(char)) * count)
+
+    def border(self, *args):
+        self.writes += 1
+
+    def erase(self):
+        self.screen = [[" "] * self.columns for _ in range(self.lines)]
+        self.writes += 1
+
+    clear = erase
+
+    def noutrefresh(self):
+        pass
+
+    def refresh(self):
+        pass
+
+    def nodelay(self, flag: bool):
+        pass
+
+    def line(self, y: int) -> str:
+        """
+        Текст строки экрана y.
+        """
+        return "".join(self.screen[y])
+
+
+@contextmanager
+def fake_curses():
+    """
+    Подменяет функции модуля curses, которые требуют initscr(): color_pair,
+    doupdate, символы ACS_* и настройки терминала, чтобы функции отрисовки
+    и TaskManager работали с FakeWindow.
+    """
+    replacements = {
+        "color_pair": lambda number: number << 8,
+        "doupdate": lambda: None,
+        "ACS_HLINE": ord("-"),
+        "start_color": lambda: None,
+        "init_pair": lambda *args: None,
+        "curs_set": lambda visibility: None,
+        "set_escdelay": lambda ms: None,
+        "echo": lambda: None,
+        "noecho": lambda: None,
+        "beep": lambda: None,
+    }
+    missing = object()
+    saved = {name: getattr(curses, name, missing) for name in replacements}
+    for name, value in replacements.items():
+        setattr(curses, name, value)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            if value is missing:
+                delattr(curses, name)
+            else:
+                setattr(curses, name, value)
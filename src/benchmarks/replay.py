@@ -0,0 +1,259 @@
+import tempfile
+import time
+from collections import deque
+from pathlib import Path
+
+from benchmarks.fake_curses import FakeWindow, fake_curses
+from benchmarks.suite import preload
+from controller.recorder import read_trace
+from controller.task_manager import TaskManager
+from model.database import Database
+from model.instrumentation import Instrumentation, LatencyHistogram
+from model.storage import open_storage
+from model.task import Task
+
+DEFAULT_TASKS = 1000
+MIN_STEP = 0.001
+IDLE_METHODS = frozenset({"pending_timeout", "flush_if_due"})
+
+
+class VirtualClock:
+    """
+    Виртуальные часы воспроизведения: время стоит на месте, пока его
+    не переведут вперед. Служат и часами задач (Task.clock),
+    и монотонными часами TaskManager.
+    """
+
+    def __init__(self, start: float):
+        """
+        :param start: Время начала сессии в секундах эпохи
+        """
+        self.start = start
+        self.elapsed = 0.0
+
+    def __call__(self) -> float:
+        return self.start + self.elapsed
+
+    def advance_to(self, elapsed: float):
+        """
+        Переводит часы на elapsed секунд от начала сессии (назад не переводит).
+        """
+        self.elapsed = max(self.elapsed, elapsed)
+
+
+class ReplayWindow(FakeWindow):
+    """
+    Окно FakeWindow, отдающее ввод из трассы сессии по виртуальным часам.
+
+    В режиме nodelay getch() возвращает событие, только если его время
+    наступило; в блокирующем режиме (диалоги) — следующее событие, переводя
+    часы на его время. Если воспроизведение разошлось с записью (например,
+    диалог не открылся на другой базе данных), лишние строки getstr()
+    пропускаются, а getstr() без записанной строки возвращает пустой ввод.
+
+    Как и curses, окно передает в терминал только ячейки, изменившиеся
+    с прошлой передачи; их размер в UTF-8 накапливается в sent_bytes.
+    """
+
+    def __init__(self, events: list[dict], clock: VirtualClock, lines=50, columns=120):
+        """
+        :param events: События трассы
+        :param clock: Виртуальные часы воспроизведения
+        :param lines: Высота окна
+        :param columns: Ширина окна
+        """
+        super().__init__(lines, columns)
+        self.keys = 0
+        self.skipped = 0
+        self.sent_bytes = 0
+        self.__events = deque(events)
+        self.__clock = clock
+        self.__nodelay = False
+        self.__dirty = False
+        self.__sent = [[" "] * columns for _ in range(lines)]
+
+    def next_time(self) -> float | None:
+        """
+        Время следующего события трассы или None, если события закончились.
+        """
+        return self.__events[0]["t"] if self.__events else None
+
+    def nodelay(self, flag: bool):
+        self.__nodelay = flag
+
+    def getch(self) -> int:
+        while self.__events and "str" in self.__events[0]:
+            self.__events.popleft()
+            self.skipped += 1
+        if not self.__events:
+            return -1
+        if self.__nodelay:
+            if self.__events[0]["t"] > self.__clock.elapsed:
+                return -1
+        else:
+            self.transmit()
+            self.__clock.advance_to(self.__events[0]["t"])
+        self.keys += 1
+        return self.__events.popleft()["key"]
+
+    def getstr(self, y: int, x: int, limit: int) -> bytes:
+        self.transmit()
+        if not self.__events or "str" not in self.__events[0]:
+            return b""
+        event = self.__events.popleft()
+        self.__clock.advance_to(event["t"])
+        self.keys += 1
+        return event["str"].encode("utf-8", "surrogateescape")[:limit]
+
+    def noutrefresh(self):
+        self.__dirty = True
+
+    refresh = noutrefresh
+
+    def transmit(self):
+        """
+        Передает в терминал изменения экрана после последнего refresh().
+        """
+        if not self.__dirty:
+            return
+        self.__dirty = False
+        for screen_row, sent_row in zip(self.screen, self.__sent):
+            if screen_row != sent_row:
+                for x, (char, sent) in enumerate(zip(screen_row, sent_row)):
+                    if char != sent:
+                        self.sent_bytes += len(char.encode())
+                        sent_row[x] = char
+
+
+class CountingStorage:
+    """
+    Обертка хранилища, считающая вызовы его методов, кроме опросов буфера
+    отложенной записи (IDLE_METHODS), которые поток сохранения делает
+    между командами.
+    """
+
+    def __init__(self, storage):
+        self.calls = 0
+        self.__storage = storage
+
+    def __getattr__(self, name):
+        attribute = getattr(self.__storage, name)
+        if name in IDLE_METHODS or not callable(attribute):
+            return attribute
+
+        def call(*args, **kwargs):
+            self.calls += 1
+            return attribute(*args, **kwargs)
+
+        call.__name__ = name
+        return call
+
+
+def replay(path: str, db_url: str | None = None, tasks: int | None = None) -> dict:
+    """
+    Воспроизводит записанную сессию (main.py --record) в TaskManager через
+    ReplayWindow и виртуальные часы. Между событиями трассы выполняются
+    кадры по таймеру (начало секунды, синхронизация, сроки планировщика),
+    как в цикле событий run(). После каждого кадра воспроизведение дожидается
+    команд потока сохранения, поэтому запросы к хранилищу относятся
+    к вызвавшей их клавише. Хранилище открывается без отложенной записи,
+    перенос в архив выключен: результат зависит только от трассы и данных.
+
+    :param path: Файл трассы
+    :param db_url: Хранилище, над которым воспроизводится сессия (оно будет
+        изменено); None — временная база SQLite с задачами make_tasks()
+    :param tasks: Количество задач временной базы; None — значение "tasks"
+        из заголовка трассы или DEFAULT_TASKS
+    :return: Кадры ("t" — время от начала сессии, "keys" — обработано
+        клавиш, "seconds" — время кадра, "db_calls" и "sql" — вызовы
+        хранилища и SQL-запросы, "bytes" — передано в терминал) и сводка
+    """
+    with open(path, encoding="utf-8") as file:
+        header, events = read_trace(file)
+    with tempfile.TemporaryDirectory(prefix="replay-") as directory:
+        if db_url is None:
+            db_url = f"sqlite:///{Path(directory) / 'replay.db'}"
+            database = Database(db_url)
+            if tasks is None:
+                tasks = header.get("tasks", DEFAULT_TASKS)
+            preload(database, tasks)
+            database.close()
+        return _replay(header, events, db_url)
+
+
+def _replay(header: dict, events: list[dict], db_url: str) -> dict:
+    clock = VirtualClock(header["start"])
+    window = ReplayWindow(events, clock, header["lines"], header["columns"])
+    storage = CountingStorage(open_storage(db_url))
+    instrumentation = Instrumentation()
+    if storage.engine is not None:
+        instrumentation.attach_engine(storage.engine)
+    frames = []
+    latency = LatencyHistogram()
+    saved_clock = Task.clock
+    Task.clock = clock
+    try:
+        with fake_curses():
+            manager = TaskManager(
+                window, db_url, database=storage, archive_after=None, clock=clock
+            )
+
+            def frame(function) -> bool:
+                calls, sql = storage.calls, _sql_count(instrumentation)
+                keys, sent_bytes = window.keys, window.sent_bytes
+                start = time.perf_counter()
+                running = function()
+                seconds = time.perf_counter() - start
+                manager.wait_results()
+                window.transmit()
+                latency.record(seconds)
+                frames.append(
+                    {
+                        "t": round(clock.elapsed, 6),
+                        "keys": window.keys - keys,
+                        "seconds": seconds,
+                        "db_calls": storage.calls - calls,
+                        "sql": _sql_count(instrumentation) - sql,
+                        "bytes": window.sent_bytes - sent_bytes,
+                    }
+                )
+                return running is not False
+
+            try:
+                running = frame(manager.render)
+                while running and (due := window.next_time()) is not None:
+                    timeout = manager.next_timeout()
+                    if timeout is not None and clock.elapsed + timeout < due:
+                        clock.advance_to(clock.elapsed + max(timeout, MIN_STEP))
+                    else:
+                        clock.advance_to(due)
+                    running = frame(manager.process_events)
+            finally:
+                manager.close()
+    finally:
+        Task.clock = saved_clock
+    keys = max(window.keys, 1)
+    return {
+        "frames": frames,
+        "summary": {
+            "frames": len(frames),
+            "keys": window.keys,
+            "skipped": window.skipped,
+            "duration": clock.elapsed,
+            "frame": latency.summary(),
+            "db_calls": sum(item["db_calls"] for item in frames),
+            "db_calls_per_key": sum(item["db_calls"] for item in frames) / keys,
+            "sql": sum(item["sql"] for item in frames),
+            "sql_per_key": sum(item["sql"] for item in frames) / keys,
+            "bytes": window.sent_bytes,
+            "bytes_per_frame": window.sent_bytes / max(len(frames), 1),
+        },
+    }
+
+
+def _sql_count(instrumentation: Instrumentation) -> int:
+    return sum(
+        item["count"]
+        for name, item in instrumentation.summary().items()
+        if name.startswith("sql.")
+    )
@@ -0,0 +1,42 @@
+import sys
+
+
+def first_frame_database(db_url: str):
+    """
+    Первый кадр обычным путем: загрузка SQLAlchemy, открытие базы данных
+    (создание таблиц и миграции), чтение активных задач и отрисовка.
+    """
+    from benchmarks.fake_curses import FakeWindow, fake_curses
+    from model.database import Database
+    from model.task_index import TaskIndex
+    from view.console_view import TableView
+
+    database = Database(db_url)
+    tasks = TaskIndex(database.load_store(finished=False).views()).view(False)
+    with fake_curses():
+        TableView(FakeWindow()).draw(tasks, 0, False)
+    database.close()
+
+
+def first_frame_snapshot(db_url: str):
+    """
+    Первый кадр по снимку: чтение снимка через mmap и отрисовка без
+    загрузки SQLAlchemy.
+    """
+    from benchmarks.fake_curses import FakeWindow, fake_curses
+    from model.snapshot import read_snapshot, snapshot_path
+    from view.console_view import TableView
+
+    tasks = read_snapshot(snapshot_path(db_url))
+    if tasks is None:
+        raise SystemExit("snapshot not found")
+    with fake_curses():
+        TableView(FakeWindow()).draw(tasks, 0, False)
+    assert "sqlalchemy" not in sys.modules
+
+
+PATHS = {"database": first_frame_database, "snapshot": first_frame_snapshot}
+
+
+if __name__ == "__main__":
+    PATHS[sys.argv[1]](sys.argv[2])
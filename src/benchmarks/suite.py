@@ -0,0 +1,491 @@
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import timeit
+from datetime import datetime
+from itertools import count, islice
+from pathlib import Path
+from typing import Callable, Iterator
+
+import numpy
+import sqlalchemy
+
+from benchmarks.fake_curses import FakeWindow, fake_curses
+from model.database import Database
+from model.name_index import NameIndex
+from model.snapshot import snapshot_path, write_snapshot
+from model.task import Task
+from model.task_index import TaskIndex
+from model.task_store import TaskStore
+from view.console_view import TableView, draw_table, format_elapsed_time
+
+SIZES = (100, 1_000, 10_000, 100_000, 1_000_000)
+QUICK_SIZES = (100, 1_000)
+BACKENDS = ("memory", "file")
+START_TIME = 1_700_000_000.0
+SEED = 1234
+SOURCE_DIR = Path(__file__).resolve().parent.parent
+TRACES_DIR = Path(__file__).resolve().parent / "traces"
+PRELOAD_BATCH = 10_000
+TREE_DEPTH = 10
+
+
+def measure(function: Callable[[], object], number: int, repeat: int) -> dict:
+    """
+    Замеряет function через timeit: repeat серий по number вызовов
+    (сборщик мусора на время серии отключается).
+
+    :return: Минимальное и медианное время одного вызова в секундах.
+    """
+    times = [
+        total / number
+        for total in timeit.Timer(function).repeat(repeat=repeat, number=number)
+    ]
+    return {
+        "seconds": min(times),
+        "median": statistics.median(times),
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def per_item(result: dict, items: int) -> dict:
+    """
+    Пересчитывает результат measure() на один элемент обработанного набора.
+    """
+    return {
+        **result,
+        "seconds": result["seconds"] / items,
+        "median": result["median"] / items,
+    }
+
+
+def make_tasks(size: int, prefix="task") -> Iterator[Task]:
+    """
+    Детерминированный набор задач: каждая третья запущена, каждая десятая
+    завершена, время начала фиксировано.
+    """
+    for i in range(size):
+        yield Task(
+            f"{prefix}-{i:07d}",
+            start_time=START_TIME + i,
+            total_time=float(i % 3600),
+            running=i % 3 == 0 and i % 10 != 0,
+            finished=i % 10 == 0,
+        )
+
+
+def preload(database: Database, size: int):
+    tasks = make_tasks(size)
+    while chunk := list(islice(tasks, PRELOAD_BATCH)):
+        database.add_tasks(chunk)
+
+
+def database_url(backend: str, directory: str) -> str:
+    if backend == "memory":
+        return "sqlite:///:memory:"
+    return f"sqlite:///{Path(directory) / 'bench.db'}"
+
+
+def bench_database(
+    size: int, backend: str, repeat: int, core=False
+) -> dict[str, dict]:
+    """
+    Замеры операций Database на таблице из size задач (fetch_page — страница
+    от случайной границы вперед или назад). С core=True замеряется реализация
+    горячих методов на SQLAlchemy Core, в названии варианта "+core".
+    Операции записи добавляют новые задачи и меняют существующие, поэтому
+    к концу замера таблица вырастает не более чем на number × repeat строк.
+    """
+    results = {}
+    rng = random.Random(SEED)
+    suffix = f"[{backend}{'+core' if core else ''},{size}]"
+    with tempfile.TemporaryDirectory() as directory:
+        database = Database(database_url(backend, directory), core=core)
+        try:
+            preload(database, size)
+            names = [f"task-{i:07d}" for i in rng.sample(range(size), min(size, 100))]
+
+            new_names = (f"new-{i:07d}" for i in count())
+            results["db.add_task" + suffix] = measure(
+                lambda: database.add_task(Task(next(new_names), START_TIME)),
+                number=100,
+                repeat=repeat,
+            )
+
+            tasks = [database.get_task_by_name(name) for name in names]
+            toggles = iter(range(10**9))
+
+            def update_task():
+                task = tasks[next(toggles) % len(tasks)]
+                if task.running:
+                    task.stop(START_TIME)
+                else:
+                    task.resume(START_TIME)
+                database.update_task(task.name, task)
+
+            results["db.update_task" + suffix] = measure(
+                update_task, number=100, repeat=repeat
+            )
+
+            lookups = iter(range(10**9))
+            results["db.get_task_by_name" + suffix] = measure(
+                lambda: database.get_task_by_name(names[next(lookups) % len(names)]),
+                number=100,
+                repeat=repeat,
+            )
+
+            keys = iter(range(10**9))
+            results["db.fetch_page" + suffix] = measure(
+                lambda: database.fetch_page(
+                    (True, names[next(keys) % len(names)]), backward=next(keys) % 2 == 1
+                ),
+                number=100,
+                repeat=repeat,
+            )
+
+            results["db.fetch_all_tasks" + suffix] = measure(
+                database.fetch_all_tasks,
+                number=1,
+                repeat=max(1, min(repeat, 100_000 // size)),
+            )
+        finally:
+            database.close()
+    return results
+
+
+def bench_tree(size: int, backend: str, repeat: int) -> dict[str, dict]:
+    """
+    Иерархия задач из size узлов в TREE_DEPTH уровней (сильно ветвящееся
+    дерево, у узла i родитель (i - 1) // fanout): чтение сводки поддерева,
+    запуск/остановка листа и перенос листа между проектами. Сводки
+    обновляются триггерами у предков, поэтому время не должно расти
+    с размером дерева. Дерево строится одним пакетным UPDATE parent_id,
+    таблицу замыкания и сводки заполняют триггеры.
+    """
+    fanout = 2
+    while (fanout**TREE_DEPTH - 1) // (fanout - 1) < size:
+        fanout += 1
+    names = [f"task-{i:07d}" for i in range(size)]
+    rng = random.Random(SEED)
+    suffix = f"[{backend},{size}]"
+    with tempfile.TemporaryDirectory() as directory:
+        database = Database(database_url(backend, directory))
+        try:
+            preload(database, size)
+            with database.engine.begin() as connection:
+                connection.execute(
+                    sqlalchemy.text(
+                        "UPDATE tasks SET parent_id = "
+                        "(SELECT id FROM tasks WHERE name = :parent) "
+                        "WHERE name = :name"
+                    ),
+                    [
+                        {"name": names[i], "parent": names[(i - 1) // fanout]}
+                        for i in range(1, size)
+                    ],
+                )
+            inner = (size - 2) // fanout + 1
+            leaves = [
+                database.get_task_by_name(name)
+                for name in names[max(inner, size - 100) :]
+            ]
+            sample = [names[i] for i in rng.sample(range(size), min(size, 100))]
+            projects = [names[i] for i in rng.sample(range(inner), min(inner, 100))]
+
+            lookups = iter(range(10**9))
+            results = {
+                "tree.rollup"
+                + suffix: measure(
+                    lambda: database.get_rollup(sample[next(lookups) % len(sample)]),
+                    number=100,
+                    repeat=repeat,
+                )
+            }
+
+            toggles = iter(range(10**9))
+
+            def toggle_leaf():
+                task = leaves[next(toggles) % len(leaves)]
+                if task.running:
+                    task.stop(START_TIME)
+                else:
+                    task.resume(START_TIME)
+                database.update_task(task.name, task)
+                database.flush()
+
+            results["tree.stop" + suffix] = measure(
+                toggle_leaf, number=100, repeat=repeat
+            )
+
+            moves = iter(range(10**9))
+
+            def move_leaf():
+                i = next(moves)
+                parent = projects[i % len(projects)]
+                database.set_parent(leaves[i % len(leaves)].name, parent)
+
+            results["tree.move" + suffix] = measure(
+                move_leaf, number=100, repeat=repeat
+            )
+        finally:
+            database.close()
+    return results
+
+
+def bench_startup(size: int, repeat: int) -> dict[str, dict]:
+    """
+    Время от запуска интерпретатора до первого кадра (benchmarks.startup)
+    в отдельном процессе: через SQLAlchemy и базу данных из size задач
+    и по снимку активных задач. Время включает запуск интерпретатора.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        db_url = database_url("file", directory)
+        database = Database(db_url)
+        try:
+            preload(database, size)
+            tasks = TaskIndex(database.load_store(finished=False).views()).view(False)
+            write_snapshot(snapshot_path(db_url), tasks)
+        finally:
+            database.close()
+        return {
+            f"startup.{path}[{size}]": measure(
+                lambda p=path: subprocess.run(
+                    [sys.executable, "-m", "benchmarks.startup", p, db_url],
+                    cwd=SOURCE_DIR,
+                    check=True,
+                ),
+                number=1,
+                repeat=repeat,
+            )
+            for path in ("database", "snapshot")
+        }
+
+
+def bench_model(size: int, repeat: int) -> dict[str, dict]:
+    """
+    Расчет общего времени всех задач: обход объектов Task и векторный
+    расчет по колонкам TaskStore. Время указано на одну задачу.
+    """
+    tasks = list(make_tasks(size))
+    store = TaskStore()
+    for task in tasks:
+        store.add(task)
+    now = START_TIME + size
+    number = max(1, 100_000 // size)
+    return {
+        f"task.elapsed_time[{size}]": per_item(
+            measure(
+                lambda: [task.elapsed_time(now) for task in tasks],
+                number=number,
+                repeat=repeat,
+            ),
+            size,
+        ),
+        f"store.elapsed[{size}]": per_item(
+            measure(lambda: store.elapsed(now), number=number, repeat=repeat), size
+        ),
+    }
+
+
+def bench_search(size: int, repeat: int) -> dict[str, dict]:
+    """
+    Поиск по именам задач: построение индекса имен (выполняется при первом
+    поиске), узкий запрос (одно совпадение) и широкий запрос (все задачи).
+    """
+    index = TaskIndex(make_tasks(size))
+    names = [f"task-{i:07d}" for i in range(size)]
+    target = f"{size // 2:07d}"
+    return {
+        f"search.build[{size}]": measure(
+            lambda: NameIndex(names),
+            number=1,
+            repeat=max(1, min(repeat, 1_000_000 // size)),
+        ),
+        f"search.narrow[{size}]": measure(
+            lambda: index.search(target, False), number=100, repeat=repeat
+        ),
+        f"search.broad[{size}]": measure(
+            lambda: index.search("task", False),
+            number=max(1, 10_000 // size),
+            repeat=repeat,
+        ),
+    }
+
+
+def bench_render(size: int, repeat: int) -> dict[str, dict]:
+    """
+    Отрисовка кадра таблицы в FakeWindow 50×120: полный кадр draw_table
+    и кадр TableView, в котором изменилась только отображаемая секунда.
+    """
+    tasks = list(make_tasks(size))
+    window = FakeWindow()
+    ticks = iter(range(10**9))
+    saved_clock = Task.clock
+    Task.clock = lambda: START_TIME + size + next(ticks)
+    try:
+        with fake_curses():
+            view = TableView(window)
+            view.draw(tasks, 0, False)
+            return {
+                f"render.draw_table[{size}]": measure(
+                    lambda: draw_table(window, tasks, 0, False),
+                    number=100,
+                    repeat=repeat,
+                ),
+                f"render.table_view_tick[{size}]": measure(
+                    lambda: view.draw(tasks, 0, False), number=100, repeat=repeat
+                ),
+            }
+    finally:
+        Task.clock = saved_clock
+
+
+def bench_replay(path: Path, repeat: int) -> dict[str, dict]:
+    """
+    Воспроизведение записанной сессии (benchmarks.replay): среднее время
+    кадра по repeat воспроизведениям, а также вызовы хранилища на клавишу
+    и байты, переданные в терминал, на кадр (они от запуска к запуску
+    не меняются).
+    """
+    from benchmarks.replay import replay
+
+    summaries = [replay(str(path))["summary"] for _ in range(repeat)]
+    means = [summary["frame"]["mean"] for summary in summaries]
+    return {
+        f"replay.frame[{path.stem}]": {
+            "seconds": min(means),
+            "median": statistics.median(means),
+            "number": summaries[0]["frames"],
+            "repeat": repeat,
+            "db_calls_per_key": summaries[0]["db_calls_per_key"],
+            "bytes_per_frame": summaries[0]["bytes_per_frame"],
+        }
+    }
+
+
+def bench_format(repeat: int) -> dict[str, dict]:
+    seconds = [float(i * 37 % 200_000) for i in range(1000)]
+    result = measure(
+        lambda: [format_elapsed_time(value) for value in seconds],
+        number=10,
+        repeat=repeat,
+    )
+    return {"render.format_elapsed_time": per_item(result, len(seconds))}
+
+
+def metadata() -> dict:
+    return {
+        "time": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "sqlite": sqlite3.sqlite_version,
+        "sqlalchemy": sqlalchemy.__version__,
+        "numpy": numpy.__version__,
+    }
+
+
+def run_suite(
+    sizes=SIZES,
+    backends=BACKENDS,
+    repeat=5,
+    only: str | None = None,
+    progress: Callable[[str], None] | None = None,
+) -> dict:
+    """
+    Выполняет все замеры.
+
+    :param sizes: Размеры таблицы задач
+    :param backends: Варианты SQLite: "memory" и/или "file"
+    :param repeat: Количество серий в каждом замере
+    :param only: Выполнять только группы, в названии которых есть эта подстрока
+        ("db", "tree", "startup", "task", "store", "search", "render",
+        "replay")
+    :param progress: Функция для вывода хода выполнения
+    :return: Метаданные окружения и результаты по названиям замеров
+    """
+    groups = []
+    for size in sizes:
+        for backend in backends:
+            for core in (False, True):
+                groups.append(
+                    (
+                        f"db[{backend}{'+core' if core else ''},{size}]",
+                        lambda s=size, b=backend, c=core: bench_database(
+                            s, b, repeat, c
+                        ),
+                    )
+                )
+        if size <= 100_000:
+            for backend in backends:
+                groups.append(
+                    (
+                        f"tree[{backend},{size}]",
+                        lambda s=size, b=backend: bench_tree(s, b, repeat),
+                    )
+                )
+            groups.append(
+                (f"startup[{size}]", lambda s=size: bench_startup(s, repeat))
+            )
+            groups.append(
+                (f"task/store[{size}]", lambda s=size: bench_model(s, repeat))
+            )
+            groups.append((f"search[{size}]", lambda s=size: bench_search(s, repeat)))
+        if size <= 10_000:
+            groups.append(
+                (f"render[{size}]", lambda s=size: bench_render(s, repeat))
+            )
+    groups.append(("render.format", lambda: bench_format(repeat)))
+    for path in sorted(TRACES_DIR.glob("*.jsonl")):
+        groups.append(
+            (f"replay[{path.stem}]", lambda p=path: bench_replay(p, repeat))
+        )
+
+    results = {}
+    for name, group in groups:
+        if only and only not in name:
+            continue
+        if progress is not None:
+            progress(name)
+        results.update(group())
+    return {"meta": metadata(), "results": results}
+
+
+def compare(baseline: dict, current: dict, threshold=0.1) -> list[dict]:
+    """
+    Сравнивает результаты с сохраненной базовой линией.
+
+    :param baseline: Результаты run_suite() базовой линии
+    :param current: Результаты run_suite() текущего запуска
+    :param threshold: Допустимое относительное замедление (0.1 — 10%)
+    :return: Строки сравнения по общим замерам: старое и новое время,
+        отношение и статус "regression", "improvement" или "ok"
+    """
+    rows = []
+    old_results, new_results = baseline["results"], current["results"]
+    for name in sorted(old_results.keys() & new_results.keys()):
+        old = old_results[name]["seconds"]
+        new = new_results[name]["seconds"]
+        ratio = new / old if old else float("inf")
+        if ratio > 1 + threshold:
+            status = "regression"
+        elif ratio < 1 / (1 + threshold):
+            status = "improvement"
+        else:
+            status = "ok"
+        rows.append(
+            {
+                "name": name,
+                "baseline": old,
+                "current": new,
+                "ratio": ratio,
+                "status": status,
+            }
+        )
+    return rows
@@ -0,0 +1,462 @@
+import argparse
+import json
+import os
+import shlex
+import sys
+from datetime import date, datetime, timedelta
+
+from model.exchange import FORMATS, detect_format, read_tasks, write_tasks
+from model.remote_storage import SOCKET_PATH, RemoteStorage
+from model.scheduler import Scheduler
+from model.storage import (ARCHIVE_AFTER, ARCHIVE_BATCH_SIZE,
+                           CONFLICT_POLICIES, ConflictError, Storage,
+                           open_storage)
+from model.task import Task
+from model.task_tree import Rollup
+
+DB_ENV = "TASKS_DB"
+DEFAULT_DB = "sqlite:///tasks.db"
+
+
+class CommandError(Exception):
+    """
+    Ошибка выполнения команды: задача не найдена, имя занято и т.п.
+    """
+
+
+def task_to_dict(task: Task) -> dict:
+    """
+    Представление задачи для машиночитаемого вывода.
+    """
+    return {
+        "name": task.name,
+        "running": task.running,
+        "finished": task.finished,
+        "start_time": task.start_time.isoformat(),
+        "total_time": round(task.total_time, 3),
+        "elapsed_time": round(task.elapsed_time(), 3),
+        "budget": task.budget,
+    }
+
+
+def rollup_to_dict(rollup: Rollup) -> dict:
+    """
+    Представление сводки поддерева задачи для машиночитаемого вывода.
+    """
+    return {
+        "size": rollup.size,
+        "children": rollup.children,
+        "running": rollup.running,
+        "total_time": round(rollup.total_time, 3),
+        "elapsed_time": round(rollup.elapsed_time(), 3),
+    }
+
+
+def get_task(database: Storage, name: str) -> Task:
+    if task := database.get_task_by_name(name):
+        return task
+    raise CommandError(f"task not found: {name}")
+
+
+def update(database: Storage, task: Task) -> dict:
+    if not database.update_task(task.name, task):
+        raise CommandError(f"task not found: {task.name}")
+    return {"task": task_to_dict(task)}
+
+
+def cmd_add(database: Storage, args) -> dict:
+    task = Task(args.name, running=not args.stopped)
+    with database.transaction():
+        if not database.add_task(task):
+            raise CommandError(f"task already exists: {args.name}")
+        if args.parent is not None and not database.set_parent(args.name, args.parent):
+            raise CommandError(f"task not found: {args.parent}")
+    return {"task": task_to_dict(task)}
+
+
+def cmd_start(database: Storage, args) -> dict:
+    task = get_task(database, args.name)
+    if task.finished:
+        raise CommandError(f"task is finished: {args.name}")
+    task.resume()
+    return update(database, task)
+
+
+def cmd_stop(database: Storage, args) -> dict:
+    task = get_task(database, args.name)
+    task.stop()
+    return update(database, task)
+
+
+def cmd_finish(database: Storage, args) -> dict:
+    task = get_task(database, args.name)
+    task.finish()
+    return update(database, task)
+
+
+def cmd_rename(database: Storage, args) -> dict:
+    task = get_task(database, args.name)
+    task.name = args.new_name
+    if not database.update_task(args.name, task):
+        raise CommandError(f"task already exists: {args.new_name}")
+    return {"task": task_to_dict(task)}
+
+
+def cmd_budget(database: Storage, args) -> dict:
+    task = get_task(database, args.name)
+    if args.hours is not None and not 0 < args.hours < float("inf"):
+        raise CommandError(f"budget must be positive: {args.hours}")
+    task.budget = None if args.hours is None else args.hours * 3600
+    return update(database, task)
+
+
+def cmd_rm(database: Storage, args) -> dict:
+    if not database.delete_task(args.name):
+        raise CommandError(f"task not found: {args.name}")
+    return {"deleted": args.name}
+
+
+def cmd_move(database: Storage, args) -> dict:
+    get_task(database, args.name)
+    try:
+        if not database.set_parent(args.name, args.parent):
+            raise CommandError(f"task not found: {args.parent}")
+    except ValueError as error:
+        raise CommandError(
+            f"cannot move {args.name} into its own subtree: {args.parent}"
+        ) from error
+    return {"task": args.name, "parent": args.parent}
+
+
+def cmd_tree(database: Storage, args) -> dict:
+    def node(task: Task, rollup: Rollup, depth: int) -> dict:
+        item = {"task": task_to_dict(task), "rollup": rollup_to_dict(rollup)}
+        if rollup.children and (args.depth is None or depth < args.depth):
+            item["children"] = [
+                node(*child, depth + 1) for child in database.fetch_children(task.name)
+            ]
+        return item
+
+    if args.name is None:
+        return {"tree": [node(*root, 1) for root in database.fetch_children()]}
+    task = get_task(database, args.name)
+    return {"tree": [node(task, database.get_rollup(args.name), 1)]}
+
+
+def cmd_ls(database: Storage, args) -> dict:
+    tasks = database.fetch_all_tasks(args.finished)
+    return {"tasks": [task_to_dict(task) for task in tasks]}
+
+
+def cmd_status(database: Storage, args) -> dict:
+    now = Task.clock()
+    if isinstance(database, RemoteStorage):
+        running, over_budget, deadline = database.status()
+    else:
+        running = [task for task in database.fetch_all_tasks() if task.running]
+        scheduler = Scheduler()
+        for task in running:
+            scheduler.update(task.name, task, now)
+        over_budget = sorted(scheduler.exceeded)
+        deadline = scheduler.next_deadline()
+    return {
+        "time": datetime.fromtimestamp(now).isoformat(),
+        "running": [task_to_dict(task) for task in running],
+        "over_budget": over_budget,
+        "next_alert": None
+        if deadline is None
+        else datetime.fromtimestamp(deadline).isoformat(),
+    }
+
+
+def cmd_export(database: Storage, args) -> dict:
+    fmt = args.format or detect_format(args.output or "")
+    finished = {"active": False, "finished": True, "all": None}[args.tasks]
+    tasks = database.iter_tasks(finished, batch_size=args.batch_size)
+    if args.output is None:
+        write_tasks(tasks, sys.stdout, fmt)
+        return None
+    with open(args.output, "w", encoding="utf-8", newline="") as file:
+        count = write_tasks(tasks, file, fmt)
+    return {"exported": count, "file": args.output}
+
+
+def cmd_import(database: Storage, args) -> dict:
+    fmt = args.format or detect_format(args.file)
+    try:
+        with open(args.file, encoding="utf-8", newline="") as file:
+            counts = database.import_tasks(
+                read_tasks(file, fmt),
+                batch_size=args.batch_size,
+                on_conflict=args.on_conflict,
+            )
+    except (OSError, ValueError, KeyError) as error:
+        raise CommandError(f"import failed: {error}") from error
+    return counts
+
+
+def cmd_report(database: Storage, args) -> dict:
+    from model.report import build_report
+
+    today = datetime.combine(date.today(), datetime.min.time())
+    since = args.since or today - timedelta(days=13)
+    until = args.until or today + timedelta(days=1)
+    if until <= since:
+        raise CommandError(f"report range is empty: {since} - {until}")
+    report = build_report(database, since, until, args.period)
+    if args.csv:
+        report.to_csv(sys.stdout)
+        return None
+    totals = report.period_totals()
+    return {
+        "since": since.isoformat(),
+        "until": until.isoformat(),
+        "period": args.period,
+        "tasks": [
+            {"name": name, "total_time": round(seconds, 3)}
+            for name, seconds in report.top(len(report.task_names))
+        ],
+        "periods": [
+            {"start": start.isoformat(), "total_time": round(float(seconds), 3)}
+            for start, seconds in zip(report.period_starts, totals)
+        ],
+    }
+
+
+def cmd_archive(database: Storage, args) -> dict:
+    archived = database.archive(
+        timedelta(days=args.days), args.batch_size, vacuum=not args.no_vacuum
+    )
+    return {"archived": archived}
+
+
+def cmd_daemon(database: Storage, args) -> dict:
+    from model.daemon import run_daemon
+
+    if isinstance(database, RemoteStorage):
+        raise CommandError("daemon needs a database or task log URL")
+    run_daemon(database, args.socket)
+    return {"stopped": args.socket}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Парсер аргументов командной строки.
+    """
+    parser = argparse.ArgumentParser(
+        prog="tasks",
+        description="Неинтерактивное управление задачами трекера времени. "
+        "Результат каждой команды выводится строкой JSON.",
+    )
+    parser.add_argument(
+        "--db",
+        default=os.environ.get(DB_ENV, DEFAULT_DB),
+        help="URL хранилища: база данных sqlite:///путь, tasklog:///путь или "
+        f"taskd:///сокет (по умолчанию ${DB_ENV} или {DEFAULT_DB})",
+    )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="читать команды построчно из stdin и выполнить их одной транзакцией",
+    )
+    commands = parser.add_subparsers(dest="command")
+
+    add = commands.add_parser("add", help="добавить задачу")
+    add.add_argument("name")
+    add.add_argument("--stopped", action="store_true", help="не запускать задачу")
+    add.add_argument("--parent", help="родительская задача (проект)")
+    add.set_defaults(handler=cmd_add)
+
+    for name, handler, help_text in (
+        ("start", cmd_start, "запустить задачу"),
+        ("stop", cmd_stop, "остановить задачу"),
+        ("finish", cmd_finish, "завершить задачу"),
+        ("rm", cmd_rm, "удалить задачу"),
+    ):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("name")
+        command.set_defaults(handler=handler)
+
+    rename = commands.add_parser("rename", help="переименовать задачу")
+    rename.add_argument("name")
+    rename.add_argument("new_name")
+    rename.set_defaults(handler=cmd_rename)
+
+    budget = commands.add_parser(
+        "budget", help="задать бюджет времени задачи (без HOURS — снять)"
+    )
+    budget.add_argument("name")
+    budget.add_argument("hours", type=float, nargs="?", help="бюджет в часах")
+    budget.set_defaults(handler=cmd_budget)
+
+    move = commands.add_parser(
+        "move", help="перенести задачу в проект PARENT (без PARENT — в корень)"
+    )
+    move.add_argument("name")
+    move.add_argument("parent", nargs="?")
+    move.set_defaults(handler=cmd_move)
+
+    tree = commands.add_parser(
+        "tree", help="иерархия задач со сводками (без NAME — от корня)"
+    )
+    tree.add_argument("name", nargs="?")
+    tree.add_argument("--depth", type=int, help="количество выводимых уровней")
+    tree.set_defaults(handler=cmd_tree)
+
+    ls = commands.add_parser("ls", help="список задач")
+    ls.add_argument("--finished", action="store_true", help="завершенные задачи")
+    ls.set_defaults(handler=cmd_ls)
+
+    status = commands.add_parser("status", help="запущенные задачи")
+    status.set_defaults(handler=cmd_status)
+
+    export = commands.add_parser("export", help="выгрузить задачи в CSV или JSONL")
+    export.add_argument("-o", "--output", help="файл (по умолчанию stdout)")
+    export.add_argument("--format", choices=FORMATS, help="формат выгрузки")
+    export.add_argument(
+        "--tasks", choices=("active", "finished", "all"), default="all"
+    )
+    export.add_argument("--batch-size", type=int, default=1000)
+    export.set_defaults(handler=cmd_export)
+
+    import_ = commands.add_parser("import", help="загрузить задачи из CSV или JSONL")
+    import_.add_argument("file")
+    import_.add_argument("--format", choices=FORMATS, help="формат файла")
+    import_.add_argument("--batch-size", type=int, default=1000)
+    import_.add_argument(
+        "--on-conflict",
+        choices=CONFLICT_POLICIES,
+        default="skip",
+        help="что делать с задачами, имена которых уже заняты",
+    )
+    import_.set_defaults(handler=cmd_import)
+
+    report = commands.add_parser(
+        "report", help="отчет о затраченном времени (по умолчанию за две недели)"
+    )
+    report.add_argument("--period", choices=("day", "week"), default="day")
+    report.add_argument(
+        "--since", type=datetime.fromisoformat, help="начало отчета (ISO 8601)"
+    )
+    report.add_argument(
+        "--until",
+        type=datetime.fromisoformat,
+        help="конец отчета, не включая его (ISO 8601)",
+    )
+    report.add_argument(
+        "--csv",
+        action="store_true",
+        help="вывести ненулевые ячейки отчета в CSV вместо JSON",
+    )
+    report.set_defaults(handler=cmd_report)
+
+    archive = commands.add_parser(
+        "archive", help="перенести старые завершенные задачи в архив"
+    )
+    archive.add_argument(
+        "--days",
+        type=float,
+        default=ARCHIVE_AFTER.days,
+        help="возраст завершенной задачи в днях",
+    )
+    archive.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+    archive.add_argument(
+        "--no-vacuum", action="store_true", help="не выполнять VACUUM после переноса"
+    )
+    archive.set_defaults(handler=cmd_archive)
+
+    daemon = commands.add_parser(
+        "daemon", help="обслуживать клиентов через сокет Unix до SIGINT/SIGTERM"
+    )
+    daemon.add_argument("--socket", default=SOCKET_PATH, help="путь к сокету")
+    daemon.set_defaults(handler=cmd_daemon)
+    return parser
+
+
+def execute(database: Storage, args: argparse.Namespace) -> dict | None:
+    """
+    Выполняет одну разобранную команду и возвращает её результат.
+
+    :return: Результат команды или None, если команда сама пишет в stdout.
+    :raises CommandError: Если команда не может быть выполнена.
+    """
+    if args.command is None:
+        raise CommandError("command is required")
+    try:
+        result = args.handler(database, args)
+    except ConflictError as error:
+        raise CommandError(f"conflict: {error}") from error
+    if result is None:
+        return None
+    return {"ok": True, "command": args.command, **result}
+
+
+def parse_line(parser: argparse.ArgumentParser, line: str) -> argparse.Namespace | None:
+    """
+    Разбирает строку пакетного режима как команду командной строки.
+
+    :return: Разобранная команда или None для пустой строки и комментария.
+    :raises CommandError: Если строку не удалось разобрать.
+    """
+    try:
+        argv = shlex.split(line, comments=True)
+        return parser.parse_args(argv) if argv else None
+    except (ValueError, argparse.ArgumentError, SystemExit) as error:
+        raise CommandError(f"invalid command: {line.strip()}") from error
+
+
+def run_batch(database: Storage, parser: argparse.ArgumentParser, lines) -> int:
+    """
+    Выполняет команды из строк lines одной транзакцией.
+    При первой ошибке транзакция откатывается целиком.
+
+    :return: Код завершения процесса.
+    """
+    results = []
+    try:
+        with database.transaction():
+            for number, line in enumerate(lines, start=1):
+                try:
+                    if args := parse_line(parser, line):
+                        results.append(execute(database, args))
+                except CommandError as error:
+                    raise CommandError(f"line {number}: {error}") from error
+    except CommandError as error:
+        print_result({"ok": False, "error": str(error), "rolled_back": True})
+        return 1
+    for result in results:
+        print_result(result)
+    return 0
+
+
+def print_result(result: dict | None):
+    if result is not None:
+        print(json.dumps(result, ensure_ascii=False))
+
+
+def run(argv: list[str]) -> int:
+    """
+    Точка входа командной строки. Модуль не импортирует curses, поэтому
+    разовые вызовы из cron и git-хуков запускаются быстро.
+
+    :param argv: Аргументы командной строки без имени программы.
+    :return: Код завершения процесса.
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    database = open_storage(args.db)
+    try:
+        if args.batch:
+            return run_batch(database, parser, sys.stdin)
+        try:
+            print_result(execute(database, args))
+        except CommandError as error:
+            print_result({"ok": False, "error": str(error)})
+            return 1
+        return 0
+    finally:
+        database.close()
+
+
+if __name__ == "__main__":
+    sys.exit(run(sys.argv[1:]))
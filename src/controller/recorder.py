@@ -0,0 +1,96 @@
+import json
+import time
+from contextlib import contextmanager
+from typing import IO, Callable, Iterator
+
+from model.task import Task
+
+TRACE_VERSION = 1
+
+
+class RecordingWindow:
+    """
+    Обертка окна curses, записывающая ввод сессии в трассу JSONL.
+
+    Первая строка трассы — заголовок: версия формата, размер окна и время
+    начала сессии (Task.clock()). Далее по строке на событие ввода:
+    {"t": секунды от начала, "key": код} для getch() и {"t": ..., "str": текст}
+    для getstr(). Пустые опросы getch() (-1) не записываются. Остальные
+    методы передаются окну без изменений. Трассу воспроизводит
+    benchmarks.replay.
+    """
+
+    def __init__(
+        self, window, file: IO[str], clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        :param window: Окно curses
+        :param file: Текстовый файл трассы, открытый на запись
+        :param clock: Монотонные часы для отметок времени событий
+        """
+        self.__window = window
+        self.__file = file
+        self.__clock = clock
+        self.__started = clock()
+        lines, columns = window.getmaxyx()
+        self.__write(
+            {
+                "version": TRACE_VERSION,
+                "lines": lines,
+                "columns": columns,
+                "start": Task.clock(),
+            }
+        )
+
+    def getch(self, *args) -> int:
+        key = self.__window.getch(*args)
+        if key != -1:
+            self.__write({"t": self.__elapsed(), "key": key})
+        return key
+
+    def getstr(self, *args) -> bytes:
+        text = self.__window.getstr(*args)
+        self.__write(
+            {"t": self.__elapsed(), "str": text.decode("utf-8", "surrogateescape")}
+        )
+        return text
+
+    def __getattr__(self, name):
+        return getattr(self.__window, name)
+
+    def __elapsed(self) -> float:
+        return round(self.__clock() - self.__started, 6)
+
+    def __write(self, record: dict):
+        self.__file.write(json.dumps(record) + "\n")
+        self.__file.flush()
+
+
+@contextmanager
+def recording(window, path: str | None) -> Iterator:
+    """
+    Включает запись ввода сессии в файл path.
+
+    :param window: Окно curses
+    :param path: Путь к файлу трассы или None
+    :return: RecordingWindow над window или само window, если path не задан
+    """
+    if path is None:
+        yield window
+        return
+    with open(path, "w", encoding="utf-8") as file:
+        yield RecordingWindow(window, file)
+
+
+def read_trace(file: IO[str]) -> tuple[dict, list[dict]]:
+    """
+    Читает трассу, записанную RecordingWindow.
+
+    :param file: Текстовый файл трассы
+    :return: Заголовок и события ввода по порядку
+    :raises ValueError: Если файл не является трассой поддерживаемой версии
+    """
+    header = json.loads(file.readline() or "null")
+    if not isinstance(header, dict) or header.get("version") != TRACE_VERSION:
+        raise ValueError("not a session trace")
+    return header, [json.loads(line) for line in file if line.strip()]
@@ -1,11 +1,37 @@
+import codecs
 import curses
+import os
+import selectors
+import signal
+import sys
 import time
+from concurrent.futures import Future
+from datetime import date, datetime, timedelta
 from enum import Enum
+from typing import Callable
 
-from model.database import Database
+from model.instrumentation import Instrumentation
+from model.lazy_task_list import LazyTaskList
+from model.persistence import PersistenceWorker
+from model.remote_storage import RemoteStorage
+from model.report import build_report
+from model.scheduler import BUDGET, REMIND_AFTER, Scheduler
+from model.snapshot import snapshot_path, write_store_snapshot
+from model.storage import (ARCHIVE_AFTER, ARCHIVE_BATCH_SIZE, ConflictError,
+                           Storage, open_storage)
 from model.task import Task
-from view.console_view import (confirmation, draw_table, error_screen,
-                               get_task_name, init_colors)
+from model.task_index import TaskIndex
+from model.tree_list import TreeList
+from view.console_view import (TableView, confirmation, get_task_name,
+                               init_colors, report_screen)
+
+STATUS_SECONDS = 3.0
+SYNC_SECONDS = 2.0
+ARCHIVE_SECONDS = 3600.0
+ESCAPE_DELAY_MS = 25
+KEY_ESCAPE = 27
+ENTER_KEYS = (curses.KEY_ENTER, ord("\n"), ord("\r"))
+BACKSPACE_KEYS = (curses.KEY_BACKSPACE, 127, 8)
 
 
 class Commands(Enum):
@@ -15,6 +41,12 @@ class Commands(Enum):
     DELETE_TASK = "dD"
     RENAME_TASK = "rR"
     FINISH_TASK = "xX"
+    REPORT = "pP"
+    STATS = "iI"
+    SEARCH = "/"
+    BUDGET = "bB"
+    TREE = "tT"
+    MOVE = "mM"
     QUIT = "qQ"
 
     @classmethod
@@ -36,74 +68,306 @@ class Commands(Enum):
         return None
 
 
+TREE_COMMANDS = frozenset(
+    (Commands.TREE, Commands.MOVE, Commands.REPORT, Commands.STATS)
+)
+
+
 class TaskManager:
-    def __init__(self, stdscr: curses.window, db_url="sqlite:///tasks.db"):
+    def __init__(
+        self,
+        stdscr: curses.window,
+        db_url="sqlite:///tasks.db",
+        instrumentation: Instrumentation | None = None,
+        database: Storage | None = None,
+        archive_after: timedelta | None = ARCHIVE_AFTER,
+        remind_after: timedelta | None = REMIND_AFTER,
+        clock: Callable[[], float] = time.monotonic,
+    ):
         """
-        Инициализация менеджера задач. Создается подключение к базе данных и настраивается
-        начальное состояние интерфейса.
+        Инициализация менеджера задач. Создается подключение к базе данных, активные
+        задачи загружаются в колоночное хранилище, над строками которого строится
+        индекс в памяти, и настраивается начальное состояние интерфейса. Индекс
+        является основным источником данных для раздела активных задач; раздел
+        завершенных задач не загружается целиком, а читается страницами по мере
+        движения курсора (LazyTaskList), поэтому его открытие не зависит от
+        количества завершенных задач. Страницы, размер раздела и дети узлов
+        дерева читает поток сохранения, а интерфейс их не ждет: до прихода
+        результата на месте строк рисуются заглушки. Изменения передаются потоку
+        сохранения и записываются в базу данных в режиме отложенной записи,
+        поэтому интерфейс не ждет диска; ошибки записи приходят позже и
+        показываются в строке состояния. Раз в SYNC_SECONDS секунд из журнала
+        изменений перечитываются задачи, измененные другими процессами;
+        с хранилищем демона (taskd:///сокет) — сразу по событию подписки.
+        Активные задачи сохраняются в снимок рядом с файлом базы данных после
+        каждого фонового сброса буфера и при выходе: по снимку следующий
+        запуск рисует первый кадр до загрузки SQLAlchemy (см. main.py).
+        При запуске и затем раз в ARCHIVE_SECONDS секунд завершенные задачи
+        старше archive_after переносятся в архив пачками, каждая пачка —
+        отдельной командой потока сохранения, чтобы не задерживать запись
+        изменений пользователя.
+        Сроки бюджетов времени и напоминаний о запущенных задачах ведет
+        планировщик (Scheduler): цикл событий просыпается к ближайшему сроку,
+        а задачи с исчерпанным бюджетом выделяются в таблице.
+        Дерево проектов (TreeList) читает из хранилища только корневые задачи
+        и раскрытые поддеревья, время проектов берется из сводок поддеревьев.
 
         :param stdscr: Объект окна curses для рисования интерфейса.
-        :param db_url: URL базы данных для подключения (по умолчанию используется SQLite).
+        :param db_url: URL хранилища задач: база данных SQLite или журнал
+            операций tasklog:///путь (см. open_storage).
+        :param instrumentation: Сбор задержек SQL-запросов, команд, потока
+            сохранения и кадров; None — без замеров.
+        :param database: Уже открытое хранилище (с отложенной записью)
+            по адресу db_url; None — открыть его здесь.
+        :param archive_after: Возраст завершенной задачи для переноса
+            в архив; None — не архивировать.
+        :param remind_after: Интервал напоминаний о задаче, запущенной без
+            остановки; None — без напоминаний.
+        :param clock: Монотонные часы для сроков строки состояния,
+            синхронизации и архивации (при воспроизведении сессии —
+            виртуальные, см. benchmarks.replay).
         """
-        self.__database = Database(db_url)
+        self.__instrumentation = instrumentation
+        self.__clock = clock
+        self.__overlay = False
+        if database is None:
+            database = open_storage(db_url, write_behind=True)
+        self.__database = database
+        self.__snapshot_path = snapshot_path(db_url)
+        self.__snapshot_flushes = 0
+        self.__snapshot_saving: Future | None = None
+        if instrumentation is not None and self.__database.engine is not None:
+            instrumentation.attach_engine(self.__database.engine)
         self.__stdscr = stdscr
-        self.__tasks = self.__database.fetch_all_tasks()
-        self.__active_field = 0
+        self.__change_seq = self.__database.last_change()
+        self.__store = self.__database.load_store(finished=False)
+        self.__index = TaskIndex(self.__store.views())
+        self.__scheduler = Scheduler(
+            None if remind_after is None else remind_after.total_seconds()
+        )
+        self.__scheduler.load(self.__store)
+        self.__results_read, self.__results_write = os.pipe()
+        os.set_blocking(self.__results_read, False)
+        os.set_blocking(self.__results_write, False)
+        if isinstance(self.__database, RemoteStorage):
+            self.__database.subscribe(self.__on_remote_changes)
+        self.__worker = PersistenceWorker(
+            self.__database, notify=self.__notify, instrumentation=instrumentation
+        )
+        self.__results: list[tuple[Future, Callable | None]] = []
+        self.__status = None
+        self.__status_until = 0.0
+        self.__next_sync = self.__clock() + SYNC_SECONDS
+        self.__touched: set[str] = set()
+        self.__archive_after = archive_after
+        self.__next_archive = self.__clock()
+        self.__archived = 0
         self.__show_finished = False
-        self.__stdscr.nodelay(True)
-        init_colors()
-
-    def run(self):
-        """
-        Основной цикл программы, который обновляет интерфейс и обрабатывает команды.
-        """
-        commands_map = {
+        self.__query: str | None = None
+        self.__typing = False
+        self.__decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+        self.__finished = LazyTaskList(self.__fetch_finished, self.__count_finished)
+        self.__finished_pages: dict[tuple, Future] = {}
+        self.__finished_counts: dict[str | None, Future] = {}
+        self.__tree: TreeList | None = None
+        self.__tree_reads: dict[str | None, Future] = {}
+        self.__tasks = self.__index.view(self.__show_finished)
+        self.__active_field = 0
+        self.__view = TableView(stdscr)
+        self.__commands = {
             Commands.ADD_TASK: self.add_task,
             Commands.SWITCH_TASKS: self.switch_tasks,
             Commands.STOP_RESUME: self.stop_resume_task,
             Commands.DELETE_TASK: self.delete_task,
             Commands.RENAME_TASK: self.update_task_name,
             Commands.FINISH_TASK: self.finish_task,
+            Commands.REPORT: self.show_report,
+            Commands.STATS: self.toggle_stats,
+            Commands.SEARCH: self.start_search,
+            Commands.BUDGET: self.set_budget,
+            Commands.TREE: self.toggle_tree,
+            Commands.MOVE: self.move_task,
         }
+        self.__stdscr.nodelay(True)
+        curses.set_escdelay(ESCAPE_DELAY_MS)
+        init_colors()
+
+    def run(self):
+        """
+        Основной цикл программы, управляемый событиями.
+
+        Процесс спит в selector до одного из событий: ввода с терминала,
+        начала следующей секунды (только пока есть запущенные задачи), ответа
+        потока сохранения, истечения сообщения в строке состояния, срока
+        синхронизации с журналом изменений, ближайшего срока планировщика
+        или сигнала SIGWINCH. Без запущенных
+        задач и без ввода цикл просыпается только для синхронизации.
+        """
+        selector = selectors.DefaultSelector()
+        wakeup_read, wakeup_write = os.pipe()
+        os.set_blocking(wakeup_read, False)
+        os.set_blocking(wakeup_write, False)
+        selector.register(sys.stdin.fileno(), selectors.EVENT_READ)
+        selector.register(wakeup_read, selectors.EVENT_READ)
+        selector.register(self.__results_read, selectors.EVENT_READ)
+        previous_wakeup_fd = signal.set_wakeup_fd(wakeup_write)
+        previous_handler = signal.signal(signal.SIGWINCH, lambda *_: None)
+        try:
+            self.render()
+            while True:
+                for key, _ in selector.select(self.next_timeout()):
+                    if key.fd == wakeup_read:
+                        drain(wakeup_read)
+                        self.__resize()
+                    elif key.fd == self.__results_read:
+                        drain(self.__results_read)
+                if not self.process_events():
+                    return
+        finally:
+            signal.signal(signal.SIGWINCH, previous_handler)
+            signal.set_wakeup_fd(previous_wakeup_fd)
+            selector.close()
+            os.close(wakeup_read)
+            os.close(wakeup_write)
+            self.close()
+
+    def process_events(self) -> bool:
+        """
+        Один шаг цикла событий после пробуждения: обрабатывает результаты
+        потока сохранения, сроки синхронизации, архивации и планировщика,
+        нажатые клавиши и рисует кадр. Тот же шаг выполняет воспроизведение
+        записанной сессии (benchmarks.replay).
+
+        :return: False, если пользователь выбрал выход, иначе True.
+        """
+        self.__collect_results()
+        self.__sync_if_due()
+        self.__archive_if_due()
+        self.__fire_alerts()
+        while (key := self.__stdscr.getch()) != -1:
+            if not self.handle_key(key):
+                return False
+        if self.__status and self.__clock() >= self.__status_until:
+            self.__status = None
+        self.render()
+        return True
+
+    def wait_results(self):
+        """
+        Дожидается команд потока сохранения, результаты которых еще не
+        обработаны; сами результаты обработает следующий process_events().
+        Позволяет воспроизведению сессии отнести запросы к хранилищу
+        к вызвавшей их клавише.
+        """
+        for future, _ in list(self.__results):
+            future.exception()
+
+    def close(self):
+        """
+        Останавливает поток сохранения (он сбрасывает буфер и закрывает
+        хранилище) и сохраняет снимок активных задач.
+        """
+        self.__worker.close()
+        if self.__snapshot_path is not None:
+            _write_snapshot(self.__snapshot_path, self.__store)
+        os.close(self.__results_read)
+        os.close(self.__results_write)
 
-        while True:
-            draw_table(
-                self.__stdscr, self.__tasks, self.__active_field, self.__show_finished
+    def render(self):
+        """
+        Рисует текущий кадр таблицы задач (и панель статистики, если она открыта).
+        """
+        instrumentation = self.__instrumentation
+        search = None
+        if self.__query is not None:
+            cursor = "_" if self.__typing else ""
+            search = f"/{self.__query}{cursor} ({len(self.__tasks)})"
+        tree = self.__tree is not None
+        if instrumentation is None:
+            self.__view.draw(
+                self.__tasks,
+                self.__active_field,
+                self.__show_finished,
+                self.__status,
+                search=search,
+                alerts=self.__scheduler.exceeded,
+                tree=tree,
             )
-            key = self.__stdscr.getch()
-            command = Commands.match_command(key)
+            return
+        start = instrumentation.clock()
+        overlay = None
+        if self.__overlay:
+            overlay = instrumentation.overlay_lines(self.__stdscr.getmaxyx()[0] - 9)
+        self.__view.draw(
+            self.__tasks,
+            self.__active_field,
+            self.__show_finished,
+            self.__status,
+            overlay,
+            search,
+            self.__scheduler.exceeded,
+            tree,
+        )
+        instrumentation.frame(instrumentation.clock() - start)
 
-            if command == Commands.QUIT:
-                break
+    def handle_key(self, key) -> bool:
+        """
+        Обрабатывает одну нажатую клавишу.
 
-            if command in commands_map:
-                commands_map[command]()
-            elif key == curses.KEY_UP:
-                self.navigate_up()
-            elif key == curses.KEY_DOWN:
-                self.navigate_down()
-            time.sleep(0.01)
+        :param key: Код нажатой клавиши.
+        :return: False, если пользователь выбрал выход, иначе True.
+        """
+        if self.__typing and self.__edit_query(key):
+            return True
+        command = Commands.match_command(key)
+        if command == Commands.QUIT:
+            return False
+        if self.__tree is not None and command in self.__commands:
+            if command not in TREE_COMMANDS:
+                self.__show_status("Недоступно в дереве проектов: 't' - список задач")
+                return True
+        if command in self.__commands:
+            if self.__instrumentation is None:
+                self.__commands[command]()
+            else:
+                self.__instrumentation.call(
+                    "key." + command.name.lower(), self.__commands[command]
+                )
+            self.__view.invalidate()
+        elif key == curses.KEY_UP:
+            self.navigate_up()
+        elif key == curses.KEY_DOWN:
+            self.navigate_down()
+        elif key == curses.KEY_RIGHT or key in ENTER_KEYS:
+            self.expand_node()
+        elif key == curses.KEY_LEFT:
+            self.collapse_node()
+        elif key == curses.KEY_RESIZE:
+            self.__view.invalidate()
+        return True
 
     def finish_task(self):
         """
         Завершает текущую задачу, если она активна.
         Запрашивает подтверждение на завершение задачи, обновляет её статус в базе данных.
         """
-        if not self.__tasks:
+        task = self.__active_task()
+        if task is None:
             return
-        task = self.__tasks[self.__active_field]
         if confirmation(self.__stdscr, "завершить", task.name):
             task.finish()
-            self.__database.update_task(task.name, task)
-            self.__update_tasks_list()
+            self.__touched.add(task.name)
+            self.__expect(self.__worker.update_task(task.name, task))
+            self.__place(task.name, task)
 
     def switch_tasks(self):
         """
         Переключает отображение между активными и завершенными задачами.
         """
         self.__show_finished = not self.__show_finished
+        self.__finished.reset()
+        self.__tasks = self.__list_tasks()
         self.__active_field = 0
-        self.__update_tasks_list()
 
     def add_task(self):
         """
@@ -111,63 +375,186 @@ class TaskManager:
         """
         task_name = get_task_name(self.__stdscr)
         if task_name == "":
-            error_screen(self.__stdscr, "Пустой ввод или ошибка кодировки")
+            self.__show_status("Пустой ввод или ошибка кодировки")
             return
-        new_task = Task(task_name)
-        if self.__database.add_task(new_task):
-            self.__update_tasks_list()
-        else:
-            error_screen(self.__stdscr, "Задача с данным именем уже существует")
+        if task_name in self.__index:
+            self.__show_status("Задача с данным именем уже существует")
+            return
+        new_task = self.__store.add(Task(task_name))
+        self.__index.add(new_task)
+        self.__scheduler.update(task_name, new_task)
+        self.__touched.add(task_name)
+        self.__update_tasks_list()
+        self.__expect(
+            self.__worker.add_task(new_task),
+            lambda added: added or self.__task_not_added(task_name),
+        )
 
     def stop_resume_task(self):
         """
         Останавливает или возобновляем задачу.
         """
-        if not self.__tasks:
+        task = self.__active_task()
+        if task is None:
             return
-        task = self.__tasks[self.__active_field]
         if task.finished:
-            error_screen(self.__stdscr, "Задача уже завершена, начните новую")
+            self.__show_status("Задача уже завершена, начните новую")
         else:
             if task.running:
                 task.stop()
             else:
                 task.resume()
-            self.__database.update_task(task.name, task)
-            self.__update_tasks_list()
+            self.__touched.add(task.name)
+            self.__expect(self.__worker.update_task(task.name, task))
+            self.__place(task.name, task)
 
     def delete_task(self):
         """
         Запрашивает подтверждение на удаление и удаляет задачу из базы данных.
         """
-        if not self.__tasks:
+        task = self.__active_task()
+        if task is None:
             return
-        task = self.__tasks[self.__active_field]
         if confirmation(self.__stdscr, "удалить", task.name):
-            if self.__database.delete_task(task.name):
-                self.__update_tasks_list()
-            else:
-                error_screen(self.__stdscr, "Ошибка базы данных")
+            self.__touched.add(task.name)
+            self.__expect(
+                self.__worker.delete_task(task.name, task.version),
+                lambda deleted: deleted or self.__show_status("Ошибка базы данных"),
+            )
+            self.__forget(task.name)
+            self.__update_tasks_list()
 
     def update_task_name(self):
         """
         Переименовывает задачу. Запрашивает новое имя и обновляет его в базе данных.
         """
-        if not self.__tasks:
+        task = self.__active_task()
+        if task is None:
             return
-        task = self.__tasks[self.__active_field]
         if confirmation(self.__stdscr, "переименовать", task.name):
             new_name = get_task_name(self.__stdscr)
             if new_name == "":
-                error_screen(self.__stdscr, "Пустой ввод или ошибка кодировки")
+                self.__show_status("Пустой ввод или ошибка кодировки")
+                return
+            if new_name in self.__index:
+                self.__show_status("Задача с данным именем уже существует")
                 return
             task_name = task.name
             task.name = new_name
-            if self.__database.update_task(task_name, task):
-                self.__update_tasks_list()
-            else:
-                task.name = task_name
-                error_screen(self.__stdscr, "Задача с данным именем уже существует")
+            self.__touched.update((task_name, new_name))
+            self.__place(task_name, task)
+            self.__expect(
+                self.__worker.update_task(task_name, task),
+                lambda renamed: renamed
+                or self.__task_not_renamed(task_name, new_name),
+            )
+
+    def set_budget(self):
+        """
+        Задает бюджет времени текущей задачи в часах; пустой ввод снимает
+        бюджет. Когда запущенная задача исчерпает бюджет, планировщик
+        покажет сообщение и выделит её строку.
+        """
+        task = self.__active_task()
+        if task is None:
+            return
+        if task.finished:
+            self.__show_status("Задача уже завершена, начните новую")
+            return
+        answer = get_task_name(
+            self.__stdscr, "Бюджет в часах (пустой ввод - снять бюджет): "
+        )
+        try:
+            budget = parse_hours(answer)
+        except ValueError:
+            self.__show_status("Бюджет задается положительным числом часов")
+            return
+        task.budget = budget
+        self.__touched.add(task.name)
+        self.__expect(self.__worker.update_task(task.name, task))
+        self.__place(task.name, task)
+
+    def show_report(self):
+        """
+        Показывает отчет о затраченном времени по дням за последние две недели.
+        Отчет строится в потоке сохранения и открывается, когда будет готов.
+        """
+        today = datetime.combine(date.today(), datetime.min.time())
+        future = self.__worker.submit(
+            build_report,
+            self.__database,
+            today - timedelta(days=13),
+            today + timedelta(days=1),
+        )
+        self.__show_status("Построение отчета...")
+        self.__expect(future, self.__open_report)
+
+    def start_search(self):
+        """
+        Включает ввод строки поиска: список задач фильтруется по мере ввода,
+        Enter оставляет фильтр и возвращает обычные команды, которые
+        применяются к выбранной найденной задаче, Esc сбрасывает фильтр.
+        """
+        if self.__query is None:
+            self.__query = ""
+        self.__typing = True
+        self.__decoder.reset()
+
+    def toggle_stats(self):
+        """
+        Показывает или скрывает панель статистики задержек. Пока панель открыта,
+        кадр перерисовывается не реже раза в секунду.
+        """
+        if self.__instrumentation is None:
+            self.__show_status("Статистика выключена: задайте TASKS_STATS")
+            return
+        self.__overlay = not self.__overlay
+
+    def toggle_tree(self):
+        """
+        Включает или выключает дерево проектов: активные корневые задачи
+        со сводками их поддеревьев, дети читаются при раскрытии узла.
+        Команды изменения задач в дереве недоступны, кроме переноса в проект.
+        """
+        if self.__tree is None:
+            self.__tree_reads.clear()
+            self.__tree = TreeList(self.__fetch_children)
+        else:
+            self.__tree = None
+        self.__tasks = self.__list_tasks()
+        self.__active_field = 0
+
+    def move_task(self):
+        """
+        Переносит текущую задачу вместе с её поддеревом в проект, имя которого
+        вводится; пустой ввод делает задачу корневой. Сводки старых и новых
+        проектов обновляет хранилище.
+        """
+        task = self.__active_task()
+        if task is None:
+            return
+        task_name = task.name
+        parent_name = get_task_name(
+            self.__stdscr, "Проект (пустой ввод - без проекта): "
+        )
+        self.__expect(
+            self.__worker.submit(self.__set_parent, task_name, parent_name or None),
+            self.__on_moved,
+        )
+
+    def expand_node(self):
+        """
+        Раскрывает текущий узел дерева проектов.
+        """
+        if self.__tree is not None and self.__tree:
+            self.__tree.expand(self.__active_field)
+
+    def collapse_node(self):
+        """
+        Сворачивает текущий узел дерева проектов или переходит к его родителю.
+        """
+        if self.__tree is not None and self.__tree:
+            self.__active_field = self.__tree.collapse(self.__active_field)
 
     def navigate_up(self):
         """
@@ -185,11 +572,529 @@ class TaskManager:
         if self.__active_field >= len(self.__tasks):
             self.__active_field = 0
 
+    def __list_tasks(self) -> list[Task]:
+        """
+        Задачи текущего раздела: живой раздел индекса, результаты поиска
+        или страницы завершенных задач (с фильтром поиска), а в режиме
+        дерева — строки дерева проектов.
+        """
+        if self.__tree is not None:
+            return self.__tree
+        if self.__show_finished:
+            return self.__finished
+        if self.__query:
+            return self.__index.search(self.__query, self.__show_finished)
+        return self.__index.view(self.__show_finished)
+
+    def __edit_query(self, key) -> bool:
+        """
+        Обрабатывает клавишу в режиме ввода строки поиска. Байты UTF-8
+        собираются в символы, список задач обновляется после каждого символа.
+
+        :param key: Код нажатой клавиши.
+        :return: False, если клавиша не относится к вводу (стрелки,
+            изменение размера окна) и должна быть обработана как обычно.
+        """
+        if key in (curses.KEY_UP, curses.KEY_DOWN, curses.KEY_RESIZE):
+            return False
+        query = self.__query or None
+        if key in ENTER_KEYS:
+            self.__typing = False
+            if not self.__query:
+                self.__query = None
+        elif key == KEY_ESCAPE:
+            self.__typing = False
+            self.__query = None
+        elif key in BACKSPACE_KEYS:
+            self.__query = self.__query[:-1]
+        elif 0 <= key < 256:
+            char = self.__decoder.decode(bytes([key]))
+            if not char or not char.isprintable():
+                return True
+            self.__query += char
+        else:
+            return True
+        if (self.__query or None) != query:
+            self.__finished_pages.clear()
+            self.__finished.reset()
+        self.__tasks = self.__list_tasks()
+        self.__active_field = 0
+        return True
+
+    def __active_task(self):
+        """
+        Текущая задача (строка дерева) или None, если раздел пуст или строка
+        еще не прочитана.
+        """
+        if not self.__tasks:
+            return None
+        return self.__tasks[self.__active_field]
+
+    def __read(self, reads: dict, key, keep: bool, function: Callable, *args):
+        """
+        Чтение для раздела, который рисуется по мере загрузки. Команда
+        отправляется потоку сохранения один раз на ключ, и основной поток
+        её не ждет: пока результата нет (или чтение завершилось ошибкой,
+        показанной в строке состояния), возвращается None, а когда он
+        придет, список задач перерисовывается (__on_read).
+
+        :param reads: Отправленные чтения раздела по ключам.
+        :param key: Ключ чтения.
+        :param keep: Оставить результат в reads (размер раздела, дети узла),
+            а не отдать его один раз (страница, которую запомнит
+            LazyTaskList).
+        :param function: Метод хранилища.
+        :param args: Аргументы метода.
+        :return: Результат чтения или None.
+        """
+        future = reads.get(key)
+        if future is None:
+            future = reads[key] = self.__worker.submit(function, *args)
+            self.__expect(future, lambda _: self.__on_read(reads))
+        if not future.done() or future.exception() is not None:
+            return None
+        if not keep:
+            del reads[key]
+        return future.result()
+
+    def __on_read(self, reads: dict):
+        """
+        Перерисовывает раздел после прихода результата чтения: дерево
+        строится заново из прочитанных детей.
+        """
+        if reads is self.__tree_reads and self.__tree is not None:
+            self.__tree.reset()
+        self.__update_tasks_list()
+
+    def __fetch_finished(
+        self, after_key, limit: int, backward: bool
+    ) -> list[Task] | None:
+        """
+        Страница завершенных задач (с учетом строки поиска), читаемая
+        потоком сохранения без ожидания; None — она еще не прочитана.
+        """
+        query = self.__query or None
+        return self.__read(
+            self.__finished_pages,
+            (after_key, limit, backward, query),
+            False,
+            self.__database.fetch_page,
+            after_key,
+            limit,
+            True,
+            backward,
+            query,
+        )
+
+    def __fetch_children(self, parent_name: str | None) -> list | None:
+        """
+        Дети узла дерева, читаемые потоком сохранения без ожидания: для
+        корня — только активные задачи, для проекта — все; None — они еще
+        не прочитаны. Прочитанные дети запоминаются до изменения задач.
+        """
+        finished = False if parent_name is None else None
+        return self.__read(
+            self.__tree_reads,
+            parent_name,
+            True,
+            self.__database.fetch_children,
+            parent_name,
+            finished,
+        )
+
+    def __set_parent(self, task_name: str, parent_name: str | None) -> bool | None:
+        """
+        Переносит задачу в проект (выполняется в потоке сохранения).
+
+        :return: Результат set_parent или None, если проект — сама задача
+            или её потомок.
+        """
+        try:
+            return self.__database.set_parent(task_name, parent_name)
+        except ValueError:
+            return None
+
+    def __on_moved(self, moved: bool | None):
+        if moved is None:
+            self.__show_status("Нельзя перенести задачу в её собственное поддерево")
+        elif not moved:
+            self.__show_status("Проект не найден")
+        elif self.__tree is not None:
+            self.__reset_tree()
+            self.__update_tasks_list()
+
+    def __count_finished(self) -> int | None:
+        """
+        Количество завершенных задач (с учетом строки поиска) или None, если
+        оно еще не прочитано. Размер раздела для каждой строки поиска
+        читается через поток сохранения один раз и запоминается до изменения
+        задач (__reset_finished), поэтому возврат к прежней строке поиска
+        не пересчитывает его.
+        """
+        query = self.__query or None
+        return self.__read(
+            self.__finished_counts,
+            query,
+            True,
+            self.__database.count_tasks,
+            True,
+            query,
+        )
+
+    def __reset_finished(self):
+        """
+        Сбрасывает загруженные страницы и запомненные размеры раздела
+        завершенных задач после изменения задач.
+        """
+        self.__finished_pages.clear()
+        self.__finished_counts.clear()
+        self.__finished.reset()
+
+    def __reset_tree(self):
+        """
+        Сбрасывает строки и прочитанных детей дерева проектов после
+        изменения задач.
+        """
+        self.__tree_reads.clear()
+        self.__tree.reset()
+
+    def __place(self, task_name: str, task):
+        """
+        Обновляет положение измененной задачи. Активные задачи перемещаются
+        в индексе; завершенная задача убирается из хранилища и индекса,
+        а страницы завершенных задач будут перечитаны.
+
+        :param task_name: Имя, под которым задача хранилась до изменения.
+        :param task: Задача с актуальным состоянием.
+        """
+        if task.finished:
+            self.__forget(task_name)
+        else:
+            self.__index.update(task_name, task)
+            self.__scheduler.update(task_name, task)
+        self.__update_tasks_list()
+
+    def __forget(self, task_name: str):
+        """
+        Убирает задачу из хранилища и индекса, а если её там нет (завершенная
+        задача), сбрасывает загруженные страницы завершенных задач.
+        """
+        if task_name in self.__index:
+            self.__index.remove(task_name)
+            self.__store.remove(task_name)
+            self.__scheduler.update(task_name)
+        else:
+            self.__reset_finished()
+
     def __update_tasks_list(self):
         """
-        Обновление списка задач.
-        Если активное поле выходит за пределы списка, оно корректируется.
+        Обновление списка задач после изменения индекса (результаты поиска
+        ищутся заново). Если активное поле выходит за пределы списка,
+        оно корректируется; пока раздел читается, поле сохраняется.
         """
-        self.__tasks = self.__database.fetch_all_tasks(self.__show_finished)
+        if self.__query:
+            self.__tasks = self.__list_tasks()
+        if isinstance(self.__tasks, (LazyTaskList, TreeList)) and self.__tasks.loading:
+            return
         if len(self.__tasks) <= self.__active_field:
             self.__active_field = max(len(self.__tasks) - 1, 0)
+
+    def __show_status(self, message: str):
+        """
+        Показывает сообщение в строке состояния на STATUS_SECONDS секунд.
+        """
+        self.__status = message
+        self.__status_until = self.__clock() + STATUS_SECONDS
+
+    def __expect(self, future: Future, on_result: Callable | None = None):
+        """
+        Запоминает команду потока сохранения, результат которой нужно
+        обработать в основном потоке.
+
+        :param future: Future команды.
+        :param on_result: Обработчик успешного результата.
+        """
+        self.__results.append((future, on_result))
+
+    def __collect_results(self):
+        """
+        Обрабатывает завершенные команды потока сохранения: ошибки показываются
+        в строке состояния, успешные результаты передаются обработчикам.
+        """
+        results, self.__results = self.__results, []
+        for future, on_result in results:
+            if not future.done():
+                self.__results.append((future, on_result))
+            elif error := future.exception():
+                self.__show_error(error)
+            elif on_result is not None:
+                on_result(future.result())
+        while error := self.__worker.pop_flush_error():
+            self.__show_error(error)
+        saving = self.__snapshot_saving
+        if self.__worker.flushes != self.__snapshot_flushes and (
+            saving is None or saving.done()
+        ):
+            self.__snapshot_flushes = self.__worker.flushes
+            self.__save_snapshot()
+
+    def __save_snapshot(self):
+        """
+        Ставит запись снимка активных задач (для быстрого первого кадра)
+        в поток сохранения. В поток передается копия хранилища: она снимается
+        векторно за миллисекунды, а упаковка и запись файла не задерживают
+        кадр. Пока пишется предыдущий снимок, новый не ставится в очередь.
+        """
+        if self.__snapshot_path is not None:
+            self.__snapshot_saving = self.__worker.submit(
+                _write_snapshot, self.__snapshot_path, self.__store.copy()
+            )
+
+    def __show_error(self, error: Exception):
+        """
+        Показывает ошибку потока сохранения. Задачи, измененные другим
+        процессом, перечитываются из базы данных.
+        """
+        if isinstance(error, ConflictError):
+            self.__reload(error.names)
+            self.__show_status(f"Задача изменена другим процессом: {error.names[0]}")
+        else:
+            self.__show_status(f"Ошибка базы данных: {error}")
+
+    def __sync_if_due(self):
+        """
+        Запрашивает у потока сохранения задачи, изменившиеся после последней
+        обработанной записи журнала изменений.
+        """
+        if self.__clock() < self.__next_sync:
+            return
+        self.__next_sync = self.__clock() + SYNC_SECONDS
+        self.__touched.clear()
+        self.__expect(
+            self.__worker.submit(self.__database.changes_since, self.__change_seq),
+            self.__apply_changes,
+        )
+
+    def __fire_alerts(self):
+        """
+        Показывает наступившие сроки планировщика в строке состояния.
+        """
+        alerts = self.__scheduler.pop_due()
+        if not alerts:
+            return
+        name, kind = alerts[0]
+        if kind == BUDGET:
+            message = f"Бюджет времени исчерпан: {name}"
+        else:
+            message = f"Задача все еще запущена: {name}"
+        if len(alerts) > 1:
+            message += f" (и еще {len(alerts) - 1})"
+        self.__show_status(message)
+        curses.beep()
+
+    def __archive_if_due(self):
+        """
+        Начинает перенос старых завершенных задач в архив, если подошел срок.
+        """
+        if self.__archive_after is None or self.__clock() < self.__next_archive:
+            return
+        self.__next_archive = self.__clock() + ARCHIVE_SECONDS
+        self.__archived = 0
+        self.__archive_batch()
+
+    def __archive_batch(self):
+        self.__expect(
+            self.__worker.submit(
+                self.__database.archive_finished, self.__archive_after
+            ),
+            self.__on_archived,
+        )
+
+    def __on_archived(self, moved: int):
+        """
+        Ставит в очередь следующую пачку переноса в архив, а после последней
+        обновляет статистику планировщика (ANALYZE). Перенесенные задачи
+        приходят из журнала изменений при следующей синхронизации.
+        """
+        self.__archived += moved
+        if moved == ARCHIVE_BATCH_SIZE:
+            self.__archive_batch()
+        elif self.__archived:
+            self.__expect(self.__worker.submit(self.__database.optimize))
+
+    def __apply_changes(self, changes: tuple[int, list[Task], list[str]]):
+        """
+        Применяет изменения из журнала. Если после запроса пользователь уже
+        изменил одну из этих задач, результат отбрасывается и запрос сразу
+        повторяется с того же места журнала.
+        """
+        seq, tasks, removed = changes
+        if self.__touched.intersection(removed, (task.name for task in tasks)):
+            self.__next_sync = 0.0
+            return
+        self.__change_seq = max(self.__change_seq, seq)
+        self.__merge(tasks, removed)
+
+    def __reload(self, names: list[str]):
+        """
+        Перечитывает задачи из базы данных, заменяя их состояние в памяти.
+        """
+        self.__expect(
+            self.__worker.submit(self.__database.get_tasks, names),
+            lambda tasks: self.__merge(
+                tasks, set(names) - {task.name for task in tasks}, force=True
+            ),
+        )
+
+    def __merge(self, tasks: list[Task], removed, force=False):
+        """
+        Переносит состояние задач из базы данных в хранилище и индекс.
+
+        :param tasks: Задачи в состоянии из базы данных.
+        :param removed: Имена задач, которых больше нет в базе данных.
+        :param force: Заменять задачи независимо от версии; иначе заменяются
+            только задачи, версия которых в базе данных новее.
+        """
+        for task in tasks:
+            current = self.__index.get(task.name)
+            if task.finished:
+                if current is not None and (force or task.version > current.version):
+                    self.__forget(task.name)
+            elif current is None:
+                current = self.__store.add(task)
+                self.__index.add(current)
+                self.__scheduler.update(task.name, current)
+            elif force or task.version > current.version:
+                self.__store.assign(current.row, task)
+                self.__index.update(task.name, current)
+                self.__scheduler.update(task.name, current)
+        for name in removed:
+            self.__forget(name)
+        if tasks or removed:
+            self.__reset_finished()
+            if self.__tree is not None:
+                self.__reset_tree()
+        self.__update_tasks_list()
+
+    def __notify(self):
+        """
+        Будит цикл событий из потока сохранения.
+        """
+        try:
+            os.write(self.__results_write, b"\0")
+        except BlockingIOError:
+            pass
+
+    def __on_remote_changes(self, seq: int, tasks: list[Task], removed: list[str]):
+        """
+        Изменения от демона (в потоке подписки): синхронизация запрашивается
+        сразу, не дожидаясь SYNC_SECONDS.
+        """
+        self.__next_sync = 0.0
+        self.__notify()
+
+    def __task_not_added(self, task_name: str):
+        """
+        Убирает задачу, которую не удалось добавить в базу данных
+        (имя уже занято другим процессом).
+        """
+        if task_name in self.__index:
+            self.__forget(task_name)
+            self.__update_tasks_list()
+        self.__show_status("Задача с данным именем уже существует")
+
+    def __task_not_renamed(self, task_name: str, new_name: str):
+        """
+        Возвращает прежнее имя задаче, которую не удалось переименовать
+        в базе данных (новое имя уже занято другим процессом).
+        """
+        task = self.__index.get(new_name)
+        if task is not None and task_name not in self.__index:
+            task.name = task_name
+            self.__index.update(new_name, task)
+            self.__scheduler.update(new_name, task)
+        self.__reset_finished()
+        self.__show_status("Задача с данным именем уже существует")
+
+    def __open_report(self, report):
+        self.__status = None
+        report_screen(self.__stdscr, report)
+        self.__view.invalidate()
+
+    def next_timeout(self) -> float | None:
+        """
+        Время ожидания событий: до начала следующей секунды, если есть
+        запущенные задачи или открыта панель статистики, и не дольше срока
+        показа сообщения в строке состояния, срока синхронизации и ближайшего
+        срока планировщика.
+
+        :return: Таймаут в секундах или None для ожидания без ограничения.
+        """
+        timeouts = []
+        if self.__index.has_running() or self.__overlay:
+            timeouts.append(seconds_until_next_tick(Task.clock()))
+        if self.__status:
+            timeouts.append(max(self.__status_until - self.__clock(), 0.0))
+        timeouts.append(max(self.__next_sync - self.__clock(), 0.0))
+        if (deadline := self.__scheduler.next_deadline()) is not None:
+            timeouts.append(max(deadline - Task.clock(), 0.0))
+        return min(timeouts, default=None)
+
+    def __resize(self):
+        """
+        Подстраивает curses под новый размер терминала после SIGWINCH.
+        """
+        columns, lines = os.get_terminal_size(sys.__stdout__.fileno())
+        curses.resizeterm(lines, columns)
+        self.__view.invalidate()
+
+
+def seconds_until_next_tick(now: float) -> float:
+    """
+    Время до начала следующей целой секунды.
+
+    :param now: Текущее время в секундах.
+    :return: Количество секунд до следующей секунды.
+    """
+    return 1.0 - now % 1.0
+
+
+def parse_hours(text: str) -> float | None:
+    """
+    Переводит введенное число часов (с точкой или запятой) в секунды.
+
+    :param text: Введенная строка
+    :return: Секунды или None для пустой строки
+    :raises ValueError: Если строка не является положительным числом
+    """
+    text = text.strip().replace(",", ".")
+    if not text:
+        return None
+    hours = float(text)
+    if not 0 < hours < float("inf"):
+        raise ValueError(text)
+    return hours * 3600
+
+
+def _write_snapshot(path: str, store):
+    """
+    Записывает снимок задач. Ошибка записи не мешает работе: следующий запуск
+    прочитает старый снимок или обойдется без него.
+    """
+    try:
+        write_store_snapshot(path, store)
+    except OSError:
+        pass
+
+
+def drain(fd: int):
+    """
+    Вычитывает все данные из неблокирующего дескриптора.
+
+    :param fd: Файловый дескриптор.
+    """
+    try:
+        while os.read(fd, 512):
+            pass
+    except BlockingIOError:
+        pass
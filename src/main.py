@@ -1,12 +1,63 @@
-from curses import window, wrapper
+import os
+import sys
 
-from controller.task_manager import TaskManager
+DB_URL = os.environ.get("TASKS_DB", "sqlite:///tasks.db")
+RECORD_OPTION = "--record"
 
 
-def main(stdscr: window):
-    manager = TaskManager(stdscr)
-    manager.run()
+def open_database(db_url: str):
+    """
+    Загружает модули менеджера задач и открывает хранилище (для базы
+    данных — загрузка SQLAlchemy, создание таблиц и миграции). Выполняется
+    в фоновом потоке, пока основной поток рисует первый кадр по снимку.
+    """
+    import controller.task_manager  # noqa: F401
+    from model.storage import open_storage
+
+    return open_storage(db_url, write_behind=True)
+
+
+def main(stdscr, record_path: str | None = None):
+    """
+    :param stdscr: Окно curses
+    :param record_path: Файл, в который записываются нажатия клавиш сессии
+        для воспроизведения (python -m benchmarks replay), или None
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    from model.snapshot import read_snapshot, snapshot_path
+    from view.console_view import TableView, init_colors
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        opening = executor.submit(open_database, DB_URL)
+        tasks = read_snapshot(snapshot_path(DB_URL))
+        if tasks is not None:
+            init_colors()
+            TableView(stdscr).draw(tasks, 0, False)
+        database = opening.result()
+
+    from controller.recorder import recording
+    from controller.task_manager import TaskManager
+    from model.instrumentation import instrumented
+
+    with instrumented() as instrumentation, recording(stdscr, record_path) as window:
+        manager = TaskManager(
+            window, DB_URL, instrumentation=instrumentation, database=database
+        )
+        manager.run()
 
 
 if __name__ == "__main__":
-    wrapper(main)
+    record_path = None
+    if sys.argv[1:2] == [RECORD_OPTION]:
+        if len(sys.argv) != 3:
+            sys.exit(f"usage: {sys.argv[0]} {RECORD_OPTION} TRACE")
+        record_path = sys.argv[2]
+    elif len(sys.argv) > 1:
+        from cli import run
+
+        sys.exit(run(sys.argv[1:]))
+
+    from curses import wrapper
+
+    wrapper(main, record_path)
@@ -0,0 +1,528 @@
+import asyncio
+import json
+import os
+import signal
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from functools import partial
+from itertools import takewhile
+
+from model.remote_storage import SOCKET_PATH, decode, encode, task_arguments
+from model.scheduler import Scheduler
+from model.storage import ConflictError, Storage
+from model.task import Task
+
+SYNC_SECONDS = 2.0
+MAX_BATCH = 256
+LINE_LIMIT = 64 << 20
+SUBSCRIBER_BUFFER = 1 << 20
+TRANSACTION_TIMEOUT = 30.0
+
+BATCHED = frozenset(
+    (
+        "add_task",
+        "add_tasks",
+        "update_task",
+        "update_tasks",
+        "delete_task",
+        "delete_tasks",
+    )
+)
+WRITES = BATCHED | {
+    "set_parent",
+    "import_tasks",
+    "archive_finished",
+    "archive",
+    "optimize",
+}
+READS = frozenset(
+    (
+        "fetch_all_tasks",
+        "fetch_page",
+        "count_tasks",
+        "get_task_by_name",
+        "get_tasks",
+        "iter_tasks",
+        "last_change",
+        "changes_since",
+        "load_store",
+        "time_spent",
+        "task_names",
+        "iter_interval_batches",
+        "get_rollup",
+        "fetch_children",
+    )
+)
+
+
+class _Rollback(Exception):
+    """
+    Откат транзакции клиента (запрос rollback или разрыв соединения).
+    """
+
+
+class TrackerDaemon:
+    """
+    Демон, владеющий хранилищем задач и обслуживающий клиентов через сокет
+    Unix. Протокол построчный: запрос {"id", "method", "args"} — одна строка
+    JSON, ответ {"id", "result"} или {"id", "error"} — тоже одна строка;
+    задачи и время кодируются model.remote_storage.encode. Методы — методы
+    хранилища (Storage), а также status, subscribe и begin/commit/rollback.
+
+    Хранилище не потокобезопасно, поэтому все обращения к нему выполняются
+    по очереди в одном рабочем потоке, а цикл asyncio только принимает
+    запросы. Записи (add_task, update_task, delete_task и их пакетные
+    варианты), пришедшие от разных клиентов, пока выполнялась предыдущая
+    пачка, выполняются одной транзакцией хранилища; если пачка не удалась,
+    её записи повторяются по одной, чтобы ошибка одного клиента не
+    затрагивала остальных.
+
+    Незавершенные задачи демон держит в памяти вместе с планировщиком
+    бюджетов (Scheduler): status, fetch_all_tasks() и get_task_by_name()
+    для активных задач отвечают без обращения к хранилищу. Память
+    обновляется по журналу изменений хранилища после каждой записи и раз
+    в sync_interval секунд (записи других процессов в хранилище попадают
+    в память с этой задержкой). Изменения рассылаются подписчикам
+    (subscribe) строками {"event": "changes", "seq", "tasks", "removed"}.
+
+    Пока транзакция клиента открыта, остальные клиенты ждут хранилище,
+    поэтому транзакция, в которой клиент молчит дольше transaction_timeout
+    секунд, откатывается и освобождает хранилище. Запросы клиента в такой
+    транзакции (включая commit) получают ошибку TimeoutError, пока он
+    не завершит её командой rollback или commit.
+    """
+
+    def __init__(
+        self,
+        storage: Storage,
+        socket_path: str = SOCKET_PATH,
+        sync_interval=SYNC_SECONDS,
+        max_batch=MAX_BATCH,
+        transaction_timeout: float | None = TRANSACTION_TIMEOUT,
+    ):
+        """
+        :param storage: Открытое хранилище, которым будет владеть демон
+        :param socket_path: Путь к сокету Unix
+        :param sync_interval: Период синхронизации памяти с хранилищем в секундах
+        :param max_batch: Максимальное количество записей в одной транзакции
+        :param transaction_timeout: Время в секундах, после которого молчащий
+            клиент теряет открытую транзакцию; None — без ограничения
+        """
+        self.__storage = storage
+        self.__socket_path = socket_path
+        self.__sync_interval = sync_interval
+        self.__max_batch = max_batch
+        self.__transaction_timeout = transaction_timeout
+        self.__executor: ThreadPoolExecutor | None = None
+        self.__loop: asyncio.AbstractEventLoop | None = None
+        self.__stopped: asyncio.Event | None = None
+        self.__lock: asyncio.Lock | None = None
+        self.__wake: asyncio.Event | None = None
+        self.__writes: list[tuple[str, list, asyncio.Future]] = []
+        self.__subscribers: set[asyncio.StreamWriter] = set()
+        self.__seq = 0
+        self.__active: dict[str, Task] = {}
+        self.__order: list[Task] | None = None
+        self.__scheduler = Scheduler()
+        self.__batches = 0
+
+    @property
+    def batches(self) -> int:
+        """
+        Количество транзакций, которыми выполнены пачки записей.
+        """
+        return self.__batches
+
+    async def serve(self, ready: threading.Event | None = None):
+        """
+        Загружает активные задачи и обслуживает клиентов до вызова stop().
+
+        :param ready: Событие, которое устанавливается, когда сокет готов
+            принимать подключения
+        """
+        self.__loop = asyncio.get_running_loop()
+        self.__stopped = asyncio.Event()
+        self.__lock = asyncio.Lock()
+        self.__wake = asyncio.Event()
+        _remove_stale_socket(self.__socket_path)
+        self.__executor = ThreadPoolExecutor(1, thread_name_prefix="taskd-storage")
+        try:
+            await self.__call(self.__load)
+            server = await asyncio.start_unix_server(
+                self.__handle, self.__socket_path, limit=LINE_LIMIT
+            )
+        except BaseException:
+            self.__executor.shutdown()
+            raise
+        tasks = [
+            asyncio.create_task(self.__write_loop()),
+            asyncio.create_task(self.__sync_loop()),
+        ]
+        if ready is not None:
+            ready.set()
+        try:
+            await self.__stopped.wait()
+        finally:
+            server.close()
+            for writer in list(self.__subscribers):
+                writer.close()
+            await server.wait_closed()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.__executor.shutdown()
+            if os.path.exists(self.__socket_path):
+                os.remove(self.__socket_path)
+
+    def stop(self):
+        """
+        Останавливает демона; можно вызывать из любого потока.
+        """
+        if self.__loop is not None:
+            self.__loop.call_soon_threadsafe(self.__stopped.set)
+
+    async def __handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        """
+        Обслуживает одно соединение: запросы выполняются по порядку.
+        Транзакция, не завершенная до разрыва соединения или до истечения
+        transaction_timeout без запросов, откатывается.
+        """
+        transaction: ExitStack | None = None
+        expired = False
+        try:
+            while True:
+                if transaction is None:
+                    line = await reader.readline()
+                else:
+                    try:
+                        line = await asyncio.wait_for(
+                            reader.readline(), self.__transaction_timeout
+                        )
+                    except asyncio.TimeoutError:
+                        transaction, opened = None, transaction
+                        expired = True
+                        await self.__end(opened, commit=False)
+                        continue
+                if not line:
+                    break
+                request_id = None
+                try:
+                    request = json.loads(line)
+                    request_id = request.get("id")
+                    method = request["method"]
+                    args = request.get("args", [])
+                    if method == "subscribe":
+                        self.__subscribers.add(writer)
+                        response = {"result": self.__seq}
+                    elif expired:
+                        expired = method not in ("commit", "rollback")
+                        if method != "rollback":
+                            raise TimeoutError(
+                                "transaction was rolled back after "
+                                f"{self.__transaction_timeout} s without requests"
+                            )
+                        response = {"result": None}
+                    elif method == "begin" and transaction is None:
+                        transaction = await self.__begin()
+                        response = {"result": None}
+                    elif method in ("commit", "rollback") and transaction is not None:
+                        transaction, opened = None, transaction
+                        await self.__end(opened, method == "commit")
+                        response = {"result": None}
+                    else:
+                        response = await self.__request(
+                            method, args, transaction is not None
+                        )
+                except Exception as error:
+                    response = {"error": _error(error)}
+                writer.write(_dumps({"id": request_id, **response}))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.__subscribers.discard(writer)
+            if transaction is not None:
+                await self.__end(transaction, commit=False)
+            writer.close()
+
+    async def __request(self, method: str, args: list, in_transaction: bool) -> dict:
+        """
+        Выполняет метод хранилища: внутри транзакции клиента — сразу,
+        записи вне транзакции — в общей пачке, чтения активных задач — из
+        памяти, остальное — по очереди под блокировкой хранилища.
+        """
+        if method == "status":
+            return {"result": self.__status()}
+        if method not in READS and method not in WRITES:
+            raise ValueError(f"unknown method: {method}")
+        if in_transaction:
+            return await self.__call(self.__execute, method, args)
+        if method in BATCHED:
+            future = self.__loop.create_future()
+            self.__writes.append((method, args, future))
+            self.__wake.set()
+            return await future
+        if (cached := self.__cached(method, args)) is not None:
+            return cached
+        async with self.__lock:
+            response = await self.__call(self.__execute, method, args)
+            if method in WRITES:
+                await self.__refresh()
+        return response
+
+    async def __begin(self) -> ExitStack:
+        """
+        Открывает транзакцию хранилища для одного клиента; до её завершения
+        запросы остальных клиентов к хранилищу ждут.
+        """
+        await self.__lock.acquire()
+        transaction = ExitStack()
+        try:
+            await self.__call(transaction.enter_context, self.__storage.transaction())
+        except BaseException:
+            self.__lock.release()
+            raise
+        return transaction
+
+    async def __end(self, transaction: ExitStack, commit: bool):
+        """
+        Фиксирует или откатывает транзакцию клиента и рассылает изменения.
+        """
+        try:
+            if commit:
+                await self.__call(transaction.close)
+            else:
+                await self.__call(_rollback, transaction)
+            await self.__refresh()
+        finally:
+            self.__lock.release()
+
+    async def __write_loop(self):
+        """
+        Выполняет накопившиеся записи пачками, каждую пачку одной транзакцией.
+        Пачка набирается после получения блокировки хранилища, поэтому
+        в неё попадают все записи, пришедшие, пока хранилище было занято.
+        """
+        while True:
+            await self.__wake.wait()
+            self.__wake.clear()
+            while self.__writes:
+                async with self.__lock:
+                    calls = self.__writes[: self.__max_batch]
+                    del self.__writes[: self.__max_batch]
+                    self.__batches += 1
+                    try:
+                        responses = await self.__call(
+                            self.__execute_batch,
+                            [(method, args) for method, args, _ in calls],
+                        )
+                        await self.__refresh()
+                    except Exception as error:
+                        responses = [{"error": _error(error)}] * len(calls)
+                for (_, _, future), response in zip(calls, responses):
+                    if not future.done():
+                        future.set_result(response)
+
+    async def __sync_loop(self):
+        """
+        Периодически подтягивает в память записи других процессов.
+        """
+        while True:
+            await asyncio.sleep(self.__sync_interval)
+            async with self.__lock:
+                await self.__refresh()
+
+    async def __refresh(self):
+        """
+        Применяет к памяти изменения из журнала хранилища и рассылает их
+        подписчикам. Вызывается под блокировкой хранилища.
+        """
+        seq, tasks, removed = await self.__call(
+            self.__storage.changes_since, self.__seq
+        )
+        if not tasks and not removed:
+            return
+        self.__seq = seq
+        for name in removed:
+            self.__active.pop(name, None)
+            self.__scheduler.update(name)
+        for task in tasks:
+            if task.finished:
+                self.__active.pop(task.name, None)
+            else:
+                self.__active[task.name] = task
+            self.__scheduler.update(task.name, task)
+        self.__order = None
+        event = _dumps(
+            {"event": "changes", "seq": seq, "tasks": encode(tasks), "removed": removed}
+        )
+        for writer in list(self.__subscribers):
+            if writer.transport.get_write_buffer_size() > SUBSCRIBER_BUFFER:
+                self.__subscribers.discard(writer)
+                writer.close()
+            else:
+                writer.write(event)
+
+    def __load(self):
+        self.__seq = self.__storage.last_change()
+        for task in self.__storage.fetch_all_tasks(finished=False):
+            self.__active[task.name] = task
+            self.__scheduler.update(task.name, task)
+
+    def __cached(self, method: str, args: list) -> dict | None:
+        """
+        Ответ на чтение активных задач из памяти или None, если его нужно
+        выполнить в хранилище.
+        """
+        if method == "fetch_all_tasks" and args in ([], [False]):
+            return {"result": encode(self.__ordered())}
+        if method == "get_task_by_name" and args and args[0] in self.__active:
+            return {"result": encode(self.__active[args[0]])}
+        return None
+
+    def __ordered(self) -> list[Task]:
+        """
+        Активные задачи в порядке отображения: сначала запущенные, затем
+        остановленные, внутри группы по имени.
+        """
+        if self.__order is None:
+            self.__order = sorted(
+                self.__active.values(), key=lambda task: (not task.running, task.name)
+            )
+        return self.__order
+
+    def __status(self) -> list:
+        """
+        Запущенные задачи, имена запущенных задач сверх бюджета и ближайший
+        срок исчерпания бюджета — из памяти, без обращения к хранилищу.
+        """
+        now = Task.clock()
+        self.__scheduler.pop_due(now)
+        running = list(takewhile(lambda task: task.running, self.__ordered()))
+        over_budget = sorted(
+            name
+            for name in self.__scheduler.exceeded
+            if name in self.__active and self.__active[name].running
+        )
+        return [encode(running), over_budget, self.__scheduler.next_deadline()]
+
+    def __execute_batch(self, calls: list[tuple[str, list]]) -> list[dict]:
+        """
+        Выполняет записи одной транзакцией; если одна из них завершилась
+        исключением, транзакция откатывается и записи выполняются по одной.
+        Аргументы декодируются заново для каждой попытки, поэтому
+        откаченная попытка не меняет задачи следующей.
+        """
+        try:
+            decoded = [(method, decode(args)) for method, args in calls]
+            with self.__storage.transaction():
+                results = [self.__invoke(method, args) for method, args in decoded]
+        except Exception:
+            return [self.__execute(method, args) for method, args in calls]
+        return [
+            _response({"result": result}, args)
+            for result, (_, args) in zip(results, decoded)
+        ]
+
+    def __execute(self, method: str, args: list) -> dict:
+        """
+        Выполняет метод хранилища и возвращает ответ (в том числе с ошибкой).
+        """
+        args = decode(args)
+        try:
+            response = {"result": self.__invoke(method, args)}
+        except Exception as error:
+            response = {"error": _error(error)}
+        return _response(response, args)
+
+    def __invoke(self, method: str, args: list):
+        """
+        Вызывает метод хранилища и кодирует результат для ответа.
+        """
+        result = getattr(self.__storage, method)(*args)
+        if method == "load_store":
+            result = [Task.snapshot(view) for view in result.views()]
+        elif method in ("iter_tasks", "iter_interval_batches"):
+            result = list(result)
+        return encode(result)
+
+    async def __call(self, function, *args):
+        return await self.__loop.run_in_executor(
+            self.__executor, partial(function, *args)
+        )
+
+
+def run_daemon(storage: Storage, socket_path: str = SOCKET_PATH, **options):
+    """
+    Запускает демона в текущем потоке до SIGINT или SIGTERM.
+
+    :param storage: Открытое хранилище задач
+    :param socket_path: Путь к сокету Unix
+    :param options: Параметры TrackerDaemon (sync_interval, max_batch,
+        transaction_timeout)
+    """
+    daemon = TrackerDaemon(storage, socket_path, **options)
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, daemon.stop)
+        await daemon.serve()
+
+    asyncio.run(main())
+
+
+def _response(response: dict, args: list) -> dict:
+    """
+    Добавляет к ответу состояние переданных задач после вызова: версию
+    и количество несохраненных интервалов.
+    """
+    if tasks := task_arguments(args):
+        response["tasks"] = [
+            [task.version, len(task.unsaved_intervals)] for task in tasks
+        ]
+    return response
+
+
+def _rollback(transaction: ExitStack):
+    try:
+        transaction.__exit__(_Rollback, _Rollback(), None)
+    except _Rollback:
+        pass
+
+
+def _error(error: Exception) -> dict:
+    details = {"type": type(error).__name__, "message": str(error)}
+    if isinstance(error, ConflictError):
+        details["names"] = error.names
+    return details
+
+
+def _remove_stale_socket(path: str):
+    """
+    Удаляет сокет, оставшийся от завершившегося демона.
+
+    :raises RuntimeError: Если демон на этом сокете уже работает.
+    """
+    if not os.path.exists(path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except OSError:
+        os.remove(path)
+    else:
+        raise RuntimeError(f"task daemon is already running: {path}")
+    finally:
+        probe.close()
+
+
+def _dumps(message: dict) -> bytes:
+    return (
+        json.dumps(message, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        + b"\n"
+    )
@@ -1,22 +1,343 @@
-from sqlalchemy import create_engine
+import atexit
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Iterable, Iterator
+
+from sqlalchemy import (Connection, Engine, Table, TableClause, bindparam,
+                        column, create_engine, delete, event, exists, func,
+                        insert, literal_column, select, union_all, update)
+from sqlalchemy.engine import URL, make_url
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from model.migrations import upgrade
+from model.name_index import GRAM
+from model.storage import (ARCHIVE_AFTER, ARCHIVE_BATCH_SIZE, PAGE_SIZE,
+                           ConflictError, import_tasks)
+from model.task import Task, seconds_to_us, to_epoch_us
+from model.task_model import (NAME_SEARCH_MARK, Base, TaskArchiveModel,
+                              TaskChangeModel, TaskCountModel,
+                              TaskIntervalArchiveModel, TaskIntervalModel,
+                              TaskModel, TaskRollupModel, name_search_table,
+                              task_from_row)
+from model.task_tree import Rollup, own_rollup
+
+if TYPE_CHECKING:
+    from model.task_store import TaskStore
+
+_tasks = TaskModel.__table__
+_intervals = TaskIntervalModel.__table__
+_changes = TaskChangeModel.__table__
+_counts = TaskCountModel.__table__
+_archive = TaskArchiveModel.__table__
+_archived_intervals = TaskIntervalArchiveModel.__table__
+_rollups = TaskRollupModel.__table__
+_parents = _tasks.alias("parents")
+_children = _tasks.alias("children")
+_name = literal_column("name")
+_name_search = {
+    source: TableClause(
+        name_search_table(source.name), column("rowid"), column("term")
+    )
+    for source in (_tasks, _archive)
+}
+_task_id_by_name = select(_tasks.c.id).where(_tasks.c.name == bindparam("_name"))
+
+_INSERT_TASKS = insert(_tasks)
+_UPDATE_TASKS = update(_tasks).where(
+    _tasks.c.name == bindparam("_name"), _tasks.c.version == bindparam("_version")
+)
+_OVERWRITE_TASKS = (
+    update(_tasks)
+    .where(_tasks.c.name == bindparam("_name"))
+    .values(version=_tasks.c.version + 1)
+)
+_DELETE_TASKS = delete(_tasks).where(_tasks.c.name == bindparam("_name"))
+_INSERT_INTERVALS = insert(_intervals).from_select(
+    ["task_id", "start_time", "end_time"],
+    _task_id_by_name.add_columns(bindparam("_start"), bindparam("_end")),
+)
+_DELETE_INTERVALS = delete(_intervals).where(
+    _intervals.c.task_id.in_(_task_id_by_name)
+)
+_SELECT_TASK = select(*TaskModel.columns()).where(
+    _tasks.c.name == bindparam("_name")
+)
+_SELECT_SECTION = (
+    select(*TaskModel.columns())
+    .where(_tasks.c.finished == bindparam("_finished"))
+    .order_by(_tasks.c.running.desc(), _tasks.c.name)
+)
+_SELECT_VERSION = select(_tasks.c.version).where(_tasks.c.name == bindparam("_name"))
+_DELETE_TASK_RETURNING = (
+    delete(_tasks).where(_tasks.c.name == bindparam("_name")).returning(_tasks.c.id)
+)
+_DELETE_VERSION_RETURNING = _DELETE_TASK_RETURNING.where(
+    _tasks.c.version == bindparam("_version")
+)
+_DELETE_TASK_INTERVALS = delete(_intervals).where(
+    _intervals.c.task_id == bindparam("_id")
+)
+
+
+def _task_columns(table: Table) -> tuple:
+    """
+    Колонки задачи в таблице tasks или tasks_archive (как TaskModel.columns()).
+    """
+    return (
+        table.c.name,
+        table.c.start_time,
+        table.c.total_time,
+        table.c.running,
+        table.c.finished,
+        table.c.version,
+        table.c.budget,
+    )
+
+
+_SELECT_ARCHIVED_TASK = select(*_task_columns(_archive)).where(
+    _archive.c.name == bindparam("_name")
+)
+_SELECT_FINISHED = union_all(
+    select(*TaskModel.columns()).where(_tasks.c.finished.is_(True)),
+    select(*_task_columns(_archive)),
+).order_by(literal_column("running").desc(), _name)
+_ROLLUP_COLUMNS = tuple(
+    _rollups.c[name].label(f"rollup_{name}") for name in Rollup._fields
+)
+_SELECT_ROLLUP = (
+    select(*_ROLLUP_COLUMNS)
+    .join_from(_tasks, _rollups, _rollups.c.task_id == _tasks.c.id)
+    .where(_tasks.c.name == bindparam("_name"))
+)
+_SELECT_CHILDREN = (
+    select(*TaskModel.columns(), *_ROLLUP_COLUMNS)
+    .join_from(_tasks, _rollups, _rollups.c.task_id == _tasks.c.id)
+    .order_by(_tasks.c.running.desc(), _tasks.c.name)
+)
+_ARCHIVE_COLUMNS = [column.name for column in _archive.c]
+_INTERVAL_COLUMNS = ["task_id", "start_time", "end_time"]
+
+
+SQLITE_BUSY_TIMEOUT_MS = 5000
+SQLITE_MIN_VERSION = (3, 34, 0)
+
+
+def _configure_sqlite(engine: Engine):
+    """
+    Настраивает подключения SQLite.
+
+    Сам драйвер pysqlite не открывает транзакцию перед SAVEPOINT, из-за чего
+    освобождение первой точки сохранения фиксирует все изменения. Поэтому
+    неявное управление транзакциями драйвера отключается, а BEGIN выполняется
+    при начале каждой транзакции SQLAlchemy.
+
+    Журнал WAL с synchronous=NORMAL не вызывает fsync при каждой фиксации
+    и позволяет читать базу во время записи, а busy_timeout заставляет
+    подключение подождать блокировку другого процесса вместо немедленной ошибки.
+    Функция casefold() нужна для поиска по имени без учета регистра
+    (встроенная lower() SQLite работает только с ASCII).
+
+    Поиск по имени использует токенизатор trigram таблиц FTS5, который
+    появился в SQLite 3.34, поэтому более старая библиотека отвергается
+    сразу, а не ошибкой при создании таблиц.
+
+    :raises RuntimeError: Если версия SQLite ниже SQLITE_MIN_VERSION.
+    """
+    version = engine.dialect.dbapi.sqlite_version_info
+    if version < SQLITE_MIN_VERSION:
+        required = ".".join(map(str, SQLITE_MIN_VERSION))
+        raise RuntimeError(
+            f"SQLite {required} or newer is required, found "
+            f"{'.'.join(map(str, version))}"
+        )
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+        dbapi_connection.create_function(
+            "casefold", 1, _casefold, deterministic=True
+        )
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute("PRAGMA journal_mode = WAL")
+        cursor.execute("PRAGMA synchronous = NORMAL")
+        cursor.close()
+
+    @event.listens_for(engine, "begin")
+    def _on_begin(connection):
+        connection.exec_driver_sql("BEGIN")
+
+
+def _casefold(value: str | None) -> str | None:
+    return value.casefold() if value is not None else None
+
+
+def _name_filter(query: str, table: Table = _tasks):
+    """
+    Условие поиска по имени, согласованное с NameIndex: подстрока без учета
+    регистра для запросов из GRAM и более символов, иначе префикс имени.
+    """
+    folded = query.casefold()
+    name = func.casefold(table.c.name)
+    if len(folded) < GRAM:
+        return func.substr(name, 1, len(folded)) == folded
+    return func.instr(name, folded) > 0
+
+
+def _search_select(statement, query: str, table: Table = _tasks):
+    """
+    Добавляет к выборке из table поиск по имени (_name_filter). Кандидаты
+    берутся из триграммной таблицы FTS5 (короткий запрос — как префикс
+    после NAME_SEARCH_MARK), поэтому стоимость поиска пропорциональна числу
+    совпадений, а не размеру таблицы; _name_filter лишь уточняет их.
+    FTS5 приводит регистр посимвольно, поэтому имена, совпадающие с запросом
+    только после полного casefold() («Straße» и «strasse»), не находятся.
+    Запрос, который короче GRAM только до casefold() (например, «ßa»),
+    проверяется по всем строкам.
+    """
+    statement = statement.where(_name_filter(query, table))
+    if len(query.casefold()) < GRAM:
+        pattern = NAME_SEARCH_MARK[: GRAM - len(query)] + query
+    elif len(query) >= GRAM:
+        pattern = query
+    else:
+        return statement
+    search = _name_search[table]
+    phrase = '"' + pattern.replace('"', '""') + '"'
+    matches = (
+        select(search.c.rowid.label("id"))
+        .where(search.c.term.op("MATCH")(phrase))
+        .cte(f"{search.name}_matches")
+        .prefix_with("MATERIALIZED")
+    )
+    return statement.select_from(matches.join(table, table.c.id == matches.c.id))
+
+
+def _tier_selects(finished: bool | None) -> list:
+    """
+    Выборки задач из tasks и архива (архив содержит только завершенные
+    задачи) в порядке id, с фильтром по завершенности.
+    """
+    tables = (_tasks,) if finished is False else (_tasks, _archive)
+    selects = []
+    for table in tables:
+        query = select(*_task_columns(table)).order_by(table.c.id)
+        if finished is not None:
+            query = query.where(table.c.finished == finished)
+        selects.append(query)
+    return selects
 
-from model.task import Task
-from model.task_model import Base, TaskModel
+
+def _page_select(
+    table: Table, bound: str | None, backward: bool, query: str | None, search=True
+):
+    """
+    Выборка задач таблицы для страницы fetch_page: имена после (или перед)
+    границей bound и подходящие под строку поиска.
+
+    :param search: Искать по таблице поиска (_search_select); иначе строки
+        группы проверяются по одной (для небольшой группы запущенных задач).
+    """
+    statement = select(*_task_columns(table))
+    if bound is not None:
+        statement = statement.where(
+            table.c.name < bound if backward else table.c.name > bound
+        )
+    if query and search:
+        statement = _search_select(statement, query, table)
+    elif query:
+        statement = statement.where(_name_filter(query, table))
+    return statement
+
+
+def _engine_options(url: URL) -> dict:
+    """
+    Параметры create_engine для URL. База SQLite в памяти существует только
+    внутри своего подключения, поэтому для неё используется одно общее
+    подключение (StaticPool), доступное из любого потока, в том числе из
+    потока сохранения. Для файловых баз используется пул подключений по
+    умолчанию, переиспользующий открытые подключения.
+    """
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return {
+            "poolclass": StaticPool,
+            "connect_args": {"check_same_thread": False},
+        }
+    return {}
 
 
 class Database:
-    def __init__(self, db_url="sqlite:///tasks.db"):
+    def __init__(
+        self,
+        db_url="sqlite:///tasks.db",
+        write_behind=False,
+        flush_size=100,
+        flush_interval=1.0,
+        core=False,
+    ):
         """
         Инициализация базы данных. Создается соединение с указанным URL базы данных,
-        если база данных не существует, она будет создана.
-        
-        :param db_url: URL базы данных (по умолчанию используется SQLite база данных)
+        если база данных не существует, она будет создана, а существующая база
+        данных старой версии будет обновлена миграциями.
+
+        В режиме отложенной записи (write_behind) обновления задач без смены имени
+        не выполняются сразу, а накапливаются в буфере: повторные изменения одной
+        задачи сливаются, и весь буфер записывается одной транзакцией, когда
+        набирается flush_size задач, проходит flush_interval секунд, перед любым
+        чтением и при завершении процесса.
+
+        Обновления и удаления проверяют версию строки (оптимистичная блокировка):
+        задача, измененная другим процессом после чтения, не перезаписывается,
+        а вызывающий получает ConflictError.
+
+        С core=True горячие методы (add_task, update_task, delete_task,
+        get_task_by_name, fetch_all_tasks) работают через SQLAlchemy Core без
+        сеанса ORM: заранее построенные выражения попадают в кэш компиляции,
+        строки выборки сразу превращаются в Task, а обновление и удаление
+        выполняются одним UPDATE/DELETE с проверкой версии в WHERE и rowcount;
+        версия строки читается только после неудачи, чтобы отличить конфликт
+        от отсутствующей задачи.
+
+        Завершенные задачи старше ARCHIVE_AFTER переносятся archive() в архив
+        (tasks_archive и task_intervals_archive), чтобы таблица tasks и её
+        индексы содержали только рабочий набор. Имена уникальны в обеих
+        таблицах, а чтение раздела завершенных задач, поиск, отчеты, выгрузка
+        и журнал изменений охватывают архив прозрачно. Изменение или удаление
+        архивной задачи сначала возвращает её в tasks.
+
+        :param db_url: URL базы данных SQLite (счетчики, журнал изменений,
+            дерево проектов и поиск по имени ведут триггеры и таблицы FTS5
+            SQLite, поэтому другие СУБД не поддерживаются)
+        :param write_behind: Включить отложенную запись обновлений
+        :param flush_size: Количество задач в буфере, при котором он сбрасывается
+        :param flush_interval: Максимальное время (в секундах) жизни буфера
+        :param core: Использовать реализацию горячих методов на SQLAlchemy Core
+        :raises ValueError: Если URL указывает не на базу данных SQLite.
+        :raises RuntimeError: Если версия SQLite ниже SQLITE_MIN_VERSION.
         """
-        self.engine = create_engine(db_url)
+        url = make_url(db_url)
+        if url.get_backend_name() != "sqlite":
+            raise ValueError(f"only SQLite databases are supported: {db_url}")
+        self.engine = create_engine(url, **_engine_options(url))
+        _configure_sqlite(self.engine)
+        upgrade(self.engine)
         Base.metadata.create_all(self.engine)
         self.Session = sessionmaker(bind=self.engine)
+        self.__write_behind = write_behind
+        self.__core = core
+        self.__flush_size = flush_size
+        self.__flush_interval = flush_interval
+        self.__pending: dict[str, Task] = {}
+        self.__pending_tasks: dict[str, Task] = {}
+        self.__expected_versions: dict[str, int] = {}
+        self.__pending_since = None
+        self.__session = None
+        self.__saved_on_commit = []
+        if write_behind:
+            atexit.register(self.flush)
 
     def add_task(self, task: Task):
         """
@@ -25,73 +346,259 @@ class Database:
         :param task: Объект задачи, который нужно добавить в базу данных.
         :return: True, если задача успешно добавлена, иначе False.
         """
-        with self.Session() as session:
-            task_model = TaskModel.from_task(task)
-            session.add(task_model)
-            try:
-                session.commit()
-                return True
-            except IntegrityError:
-                pass
-        return False
+        if not self.__core:
+            return self.add_tasks([task])
+        self.flush()
+        interval_rows, saved = self.__collect_intervals([task])
+        try:
+            with self.__connection() as connection:
+                connection.execute(_INSERT_TASKS, TaskModel.values_from_task(task))
+                if interval_rows:
+                    connection.execute(_INSERT_INTERVALS, interval_rows)
+        except IntegrityError:
+            return False
+        self.__mark_intervals_saved(saved)
+        return True
+
+    def add_tasks(self, tasks: Iterable[Task]) -> bool:
+        """
+        Добавляет несколько задач одной транзакцией.
+
+        :param tasks: Задачи, которые нужно добавить.
+        :return: True, если добавлены все задачи; False, если хотя бы одно имя
+            уже занято (в этом случае не добавляется ни одна задача).
+        """
+        tasks = list(tasks)
+        rows = [TaskModel.values_from_task(task) for task in tasks]
+        if not rows:
+            return True
+        self.flush()
+        interval_rows, saved = self.__collect_intervals(tasks)
+        try:
+            with self.__scope() as session:
+                session.execute(_INSERT_TASKS, rows)
+                if interval_rows:
+                    session.execute(_INSERT_INTERVALS, interval_rows)
+        except IntegrityError:
+            return False
+        self.__mark_intervals_saved(saved)
+        return True
 
     def update_task(self, task_name: str, task: Task) -> bool:
         """
         Обновляет данные задачи по имени.
 
+        В режиме отложенной записи обновление без смены имени помещается в буфер
+        и считается успешным сразу. В буфер кладется копия состояния задачи
+        (Task.snapshot), поэтому изменения объекта после вызова не попадают
+        в отложенную запись; версия объекта растет и его интервалы отмечаются
+        сохраненными при сбросе буфера. Переименование всегда выполняется
+        немедленно, так как требует проверки уникальности. Если в буфере лежит
+        другой объект той же задачи с несохраненными интервалами, буфер сначала
+        сбрасывается, чтобы интервалы не потерялись.
+
+        Строка обновляется, только если её версия в базе данных равна task.version
+        (для слитых отложенных обновлений — версии первого из них); после записи
+        версия строки и объекта становится task.version + 1.
+
         :param task_name: Название задачи, которую нужно обновить.
         :param task: Новый объект задачи, содержащий обновленные данные.
         :return: True, если задача успешно обновлена, иначе False.
+        :raises ConflictError: Если задачу изменил другой процесс.
         """
-        with self.Session() as session:
-            if task_model := session.query(TaskModel).filter_by(name=task_name).first():
-                updates = {
-                    "name": task.name,
-                    "start_time": task.start_time,
-                    "total_time": task.total_time,
-                    "running": task.running,
-                    "finished": task.finished,
-                }
-                for key, value in updates.items():
-                    setattr(task_model, key, value)
-                try:
-                    session.commit()
-                    return True
-                except IntegrityError:
-                    pass
-        return False
+        if self.__write_behind and task_name == task.name:
+            previous = self.__pending_tasks.get(task_name)
+            if previous not in (None, task) and previous.unsaved_intervals:
+                self.flush()
+            self.__pending[task_name] = Task.snapshot(task)
+            self.__pending_tasks[task_name] = task
+            self.__expected_versions.setdefault(task_name, task.version)
+            if self.__pending_since is None:
+                self.__pending_since = time.monotonic()
+            self.flush_if_due()
+            return True
+        if self.__core:
+            return self.__update_task_core(task_name, task)
+        return self.update_tasks({task_name: task}) == 1
 
-    def delete_task(self, task_name: str) -> bool:
+    def update_tasks(self, updates: dict[str, Task], check_version=True) -> int:
+        """
+        Обновляет несколько задач одной транзакцией.
+
+        :param updates: Словарь вида {текущее имя задачи: новый объект задачи}.
+        :param check_version: Проверять версии строк; False — перезаписать
+            задачи безусловно (например, при импорте).
+        :return: Количество обновленных задач; 0, если новое имя одной из задач
+            уже занято (в этом случае не обновляется ни одна задача).
+        :raises ConflictError: Если часть задач изменил другой процесс
+            (остальные задачи при этом обновляются).
+        :raises IntegrityError: При нарушении других ограничений базы данных
+            (ни одна задача не обновляется).
+        """
+        self.flush()
+        try:
+            return self.__write_updates(updates, check_version=check_version)
+        except IntegrityError:
+            if self.__renamed_to_taken(updates):
+                return 0
+            raise
+
+    def delete_task(self, task_name: str, version: int | None = None) -> bool:
         """
         Удаляет задачу из базы данных по её имени.
 
         :param task_name: Название задачи, которую нужно удалить.
+        :param version: Ожидаемая версия строки; None — удалить без проверки.
         :return: True, если задача успешно удалена, иначе False.
+        :raises ConflictError: Если задачу изменил другой процесс.
         """
-        with self.Session() as session:
-            task_model = session.query(TaskModel).filter_by(name=task_name).first()
-            if task_model:
-                session.delete(task_model)
-                session.commit()
-                return True
-            else:
-                return False
+        if version is None and not self.__core:
+            return self.delete_tasks([task_name]) == 1
+        if version is not None:
+            version = self.__expected_versions.get(task_name, version)
+        self.__pending.pop(task_name, None)
+        self.__pending_tasks.pop(task_name, None)
+        self.__expected_versions.pop(task_name, None)
+        self.flush()
+        if self.__core:
+            return self.__delete_task_core(task_name, version)
+        row = {"_name": task_name}
+        with self.__scope() as session:
+            current = session.execute(
+                select(_tasks.c.version).where(_tasks.c.name == task_name)
+            ).scalar()
+            if current is None:
+                return self.__delete_archived(session, [task_name], version) == 1
+            if current != version:
+                raise ConflictError([task_name])
+            session.execute(_DELETE_INTERVALS, [row])
+            session.execute(_DELETE_TASKS, [row])
+        return True
+
+    def delete_tasks(self, task_names: Iterable[str]) -> int:
+        """
+        Удаляет несколько задач вместе с их интервалами одной транзакцией.
+        Отложенные обновления удаляемых задач отбрасываются.
+
+        :param task_names: Названия задач, которые нужно удалить.
+        :return: Количество удаленных задач.
+        """
+        rows = [{"_name": name} for name in task_names]
+        if not rows:
+            return 0
+        for row in rows:
+            self.__pending.pop(row["_name"], None)
+            self.__pending_tasks.pop(row["_name"], None)
+            self.__expected_versions.pop(row["_name"], None)
+        self.flush()
+        with self.__scope() as session:
+            session.execute(_DELETE_INTERVALS, rows)
+            deleted = session.execute(_DELETE_TASKS, rows).rowcount
+            deleted += self.__delete_archived(session, [row["_name"] for row in rows])
+        return deleted
 
     def fetch_all_tasks(self, finished=False) -> list[Task]:
         """
         Получает все задачи из базы данных, с фильтром по завершенности.
+        Завершенные задачи читаются одним запросом из tasks и архива.
 
         :param finished: Флаг, определяющий, нужно ли получать только завершенные задачи (по умолчанию False).
         :return: Список объектов Task, которые соответствуют фильтру.
         """
-        with self.Session() as session:
+        self.flush()
+        if finished:
+            with self.__reading_connection() as connection:
+                rows = connection.execute(_SELECT_FINISHED)
+                return [task_from_row(row) for row in rows]
+        if self.__core:
+            with self.__reading_connection() as connection:
+                rows = connection.execute(_SELECT_SECTION, {"_finished": finished})
+                return [task_from_row(row) for row in rows]
+        with self.__reader() as session:
             task_models = (
                 session.query(TaskModel)
-                .order_by(TaskModel.running.desc())
+                .order_by(TaskModel.running.desc(), TaskModel.name)
                 .filter_by(finished=finished)
             )
             return [task_model.to_task() for task_model in task_models]
 
+    def fetch_page(
+        self,
+        after_key: tuple | None = None,
+        limit=PAGE_SIZE,
+        finished=False,
+        backward=False,
+        query: str | None = None,
+    ) -> list[Task]:
+        """
+        Страница задач раздела в порядке отображения: сначала запущенные,
+        затем остановленные, внутри группы по имени. Выборка идет по ключу
+        (keyset): строки читаются по индексу (finished, running DESC, name)
+        от границы предыдущей страницы, поэтому стоимость страницы не зависит
+        ни от её номера, ни от размера таблицы. Остановленные завершенные
+        задачи читаются из tasks и архива одним UNION ALL с общим ORDER BY
+        name: SQLite сливает две упорядоченные выборки по индексам имен.
+        Со строкой поиска остановленные задачи выбираются по таблицам поиска
+        имен (стоимость пропорциональна числу совпадений), а немногочисленные
+        запущенные проверяются по одной.
+
+        :param after_key: Ключ отображения (not running, name) последней строки
+            предыдущей страницы; None — с начала раздела.
+        :param limit: Максимальное количество задач.
+        :param finished: Раздел: True — завершенные задачи, False — активные.
+        :param backward: Выбрать limit строк, предшествующих after_key
+            (None — последние строки раздела); порядок результата тот же.
+        :param query: Строка поиска по имени (как в NameIndex) или None.
+        :return: Список задач.
+        """
+        self.flush()
+        groups = [False, True] if backward else [True, False]
+        if after_key is not None:
+            groups = groups[groups.index(not after_key[0]) :]
+        tasks = []
+        with self.__reader() as session:
+            for running in groups:
+                bound = None
+                if after_key is not None and running == (not after_key[0]):
+                    bound = after_key[1]
+                statement = _page_select(
+                    _tasks, bound, backward, query, search=not running
+                ).where(_tasks.c.finished == finished, _tasks.c.running == running)
+                if finished and not running:
+                    statement = union_all(
+                        statement, _page_select(_archive, bound, backward, query)
+                    )
+                statement = statement.order_by(
+                    _name.desc() if backward else _name
+                ).limit(limit - len(tasks))
+                tasks.extend(task_from_row(row) for row in session.execute(statement))
+                if len(tasks) >= limit:
+                    break
+        if backward:
+            tasks.reverse()
+        return tasks
+
+    def count_tasks(self, finished=False, query: str | None = None) -> int:
+        """
+        Количество задач раздела. Без фильтра значение берется из счетчика
+        task_counts, с фильтром по имени (как в fetch_page) строки считаются
+        (для завершенных задач — также в архиве).
+        """
+        self.flush()
+        if not query:
+            statement = select(_counts.c.count).where(_counts.c.finished == finished)
+            with self.__reader() as session:
+                return session.execute(statement).scalar() or 0
+        statements = [
+            _search_select(
+                select(func.count()).where(_tasks.c.finished == finished), query
+            )
+        ]
+        if finished:
+            statements.append(_search_select(select(func.count()), query, _archive))
+        with self.__reader() as session:
+            return sum(session.execute(statement).scalar() for statement in statements)
+
     def get_task_by_name(self, task_name: str) -> Task | None:
         """
         Получает задачу по её имени.
@@ -99,8 +606,858 @@ class Database:
         :param task_name: Название задачи.
         :return: Объект Task, если задача найдена, иначе None.
         """
-        with self.Session() as session:
+        self.flush()
+        if self.__core:
+            with self.__reading_connection() as connection:
+                row = connection.execute(_SELECT_TASK, {"_name": task_name}).first()
+                if row is None:
+                    row = connection.execute(
+                        _SELECT_ARCHIVED_TASK, {"_name": task_name}
+                    ).first()
+                return task_from_row(row) if row is not None else None
+        with self.__reader() as session:
             task_model = session.query(TaskModel).filter_by(name=task_name).first()
             if task_model:
                 return task_model.to_task()
+            row = session.execute(_SELECT_ARCHIVED_TASK, {"_name": task_name}).first()
+            return task_from_row(row) if row is not None else None
+
+    def iter_tasks(
+        self, finished: bool | None = None, batch_size=1000
+    ) -> Iterator[Task]:
+        """
+        Потоково перебирает задачи, загружая их из базы данных пачками
+        (yield_per), так что в памяти одновременно находится не более одной пачки.
+        Архивные задачи перебираются после задач таблицы tasks.
+
+        :param finished: Фильтр по завершенности; None — все задачи.
+        :param batch_size: Количество строк в одной пачке.
+        """
+        self.flush()
+        with self.engine.connect() as connection:
+            for query in _tier_selects(finished):
+                result = connection.execution_options(yield_per=batch_size).execute(
+                    query
+                )
+                for row in result:
+                    yield task_from_row(row)
+
+    def get_tasks(self, task_names: Iterable[str]) -> list[Task]:
+        """
+        Получает задачи по именам (в том числе архивные); отсутствующие
+        имена пропускаются.
+        """
+        self.flush()
+        task_names = list(task_names)
+        query = union_all(
+            select(*TaskModel.columns()).where(_tasks.c.name.in_(task_names)),
+            select(*_task_columns(_archive)).where(_archive.c.name.in_(task_names)),
+        )
+        with self.__reader() as session:
+            return [task_from_row(row) for row in session.execute(query)]
+
+    def last_change(self) -> int:
+        """
+        Номер последней записи журнала изменений task_changes.
+        """
+        with self.__reader() as session:
+            return session.execute(select(func.max(_changes.c.seq))).scalar() or 0
+
+    def changes_since(self, seq: int) -> tuple[int, list[Task], list[str]]:
+        """
+        Задачи, изменившиеся после записи журнала с номером seq (в том числе
+        другими процессами). Если изменений нет, выполняется только поиск по
+        первичному ключу журнала.
+
+        :param seq: Номер последней уже обработанной записи журнала.
+        :return: Новый номер последней записи, измененные задачи в текущем
+            состоянии (включая перенесенные в архив) и имена удаленных
+            (или переименованных) задач.
+        """
+        self.flush()
+        with self.__reader() as session:
+            changes = session.execute(
+                select(_changes.c.seq, _changes.c.name).where(_changes.c.seq > seq)
+            ).all()
+            if not changes:
+                return seq, [], []
+            changed = select(_changes.c.name).where(_changes.c.seq > seq)
+            tasks = [
+                task_from_row(row)
+                for row in session.execute(
+                    union_all(
+                        select(*TaskModel.columns()).where(_tasks.c.name.in_(changed)),
+                        select(*_task_columns(_archive)).where(
+                            _archive.c.name.in_(changed)
+                        ),
+                    )
+                )
+            ]
+        present = {task.name for task in tasks}
+        removed = sorted({name for _, name in changes} - present)
+        return max(number for number, _ in changes), tasks, removed
+
+    def load_store(self, finished: bool | None = None, batch_size=10_000) -> "TaskStore":
+        """
+        Загружает задачи в колоночное хранилище TaskStore. Строки выборки
+        раскладываются по колонкам пачками, объекты Task не создаются.
+
+        :param finished: Фильтр по завершенности; None — все задачи
+            (включая архивные).
+        :param batch_size: Количество строк в одной пачке.
+        """
+        from model.task_store import TaskStore
+
+        self.flush()
+        store = TaskStore()
+        with self.engine.connect() as connection:
+            for query in _tier_selects(finished):
+                result = connection.execution_options(yield_per=batch_size).execute(
+                    query
+                )
+                for rows in result.partitions():
+                    store.extend_rows(rows)
+        return store
+
+    def import_tasks(
+        self, tasks: Iterable[Task], batch_size=1000, on_conflict="skip"
+    ) -> dict[str, int]:
+        """
+        Импортирует задачи пачками по batch_size, каждая пачка — одной
+        транзакцией (см. model.storage.import_tasks).
+
+        :param tasks: Задачи для импорта.
+        :param batch_size: Количество задач в одной пачке.
+        :param on_conflict: Политика для занятых имен: "skip", "overwrite"
+            или "rename".
+        :return: Количество добавленных, пропущенных, перезаписанных
+            и переименованных задач.
+        """
+        return import_tasks(
+            self, tasks, batch_size, on_conflict, self.__existing_names
+        )
+
+    def __existing_names(self, names: set[str]) -> set[str]:
+        """
+        Имена из names, которые уже заняты в базе данных.
+        """
+        with self.__reader() as session:
+            return set(
+                session.execute(
+                    union_all(
+                        select(_tasks.c.name).where(_tasks.c.name.in_(names)),
+                        select(_archive.c.name).where(_archive.c.name.in_(names)),
+                    )
+                ).scalars()
+            )
+
+    def time_spent(
+        self, since: datetime, until: datetime, task_name: str | None = None
+    ) -> float:
+        """
+        Время, потраченное на задачи в промежутке [since, until), включая
+        незакрытые отрезки запущенных задач. Закрытые интервалы выбираются
+        диапазонным поиском по индексу (start_time, end_time) в журнале
+        интервалов и в архиве.
+
+        :param since: Начало промежутка.
+        :param until: Конец промежутка.
+        :param task_name: Имя задачи; если не указано, учитываются все задачи.
+        :return: Время в секундах.
+        """
+        self.flush()
+        since_us = to_epoch_us(since)
+        until_us = to_epoch_us(until)
+        open_until_us = min(until_us, seconds_to_us(Task.clock()))
+        statements = []
+        for intervals in (_intervals, _archived_intervals):
+            closed = select(
+                func.sum(
+                    func.min(intervals.c.end_time, until_us)
+                    - func.max(intervals.c.start_time, since_us)
+                )
+            ).where(intervals.c.start_time < until_us, intervals.c.end_time > since_us)
+            if task_name is not None:
+                closed = closed.where(
+                    intervals.c.task_id.in_(
+                        union_all(
+                            select(_tasks.c.id).where(_tasks.c.name == task_name),
+                            select(_archive.c.id).where(_archive.c.name == task_name),
+                        )
+                    )
+                )
+            statements.append(closed)
+        running = select(
+            func.sum(open_until_us - func.max(_tasks.c.start_time, since_us))
+        ).where(_tasks.c.running, _tasks.c.start_time < open_until_us)
+        if task_name is not None:
+            running = running.where(_tasks.c.name == task_name)
+        statements.append(running)
+        with self.__reader() as session:
+            total_us = sum(
+                session.execute(statement).scalar() or 0 for statement in statements
+            )
+        return total_us / 1_000_000
+
+    def task_names(self) -> dict[int, str]:
+        """
+        Имена всех задач (включая архивные) по их идентификаторам.
+        """
+        self.flush()
+        with self.__reader() as session:
+            return dict(
+                session.execute(
+                    union_all(
+                        select(_tasks.c.id, _tasks.c.name),
+                        select(_archive.c.id, _archive.c.name),
+                    )
+                ).all()
+            )
+
+    def iter_interval_batches(
+        self, since: datetime, until: datetime, batch_size=100_000
+    ) -> Iterator[list[tuple[int, int, int]]]:
+        """
+        Потоково выбирает интервалы (включая архивные), пересекающиеся
+        с промежутком [since, until), пачками строк (task_id, начало, конец)
+        во времени в микросекундах.
+        Последней пачкой идут незакрытые отрезки запущенных задач,
+        заканчивающиеся текущим моментом.
+
+        :param since: Начало промежутка.
+        :param until: Конец промежутка.
+        :param batch_size: Количество строк в одной пачке.
+        """
+        self.flush()
+        since_us = to_epoch_us(since)
+        until_us = to_epoch_us(until)
+        now_us = seconds_to_us(Task.clock())
+        running = select(_tasks.c.id, _tasks.c.start_time).where(
+            _tasks.c.running, _tasks.c.start_time < min(until_us, now_us)
+        )
+        with self.engine.connect() as connection:
+            for intervals in (_intervals, _archived_intervals):
+                closed = select(
+                    intervals.c.task_id, intervals.c.start_time, intervals.c.end_time
+                ).where(
+                    intervals.c.start_time < until_us, intervals.c.end_time > since_us
+                )
+                result = connection.execution_options(yield_per=batch_size).execute(
+                    closed
+                )
+                for partition in result.partitions():
+                    yield list(map(tuple, partition))
+            if open_rows := connection.execute(running).all():
+                yield [(task_id, start, now_us) for task_id, start in open_rows]
+
+    def set_parent(self, task_name: str, parent_name: str | None) -> bool:
+        """
+        Переносит задачу вместе с её поддеревом к родителю parent_name.
+        Сводки старых и новых предков и таблица замыкания обновляются
+        триггерами; архивные задачи сначала возвращаются в tasks.
+
+        :param task_name: Название переносимой задачи.
+        :param parent_name: Название нового родителя; None — сделать задачу
+            корневой.
+        :return: True, если задача перенесена; False, если задачи или
+            родителя нет.
+        :raises ValueError: Если родитель — сама задача или её потомок.
+        """
+        names = {task_name} if parent_name is None else {task_name, parent_name}
+        self.flush()
+        try:
+            with self.__connection() as connection:
+                ids = dict(
+                    connection.execute(
+                        select(_tasks.c.name, _tasks.c.id).where(
+                            _tasks.c.name.in_(names)
+                        )
+                    ).all()
+                )
+                archived = set(
+                    connection.execute(
+                        select(_archive.c.name).where(
+                            _archive.c.name.in_(names - ids.keys())
+                        )
+                    ).scalars()
+                )
+                if len(ids) + len(archived) < len(names):
+                    return False
+                if archived:
+                    self.__restore(connection, archived)
+                    ids.update(
+                        connection.execute(
+                            select(_tasks.c.name, _tasks.c.id).where(
+                                _tasks.c.name.in_(archived)
+                            )
+                        ).all()
+                    )
+                connection.execute(
+                    update(_tasks)
+                    .where(_tasks.c.id == ids[task_name])
+                    .values(parent_id=ids.get(parent_name))
+                )
+        except IntegrityError as error:
+            raise ValueError(
+                f"task {task_name!r} cannot be moved under {parent_name!r}"
+            ) from error
+        return True
+
+    def get_rollup(self, task_name: str) -> Rollup | None:
+        """
+        Сводка поддерева задачи одной строкой task_rollups. Архивная задача
+        в иерархию не входит, её сводка — она сама.
+
+        :param task_name: Название задачи.
+        :return: Сводка или None, если задачи нет.
+        """
+        self.flush()
+        with self.__reading_connection() as connection:
+            row = connection.execute(_SELECT_ROLLUP, {"_name": task_name}).first()
+            if row is not None:
+                return Rollup._make(row)
+            row = connection.execute(
+                _SELECT_ARCHIVED_TASK, {"_name": task_name}
+            ).first()
+        if row is None:
             return None
+        return Rollup(*own_rollup(task_from_row(row)), 1, 0)
+
+    def fetch_children(
+        self, parent_name: str | None = None, finished: bool | None = None
+    ) -> list[tuple[Task, Rollup]]:
+        """
+        Дети задачи со сводками их поддеревьев в порядке отображения
+        (сначала запущенные, затем по имени). Читается только один уровень
+        иерархии, поэтому дерево можно загружать по мере раскрытия.
+
+        :param parent_name: Название родителя; None — корневые задачи
+            (без архивных).
+        :param finished: Фильтр по завершенности; None — все задачи.
+        :return: Пары (задача, сводка её поддерева).
+        """
+        statement = _SELECT_CHILDREN
+        if parent_name is None:
+            statement = statement.where(_tasks.c.parent_id.is_(None))
+        else:
+            statement = statement.where(
+                _tasks.c.parent_id
+                == select(_parents.c.id)
+                .where(_parents.c.name == parent_name)
+                .scalar_subquery()
+            )
+        if finished is not None:
+            statement = statement.where(_tasks.c.finished == finished)
+        self.flush()
+        with self.__reading_connection() as connection:
+            return [
+                (task_from_row(row), Rollup._make(row[-len(Rollup._fields) :]))
+                for row in connection.execute(statement)
+            ]
+
+    def archive_finished(
+        self,
+        older_than: timedelta = ARCHIVE_AFTER,
+        batch_size=ARCHIVE_BATCH_SIZE,
+        now: float | None = None,
+    ) -> int:
+        """
+        Переносит в архив одну пачку завершенных задач, закончившихся раньше
+        чем older_than назад, вместе с их интервалами (одной транзакцией).
+        Момент завершения — конец последнего интервала задачи (для задачи
+        без интервалов — время начала). Задачи иерархии (с родителем или
+        детьми) остаются в tasks, чтобы сводки их предков не менялись.
+
+        :param older_than: Возраст завершенной задачи, после которого она
+            переносится в архив.
+        :param batch_size: Максимальное количество задач в пачке.
+        :param now: Текущий момент в секундах от эпохи (по умолчанию Task.clock()).
+        :return: Количество перенесенных задач; меньше batch_size, если
+            подходящих задач больше не осталось.
+        """
+        self.flush()
+        now = Task.clock() if now is None else now
+        cutoff_us = seconds_to_us(now - older_than.total_seconds())
+        finished_at = func.coalesce(
+            select(func.max(_intervals.c.end_time))
+            .where(_intervals.c.task_id == _tasks.c.id)
+            .scalar_subquery(),
+            _tasks.c.start_time,
+        )
+        with self.__connection() as connection:
+            ids = list(
+                connection.execute(
+                    select(_tasks.c.id)
+                    .where(
+                        _tasks.c.finished.is_(True),
+                        finished_at < cutoff_us,
+                        _tasks.c.parent_id.is_(None),
+                        ~exists().where(_children.c.parent_id == _tasks.c.id),
+                    )
+                    .order_by(_tasks.c.id)
+                    .limit(batch_size)
+                ).scalars()
+            )
+            if not ids:
+                return 0
+            connection.execute(
+                insert(_archive).from_select(
+                    _ARCHIVE_COLUMNS,
+                    select(*(_tasks.c[name] for name in _ARCHIVE_COLUMNS)).where(
+                        _tasks.c.id.in_(ids)
+                    ),
+                )
+            )
+            connection.execute(
+                insert(_archived_intervals).from_select(
+                    _INTERVAL_COLUMNS,
+                    select(*(_intervals.c[name] for name in _INTERVAL_COLUMNS)).where(
+                        _intervals.c.task_id.in_(ids)
+                    ),
+                )
+            )
+            connection.execute(delete(_intervals).where(_intervals.c.task_id.in_(ids)))
+            connection.execute(delete(_tasks).where(_tasks.c.id.in_(ids)))
+        return len(ids)
+
+    def archive(
+        self,
+        older_than: timedelta = ARCHIVE_AFTER,
+        batch_size=ARCHIVE_BATCH_SIZE,
+        vacuum=True,
+    ) -> int:
+        """
+        Переносит в архив все подходящие завершенные задачи пачками
+        archive_finished(), каждая пачка — отдельной транзакцией, поэтому
+        другие процессы могут писать между пачками. Если что-то перенесено,
+        затем выполняется optimize() (вне transaction()), иначе только
+        prune_changes().
+
+        :param older_than: Возраст завершенной задачи для переноса в архив.
+        :param batch_size: Количество задач в одной пачке.
+        :param vacuum: Выполнить VACUUM после переноса.
+        :return: Количество перенесенных задач.
+        """
+        total = 0
+        while (moved := self.archive_finished(older_than, batch_size)) > 0:
+            total += moved
+            if moved < batch_size:
+                break
+        if total and self.__session is None:
+            self.optimize(vacuum)
+        else:
+            self.prune_changes()
+        return total
+
+    def prune_changes(self) -> int:
+        """
+        Сжимает журнал изменений task_changes: для каждого имени остается
+        только последняя запись. Для любого номера seq, который мог запомнить
+        читатель (в том числе другой процесс), changes_since() после сжатия
+        возвращает тот же номер, те же задачи и те же удаленные имена, поэтому
+        журнал растет с количеством имен задач, а не с количеством изменений.
+
+        :return: Количество удаленных записей журнала.
+        """
+        self.flush()
+        latest = select(func.max(_changes.c.seq)).group_by(_changes.c.name)
+        with self.__connection() as connection:
+            return connection.execute(
+                delete(_changes).where(_changes.c.seq.not_in(latest))
+            ).rowcount
+
+    def optimize(self, vacuum=False):
+        """
+        Обновляет статистику планировщика запросов (ANALYZE) и, если нужно,
+        перестраивает файл базы данных, возвращая место после переноса
+        в архив (VACUUM). VACUUM переписывает весь файл и блокирует запись
+        на время работы, поэтому в интерфейсе выполняется только ANALYZE.
+        Перед этим сжимается журнал изменений (prune_changes()).
+
+        :param vacuum: Выполнить VACUUM.
+        """
+        self.prune_changes()
+        connection = self.engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            cursor.execute("ANALYZE")
+            if vacuum:
+                cursor.execute("VACUUM")
+            cursor.close()
+        finally:
+            connection.close()
+
+    @contextmanager
+    def transaction(self):
+        """
+        Выполняет все операции с базой данных внутри блока одной транзакцией.
+        Если блок завершается исключением, все изменения откатываются.
+        Вложенные вызовы присоединяются к внешней транзакции.
+        """
+        if self.__session is not None:
+            yield self
+            return
+        self.flush()
+        with self.Session() as session:
+            self.__session = session
+            try:
+                yield self
+                self.flush()
+                session.commit()
+            except BaseException:
+                self.__saved_on_commit = []
+                raise
+            finally:
+                self.__session = None
+        saved, self.__saved_on_commit = self.__saved_on_commit, []
+        self.__mark_intervals_saved(saved)
+
+    def flush(self):
+        """
+        Записывает все отложенные обновления одной транзакцией.
+
+        :raises ConflictError: Если часть задач изменил другой процесс
+            (остальные задачи при этом записываются).
+        :raises IntegrityError: Если запись нарушает ограничение базы данных:
+            транзакция откатывается, буфер очищается, а несохраненные
+            интервалы остаются у объектов задач до их следующего обновления.
+        """
+        if not self.__pending:
+            return
+        pending, self.__pending = self.__pending, {}
+        tasks, self.__pending_tasks = self.__pending_tasks, {}
+        expected, self.__expected_versions = self.__expected_versions, {}
+        self.__pending_since = None
+        self.__write_updates(pending, expected, owners=tasks)
+
+    def flush_if_due(self):
+        """
+        Сбрасывает буфер, если превышен порог по размеру или по времени.
+        """
+        if self.__pending and (
+            len(self.__pending) >= self.__flush_size
+            or time.monotonic() - self.__pending_since >= self.__flush_interval
+        ):
+            self.flush()
+
+    def pending_timeout(self) -> float | None:
+        """
+        Время (в секундах), через которое буфер отложенной записи нужно сбросить.
+
+        :return: Количество секунд или None, если буфер пуст.
+        """
+        if not self.__pending:
+            return None
+        elapsed = time.monotonic() - self.__pending_since
+        return max(self.__flush_interval - elapsed, 0.0)
+
+    def close(self):
+        """
+        Сбрасывает отложенные обновления и закрывает соединения с базой данных.
+        """
+        self.flush()
+        if self.__write_behind:
+            atexit.unregister(self.flush)
+        self.engine.dispose()
+
+    def __write_updates(
+        self,
+        updates: dict[str, Task],
+        expected: dict[str, int] | None = None,
+        check_version=True,
+        owners: dict[str, Task] | None = None,
+    ) -> int:
+        """
+        Выполняет пакетный UPDATE (executemany) для переданных задач и
+        добавляет их закрытые интервалы в журнал той же транзакцией.
+
+        При проверке версий текущие версии строк читаются в той же транзакции,
+        задачи с несовпадающей версией пропускаются, а остальные записываются.
+        Архивные задачи перед записью возвращаются в tasks.
+
+        :param updates: Словарь {текущее имя задачи: объект задачи}.
+        :param expected: Ожидаемые версии строк, если они отличаются от версий
+            объектов (слитые отложенные обновления).
+        :param check_version: Проверять версии строк.
+        :param owners: Объекты задач, копии которых записываются (отложенные
+            обновления): версия растет и интервалы отмечаются у них.
+        :raises ConflictError: После записи остальных задач, если версии
+            части строк не совпали.
+        :raises IntegrityError: Если запись нарушает ограничение базы данных
+            (транзакция откатывается целиком).
+        """
+        if not updates:
+            return 0
+        expected = expected or {}
+        conflicts = []
+        with self.__scope() as session:
+            if check_version:
+                current = dict(
+                    session.execute(
+                        select(_tasks.c.name, _tasks.c.version).where(
+                            _tasks.c.name.in_(updates)
+                        )
+                    ).all()
+                )
+                if len(current) < len(updates):
+                    current.update(
+                        self.__restore(session, updates.keys() - current.keys())
+                    )
+                conflicts = [
+                    name
+                    for name, task in updates.items()
+                    if current.get(name, expected.get(name, task.version))
+                    != expected.get(name, task.version)
+                ]
+                updates = {
+                    name: task
+                    for name, task in updates.items()
+                    if name not in conflicts
+                }
+            else:
+                self.__restore(session, updates)
+            rows = [
+                {"_name": task_name, **TaskModel.values_from_task(task)}
+                for task_name, task in updates.items()
+            ]
+            if check_version:
+                for row, (task_name, task) in zip(rows, updates.items()):
+                    row["_version"] = expected.get(task_name, task.version)
+                    row["version"] = task.version + 1
+            interval_rows, saved = self.__collect_intervals(updates.values())
+            if owners:
+                saved = [(owners[task.name], count) for task, count in saved]
+            rowcount = 0
+            if rows:
+                statement = _UPDATE_TASKS if check_version else _OVERWRITE_TASKS
+                rowcount = session.execute(statement, rows).rowcount
+            if interval_rows:
+                session.execute(_INSERT_INTERVALS, interval_rows)
+        if check_version:
+            written = owners or updates
+            for name in updates:
+                written[name].version += 1
+        self.__mark_intervals_saved(saved)
+        if conflicts:
+            raise ConflictError(conflicts)
+        return rowcount
+
+    def __update_task_core(self, task_name: str, task: Task) -> bool:
+        """
+        Обновление одной задачи через Core: один UPDATE с проверкой версии
+        в WHERE; версия строки читается, только если строка не обновилась
+        (архивная задача при этом возвращается в tasks, и UPDATE повторяется).
+        """
+        self.flush()
+        row = {
+            "_name": task_name,
+            "_version": task.version,
+            **TaskModel.values_from_task(task),
+            "version": task.version + 1,
+        }
+        interval_rows, saved = self.__collect_intervals([task])
+        try:
+            with self.__connection() as connection:
+                if connection.execute(_UPDATE_TASKS, row).rowcount != 1:
+                    current = connection.execute(
+                        _SELECT_VERSION, {"_name": task_name}
+                    ).scalar()
+                    if current is None:
+                        current = self.__restore(connection, [task_name]).get(
+                            task_name
+                        )
+                        if current is None:
+                            return False
+                    if (
+                        current != task.version
+                        or connection.execute(_UPDATE_TASKS, row).rowcount != 1
+                    ):
+                        raise ConflictError([task_name])
+                if interval_rows:
+                    connection.execute(_INSERT_INTERVALS, interval_rows)
+        except IntegrityError:
+            if self.__renamed_to_taken({task_name: task}):
+                return False
+            raise
+        task.version += 1
+        self.__mark_intervals_saved(saved)
+        return True
+
+    def __renamed_to_taken(self, updates: dict[str, Task]) -> bool:
+        """
+        Занято ли в базе данных новое имя одной из переименовываемых задач
+        (ошибка целостности — конфликт имен, а не другое нарушение).
+        """
+        names = {task.name for name, task in updates.items() if task.name != name}
+        return bool(names and self.__existing_names(names) - updates.keys())
+
+    def __delete_task_core(self, task_name: str, version: int | None) -> bool:
+        """
+        Удаление одной задачи через Core: DELETE ... RETURNING id с проверкой
+        версии в WHERE, затем удаление интервалов по id задачи. Если задачи
+        нет в tasks, она удаляется из архива.
+        """
+        with self.__connection() as connection:
+            if version is None:
+                deleted = connection.execute(
+                    _DELETE_TASK_RETURNING, {"_name": task_name}
+                ).scalar()
+            else:
+                deleted = connection.execute(
+                    _DELETE_VERSION_RETURNING,
+                    {"_name": task_name, "_version": version},
+                ).scalar()
+            if deleted is None:
+                if version is not None and connection.execute(
+                    _SELECT_VERSION, {"_name": task_name}
+                ).scalar() is not None:
+                    raise ConflictError([task_name])
+                return self.__delete_archived(connection, [task_name], version) == 1
+            connection.execute(_DELETE_TASK_INTERVALS, {"_id": deleted})
+        return True
+
+    @staticmethod
+    def __restore(
+        connection: Connection | Session, task_names: Iterable[str]
+    ) -> dict[str, int]:
+        """
+        Возвращает архивные задачи из task_names и их интервалы в tasks
+        (с прежними id), чтобы их можно было изменить.
+
+        :return: Версии возвращенных задач по именам.
+        """
+        rows = connection.execute(
+            select(_archive).where(_archive.c.name.in_(list(task_names)))
+        ).all()
+        if not rows:
+            return {}
+        ids = [row.id for row in rows]
+        connection.execute(delete(_archive).where(_archive.c.id.in_(ids)))
+        connection.execute(insert(_tasks), [row._asdict() for row in rows])
+        connection.execute(
+            insert(_intervals).from_select(
+                _INTERVAL_COLUMNS,
+                select(
+                    *(_archived_intervals.c[name] for name in _INTERVAL_COLUMNS)
+                ).where(_archived_intervals.c.task_id.in_(ids)),
+            )
+        )
+        connection.execute(
+            delete(_archived_intervals).where(_archived_intervals.c.task_id.in_(ids))
+        )
+        return {row.name: row.version for row in rows}
+
+    @staticmethod
+    def __delete_archived(
+        connection: Connection | Session,
+        task_names: list[str],
+        version: int | None = None,
+    ) -> int:
+        """
+        Удаляет архивные задачи из task_names вместе с их интервалами.
+
+        :param version: Ожидаемая версия строк; None — удалить без проверки.
+        :return: Количество удаленных задач.
+        :raises ConflictError: Если версия архивной задачи не совпала.
+        """
+        rows = connection.execute(
+            select(_archive.c.id, _archive.c.name, _archive.c.version).where(
+                _archive.c.name.in_(task_names)
+            )
+        ).all()
+        if version is not None and (
+            conflicts := [row.name for row in rows if row.version != version]
+        ):
+            raise ConflictError(conflicts)
+        ids = [row.id for row in rows]
+        if ids:
+            connection.execute(
+                delete(_archived_intervals).where(
+                    _archived_intervals.c.task_id.in_(ids)
+                )
+            )
+            connection.execute(delete(_archive).where(_archive.c.id.in_(ids)))
+        return len(ids)
+
+    @staticmethod
+    def __collect_intervals(tasks: Iterable[Task]) -> tuple[list, list]:
+        """
+        Собирает несохраненные интервалы задач в строки для пакетной вставки.
+
+        :return: Строки для вставки и пары (задача, количество интервалов).
+        """
+        rows = []
+        saved = []
+        for task in tasks:
+            intervals = task.unsaved_intervals
+            if intervals:
+                rows.extend(
+                    {
+                        "_name": task.name,
+                        "_start": seconds_to_us(start),
+                        "_end": seconds_to_us(end),
+                    }
+                    for start, end in intervals
+                )
+                saved.append((task, len(intervals)))
+        return rows, saved
+
+    def __mark_intervals_saved(self, saved: list):
+        """
+        Отмечает интервалы сохраненными; внутри transaction() — после фиксации.
+        """
+        if self.__session is not None:
+            self.__saved_on_commit.extend(saved)
+            return
+        for task, count in saved:
+            task.mark_intervals_saved(count)
+
+    @contextmanager
+    def __scope(self) -> Iterator[Session]:
+        """
+        Сеанс для одной изменяющей операции. Вне transaction() операция
+        выполняется отдельной транзакцией, внутри — точкой сохранения общей
+        транзакции, чтобы ошибка откатывала только эту операцию.
+        """
+        if self.__session is None:
+            with self.Session.begin() as session:
+                yield session
+        else:
+            with self.__session.begin_nested():
+                yield self.__session
+
+    @contextmanager
+    def __connection(self) -> Iterator[Connection | Session]:
+        """
+        Подключение Core для одной изменяющей операции: отдельная транзакция
+        вне transaction(), точка сохранения общей транзакции внутри.
+        """
+        if self.__session is None:
+            with self.engine.begin() as connection:
+                yield connection
+        else:
+            with self.__session.begin_nested():
+                yield self.__session
+
+    @contextmanager
+    def __reading_connection(self) -> Iterator[Connection | Session]:
+        """
+        Подключение Core для чтения: общий сеанс внутри transaction(), иначе
+        подключение из пула без сеанса ORM.
+        """
+        if self.__session is None:
+            with self.engine.connect() as connection:
+                yield connection
+        else:
+            yield self.__session
+
+    @contextmanager
+    def __reader(self) -> Iterator[Session]:
+        """
+        Сеанс для чтения: общий внутри transaction(), иначе новый.
+        """
+        if self.__session is None:
+            with self.Session() as session:
+                yield session
+        else:
+            yield self.__session
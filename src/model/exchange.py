@@ -0,0 +1,96 @@
+import csv
+import json
+from datetime import datetime
+from typing import Iterable, Iterator, TextIO
+
+from model.task import Task
+
+FORMATS = ("csv", "jsonl")
+FIELDS = ("name", "start_time", "total_time", "running", "finished")
+
+
+def detect_format(path: str, default="jsonl") -> str:
+    """
+    Определяет формат файла по расширению.
+
+    :param path: Путь к файлу.
+    :param default: Формат, если расширение не распознано.
+    """
+    extension = path.rsplit(".", 1)[-1].lower()
+    return extension if extension in FORMATS else default
+
+
+def task_to_record(task: Task) -> dict:
+    """
+    Представление задачи в виде записи для выгрузки.
+    """
+    return {
+        "name": task.name,
+        "start_time": task.start_time.isoformat(),
+        "total_time": task.total_time,
+        "running": task.running,
+        "finished": task.finished,
+    }
+
+
+def task_from_record(record: dict) -> Task:
+    """
+    Строит задачу по записи из файла. Значения CSV приходят строками,
+    отсутствующее время начала заменяется текущим.
+
+    :raises ValueError: Если запись не содержит имени или значения некорректны.
+    """
+    if not record.get("name"):
+        raise ValueError(f"task name is required: {record}")
+    start_time = record.get("start_time")
+    return Task(
+        name=record["name"],
+        start_time=datetime.fromisoformat(start_time) if start_time else None,
+        total_time=float(record.get("total_time") or 0.0),
+        running=_to_bool(record.get("running", False)),
+        finished=_to_bool(record.get("finished", False)),
+    )
+
+
+def _to_bool(value) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes")
+    return bool(value)
+
+
+def write_tasks(tasks: Iterable[Task], file: TextIO, fmt: str) -> int:
+    """
+    Потоково записывает задачи в файл.
+
+    :param tasks: Задачи для выгрузки (итератор не материализуется).
+    :param file: Открытый текстовый файл.
+    :param fmt: Формат: "csv" или "jsonl".
+    :return: Количество записанных задач.
+    """
+    count = 0
+    if fmt == "csv":
+        writer = csv.DictWriter(file, fieldnames=FIELDS)
+        writer.writeheader()
+        for task in tasks:
+            writer.writerow(task_to_record(task))
+            count += 1
+    else:
+        for task in tasks:
+            file.write(json.dumps(task_to_record(task), ensure_ascii=False) + "\n")
+            count += 1
+    return count
+
+
+def read_tasks(file: TextIO, fmt: str) -> Iterator[Task]:
+    """
+    Лениво читает задачи из файла по одной записи.
+
+    :param file: Открытый текстовый файл.
+    :param fmt: Формат: "csv" или "jsonl".
+    """
+    if fmt == "csv":
+        records = csv.DictReader(file)
+    else:
+        records = (json.loads(line) for line in file if line.strip())
+    for record in records:
+        yield task_from_record(record)
@@ -0,0 +1,308 @@
+import cProfile
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+STATS_ENV = "TASKS_STATS"
+PROFILE_ENV = "TASKS_PROFILE"
+FPS_WINDOW = 5.0
+SUB_BUCKET_BITS = 7
+
+_SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+_HALF_BUCKETS = _SUB_BUCKETS >> 1
+_PLACEHOLDERS = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_SPACES = re.compile(r"\s+")
+
+
+class LatencyHistogram:
+    """
+    Гистограмма задержек в стиле HDR: значения в микросекундах раскладываются
+    по логарифмическим корзинам, каждая из которых делится на 64 линейные
+    подкорзины. Относительная погрешность перцентилей не превышает 1/64
+    при любом диапазоне значений, а запись стоит O(1) и не выделяет памяти.
+    """
+
+    def __init__(self):
+        self.__counts = [0] * _SUB_BUCKETS
+        self.__count = 0
+        self.__total = 0.0
+        self.__max = 0.0
+
+    @property
+    def count(self):
+        return self.__count
+
+    @property
+    def total(self):
+        """
+        Сумма всех записанных значений в секундах.
+        """
+        return self.__total
+
+    @property
+    def max(self):
+        return self.__max
+
+    def record(self, seconds: float):
+        """
+        Записывает одно значение задержки.
+
+        :param seconds: Задержка в секундах
+        """
+        index = _bucket_index(int(seconds * 1_000_000))
+        if index >= len(self.__counts):
+            self.__counts.extend([0] * (index + 1 - len(self.__counts)))
+        self.__counts[index] += 1
+        self.__count += 1
+        self.__total += seconds
+        if seconds > self.__max:
+            self.__max = seconds
+
+    def percentile(self, percent: float) -> float:
+        """
+        Значение, не меньше которого percent процентов записанных значений.
+
+        :param percent: Перцентиль от 0 до 100
+        :return: Задержка в секундах (середина корзины) или 0.0 для пустой гистограммы
+        """
+        if not self.__count:
+            return 0.0
+        rank = max(1, math.ceil(self.__count * percent / 100))
+        seen = 0
+        for index, count in enumerate(self.__counts):
+            seen += count
+            if seen >= rank:
+                low, high = _bucket_range(index)
+                return min((low + high) / 2 / 1_000_000, self.__max)
+        return self.__max
+
+    def summary(self) -> dict:
+        """
+        Сводка гистограммы: количество, среднее, p50, p90, p99 и максимум в секундах.
+        """
+        return {
+            "count": self.__count,
+            "total": self.__total,
+            "mean": self.__total / self.__count if self.__count else 0.0,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "max": self.__max,
+        }
+
+
+def _bucket_index(value: int) -> int:
+    if value < _SUB_BUCKETS:
+        return max(value, 0)
+    shift = value.bit_length() - SUB_BUCKET_BITS
+    return _SUB_BUCKETS + (shift - 1) * _HALF_BUCKETS + (value >> shift) - _HALF_BUCKETS
+
+
+def _bucket_range(index: int) -> tuple[int, int]:
+    if index < _SUB_BUCKETS:
+        return index, index
+    shift, top = divmod(index - _SUB_BUCKETS, _HALF_BUCKETS)
+    shift += 1
+    top += _HALF_BUCKETS
+    return top << shift, ((top + 1) << shift) - 1
+
+
+class Instrumentation:
+    """
+    Сбор задержек интерфейса, потока сохранения и SQL-запросов.
+
+    Задержки записываются в именованные гистограммы LatencyHistogram:
+    "sql.<запрос>" — выполнение запроса курсором, "worker.<метод>" — команда
+    потока сохранения целиком (разница с SQL — построение объектов ORM),
+    "key.<команда>" — обработка клавиши, "render.frame" — кадр таблицы.
+    Запись потокобезопасна. Если сбор выключен, объект не создается вовсе,
+    и инструментируемый код проверяет только значение None.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter):
+        """
+        :param clock: Монотонные часы для замеров (по умолчанию time.perf_counter)
+        """
+        self.clock = clock
+        self.__lock = threading.Lock()
+        self.__histograms: dict[str, LatencyHistogram] = {}
+        self.__frames: deque[float] = deque()
+        self.__started = clock()
+
+    def record(self, name: str, seconds: float):
+        """
+        Записывает задержку в гистограмму name.
+        """
+        with self.__lock:
+            histogram = self.__histograms.get(name)
+            if histogram is None:
+                histogram = self.__histograms[name] = LatencyHistogram()
+            histogram.record(seconds)
+
+    def call(self, name: str, function: Callable, *args):
+        """
+        Вызывает function(*args) и записывает время вызова в гистограмму name
+        (в том числе, если вызов завершился исключением).
+
+        :return: Результат вызова.
+        """
+        start = self.clock()
+        try:
+            return function(*args)
+        finally:
+            self.record(name, self.clock() - start)
+
+    def frame(self, seconds: float):
+        """
+        Записывает время отрисовки кадра и отмечает кадр для расчета частоты.
+        """
+        now = self.clock()
+        with self.__lock:
+            self.__frames.append(now)
+            while self.__frames[0] <= now - FPS_WINDOW:
+                self.__frames.popleft()
+        self.record("render.frame", seconds)
+
+    def fps(self) -> float:
+        """
+        Частота кадров за последние FPS_WINDOW секунд.
+        """
+        now = self.clock()
+        window = min(FPS_WINDOW, now - self.__started) or FPS_WINDOW
+        with self.__lock:
+            frames = sum(1 for moment in self.__frames if moment > now - FPS_WINDOW)
+        return frames / window
+
+    def histogram(self, name: str) -> LatencyHistogram | None:
+        return self.__histograms.get(name)
+
+    def summary(self) -> dict[str, dict]:
+        """
+        Сводки всех гистограмм по именам.
+        """
+        with self.__lock:
+            return {
+                name: histogram.summary()
+                for name, histogram in sorted(self.__histograms.items())
+            }
+
+    def overlay_lines(self, limit: int) -> list[str]:
+        """
+        Строки панели статистики: частота кадров и задержки p50/p99, сначала
+        кадр и клавиши, затем SQL и поток сохранения по убыванию общего времени.
+
+        :param limit: Максимальное количество строк
+        :return: Строки одинаковой ширины
+        """
+        summary = self.summary()
+        names = sorted(
+            summary,
+            key=lambda name: (
+                not name.startswith(("render.", "key.")),
+                -summary[name]["total"],
+            ),
+        )
+        lines = [
+            f"{'Кадров/с':<30}{self.fps():>9.1f}",
+            f"{'':<30}{'p50':>9}{'p99':>9}{'n':>7}",
+        ]
+        for name in names[: max(limit - len(lines), 0)]:
+            item = summary[name]
+            lines.append(
+                f"{name[:29]:<30}{format_latency(item['p50']):>9}"
+                f"{format_latency(item['p99']):>9}{item['count']:>7}"
+            )
+        return [line.ljust(55) for line in lines[:limit]]
+
+    def dump(self, path: str):
+        """
+        Сохраняет сводку в JSON.
+
+        :param path: Путь к файлу
+        """
+        data = {
+            "uptime": self.clock() - self.__started,
+            "fps": self.fps(),
+            "histograms": self.summary(),
+        }
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(data, file, ensure_ascii=False, indent=2)
+
+    def attach_engine(self, engine):
+        """
+        Подключает замер каждого SQL-запроса движка SQLAlchemy. Запросы
+        группируются по тексту, в котором списки параметров IN (?, ?, ...)
+        сокращены до (?). SQLAlchemy импортируется только здесь, чтобы
+        хранилища без движка её не загружали.
+        """
+        from sqlalchemy import event
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("instrumentation_start", []).append(self.clock())
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            start = conn.info["instrumentation_start"].pop()
+            self.record(statement_name(statement), self.clock() - start)
+
+
+def statement_name(statement: str) -> str:
+    """
+    Имя гистограммы SQL-запроса: текст запроса в одну строку без списков
+    параметров, не длиннее 60 символов.
+    """
+    statement = _SPACES.sub(" ", _PLACEHOLDERS.sub("(?)", statement)).strip()
+    return "sql." + statement[:60]
+
+
+def format_latency(seconds: float) -> str:
+    """
+    Форматирует задержку для панели статистики.
+
+    :param seconds: Задержка в секундах
+    :return: Строка вида "850мкс", "12.5мс" или "1.20с"
+    """
+    if seconds < 0.001:
+        return f"{seconds * 1_000_000:.0f}мкс"
+    if seconds < 1:
+        return f"{seconds * 1000:.1f}мс"
+    return f"{seconds:.2f}с"
+
+
+@contextmanager
+def instrumented(environ=os.environ) -> Iterator[Instrumentation | None]:
+    """
+    Включает сбор статистики по переменным окружения.
+
+    TASKS_STATS — путь к файлу, куда при выходе сохраняется сводка задержек;
+    TASKS_PROFILE — путь к файлу профиля cProfile основного потока
+    (его можно открыть через pstats или snakeviz). Если ни одна переменная
+    не задана, возвращается None и код работает без замеров.
+
+    :param environ: Переменные окружения
+    :return: Объект Instrumentation или None
+    """
+    stats_path = environ.get(STATS_ENV)
+    profile_path = environ.get(PROFILE_ENV)
+    if not stats_path and not profile_path:
+        yield None
+        return
+    instrumentation = Instrumentation()
+    profiler = cProfile.Profile() if profile_path else None
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield instrumentation
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(profile_path)
+        if stats_path:
+            instrumentation.dump(stats_path)
@@ -0,0 +1,137 @@
+from collections import OrderedDict
+from collections.abc import Sequence
+from itertools import chain
+from typing import Callable
+
+from model.task import Task
+from model.task_index import TaskIndex
+
+PAGE_SIZE = 100
+MAX_PAGES = 8
+
+
+class LazyTaskList(Sequence):
+    """
+    Раздел задач, загружаемый из базы данных страницами по мере обращения.
+
+    Страницы читаются постраничной выборкой по ключу: для каждой загруженной
+    страницы запоминаются ключи отображения её первой и последней строк,
+    и соседние страницы читаются от этих границ (вперед или назад). Поэтому
+    открытие раздела, движение курсора и переход в конец раздела стоят одну
+    выборку страницы независимо от размера таблицы. В памяти хранится не
+    больше max_pages страниц: давно не использованные вытесняются (LRU).
+
+    Функции чтения могут не отдавать результат сразу (чтение выполняется
+    в другом потоке): None означает «еще не прочитано». Пока размер
+    раздела не прочитан, раздел пуст (loading), а строки непрочитанной
+    страницы — None; таблица рисует на их месте заглушки, а следующее
+    обращение после прихода результата повторит чтение.
+    """
+
+    def __init__(
+        self,
+        fetch_page: Callable[[tuple | None, int, bool], list[Task] | None],
+        count: Callable[[], int | None],
+        page_size=PAGE_SIZE,
+        max_pages=MAX_PAGES,
+    ):
+        """
+        :param fetch_page: Функция (граница, количество, назад) -> задачи, как
+            Database.fetch_page с зафиксированными разделом и фильтром,
+            или None, если страница еще не прочитана.
+        :param count: Функция, возвращающая количество задач раздела
+            или None, если оно еще не прочитано.
+        :param page_size: Количество задач на странице.
+        :param max_pages: Максимальное количество страниц в памяти.
+        """
+        self.__fetch_page = fetch_page
+        self.__count = count
+        self.__page_size = page_size
+        self.__max_pages = max_pages
+        self.reset()
+
+    def reset(self):
+        """
+        Забывает загруженные страницы и размер раздела: следующее обращение
+        прочитает их заново (после изменения задач раздела или фильтра).
+        """
+        self.__length: int | None = None
+        self.__pages: OrderedDict[int, list[Task]] = OrderedDict()
+        self.__after: dict[int, tuple | None] = {0: None}
+        self.__before: dict[int, tuple | None] = {}
+
+    @property
+    def loaded_pages(self) -> list[int]:
+        """
+        Номера страниц в памяти, от давно использованной к последней.
+        """
+        return list(self.__pages)
+
+    @property
+    def loading(self) -> bool:
+        """
+        Размер раздела еще не прочитан.
+        """
+        return not len(self) and self.__length is None
+
+    def __len__(self) -> int:
+        if self.__length is None:
+            length = self.__count()
+            if length is None:
+                return 0
+            self.__length = length
+            if length:
+                self.__before[(length - 1) // self.__page_size] = None
+        return self.__length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError(index)
+        number, offset = divmod(index, self.__page_size)
+        page = self.__page(number)
+        if page is not None and offset >= len(page):
+            self.reset()
+            if index >= len(self):
+                raise IndexError(index)
+            page = self.__page(number)
+        return None if page is None else page[offset]
+
+    def __page(self, number: int) -> list[Task] | None:
+        page = self.__pages.get(number)
+        if page is not None:
+            self.__pages.move_to_end(number)
+            return page
+        page = self.__load(number)
+        if page is None:
+            return None
+        self.__pages[number] = page
+        if len(self.__pages) > self.__max_pages:
+            self.__pages.popitem(last=False)
+        if page:
+            self.__after[number + 1] = TaskIndex.sort_key(page[-1])
+            self.__before[number - 1] = TaskIndex.sort_key(page[0])
+        return page
+
+    def __load(self, number: int) -> list[Task] | None:
+        """
+        Читает страницу от известной границы. Если границ страницы еще нет
+        (переход далеко от загруженных страниц), страницы подгружаются
+        подряд от ближайшей известной границы; None — одна из них еще
+        не прочитана.
+        """
+        if number in self.__after:
+            return self.__fetch_page(self.__after[number], self.__page_size, False)
+        if number in self.__before:
+            size = min(self.__page_size, len(self) - number * self.__page_size)
+            return self.__fetch_page(self.__before[number], size, True)
+        known = min(chain(self.__after, self.__before), key=lambda n: abs(n - number))
+        step = 1 if known < number else -1
+        for nearer in range(known, number, step):
+            if self.__page(nearer) is None:
+                return None
+        return self.__load(number)
@@ -0,0 +1,963 @@
+import fcntl
+import json
+import os
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Iterable, Iterator
+
+from model.name_index import GRAM
+from model.storage import (ARCHIVE_AFTER, ARCHIVE_BATCH_SIZE, PAGE_SIZE,
+                           ConflictError, import_tasks)
+from model.task import Task, seconds_to_us, to_epoch_us
+from model.task_tree import Rollup, TaskTree
+
+if TYPE_CHECKING:
+    from model.task_store import TaskStore
+
+COMPACT_RATIO = 4.0
+COMPACT_MIN_SIZE = 1 << 20
+LOCK_SUFFIX = ".lock"
+CHANGES_MIN = 1024
+
+
+class LogStorage:
+    """
+    Хранилище задач в журнале операций: файл JSONL, в конец которого
+    дописываются записи put (состояние задачи целиком вместе с новыми
+    закрытыми интервалами), del и parent (новый родитель задачи в иерархии).
+    При открытии журнал проигрывается в память (иерархия и сводки
+    поддеревьев — в TaskTree), все чтения выполняются из памяти, а запись —
+    это одно добавление строк в конец файла. SQLAlchemy не используется.
+
+    Записи получают сквозной номер seq, который служит журналом изменений
+    (last_change, changes_since). Несколько процессов могут работать с одним
+    журналом: запись выполняется под блокировкой flock файла рядом
+    с журналом, перед каждой операцией процесс дочитывает чужие записи,
+    поэтому проверка версий (ConflictError) и уникальность имен работают
+    так же, как в Database.
+
+    В режиме отложенной записи (write_behind) fsync выполняется группами:
+    когда накопится flush_size записей, пройдет flush_interval секунд или
+    при flush()/close(). Строки попадают в файл сразу, поэтому падение
+    процесса их не теряет; сбой системы может потерять последнюю группу.
+    Без write_behind fsync выполняется после каждой операции.
+
+    Когда журнал вырастает в compact_ratio раз относительно размера после
+    последнего сжатия (и не меньше compact_min_size байт), фоновый поток
+    переписывает его: текущее состояние записывается во временный файл без
+    блокировок, затем под блокировкой к нему дописываются строки, добавленные
+    за это время, и файл атомарно заменяет журнал. Другие процессы замечают
+    замену по номеру inode и перечитывают журнал.
+
+    Архива у журнала нет: archive_finished и archive ничего не переносят,
+    а archive(vacuum=True) и optimize(vacuum=True) сжимают журнал сразу.
+    """
+
+    engine = None
+
+    def __init__(
+        self,
+        path: str,
+        write_behind=False,
+        flush_size=100,
+        flush_interval=1.0,
+        compact_ratio=COMPACT_RATIO,
+        compact_min_size=COMPACT_MIN_SIZE,
+    ):
+        """
+        :param path: Путь к файлу журнала (создается, если его нет)
+        :param write_behind: Выполнять fsync группами
+        :param flush_size: Количество записей без fsync, при котором он выполняется
+        :param flush_interval: Максимальное время (в секундах) до fsync записи
+        :param compact_ratio: Во сколько раз журнал должен вырасти после
+            последнего сжатия, чтобы сжаться снова
+        :param compact_min_size: Минимальный размер журнала для сжатия в байтах
+        """
+        self.__path = path
+        self.__write_behind = write_behind
+        self.__flush_size = flush_size
+        self.__flush_interval = flush_interval
+        self.__compact_ratio = compact_ratio
+        self.__compact_min_size = compact_min_size
+        self.__lock = threading.RLock()
+        self.__lock_fd = os.open(path + LOCK_SUFFIX, os.O_RDWR | os.O_CREAT, 0o644)
+        self.__locked = 0
+        self.__fd = -1
+        self.__inode = None
+        self.__offset = 0
+        self.__base_size = 0
+        self.__seq = 0
+        self.__tasks: dict[int, Task] = {}
+        self.__ids: dict[str, int] = {}
+        self.__intervals: dict[int, list[tuple[float, float]]] = {}
+        self.__tree = TaskTree()
+        self.__next_id = 1
+        self.__sections: dict[bool, list[tuple[bool, str]]] = {}
+        self.__changes: list[tuple[int, str]] = []
+        self.__changes_limit = CHANGES_MIN
+        self.__pending: list[bytes] | None = None
+        self.__saved_on_commit: list[tuple[Task, int]] = []
+        self.__unsynced = 0
+        self.__unsynced_since = None
+        self.__compactor: threading.Thread | None = None
+        self.__compact_error: Exception | None = None
+        with self.__writing():
+            pass
+
+    def add_task(self, task: Task) -> bool:
+        """
+        Добавляет задачу.
+
+        :return: True, если задача добавлена; False, если имя уже занято.
+        """
+        return self.add_tasks([task])
+
+    def add_tasks(self, tasks: Iterable[Task]) -> bool:
+        """
+        Добавляет несколько задач одной записью журнала.
+
+        :return: True, если добавлены все задачи; False, если хотя бы одно имя
+            уже занято (в этом случае не добавляется ни одна задача).
+        """
+        tasks = list(tasks)
+        names = {task.name for task in tasks}
+        with self.__writing():
+            if len(names) != len(tasks) or not names.isdisjoint(self.__ids):
+                return False
+            records = []
+            for task in tasks:
+                records.append(self.__put(self.__next_id, task, 0))
+            self.__append(records, tasks)
+        return True
+
+    def update_task(self, task_name: str, task: Task) -> bool:
+        """
+        Обновляет задачу по имени, если её версия в журнале равна task.version;
+        после записи версия задачи и объекта становится task.version + 1.
+
+        :return: True, если задача обновлена; False, если её нет или новое
+            имя уже занято.
+        :raises ConflictError: Если задачу изменил другой процесс.
+        """
+        return self.update_tasks({task_name: task}) == 1
+
+    def update_tasks(self, updates: dict[str, Task], check_version=True) -> int:
+        """
+        Обновляет несколько задач одной записью журнала.
+
+        :param updates: Словарь вида {текущее имя задачи: новый объект задачи}.
+        :param check_version: Проверять версии; False — перезаписать задачи
+            безусловно (например, при импорте).
+        :return: Количество обновленных задач; 0, если новое имя одной из задач
+            уже занято (в этом случае не обновляется ни одна задача).
+        :raises ConflictError: Если часть задач изменил другой процесс
+            (остальные задачи при этом обновляются).
+        """
+        with self.__writing():
+            names = set(self.__ids)
+            for task_name, task in updates.items():
+                if task_name in self.__ids and task.name != task_name:
+                    names.discard(task_name)
+                    if task.name in names:
+                        return 0
+                    names.add(task.name)
+            conflicts = []
+            records = []
+            written = []
+            for task_name, task in updates.items():
+                task_id = self.__ids.get(task_name)
+                if task_id is None:
+                    continue
+                version = self.__tasks[task_id].version
+                if check_version and version != task.version:
+                    conflicts.append(task_name)
+                    continue
+                records.append(self.__put(task_id, task, version + 1))
+                written.append(task)
+            self.__append(records, written)
+        if check_version:
+            for task in written:
+                task.version += 1
+        if conflicts:
+            raise ConflictError(conflicts)
+        return len(written)
+
+    def delete_task(self, task_name: str, version: int | None = None) -> bool:
+        """
+        Удаляет задачу вместе с её интервалами.
+
+        :param version: Ожидаемая версия; None — удалить без проверки.
+        :return: True, если задача удалена; False, если её нет.
+        :raises ConflictError: Если задачу изменил другой процесс.
+        """
+        with self.__writing():
+            task_id = self.__ids.get(task_name)
+            if task_id is None:
+                return False
+            if version is not None and self.__tasks[task_id].version != version:
+                raise ConflictError([task_name])
+            self.__append([self.__delete(task_id)])
+        return True
+
+    def delete_tasks(self, task_names: Iterable[str]) -> int:
+        """
+        Удаляет несколько задач одной записью журнала.
+
+        :return: Количество удаленных задач.
+        """
+        with self.__writing():
+            ids = {self.__ids[name] for name in task_names if name in self.__ids}
+            self.__append([self.__delete(task_id) for task_id in ids])
+        return len(ids)
+
+    def fetch_all_tasks(self, finished=False) -> list[Task]:
+        """
+        Задачи раздела в порядке отображения: сначала запущенные, затем
+        остановленные, внутри группы по имени.
+        """
+        with self.__reading():
+            return [self.__copy(name) for _, name in self.__section(finished)]
+
+    def fetch_page(
+        self,
+        after_key: tuple | None = None,
+        limit=PAGE_SIZE,
+        finished=False,
+        backward=False,
+        query: str | None = None,
+    ) -> list[Task]:
+        """
+        Страница задач раздела в порядке отображения (как Database.fetch_page).
+        Порядок раздела хранится отсортированным списком ключей (not running,
+        name) и перестраивается только после изменений, граница страницы
+        ищется двоичным поиском.
+
+        :param after_key: Ключ (not running, name) последней строки предыдущей
+            страницы; None — с начала раздела.
+        :param limit: Максимальное количество задач.
+        :param finished: Раздел: True — завершенные задачи, False — активные.
+        :param backward: Выбрать limit строк, предшествующих after_key.
+        :param query: Строка поиска по имени (как в NameIndex) или None.
+        """
+        with self.__reading():
+            keys = self.__section(finished)
+            if query:
+                keys = [key for key in keys if _matches(key[1], query)]
+            if backward:
+                end = len(keys) if after_key is None else bisect_left(
+                    keys, tuple(after_key)
+                )
+                page = keys[max(end - limit, 0) : end]
+            else:
+                start = 0 if after_key is None else bisect_right(
+                    keys, tuple(after_key)
+                )
+                page = keys[start : start + limit]
+            return [self.__copy(name) for _, name in page]
+
+    def count_tasks(self, finished=False, query: str | None = None) -> int:
+        """
+        Количество задач раздела (с фильтром по имени, как в fetch_page).
+        """
+        with self.__reading():
+            keys = self.__section(finished)
+            if not query:
+                return len(keys)
+            return sum(1 for _, name in keys if _matches(name, query))
+
+    def get_task_by_name(self, task_name: str) -> Task | None:
+        with self.__reading():
+            return self.__copy(task_name) if task_name in self.__ids else None
+
+    def get_tasks(self, task_names: Iterable[str]) -> list[Task]:
+        """
+        Задачи по именам; отсутствующие имена пропускаются.
+        """
+        with self.__reading():
+            return [self.__copy(name) for name in task_names if name in self.__ids]
+
+    def iter_tasks(
+        self, finished: bool | None = None, batch_size=1000
+    ) -> Iterator[Task]:
+        """
+        Перебирает задачи в порядке добавления, копируя их пачками по
+        batch_size, чтобы не держать блокировку во время обработки.
+        """
+        with self.__reading():
+            ids = [
+                task_id
+                for task_id, task in self.__tasks.items()
+                if finished is None or task.finished == finished
+            ]
+        for first in range(0, len(ids), batch_size):
+            with self.__reading():
+                tasks = [
+                    Task.snapshot(self.__tasks[task_id])
+                    for task_id in ids[first : first + batch_size]
+                    if task_id in self.__tasks
+                ]
+            yield from tasks
+
+    def last_change(self) -> int:
+        """
+        Номер последней записи журнала.
+        """
+        with self.__reading():
+            return self.__seq
+
+    def changes_since(self, seq: int) -> tuple[int, list[Task], list[str]]:
+        """
+        Задачи, изменившиеся после записи журнала с номером seq (в том числе
+        другими процессами). Из старых изменений одной задачи хранится только
+        последнее, поэтому журнал изменений растет с количеством задач,
+        а не записей.
+
+        :return: Новый номер последней записи, измененные задачи в текущем
+            состоянии и имена удаленных (или переименованных) задач.
+        """
+        with self.__reading():
+            changes = self.__changes
+            first = bisect_right(changes, (seq, "\U0010ffff"))
+            names = {name for _, name in changes[first:]}
+            last = changes[-1][0] if first < len(changes) else seq
+            tasks = [self.__copy(name) for name in names if name in self.__ids]
+        if not names:
+            return seq, [], []
+        present = {task.name for task in tasks}
+        return last, tasks, sorted(names - present)
+
+    def load_store(self, finished: bool | None = None, batch_size=10_000) -> "TaskStore":
+        """
+        Загружает задачи в колоночное хранилище TaskStore одной пачкой.
+        """
+        from model.task_store import TaskStore
+
+        with self.__reading():
+            tasks = [
+                task
+                for task in self.__tasks.values()
+                if finished is None or task.finished == finished
+            ]
+            store = TaskStore(max(len(tasks), 1))
+            store.extend(
+                [task.name for task in tasks],
+                [task.start_timestamp for task in tasks],
+                [task.total_time for task in tasks],
+                [task.running for task in tasks],
+                [task.finished for task in tasks],
+                [task.version for task in tasks],
+                [task.budget for task in tasks],
+            )
+        return store
+
+    def import_tasks(
+        self, tasks: Iterable[Task], batch_size=1000, on_conflict="skip"
+    ) -> dict[str, int]:
+        """
+        Импортирует задачи пачками (см. model.storage.import_tasks).
+        """
+        return import_tasks(self, tasks, batch_size, on_conflict, self.__taken)
+
+    def time_spent(
+        self, since: datetime, until: datetime, task_name: str | None = None
+    ) -> float:
+        """
+        Время, потраченное на задачи в промежутке [since, until), включая
+        незакрытые отрезки запущенных задач.
+
+        :param task_name: Имя задачи; если не указано, учитываются все задачи.
+        :return: Время в секундах.
+        """
+        since_us, until_us = to_epoch_us(since), to_epoch_us(until)
+        with self.__reading():
+            task_id = self.__ids.get(task_name)
+        total_us = 0
+        for batch in self.iter_interval_batches(since, until):
+            for interval_task_id, start_us, end_us in batch:
+                if task_name is None or interval_task_id == task_id:
+                    total_us += min(end_us, until_us) - max(start_us, since_us)
+        return total_us / 1_000_000
+
+    def task_names(self) -> dict[int, str]:
+        """
+        Имена всех задач по их идентификаторам.
+        """
+        with self.__reading():
+            return {task_id: task.name for task_id, task in self.__tasks.items()}
+
+    def iter_interval_batches(
+        self, since: datetime, until: datetime, batch_size=100_000
+    ) -> Iterator[list[tuple[int, int, int]]]:
+        """
+        Интервалы, пересекающиеся с промежутком [since, until), пачками строк
+        (task_id, начало, конец) во времени в микросекундах. Последней пачкой
+        идут незакрытые отрезки запущенных задач, заканчивающиеся текущим
+        моментом.
+        """
+        since_us = to_epoch_us(since)
+        until_us = to_epoch_us(until)
+        now_us = seconds_to_us(Task.clock())
+        batch = []
+        open_rows = []
+        with self.__reading():
+            for task_id, intervals in self.__intervals.items():
+                for start, end in intervals:
+                    start_us, end_us = seconds_to_us(start), seconds_to_us(end)
+                    if start_us < until_us and end_us > since_us:
+                        batch.append((task_id, start_us, end_us))
+            for task_id, task in self.__tasks.items():
+                start_us = seconds_to_us(task.start_timestamp)
+                if task.running and start_us < min(until_us, now_us):
+                    open_rows.append((task_id, start_us, now_us))
+        for first in range(0, len(batch), batch_size):
+            yield batch[first : first + batch_size]
+        if open_rows:
+            yield open_rows
+
+    def set_parent(self, task_name: str, parent_name: str | None) -> bool:
+        """
+        Переносит задачу вместе с поддеревом к родителю parent_name (None —
+        в корень) одной записью parent; сводки обновляются у старых и новых
+        предков.
+
+        :return: True, если задача перенесена; False, если задачи или
+            родителя нет.
+        :raises ValueError: Если родитель — сама задача или её потомок.
+        """
+        with self.__writing():
+            task_id = self.__ids.get(task_name)
+            parent_id = None if parent_name is None else self.__ids.get(parent_name)
+            if task_id is None or parent_id is None and parent_name is not None:
+                return False
+            if parent_id is not None and self.__tree.contains(task_id, parent_id):
+                raise ValueError(
+                    f"task {task_name!r} cannot be moved under {parent_name!r}"
+                )
+            self.__append([self.__move(task_id, parent_id)])
+        return True
+
+    def get_rollup(self, task_name: str) -> Rollup | None:
+        """
+        Сводка поддерева задачи из памяти или None, если задачи нет.
+        """
+        with self.__reading():
+            task_id = self.__ids.get(task_name)
+            return None if task_id is None else self.__tree.rollup(task_id)
+
+    def fetch_children(
+        self, parent_name: str | None = None, finished: bool | None = None
+    ) -> list[tuple[Task, Rollup]]:
+        """
+        Дети задачи (None — корневые задачи) со сводками их поддеревьев
+        в порядке отображения (как Database.fetch_children).
+        """
+        with self.__reading():
+            if parent_name is None:
+                children = self.__tree.children(None)
+            elif parent_name in self.__ids:
+                children = self.__tree.children(self.__ids[parent_name])
+            else:
+                return []
+            tasks = sorted(
+                (self.__tasks[task_id] for task_id in children),
+                key=lambda task: (not task.running, task.name),
+            )
+            return [
+                (Task.snapshot(task), self.__tree.rollup(self.__ids[task.name]))
+                for task in tasks
+                if finished is None or task.finished == finished
+            ]
+
+    def archive_finished(
+        self,
+        older_than: timedelta = ARCHIVE_AFTER,
+        batch_size=ARCHIVE_BATCH_SIZE,
+        now: float | None = None,
+    ) -> int:
+        """
+        Архива у журнала нет: его размер ограничивает сжатие.
+
+        :return: 0 — ни одна задача не перенесена.
+        """
+        return 0
+
+    def archive(
+        self,
+        older_than: timedelta = ARCHIVE_AFTER,
+        batch_size=ARCHIVE_BATCH_SIZE,
+        vacuum=True,
+    ) -> int:
+        """
+        Архива у журнала нет; с vacuum журнал сжимается сразу.
+
+        :return: 0 — ни одна задача не перенесена.
+        """
+        self.optimize(vacuum)
+        return 0
+
+    def optimize(self, vacuum=False):
+        """
+        С vacuum сжимает журнал в текущем потоке (дождавшись фонового
+        сжатия, если оно идет); без vacuum ничего не делает.
+        """
+        if vacuum:
+            self.__join_compactor()
+            self.__compact()
+            self.flush()
+
+    @contextmanager
+    def transaction(self):
+        """
+        Выполняет все операции внутри блока одной записью журнала под
+        блокировкой. Если блок завершается исключением, журнал не меняется,
+        а состояние в памяти перечитывается из него.
+        Вложенные вызовы присоединяются к внешней транзакции.
+        """
+        if self.__pending is not None:
+            yield self
+            return
+        with self.__writing():
+            self.__pending = []
+            try:
+                yield self
+                lines, self.__pending = self.__pending, None
+                self.__write(lines)
+            except BaseException:
+                self.__pending = None
+                self.__saved_on_commit = []
+                self.__reload(track=False)
+                raise
+        saved, self.__saved_on_commit = self.__saved_on_commit, []
+        for task, count in saved:
+            task.mark_intervals_saved(count)
+
+    def flush(self):
+        """
+        Выполняет fsync записанных строк. Ошибка фонового сжатия
+        возвращается отсюда.
+        """
+        with self.__lock:
+            if self.__unsynced:
+                os.fsync(self.__fd)
+                self.__unsynced = 0
+                self.__unsynced_since = None
+            if error := self.__compact_error:
+                self.__compact_error = None
+                raise error
+
+    def flush_if_due(self):
+        """
+        Выполняет fsync, если превышен порог по количеству записей или по времени.
+        """
+        if self.__unsynced and (
+            self.__unsynced >= self.__flush_size
+            or time.monotonic() - self.__unsynced_since >= self.__flush_interval
+        ):
+            self.flush()
+
+    def pending_timeout(self) -> float | None:
+        """
+        Время (в секундах), через которое записанные строки нужно fsync.
+
+        :return: Количество секунд или None, если все записи на диске.
+        """
+        if not self.__unsynced:
+            return None
+        elapsed = time.monotonic() - self.__unsynced_since
+        return max(self.__flush_interval - elapsed, 0.0)
+
+    def close(self):
+        """
+        Дожидается фонового сжатия, выполняет fsync и закрывает файлы.
+        """
+        self.__join_compactor()
+        try:
+            self.flush()
+        finally:
+            os.close(self.__fd)
+            os.close(self.__lock_fd)
+
+    @contextmanager
+    def __reading(self):
+        """
+        Блок чтения: дочитывает записи других процессов.
+        """
+        with self.__lock:
+            self.__catch_up()
+            yield
+
+    @contextmanager
+    def __writing(self):
+        """
+        Блок записи: берет блокировку журнала между процессами и дочитывает
+        записи других процессов. Вложенные блоки используют ту же блокировку.
+        """
+        with self.__lock:
+            if not self.__locked:
+                fcntl.flock(self.__lock_fd, fcntl.LOCK_EX)
+            self.__locked += 1
+            try:
+                if self.__locked == 1:
+                    if self.__fd < 0:
+                        self.__reload(track=False, repair=True)
+                    else:
+                        self.__catch_up()
+                yield
+            finally:
+                self.__locked -= 1
+                if not self.__locked:
+                    fcntl.flock(self.__lock_fd, fcntl.LOCK_UN)
+
+    def __catch_up(self):
+        """
+        Применяет строки, дописанные в журнал после прочитанного места;
+        если журнал был заменен сжатием, перечитывает его целиком.
+        """
+        if os.stat(self.__path).st_ino != self.__inode:
+            self.__reload(track=True)
+            return
+        size = os.fstat(self.__fd).st_size
+        if size > self.__offset:
+            self.__offset += self.__replay(_read(self.__fd, self.__offset, size))
+
+    def __reload(self, track: bool, repair=False):
+        """
+        Открывает журнал заново и проигрывает его в пустое состояние.
+
+        :param track: Записать отличия от прежнего состояния в журнал
+            изменений (журнал заменен сжатием другого процесса).
+        :param repair: Отрезать недописанную последнюю строку (после сбоя);
+            только под блокировкой записи.
+        """
+        previous = {task.name: _values(task) for task in self.__tasks.values()}
+        if self.__fd >= 0:
+            os.close(self.__fd)
+        self.__fd = os.open(
+            self.__path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644
+        )
+        self.__inode = os.fstat(self.__fd).st_ino
+        self.__tasks.clear()
+        self.__ids.clear()
+        self.__intervals.clear()
+        self.__tree.clear()
+        self.__sections.clear()
+        self.__next_id = 1
+        self.__base_size = 0
+        self.__seq = 0
+        changes, self.__changes = self.__changes, []
+        size = os.fstat(self.__fd).st_size
+        self.__offset = self.__replay(_read(self.__fd, 0, size))
+        if repair and self.__offset < size:
+            os.ftruncate(self.__fd, self.__offset)
+        self.__changes = [change for change in changes if change[0] <= self.__seq]
+        if track:
+            current = {task.name: _values(task) for task in self.__tasks.values()}
+            self.__changes.extend(
+                (self.__seq, name)
+                for name in sorted(previous.keys() | current.keys())
+                if previous.get(name) != current.get(name)
+            )
+
+    def __replay(self, data: bytes) -> int:
+        """
+        Применяет полные строки из data.
+
+        :return: Количество примененных байт (до последнего перевода строки).
+        :raises ValueError: Если полная строка журнала повреждена.
+        """
+        end = data.rfind(b"\n") + 1
+        position = 0
+        for line in data[:end].splitlines(keepends=True):
+            try:
+                record = json.loads(line)
+            except ValueError as error:
+                raise ValueError(
+                    f"damaged task log {self.__path}: {line[:80]!r}"
+                ) from error
+            position += len(line)
+            if record["op"] == "compact":
+                self.__base_size = position + record["size"]
+            self.__apply(record)
+        return end
+
+    def __apply(self, record: dict):
+        """
+        Применяет одну запись журнала к состоянию в памяти.
+        """
+        self.__sections.clear()
+        seq = self.__seq = record.get("seq", self.__seq)
+        op = record["op"]
+        if op == "compact":
+            return
+        task_id = record["id"]
+        previous = self.__tasks.get(task_id)
+        if op == "parent":
+            self.__tree.move(task_id, record["parent"])
+            self.__changed(seq, previous.name)
+            return
+        if previous is not None:
+            del self.__ids[previous.name]
+            self.__changed(seq, previous.name)
+        if op == "del":
+            del self.__tasks[task_id]
+            self.__intervals.pop(task_id, None)
+            self.__tree.remove(task_id)
+            return
+        task = _task_from_dict(record["task"])
+        self.__tasks[task_id] = task
+        if previous is None:
+            self.__tree.add(task_id, task)
+        else:
+            self.__tree.update(task_id, task)
+        self.__ids[task.name] = task_id
+        self.__changed(seq, task.name)
+        self.__next_id = max(self.__next_id, task_id + 1)
+        if intervals := record.get("intervals"):
+            self.__intervals.setdefault(task_id, []).extend(map(tuple, intervals))
+
+    def __changed(self, seq: int, task_name: str):
+        """
+        Добавляет запись в журнал изменений; когда записей становится вдвое
+        больше, чем задач в нем, оставляет только последнюю запись каждой задачи.
+        """
+        self.__changes.append((seq, task_name))
+        if len(self.__changes) > self.__changes_limit:
+            latest = {name: number for number, name in self.__changes}
+            self.__changes = sorted((number, name) for name, number in latest.items())
+            self.__changes_limit = max(2 * len(self.__changes), CHANGES_MIN)
+
+    def __put(self, task_id: int, task: Task, version: int) -> dict:
+        self.__seq += 1
+        record = {
+            "seq": self.__seq,
+            "op": "put",
+            "id": task_id,
+            "task": _task_to_dict(task, version),
+        }
+        if intervals := task.unsaved_intervals:
+            record["intervals"] = intervals
+        self.__apply(record)
+        return record
+
+    def __delete(self, task_id: int) -> dict:
+        self.__seq += 1
+        record = {"seq": self.__seq, "op": "del", "id": task_id}
+        self.__apply(record)
+        return record
+
+    def __move(self, task_id: int, parent_id: int | None) -> dict:
+        self.__seq += 1
+        record = {"seq": self.__seq, "op": "parent", "id": task_id, "parent": parent_id}
+        self.__apply(record)
+        return record
+
+    def __append(self, records: list[dict], tasks: Iterable[Task] = ()):
+        """
+        Записывает уже примененные записи в журнал (внутри транзакции —
+        в её буфер) и отмечает интервалы задач сохраненными.
+        """
+        saved = [(task, len(task.unsaved_intervals)) for task in tasks]
+        lines = [_dumps(record) for record in records]
+        if self.__pending is not None:
+            self.__pending.extend(lines)
+            self.__saved_on_commit.extend(saved)
+            return
+        self.__write(lines)
+        for task, count in saved:
+            task.mark_intervals_saved(count)
+
+    def __write(self, lines: list[bytes]):
+        """
+        Дописывает строки в конец журнала одним вызовом write и выполняет
+        fsync сразу или по правилам группы (write_behind).
+        """
+        if not lines:
+            return
+        data = b"".join(lines)
+        view = memoryview(data)
+        while view:
+            view = view[os.write(self.__fd, view) :]
+        self.__offset += len(data)
+        self.__unsynced += len(lines)
+        if self.__unsynced_since is None:
+            self.__unsynced_since = time.monotonic()
+        if not self.__write_behind:
+            self.flush()
+        else:
+            self.flush_if_due()
+        if (
+            self.__compactor is None
+            and self.__offset >= self.__compact_min_size
+            and self.__offset >= self.__base_size * self.__compact_ratio
+        ):
+            self.__compactor = threading.Thread(
+                target=self.__compact_in_background, name="log-compaction", daemon=True
+            )
+            self.__compactor.start()
+
+    def __compact_in_background(self):
+        try:
+            self.__compact()
+        except Exception as error:
+            self.__compact_error = error
+        finally:
+            self.__compactor = None
+
+    def __join_compactor(self):
+        if (compactor := self.__compactor) is not None:
+            compactor.join()
+
+    def __compact(self):
+        """
+        Переписывает журнал текущим состоянием. Снимок состояния пишется во
+        временный файл без блокировок; затем под блокировкой дописываются
+        строки, появившиеся после снимка, файл синхронизируется
+        и атомарно заменяет журнал.
+        """
+        with self.__writing():
+            offset, inode = self.__offset, self.__inode
+            records = [
+                {
+                    "op": "put",
+                    "id": task_id,
+                    "task": _task_to_dict(task, task.version),
+                    **(
+                        {"intervals": self.__intervals[task_id]}
+                        if task_id in self.__intervals
+                        else {}
+                    ),
+                }
+                for task_id, task in self.__tasks.items()
+            ]
+            records.extend(
+                {"op": "parent", "id": task_id, "parent": parent_id}
+                for task_id in self.__tasks
+                if (parent_id := self.__tree.parent(task_id)) is not None
+            )
+            seq = self.__seq
+        body = b"".join(map(_dumps, records))
+        temporary = f"{self.__path}.{os.getpid()}.compact"
+        try:
+            with open(temporary, "wb") as file:
+                header = _dumps({"seq": seq, "op": "compact", "size": len(body)})
+                file.write(header)
+                file.write(body)
+                with self.__writing():
+                    if self.__inode != inode:
+                        return
+                    file.write(_read(self.__fd, offset, self.__offset))
+                    file.flush()
+                    os.fsync(file.fileno())
+                    os.replace(temporary, self.__path)
+                    _fsync_directory(self.__path)
+                    os.close(self.__fd)
+                    self.__fd = os.open(self.__path, os.O_RDWR | os.O_APPEND)
+                    self.__inode = os.fstat(self.__fd).st_ino
+                    self.__offset = os.fstat(self.__fd).st_size
+                    self.__base_size = len(header) + len(body)
+                    self.__unsynced = 0
+                    self.__unsynced_since = None
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+
+    def __section(self, finished: bool) -> list[tuple[bool, str]]:
+        """
+        Отсортированные ключи (not running, name) задач раздела.
+        """
+        keys = self.__sections.get(finished)
+        if keys is None:
+            keys = self.__sections[finished] = sorted(
+                (not task.running, task.name)
+                for task in self.__tasks.values()
+                if task.finished == finished
+            )
+        return keys
+
+    def __copy(self, task_name: str) -> Task:
+        return Task.snapshot(self.__tasks[self.__ids[task_name]])
+
+    def __taken(self, names: set[str]) -> set[str]:
+        with self.__reading():
+            return {name for name in names if name in self.__ids}
+
+
+def _task_to_dict(task: Task, version: int) -> dict:
+    return {
+        "name": task.name,
+        "start_time": task.start_timestamp,
+        "total_time": task.total_time,
+        "running": task.running,
+        "finished": task.finished,
+        "version": version,
+        "budget": task.budget,
+    }
+
+
+def _task_from_dict(values: dict) -> Task:
+    return Task(
+        values["name"],
+        values["start_time"],
+        values["total_time"],
+        values["running"],
+        values["finished"],
+        values["version"],
+        values["budget"],
+    )
+
+
+def _values(task: Task) -> tuple:
+    return (
+        task.start_timestamp,
+        task.total_time,
+        task.running,
+        task.finished,
+        task.version,
+        task.budget,
+    )
+
+
+def _dumps(record: dict) -> bytes:
+    return (
+        json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        + b"\n"
+    )
+
+
+def _matches(name: str, query: str) -> bool:
+    """
+    Поиск по имени, согласованный с NameIndex: подстрока без учета регистра
+    для запросов из GRAM и более символов, иначе префикс имени.
+    """
+    folded = query.casefold()
+    if len(folded) < GRAM:
+        return name.casefold().startswith(folded)
+    return folded in name.casefold()
+
+
+def _read(fd: int, start: int, end: int) -> bytes:
+    """
+    Читает байты файла с позиции start до end.
+    """
+    chunks = []
+    while start < end:
+        chunk = os.pread(fd, end - start, start)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        start += len(chunk)
+    return b"".join(chunks)
+
+
+def _fsync_directory(path: str):
+    """
+    Синхронизирует каталог файла, чтобы переименование пережило сбой системы.
+    """
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
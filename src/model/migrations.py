@@ -0,0 +1,332 @@
+from datetime import datetime
+
+from sqlalchemy import (Column, Connection, Engine, Integer, MetaData, Table,
+                        inspect, text)
+
+from model.task import to_epoch_us
+from model.task_model import (NAME_SEARCH_MARK, TASK_ARCHIVE_NAME_SEARCH,
+                              TASK_ARCHIVE_TRIGGERS, TASK_CHANGE_TRIGGERS,
+                              TASK_COUNT_TRIGGERS, TASK_NAME_SEARCH,
+                              TASK_TREE_TRIGGERS, Base, name_search_table)
+
+BATCH_SIZE = 10_000
+
+_metadata = MetaData()
+_schema_version = Table(
+    "schema_version", _metadata, Column("version", Integer, nullable=False)
+)
+
+
+def _migrate_v1(connection: Connection):
+    """
+    Суррогатный целочисленный ключ, уникальный индекс по имени, время начала
+    в микросекундах от эпохи и составной индекс (finished, running DESC, name).
+    """
+    connection.execute(text("ALTER TABLE tasks RENAME TO tasks_v0"))
+    connection.execute(
+        text(
+            "CREATE TABLE tasks ("
+            "id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT, "
+            "name VARCHAR NOT NULL, "
+            "start_time INTEGER, "
+            "total_time FLOAT, "
+            "running BOOLEAN, "
+            "finished BOOLEAN)"
+        )
+    )
+    connection.execute(text("CREATE UNIQUE INDEX ix_tasks_name ON tasks (name)"))
+    connection.execute(
+        text(
+            "CREATE INDEX ix_tasks_finished_running "
+            "ON tasks (finished, running DESC, name)"
+        )
+    )
+    insert = text(
+        "INSERT INTO tasks (name, start_time, total_time, running, finished) "
+        "VALUES (:name, :start_time, :total_time, :running, :finished)"
+    )
+    rows = connection.execute(
+        text(
+            "SELECT name, start_time, total_time, running, finished "
+            "FROM tasks_v0 ORDER BY rowid"
+        )
+    )
+    while batch := rows.fetchmany(BATCH_SIZE):
+        connection.execute(
+            insert,
+            [
+                {
+                    "name": name,
+                    "start_time": to_epoch_us(datetime.fromisoformat(start_time)),
+                    "total_time": total_time,
+                    "running": running,
+                    "finished": finished,
+                }
+                for name, start_time, total_time, running, finished in batch
+            ],
+        )
+    connection.execute(text("DROP TABLE tasks_v0"))
+
+
+def _migrate_v2(connection: Connection):
+    """
+    Журнал интервалов работы task_intervals. Для каждой задачи с ненулевым
+    временем добавляется один синтетический интервал длиной total_time:
+    у запущенной задачи он заканчивается в start_time (текущий отрезок еще
+    не закрыт), у остановленной — начинается в start_time.
+    """
+    connection.execute(
+        text(
+            "CREATE TABLE task_intervals ("
+            "id INTEGER NOT NULL PRIMARY KEY, "
+            "task_id INTEGER NOT NULL REFERENCES tasks (id) ON DELETE CASCADE, "
+            "start_time INTEGER NOT NULL, "
+            "end_time INTEGER NOT NULL)"
+        )
+    )
+    connection.execute(
+        text(
+            "CREATE INDEX ix_task_intervals_task "
+            "ON task_intervals (task_id, start_time)"
+        )
+    )
+    connection.execute(
+        text(
+            "CREATE INDEX ix_task_intervals_range "
+            "ON task_intervals (start_time, end_time)"
+        )
+    )
+    connection.execute(
+        text(
+            "INSERT INTO task_intervals (task_id, start_time, end_time) "
+            "SELECT id, "
+            "CASE WHEN running "
+            "THEN start_time - CAST(total_time * 1000000 AS INTEGER) "
+            "ELSE start_time END, "
+            "CASE WHEN running "
+            "THEN start_time "
+            "ELSE start_time + CAST(total_time * 1000000 AS INTEGER) END "
+            "FROM tasks WHERE total_time > 0"
+        )
+    )
+
+
+def _migrate_v3(connection: Connection):
+    """
+    Версия строки задачи для оптимистичных блокировок и журнал изменений
+    task_changes, заполняемый триггерами на таблице tasks.
+    """
+    connection.execute(
+        text("ALTER TABLE tasks ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+    )
+    connection.execute(
+        text(
+            "CREATE TABLE task_changes ("
+            "seq INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT, "
+            "name VARCHAR NOT NULL)"
+        )
+    )
+    for trigger in TASK_CHANGE_TRIGGERS:
+        connection.execute(text(trigger))
+
+
+def _migrate_v4(connection: Connection):
+    """
+    Счетчики задач по разделам task_counts, поддерживаемые триггерами.
+    """
+    connection.execute(
+        text(
+            "CREATE TABLE task_counts ("
+            "finished BOOLEAN NOT NULL PRIMARY KEY, "
+            "count INTEGER NOT NULL)"
+        )
+    )
+    connection.execute(
+        text(
+            "INSERT INTO task_counts (finished, count) "
+            "SELECT finished, count(*) FROM tasks GROUP BY finished"
+        )
+    )
+    for trigger in TASK_COUNT_TRIGGERS:
+        connection.execute(text(trigger))
+
+
+def _migrate_v5(connection: Connection):
+    """
+    Архив завершенных задач tasks_archive и их интервалов
+    task_intervals_archive с триггерами уникальности имен, счетчиков
+    и журнала изменений.
+    """
+    connection.execute(
+        text(
+            "CREATE TABLE tasks_archive ("
+            "id INTEGER NOT NULL PRIMARY KEY, "
+            "name VARCHAR NOT NULL, "
+            "start_time INTEGER, "
+            "total_time FLOAT, "
+            "running BOOLEAN, "
+            "finished BOOLEAN, "
+            "version INTEGER NOT NULL DEFAULT 0)"
+        )
+    )
+    connection.execute(
+        text("CREATE UNIQUE INDEX ix_tasks_archive_name ON tasks_archive (name)")
+    )
+    connection.execute(
+        text(
+            "CREATE TABLE task_intervals_archive ("
+            "id INTEGER NOT NULL PRIMARY KEY, "
+            "task_id INTEGER NOT NULL, "
+            "start_time INTEGER NOT NULL, "
+            "end_time INTEGER NOT NULL)"
+        )
+    )
+    connection.execute(
+        text(
+            "CREATE INDEX ix_task_intervals_archive_task "
+            "ON task_intervals_archive (task_id, start_time)"
+        )
+    )
+    connection.execute(
+        text(
+            "CREATE INDEX ix_task_intervals_archive_range "
+            "ON task_intervals_archive (start_time, end_time)"
+        )
+    )
+    for trigger in TASK_ARCHIVE_TRIGGERS:
+        connection.execute(text(trigger))
+
+
+def _migrate_v6(connection: Connection):
+    """
+    Колонка budget (бюджет времени на задачу в секундах) в tasks
+    и tasks_archive.
+    """
+    connection.execute(text("ALTER TABLE tasks ADD COLUMN budget FLOAT"))
+    connection.execute(text("ALTER TABLE tasks_archive ADD COLUMN budget FLOAT"))
+
+
+def _migrate_v7(connection: Connection):
+    """
+    Иерархия задач: родитель parent_id в tasks, таблица замыкания task_tree
+    и сводки поддеревьев task_rollups с триггерами. Существующие задачи
+    становятся корневыми.
+    """
+    connection.execute(text("ALTER TABLE tasks ADD COLUMN parent_id INTEGER"))
+    connection.execute(text("CREATE INDEX ix_tasks_parent_id ON tasks (parent_id)"))
+    connection.execute(
+        text(
+            "CREATE TABLE task_tree ("
+            "ancestor INTEGER NOT NULL, "
+            "descendant INTEGER NOT NULL, "
+            "depth INTEGER NOT NULL, "
+            "PRIMARY KEY (descendant, ancestor))"
+        )
+    )
+    connection.execute(
+        text("CREATE INDEX ix_task_tree_ancestor ON task_tree (ancestor, depth)")
+    )
+    connection.execute(
+        text(
+            "CREATE TABLE task_rollups ("
+            "task_id INTEGER NOT NULL PRIMARY KEY, "
+            "total_time FLOAT NOT NULL, "
+            "running INTEGER NOT NULL, "
+            "running_since FLOAT NOT NULL, "
+            "size INTEGER NOT NULL, "
+            "children INTEGER NOT NULL)"
+        )
+    )
+    connection.execute(
+        text(
+            "INSERT INTO task_tree (ancestor, descendant, depth) "
+            "SELECT id, id, 0 FROM tasks"
+        )
+    )
+    connection.execute(
+        text(
+            "INSERT INTO task_rollups "
+            "(task_id, total_time, running, running_since, size, children) "
+            "SELECT id, coalesce(total_time, 0), coalesce(running, 0), "
+            "coalesce(running * start_time / 1000000.0, 0), 1, 0 FROM tasks"
+        )
+    )
+    for trigger in TASK_TREE_TRIGGERS:
+        connection.execute(text(trigger))
+
+
+def _migrate_v8(connection: Connection):
+    """
+    Триграммные таблицы FTS5 для поиска по именам задач в tasks и архиве,
+    заполненные существующими именами, и поддерживающие их триггеры.
+    """
+    for table, statements in (
+        ("tasks", TASK_NAME_SEARCH),
+        ("tasks_archive", TASK_ARCHIVE_NAME_SEARCH),
+    ):
+        for statement in statements:
+            connection.execute(text(statement))
+        connection.execute(
+            text(
+                f"INSERT INTO {name_search_table(table)} (rowid, term) "
+                f"SELECT id, :mark || name FROM {table}"
+            ),
+            {"mark": NAME_SEARCH_MARK},
+        )
+
+
+MIGRATIONS = [
+    (1, _migrate_v1),
+    (2, _migrate_v2),
+    (3, _migrate_v3),
+    (4, _migrate_v4),
+    (5, _migrate_v5),
+    (6, _migrate_v6),
+    (7, _migrate_v7),
+    (8, _migrate_v8),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def get_version(connection: Connection) -> int:
+    """
+    Текущая версия схемы. База без таблицы версий считается версией 0.
+    """
+    if not inspect(connection).has_table(_schema_version.name):
+        return 0
+    return connection.execute(_schema_version.select()).scalar() or 0
+
+
+def _set_version(connection: Connection, version: int):
+    _metadata.create_all(connection)
+    connection.execute(_schema_version.delete())
+    connection.execute(_schema_version.insert().values(version=version))
+
+
+def upgrade(engine: Engine) -> int:
+    """
+    Приводит схему базы данных к последней версии.
+
+    Номер версии схемы хранится в таблице schema_version. Новая база данных
+    сразу создается по актуальным моделям, а существующая обновляется на месте:
+    последовательно применяются все миграции с номером больше сохраненного.
+    Каждая миграция выполняется в собственной транзакции и описывает схему
+    своей версии явным SQL, не завися от текущих ORM моделей.
+
+    :param engine: Подключение к базе данных.
+    :return: Версия схемы после обновления.
+    """
+    with engine.begin() as connection:
+        if not inspect(connection).has_table("tasks"):
+            Base.metadata.create_all(connection)
+            _set_version(connection, LATEST_VERSION)
+            return LATEST_VERSION
+        version = get_version(connection)
+    for number, migration in MIGRATIONS:
+        if number > version:
+            with engine.begin() as connection:
+                migration(connection)
+                _set_version(connection, number)
+            version = number
+    return version
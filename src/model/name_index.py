@@ -0,0 +1,93 @@
+from bisect import bisect_left, insort
+from typing import Iterable
+
+GRAM = 3
+
+
+def trigrams(folded: str) -> set[str]:
+    """
+    Множество триграмм строки (строка должна быть уже приведена casefold()).
+    """
+    return {folded[i : i + GRAM] for i in range(len(folded) - GRAM + 1)}
+
+
+class NameIndex:
+    """
+    Индекс имен задач для поиска без учета регистра.
+
+    Запросы из трех и более символов ищутся как подстрока: по триграммному
+    индексу выбираются имена, содержащие все триграммы запроса (начиная
+    с самого короткого списка), и только они проверяются на вхождение
+    подстроки. Более короткие запросы ищутся как префикс имени по
+    отсортированному списку. Стоимость поиска пропорциональна числу
+    кандидатов, а не числу всех имен; добавление и удаление имени стоят
+    O(длина имени) операций со множествами и одну вставку в список.
+    """
+
+    def __init__(self, names: Iterable[str] = ()):
+        """
+        :param names: Имена, которыми заполняется индекс.
+        """
+        self.__grams: dict[str, set[str]] = {}
+        self.__sorted: list[tuple[str, str]] = []
+        for name in names:
+            folded = name.casefold()
+            self.__sorted.append((folded, name))
+            for gram in trigrams(folded):
+                self.__grams.setdefault(gram, set()).add(name)
+        self.__sorted.sort()
+
+    def add(self, name: str):
+        folded = name.casefold()
+        insort(self.__sorted, (folded, name))
+        for gram in trigrams(folded):
+            self.__grams.setdefault(gram, set()).add(name)
+
+    def remove(self, name: str):
+        """
+        :raises KeyError: Если имени нет в индексе.
+        """
+        folded = name.casefold()
+        position = bisect_left(self.__sorted, (folded, name))
+        if position == len(self.__sorted) or self.__sorted[position][1] != name:
+            raise KeyError(name)
+        del self.__sorted[position]
+        for gram in trigrams(folded):
+            names = self.__grams[gram]
+            names.discard(name)
+            if not names:
+                del self.__grams[gram]
+
+    def search(self, query: str) -> set[str]:
+        """
+        Имена, подходящие под запрос.
+
+        :param query: Строка поиска; пустая строка подходит под все имена.
+        :return: Множество имен.
+        """
+        folded = query.casefold()
+        if len(folded) < GRAM:
+            return self.__prefixed(folded)
+        postings = []
+        for gram in trigrams(folded):
+            names = self.__grams.get(gram)
+            if not names:
+                return set()
+            postings.append(names)
+        postings.sort(key=len)
+        names = postings[0].intersection(*postings[1:])
+        if len(folded) == GRAM:
+            return names
+        return {name for name in names if folded in name.casefold()}
+
+    def __prefixed(self, prefix: str) -> set[str]:
+        entries = self.__sorted
+        names = set()
+        position = bisect_left(entries, (prefix,))
+        while position < len(entries) and entries[position][0].startswith(prefix):
+            names.add(entries[position][1])
+            position += 1
+        return names
+
+    def __len__(self) -> int:
+        return len(self.__sorted)
@@ -0,0 +1,147 @@
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Callable
+
+from model.instrumentation import Instrumentation
+from model.storage import Storage
+from model.task import Task
+
+
+class PersistenceWorker:
+    """
+    Поток сохранения, владеющий хранилищем задач (Storage).
+
+    Команды записи ставятся в очередь и выполняются в отдельном потоке по
+    порядку поступления, поэтому вызывающий поток (интерфейс) не ждет ни
+    диска, ни блокировок других процессов. Каждая команда возвращает Future
+    с результатом соответствующего метода хранилища. Между командами поток
+    сбрасывает буфер отложенной записи по его сроку.
+
+    К хранилищу после создания потока нельзя обращаться напрямую:
+    все вызовы должны идти через submit().
+    """
+
+    def __init__(
+        self,
+        database: Storage,
+        notify: Callable[[], None] | None = None,
+        instrumentation: Instrumentation | None = None,
+    ):
+        """
+        :param database: Хранилище, которым будет владеть поток.
+        :param notify: Функция, вызываемая в потоке сохранения после выполнения
+            каждой команды (например, для пробуждения цикла событий).
+        :param instrumentation: Сбор задержек команд ("worker.<метод>") или None.
+        """
+        self.__database = database
+        self.__notify = notify
+        self.__instrumentation = instrumentation
+        self.__queue: queue.SimpleQueue = queue.SimpleQueue()
+        self.__flush_errors: queue.SimpleQueue = queue.SimpleQueue()
+        self.__flushes = 0
+        self.__thread = threading.Thread(
+            target=self.__run, name="persistence", daemon=True
+        )
+        self.__thread.start()
+
+    def submit(self, function: Callable, *args) -> Future:
+        """
+        Ставит вызов function(*args) в очередь потока сохранения.
+
+        :return: Future с результатом или исключением вызова.
+        """
+        future = Future()
+        self.__queue.put((future, function, args))
+        return future
+
+    def add_task(self, task: Task) -> Future:
+        return self.submit(self.__database.add_task, Task.snapshot(task))
+
+    def update_task(self, task_name: str, task: Task) -> Future:
+        """
+        Ставит в очередь обновление задачи. В поток передается снимок задачи:
+        её несохраненные интервалы переходят в снимок, поэтому дальнейшие
+        изменения задачи в вызывающем потоке не пересекаются с записью.
+        Версия задачи сразу увеличивается до той, которую строка получит после
+        записи снимка, чтобы следующее обновление ожидало именно её.
+        """
+        snapshot = Task.snapshot(task)
+        task.mark_intervals_saved(len(snapshot.unsaved_intervals))
+        task.version += 1
+        return self.submit(self.__database.update_task, task_name, snapshot)
+
+    def delete_task(self, task_name: str, version: int | None = None) -> Future:
+        return self.submit(self.__database.delete_task, task_name, version)
+
+    @property
+    def flushes(self) -> int:
+        """
+        Количество фоновых сбросов буфера отложенной записи, записавших задачи.
+        """
+        return self.__flushes
+
+    def pop_flush_error(self) -> Exception | None:
+        """
+        Очередная ошибка фонового сброса буфера отложенной записи.
+
+        :return: Исключение или None, если ошибок не было.
+        """
+        try:
+            return self.__flush_errors.get_nowait()
+        except queue.Empty:
+            return None
+
+    def close(self):
+        """
+        Выполняет оставшиеся команды, сбрасывает буфер, закрывает базу данных
+        и дожидается завершения потока.
+        """
+        self.__queue.put(None)
+        self.__thread.join()
+
+    def __run(self):
+        database = self.__database
+        try:
+            while True:
+                try:
+                    item = self.__queue.get(timeout=database.pending_timeout())
+                except queue.Empty:
+                    self.__flush_if_due()
+                    continue
+                if item is None:
+                    return
+                future, function, args = item
+                if future.set_running_or_notify_cancel():
+                    try:
+                        future.set_result(self.__call(function, args))
+                    except Exception as error:
+                        future.set_exception(error)
+                self.__flush_if_due()
+                if self.__notify is not None:
+                    self.__notify()
+        finally:
+            database.close()
+
+    def __call(self, function: Callable, args: tuple):
+        if self.__instrumentation is None:
+            return function(*args)
+        return self.__instrumentation.call(
+            "worker." + function.__name__, function, *args
+        )
+
+    def __flush_if_due(self):
+        """
+        Сбрасывает буфер по сроку; ошибка сохраняется для pop_flush_error(),
+        чтобы не останавливать поток.
+        """
+        if self.__database.pending_timeout() is None:
+            return
+        try:
+            self.__database.flush_if_due()
+            if self.__database.pending_timeout() is None:
+                self.__flushes += 1
+        except Exception as error:
+            self.__flush_errors.put(error)
+            if self.__notify is not None:
+                self.__notify()
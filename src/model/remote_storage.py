@@ -0,0 +1,425 @@
+import json
+import socket
+import sys
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from itertools import count
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator
+
+from model.storage import (ARCHIVE_AFTER, ARCHIVE_BATCH_SIZE, PAGE_SIZE,
+                           ConflictError)
+from model.task import Task
+from model.task_tree import Rollup
+
+if TYPE_CHECKING:
+    from model.task_store import TaskStore, TaskView
+
+SOCKET_PATH = "tasks.sock"
+CONNECT_TIMEOUT = 5.0
+
+
+class RemoteError(Exception):
+    """
+    Ошибка, которую демон вернул в ответ на запрос, без отдельного типа
+    на стороне клиента.
+    """
+
+
+def task_to_wire(task) -> dict:
+    """
+    Представление задачи (Task или строки хранилища) в протоколе демона
+    вместе с несохраненными интервалами.
+    """
+    return {
+        "name": task.name,
+        "start_time": task.start_timestamp,
+        "total_time": task.total_time,
+        "running": task.running,
+        "finished": task.finished,
+        "version": task.version,
+        "budget": task.budget,
+        "intervals": task.unsaved_intervals,
+    }
+
+
+def task_from_wire(values: dict) -> Task:
+    """
+    Задача из представления task_to_wire() вместе с несохраненными интервалами.
+    """
+    return Task.snapshot(
+        SimpleNamespace(
+            name=values["name"],
+            start_timestamp=values["start_time"],
+            total_time=values["total_time"],
+            running=values["running"],
+            finished=values["finished"],
+            version=values["version"],
+            budget=values["budget"],
+            unsaved_intervals=[tuple(interval) for interval in values["intervals"]],
+        )
+    )
+
+
+def _task_types() -> tuple[type, ...]:
+    """
+    Типы задач для проверки isinstance: Task и TaskView, если модуль
+    колоночного хранилища уже загружен. Без него экземпляров TaskView нет,
+    и клиент не загружает numpy ради проверки типа.
+    """
+    store = sys.modules.get("model.task_store")
+    return (Task,) if store is None else (Task, store.TaskView)
+
+
+def encode(value):
+    """
+    Переводит аргументы и результаты методов хранилища в значения JSON:
+    задачи (Task и TaskView), datetime и timedelta помечаются ключами "$task",
+    "$datetime" и "$timedelta", кортежи становятся списками.
+    """
+    if isinstance(value, _task_types()):
+        return {"$task": task_to_wire(value)}
+    if isinstance(value, datetime):
+        return {"$datetime": value.timestamp()}
+    if isinstance(value, timedelta):
+        return {"$timedelta": value.total_seconds()}
+    if isinstance(value, (list, tuple)):
+        return [encode(item) for item in value]
+    if isinstance(value, dict):
+        return {key: encode(item) for key, item in value.items()}
+    return value
+
+
+def decode(value):
+    """
+    Обратное преобразование к encode().
+    """
+    if isinstance(value, list):
+        return [decode(item) for item in value]
+    if isinstance(value, dict):
+        if "$task" in value:
+            return task_from_wire(value["$task"])
+        if "$datetime" in value:
+            return datetime.fromtimestamp(value["$datetime"])
+        if "$timedelta" in value:
+            return timedelta(seconds=value["$timedelta"])
+        return {key: decode(item) for key, item in value.items()}
+    return value
+
+
+def task_arguments(args: Iterable) -> list["Task | TaskView"]:
+    """
+    Задачи среди аргументов метода (в том числе в списках и значениях
+    словарей) в порядке обхода; по этому порядку демон возвращает версии
+    и количество несохраненных интервалов задач после вызова.
+    """
+    types = _task_types()
+    tasks = []
+    for value in args:
+        if isinstance(value, dict):
+            value = list(value.values())
+        if isinstance(value, types):
+            tasks.append(value)
+        elif isinstance(value, list):
+            tasks.extend(item for item in value if isinstance(item, types))
+    return tasks
+
+
+class RemoteStorage:
+    """
+    Хранилище задач, которым владеет демон (model.daemon): каждый вызов
+    метода — одна строка JSON запроса и одна строка ответа через сокет Unix.
+    Семантика методов та же, что у хранилища демона; после вызова версии
+    переданных задач и их несохраненные интервалы приводятся к состоянию
+    копий задач в демоне.
+
+    Отложенной записи у клиента нет: демон сам объединяет одновременные
+    записи разных клиентов в одну транзакцию, поэтому flush ничего не делает.
+    Объект не потокобезопасен; подписка на изменения (subscribe) использует
+    отдельное соединение и поток.
+    """
+
+    engine = None
+
+    def __init__(self, socket_path: str, timeout=CONNECT_TIMEOUT, **options):
+        """
+        :param socket_path: Путь к сокету демона
+        :param timeout: Время ожидания подключения в секундах
+        :param options: Параметры хранилища (write_behind и т.п.); не
+            используются, хранилище открывает демон
+        """
+        self.__socket_path = socket_path
+        self.__socket = _connect(socket_path, timeout)
+        self.__file = self.__socket.makefile("rwb")
+        self.__ids = count(1)
+        self.__transaction = False
+        self.__saved_on_commit: list[tuple[Task, int]] = []
+        self.__subscription: socket.socket | None = None
+
+    def add_task(self, task: Task) -> bool:
+        return self.__call("add_task", task)
+
+    def add_tasks(self, tasks: Iterable[Task]) -> bool:
+        return self.__call("add_tasks", list(tasks))
+
+    def update_task(self, task_name: str, task: Task) -> bool:
+        return self.__call("update_task", task_name, task)
+
+    def update_tasks(self, updates: dict[str, Task], check_version=True) -> int:
+        return self.__call("update_tasks", updates, check_version)
+
+    def delete_task(self, task_name: str, version: int | None = None) -> bool:
+        return self.__call("delete_task", task_name, version)
+
+    def delete_tasks(self, task_names: Iterable[str]) -> int:
+        return self.__call("delete_tasks", list(task_names))
+
+    def fetch_all_tasks(self, finished=False) -> list[Task]:
+        return self.__call("fetch_all_tasks", finished)
+
+    def fetch_page(
+        self,
+        after_key: tuple | None = None,
+        limit=PAGE_SIZE,
+        finished=False,
+        backward=False,
+        query: str | None = None,
+    ) -> list[Task]:
+        return self.__call("fetch_page", after_key, limit, finished, backward, query)
+
+    def count_tasks(self, finished=False, query: str | None = None) -> int:
+        return self.__call("count_tasks", finished, query)
+
+    def get_task_by_name(self, task_name: str) -> Task | None:
+        return self.__call("get_task_by_name", task_name)
+
+    def get_tasks(self, task_names: Iterable[str]) -> list[Task]:
+        return self.__call("get_tasks", list(task_names))
+
+    def iter_tasks(
+        self, finished: bool | None = None, batch_size=1000
+    ) -> Iterator[Task]:
+        return iter(self.__call("iter_tasks", finished, batch_size))
+
+    def last_change(self) -> int:
+        return self.__call("last_change")
+
+    def changes_since(self, seq: int) -> tuple[int, list[Task], list[str]]:
+        return tuple(self.__call("changes_since", seq))
+
+    def load_store(
+        self, finished: bool | None = None, batch_size=10_000
+    ) -> "TaskStore":
+        """
+        Загружает задачи в колоночное хранилище TaskStore на стороне клиента.
+        """
+        from model.task_store import TaskStore
+
+        tasks = self.__call("load_store", finished, batch_size)
+        store = TaskStore(max(len(tasks), 1))
+        store.extend(
+            [task.name for task in tasks],
+            [task.start_timestamp for task in tasks],
+            [task.total_time for task in tasks],
+            [task.running for task in tasks],
+            [task.finished for task in tasks],
+            [task.version for task in tasks],
+            [task.budget for task in tasks],
+        )
+        return store
+
+    def import_tasks(
+        self, tasks: Iterable[Task], batch_size=1000, on_conflict="skip"
+    ) -> dict[str, int]:
+        """
+        Импортирует задачи, передавая их демону пачками по batch_size.
+        """
+        counts = dict.fromkeys(("added", "skipped", "overwritten", "renamed"), 0)
+        tasks = iter(tasks)
+        while chunk := [task for _, task in zip(range(batch_size), tasks)]:
+            result = self.__call("import_tasks", chunk, batch_size, on_conflict)
+            for key, value in result.items():
+                counts[key] += value
+        return counts
+
+    def time_spent(
+        self, since: datetime, until: datetime, task_name: str | None = None
+    ) -> float:
+        return self.__call("time_spent", since, until, task_name)
+
+    def task_names(self) -> dict[int, str]:
+        return {int(key): name for key, name in self.__call("task_names").items()}
+
+    def iter_interval_batches(
+        self, since: datetime, until: datetime, batch_size=100_000
+    ) -> Iterator[list[tuple[int, int, int]]]:
+        batches = self.__call("iter_interval_batches", since, until, batch_size)
+        return ([tuple(row) for row in batch] for batch in batches)
+
+    def set_parent(self, task_name: str, parent_name: str | None) -> bool:
+        return self.__call("set_parent", task_name, parent_name)
+
+    def get_rollup(self, task_name: str) -> Rollup | None:
+        rollup = self.__call("get_rollup", task_name)
+        return Rollup._make(rollup) if rollup is not None else None
+
+    def fetch_children(
+        self, parent_name: str | None = None, finished: bool | None = None
+    ) -> list[tuple[Task, Rollup]]:
+        children = self.__call("fetch_children", parent_name, finished)
+        return [(task, Rollup._make(rollup)) for task, rollup in children]
+
+    def archive_finished(
+        self,
+        older_than: timedelta = ARCHIVE_AFTER,
+        batch_size=ARCHIVE_BATCH_SIZE,
+        now: float | None = None,
+    ) -> int:
+        return self.__call("archive_finished", older_than, batch_size, now)
+
+    def archive(
+        self,
+        older_than: timedelta = ARCHIVE_AFTER,
+        batch_size=ARCHIVE_BATCH_SIZE,
+        vacuum=True,
+    ) -> int:
+        return self.__call("archive", older_than, batch_size, vacuum)
+
+    def optimize(self, vacuum=False):
+        self.__call("optimize", vacuum)
+
+    def status(self) -> tuple[list[Task], list[str], float | None]:
+        """
+        Состояние для строки приглашения оболочки из памяти демона,
+        без обращения к хранилищу.
+
+        :return: Запущенные задачи, имена запущенных задач сверх бюджета
+            и ближайший срок исчерпания бюджета (секунды от начала эпохи)
+        """
+        running, over_budget, next_alert = self.__call("status")
+        return running, over_budget, next_alert
+
+    @contextmanager
+    def transaction(self):
+        """
+        Выполняет вызовы внутри блока одной транзакцией хранилища демона.
+        Пока транзакция открыта, демон не выполняет запросы других клиентов
+        к хранилищу. Вложенные вызовы присоединяются к внешней транзакции.
+        """
+        if self.__transaction:
+            yield self
+            return
+        self.__call("begin")
+        self.__transaction = True
+        try:
+            yield self
+        except BaseException:
+            self.__transaction = False
+            self.__saved_on_commit = []
+            self.__call("rollback")
+            raise
+        self.__transaction = False
+        saved, self.__saved_on_commit = self.__saved_on_commit, []
+        self.__call("commit")
+        for task, sent in saved:
+            task.mark_intervals_saved(sent)
+
+    def subscribe(self, callback: Callable[[int, list[Task], list[str]], None]):
+        """
+        Подписывается на изменения задач: демон присылает их после каждой
+        записи (своих и других клиентов) и при синхронизации с хранилищем.
+        callback вызывается в отдельном потоке.
+
+        :param callback: Функция (seq, измененные задачи, удаленные имена)
+        """
+        connection = _connect(self.__socket_path, CONNECT_TIMEOUT)
+        connection.settimeout(None)
+        file = connection.makefile("rwb")
+        file.write(_dumps({"id": 0, "method": "subscribe"}))
+        file.flush()
+        _result(json.loads(file.readline()))
+        self.__subscription = connection
+
+        def listen():
+            with file:
+                for line in file:
+                    event = json.loads(line)
+                    callback(event["seq"], decode(event["tasks"]), event["removed"])
+
+        threading.Thread(target=listen, name="taskd-events", daemon=True).start()
+
+    def flush(self):
+        pass
+
+    def flush_if_due(self):
+        pass
+
+    def pending_timeout(self) -> float | None:
+        return None
+
+    def close(self):
+        """
+        Закрывает соединения с демоном (открытая транзакция откатывается).
+        """
+        if self.__subscription is not None:
+            self.__subscription.shutdown(socket.SHUT_RDWR)
+            self.__subscription.close()
+        self.__file.close()
+        self.__socket.close()
+
+    def __call(self, method: str, *args):
+        """
+        Выполняет метод хранилища в демоне. Интервалы задач, переданных
+        внутри транзакции, отмечаются сохраненными после её фиксации.
+
+        :raises ConflictError: Если демон вернул конфликт версий.
+        :raises ValueError: Если демон отклонил аргументы.
+        :raises RemoteError: При остальных ошибках демона.
+        """
+        request = {"id": next(self.__ids), "method": method, "args": encode(args)}
+        self.__file.write(_dumps(request))
+        self.__file.flush()
+        line = self.__file.readline()
+        if not line:
+            raise ConnectionError(f"task daemon closed the connection: {method}")
+        response = json.loads(line)
+        for task, (version, unsaved) in zip(
+            task_arguments(args), response.get("tasks", [])
+        ):
+            task.version = version
+            sent = len(task.unsaved_intervals)
+            if self.__transaction:
+                self.__saved_on_commit.append((task, sent))
+            else:
+                task.mark_intervals_saved(sent - unsaved)
+        return _result(response)
+
+
+def _result(response: dict):
+    if error := response.get("error"):
+        if error["type"] == "ConflictError":
+            raise ConflictError(error["names"])
+        if error["type"] == "ValueError":
+            raise ValueError(error["message"])
+        raise RemoteError(f"{error['type']}: {error['message']}")
+    return decode(response.get("result"))
+
+
+def _connect(socket_path: str, timeout: float) -> socket.socket:
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    connection.settimeout(timeout)
+    try:
+        connection.connect(socket_path)
+    except OSError:
+        connection.close()
+        raise
+    connection.settimeout(None)
+    return connection
+
+
+def _dumps(message: dict) -> bytes:
+    return (
+        json.dumps(message, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        + b"\n"
+    )
@@ -0,0 +1,295 @@
+import csv
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import TextIO
+
+import numpy as np
+
+from model.task import from_epoch_us, to_epoch_us
+
+PERIODS = {
+    "day": timedelta(days=1),
+    "week": timedelta(weeks=1),
+}
+
+
+class Report:
+    """
+    Отчет о затраченном времени: матрица totals размером
+    (количество задач × количество периодов) в секундах. Строки есть только
+    у задач с интервалами в промежутке отчета.
+    """
+
+    def __init__(
+        self,
+        task_names: list[str],
+        period_starts: list[datetime],
+        period: timedelta,
+        totals: np.ndarray,
+    ):
+        """
+        :param task_names: Имена задач (строки матрицы)
+        :param period_starts: Начала периодов (столбцы матрицы)
+        :param period: Длина периода
+        :param totals: Время в секундах по задачам и периодам
+        """
+        self.task_names = task_names
+        self.period_starts = period_starts
+        self.period = period
+        self.totals = totals
+
+    def task_totals(self) -> np.ndarray:
+        """
+        Суммарное время каждой задачи за весь отчет.
+        """
+        return self.totals.sum(axis=1)
+
+    def period_totals(self) -> np.ndarray:
+        """
+        Суммарное время всех задач в каждом периоде.
+        """
+        return self.totals.sum(axis=0)
+
+    def top_rows(self, n: int) -> np.ndarray:
+        """
+        Номера строк отчета для задач с наибольшим ненулевым суммарным временем.
+
+        :param n: Количество задач
+        :return: Номера строк по убыванию времени
+        """
+        totals = self.task_totals()
+        rows = np.flatnonzero(totals)
+        if len(rows) > n:
+            rows = rows[np.argpartition(totals[rows], -n)[-n:]]
+        return rows[np.argsort(-totals[rows], kind="stable")]
+
+    def top(self, n: int) -> list[tuple[str, float]]:
+        """
+        Задачи с наибольшим суммарным временем.
+
+        :param n: Количество задач
+        :return: Пары (имя задачи, время в секундах) по убыванию времени
+        """
+        totals = self.task_totals()
+        return [(self.task_names[i], float(totals[i])) for i in self.top_rows(n)]
+
+    def utilization(self, bins=10) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Гистограмма загрузки: доля каждого периода, занятая работой над задачами.
+
+        :param bins: Количество интервалов гистограммы
+        :return: Количество периодов в каждом интервале и границы интервалов
+        """
+        share = self.period_totals() / self.period.total_seconds()
+        upper = max(1.0, share.max(initial=0.0))
+        return np.histogram(share, bins=bins, range=(0.0, upper))
+
+    def to_csv(self, file: TextIO):
+        """
+        Записывает ненулевые ячейки отчета в CSV: задача, начало периода, секунды.
+
+        :param file: Открытый текстовый файл
+        """
+        writer = csv.writer(file)
+        writer.writerow(["task", "period_start", "seconds"])
+        for i, j in zip(*np.nonzero(self.totals)):
+            writer.writerow(
+                [
+                    self.task_names[i],
+                    self.period_starts[j].isoformat(),
+                    round(float(self.totals[i, j]), 3),
+                ]
+            )
+
+
+def aggregate(
+    task_rows: np.ndarray,
+    starts: np.ndarray,
+    ends: np.ndarray,
+    origin: int,
+    period: int,
+    n_tasks: int,
+    n_periods: int,
+) -> np.ndarray:
+    """
+    Векторно раскладывает интервалы по периодам и суммирует время.
+
+    Интервалы обрезаются границами отчета. Интервал, лежащий внутри одного
+    периода, учитывается напрямую; интервал, пересекающий границы периодов,
+    размножается np.repeat на куски по одному на период. Суммы считаются
+    np.bincount по плоскому индексу (задача, период).
+
+    :param task_rows: Номер строки отчета для каждого интервала
+    :param starts: Начала интервалов в микросекундах
+    :param ends: Концы интервалов в микросекундах
+    :param origin: Начало первого периода в микросекундах
+    :param period: Длина периода в микросекундах
+    :param n_tasks: Количество строк отчета
+    :param n_periods: Количество периодов
+    :return: Матрица времени в секундах размером (n_tasks, n_periods)
+    """
+    span = period * n_periods
+    starts = np.clip(starts - origin, 0, span)
+    ends = np.clip(ends - origin, 0, span)
+    keep = ends > starts
+    if not keep.all():
+        task_rows, starts, ends = task_rows[keep], starts[keep], ends[keep]
+    first = starts // period
+    last = (ends - 1) // period
+    size = n_tasks * n_periods
+
+    single = first == last
+    totals = np.zeros(size)
+    totals += np.bincount(
+        task_rows[single] * n_periods + first[single],
+        weights=(ends[single] - starts[single]).astype(np.float64),
+        minlength=size,
+    )
+
+    multi = ~single
+    if multi.any():
+        counts = (last - first + 1)[multi]
+        offsets = np.arange(counts.sum()) - np.repeat(
+            np.cumsum(counts) - counts, counts
+        )
+        pieces = np.repeat(first[multi], counts) + offsets
+        piece_starts = np.maximum(np.repeat(starts[multi], counts), pieces * period)
+        piece_ends = np.minimum(np.repeat(ends[multi], counts), (pieces + 1) * period)
+        totals += np.bincount(
+            np.repeat(task_rows[multi], counts) * n_periods + pieces,
+            weights=(piece_ends - piece_starts).astype(np.float64),
+            minlength=size,
+        )
+    return totals.reshape(n_tasks, n_periods) / 1_000_000
+
+
+def merge_rows(
+    ids: np.ndarray, totals: np.ndarray, other_ids: np.ndarray, other: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Складывает две матрицы отчета, строки которых относятся к задачам
+    с отсортированными номерами ids и other_ids.
+
+    :return: Отсортированные номера задач обеих матриц и матрица их сумм
+    """
+    merged = np.union1d(ids, other_ids)
+    if len(merged) != len(ids):
+        grown = np.zeros((len(merged), totals.shape[1]))
+        grown[np.searchsorted(merged, ids)] = totals
+        totals = grown
+    totals[np.searchsorted(merged, other_ids)] += other
+    return merged, totals
+
+
+def _aggregate_range(
+    database,
+    task_ids: np.ndarray,
+    since: datetime,
+    until: datetime,
+    origin: int,
+    period: int,
+    n_periods: int,
+    batch_size: int,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Загружает интервалы промежутка [since, until) пачками и агрегирует их.
+    Матрица пачки строится только по встретившимся в ней задачам.
+
+    :return: Номера задач с интервалами в промежутке и их матрица времени
+    """
+    ids = np.zeros(0, dtype=np.int64)
+    totals = np.zeros((0, n_periods))
+    for batch in database.iter_interval_batches(since, until, batch_size):
+        columns = np.array(batch, dtype=np.int64)
+        rows = np.searchsorted(task_ids, columns[:, 0])
+        known = rows < len(task_ids)
+        known[known] = task_ids[rows[known]] == columns[known, 0]
+        batch_ids, rows = np.unique(columns[known, 0], return_inverse=True)
+        starts = np.maximum(columns[known, 1], to_epoch_us(since))
+        ends = np.minimum(columns[known, 2], to_epoch_us(until))
+        batch_totals = aggregate(
+            rows.reshape(-1), starts, ends, origin, period, len(batch_ids), n_periods
+        )
+        ids, totals = merge_rows(ids, totals, batch_ids, batch_totals)
+    return ids, totals
+
+
+def _aggregate_range_worker(db_url, *args) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Точка входа процесса-исполнителя: открывает собственное подключение.
+    """
+    from model.storage import open_storage
+
+    database = open_storage(db_url)
+    try:
+        return _aggregate_range(database, *args)
+    finally:
+        database.close()
+
+
+def build_report(
+    database,
+    since: datetime,
+    until: datetime,
+    period="day",
+    workers=1,
+    batch_size=100_000,
+) -> Report:
+    """
+    Строит отчет о затраченном времени по задачам и периодам.
+
+    Границы периодов отсчитываются от since в локальном времени (переходы на
+    летнее время внутри промежутка не учитываются). При workers > 1 промежуток
+    делится по границам периодов между процессами, каждый из которых читает
+    и агрегирует свою часть. Процессы открывают базу данных по URL движка,
+    поэтому хранилища без SQLAlchemy (журнал, демон) агрегируются в текущем
+    процессе.
+
+    :param database: Хранилище задач (Storage)
+    :param since: Начало отчета
+    :param until: Конец отчета
+    :param period: Длина периода: "day" или "week"
+    :param workers: Количество процессов для агрегации (только для Database)
+    :param batch_size: Количество интервалов, загружаемых за один раз
+    :return: Объект Report
+    """
+    step = PERIODS[period]
+    n_periods = max(-(-(until - since) // step), 1)
+    period_us = round(step.total_seconds() * 1_000_000)
+    origin = to_epoch_us(since)
+    names = database.task_names()
+    task_ids = np.array(sorted(names), dtype=np.int64)
+
+    if workers <= 1 or database.engine is None:
+        ids, totals = _aggregate_range(
+            database, task_ids, since, until, origin, period_us, n_periods, batch_size
+        )
+    else:
+        chunk = -(-n_periods // workers)
+        bounds = [
+            (since + step * i, min(since + step * (i + chunk), until))
+            for i in range(0, n_periods, chunk)
+        ]
+        db_url = database.engine.url.render_as_string(hide_password=False)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(
+                    _aggregate_range_worker,
+                    db_url,
+                    task_ids,
+                    start,
+                    end,
+                    origin,
+                    period_us,
+                    n_periods,
+                    batch_size,
+                )
+                for start, end in bounds
+            ]
+            ids = np.zeros(0, dtype=np.int64)
+            totals = np.zeros((0, n_periods))
+            for future in futures:
+                ids, totals = merge_rows(ids, totals, *future.result())
+
+    period_starts = [from_epoch_us(origin + i * period_us) for i in range(n_periods)]
+    return Report([names[i] for i in ids.tolist()], period_starts, step, totals)
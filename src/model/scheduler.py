@@ -0,0 +1,193 @@
+import heapq
+import math
+from datetime import timedelta
+from typing import TYPE_CHECKING
+
+from model.task import Task
+
+if TYPE_CHECKING:
+    from model.task_store import TaskStore
+
+BUDGET = "budget"
+REMINDER = "reminder"
+KINDS = (BUDGET, REMINDER)
+REMIND_AFTER = timedelta(hours=1)
+COMPACT_MIN = 64
+
+
+def budget_deadline(task) -> float | None:
+    """
+    Момент, когда запущенная задача исчерпает бюджет времени:
+    start_time + (budget - total_time).
+
+    :param task: Задача (Task или представление строки хранилища)
+    :return: Секунды от начала эпохи или None, если задача не запущена,
+        бюджет не задан или уже исчерпан до запуска
+    """
+    if task.budget is None or not task.running or task.finished:
+        return None
+    if task.total_time >= task.budget:
+        return None
+    return task.start_timestamp + (task.budget - task.total_time)
+
+
+def next_reminder(start_time: float, remind_after: float, now: float) -> float:
+    """
+    Ближайшее после now напоминание о задаче, запущенной в start_time:
+    напоминания повторяются каждые remind_after секунд работы без остановки.
+    """
+    return start_time + remind_after * (
+        max(math.floor((now - start_time) / remind_after), 0) + 1
+    )
+
+
+class Scheduler:
+    """
+    Планировщик сроков задач: исчерпание бюджета времени и напоминания
+    о задачах, запущенных дольше remind_after секунд.
+
+    Сроки лежат в двоичной куче (heapq) по моменту срабатывания, поэтому
+    кадр интерфейса проверяет только вершину кучи (next_deadline, pop_due),
+    сколько бы задач с бюджетом ни было запущено. После остановки,
+    возобновления, завершения или изменения бюджета задачи её сроки
+    пересчитываются за O(log n) (update): старые записи кучи не ищутся,
+    а помечаются недействительными и выбрасываются, когда доходят до вершины;
+    если недействительных записей становится больше действительных, куча
+    перестраивается.
+
+    Задачи, бюджет которых уже исчерпан, собираются в множество exceeded —
+    по нему интерфейс выделяет строки таблицы.
+    """
+
+    def __init__(self, remind_after: float | None = None):
+        """
+        :param remind_after: Интервал напоминаний о запущенной задаче
+            в секундах; None — без напоминаний.
+        """
+        self.__remind_after = remind_after
+        self.__heap: list[list] = []
+        self.__entries: dict[tuple[str, str], list] = {}
+        self.__sequence = 0
+        self.__exceeded: set[str] = set()
+
+    @property
+    def exceeded(self) -> set[str]:
+        """
+        Имена незавершенных задач, бюджет времени которых исчерпан.
+        """
+        return self.__exceeded
+
+    def load(self, store: "TaskStore", now: float | None = None):
+        """
+        Заполняет планировщик незавершенными задачами хранилища. Сроки
+        считаются векторно по колонкам, куча строится за O(n).
+
+        :param store: Хранилище задач
+        :param now: Текущий момент (по умолчанию Task.clock())
+        """
+        import numpy as np
+
+        now = Task.clock() if now is None else now
+        active = store.alive & ~store.finished
+        budgets = store.budgets
+        exceeded = active & (store.elapsed(now) >= budgets)
+        self.__exceeded.update(map(store.name_of, np.flatnonzero(exceeded)))
+        running = active & store.running
+        start_times = store.start_times
+        deadlines = start_times + (budgets - store.total_times)
+        heap = self.__heap
+        rows = np.flatnonzero(running & (deadlines > now))
+        for row, deadline in zip(rows.tolist(), deadlines[rows].tolist()):
+            heap.append(self.__entry(store.name_of(row), BUDGET, deadline))
+        if self.__remind_after:
+            rows = np.flatnonzero(running)
+            remind_after = self.__remind_after
+            starts = start_times[rows]
+            reminders = starts + remind_after * (
+                np.maximum(np.floor((now - starts) / remind_after), 0) + 1
+            )
+            for row, deadline in zip(rows.tolist(), reminders.tolist()):
+                heap.append(self.__entry(store.name_of(row), REMINDER, deadline))
+        heapq.heapify(heap)
+
+    def update(self, task_name: str, task=None, now: float | None = None):
+        """
+        Пересчитывает сроки задачи после её изменения.
+
+        :param task_name: Имя, под которым задача была запланирована
+            (до переименования)
+        :param task: Задача с актуальным состоянием; None — задача удалена
+        :param now: Текущий момент (по умолчанию Task.clock())
+        """
+        for kind in KINDS:
+            if (entry := self.__entries.pop((task_name, kind), None)) is not None:
+                entry[-1] = None
+        self.__exceeded.discard(task_name)
+        if task is None or task.finished:
+            return
+        now = Task.clock() if now is None else now
+        if task.budget is not None and task.elapsed_time(now) >= task.budget:
+            self.__exceeded.add(task.name)
+        elif (deadline := budget_deadline(task)) is not None:
+            heapq.heappush(self.__heap, self.__entry(task.name, BUDGET, deadline))
+        if self.__remind_after and task.running:
+            deadline = next_reminder(task.start_timestamp, self.__remind_after, now)
+            heapq.heappush(self.__heap, self.__entry(task.name, REMINDER, deadline))
+        self.__compact()
+
+    def next_deadline(self) -> float | None:
+        """
+        Ближайший срок срабатывания или None, если сроков нет.
+        """
+        heap = self.__heap
+        while heap and heap[0][-1] is None:
+            heapq.heappop(heap)
+        return heap[0][0] if heap else None
+
+    def pop_due(self, now: float | None = None) -> list[tuple[str, str]]:
+        """
+        Снимает с кучи наступившие сроки. Задача с исчерпанным бюджетом
+        попадает в exceeded, напоминание планируется на следующий интервал.
+
+        :param now: Текущий момент (по умолчанию Task.clock())
+        :return: Пары (имя задачи, BUDGET или REMINDER) в порядке сроков
+        """
+        now = Task.clock() if now is None else now
+        heap = self.__heap
+        alerts = []
+        while heap and heap[0][0] <= now:
+            deadline, _, name, kind, key = heapq.heappop(heap)
+            if key is None:
+                continue
+            del self.__entries[key]
+            alerts.append((name, kind))
+            if kind == BUDGET:
+                self.__exceeded.add(name)
+            else:
+                start_time = deadline - self.__remind_after
+                deadline = next_reminder(start_time, self.__remind_after, now)
+                heapq.heappush(heap, self.__entry(name, REMINDER, deadline))
+        return alerts
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def __entry(self, name: str, kind: str, deadline: float) -> list:
+        """
+        Запись кучи [срок, порядковый номер, имя, вид, ключ]; ключ None
+        означает, что запись отменена.
+        """
+        self.__sequence += 1
+        key = (name, kind)
+        entry = [float(deadline), self.__sequence, name, kind, key]
+        self.__entries[key] = entry
+        return entry
+
+    def __compact(self):
+        """
+        Перестраивает кучу без отмененных записей, если их стало больше,
+        чем действительных.
+        """
+        if len(self.__heap) > max(2 * len(self.__entries), COMPACT_MIN):
+            self.__heap = list(self.__entries.values())
+            heapq.heapify(self.__heap)
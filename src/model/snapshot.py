@@ -0,0 +1,165 @@
+import mmap
+import os
+import struct
+from typing import TYPE_CHECKING, Iterable
+
+from model.task import Task
+
+if TYPE_CHECKING:
+    from model.task_store import TaskStore
+
+MAGIC = b"TSNP"
+FORMAT_VERSION = 1
+SUFFIX = ".snapshot"
+SQLITE_PREFIX = "sqlite:///"
+
+_HEADER = struct.Struct("<4sHxxI")
+_RECORD = struct.Struct("<ddIHBB")
+
+
+def snapshot_path(db_url: str) -> str | None:
+    """
+    Путь к снимку задач рядом с файлом базы данных SQLite.
+
+    :param db_url: URL базы данных
+    :return: Путь или None, если база данных не файловая (снимок не ведется)
+    """
+    if not db_url.startswith(SQLITE_PREFIX):
+        return None
+    path = db_url[len(SQLITE_PREFIX) :].split("?", 1)[0]
+    if not path or path == ":memory:":
+        return None
+    return path + SUFFIX
+
+
+def write_snapshot(path: str, tasks: Iterable[Task]):
+    """
+    Записывает снимок задач в компактном двоичном формате: заголовок,
+    записи фиксированной длины (время начала, общее время, версия, длина
+    имени, флаги) и имена в UTF-8 подряд. Файл пишется во временный файл
+    рядом и переименовывается, поэтому читатель видит либо старый снимок,
+    либо новый целиком. Снимок — только кэш для первого кадра, поэтому
+    fsync не выполняется.
+
+    :param path: Путь к файлу снимка
+    :param tasks: Задачи (Task или представления строк хранилища)
+    """
+    records = []
+    names = []
+    for task in tasks:
+        name = task.name.encode("utf-8")
+        records.append(
+            _RECORD.pack(
+                task.start_timestamp,
+                task.total_time,
+                task.version,
+                len(name),
+                task.running,
+                task.finished,
+            )
+        )
+        names.append(name)
+    _write(path, len(records), b"".join(records), b"".join(names))
+
+
+def write_store_snapshot(path: str, store: "TaskStore"):
+    """
+    Записывает снимок незавершенных задач колоночного хранилища в порядке
+    отображения (как TaskIndex.view(False)) в том же формате, что
+    write_snapshot(). Записи упаковываются по колонкам NumPy, а не по задачам,
+    поэтому функция подходит для потока сохранения: интерфейс передает ему
+    копию хранилища (TaskStore.copy()) и не ждет записи.
+
+    :param path: Путь к файлу снимка
+    :param store: Хранилище задач, которое не меняется во время записи
+    """
+    import numpy as np
+
+    running = store.running.tolist()
+    rows = np.flatnonzero(store.mask(finished=False)).tolist()
+    rows.sort(key=lambda row: (not running[row], store.name_of(row)))
+    names = [store.name_of(row).encode("utf-8") for row in rows]
+    records = np.zeros(
+        len(rows),
+        dtype=[
+            ("start_time", "<f8"),
+            ("total_time", "<f8"),
+            ("version", "<u4"),
+            ("length", "<u2"),
+            ("running", "u1"),
+            ("finished", "u1"),
+        ],
+    )
+    records["start_time"] = store.start_times[rows]
+    records["total_time"] = store.total_times[rows]
+    records["version"] = store.versions[rows]
+    records["length"] = [len(name) for name in names]
+    records["running"] = store.running[rows]
+    records["finished"] = store.finished[rows]
+    _write(path, len(rows), records.tobytes(), b"".join(names))
+
+
+def _write(path: str, count: int, records: bytes, names: bytes):
+    """
+    Записывает снимок во временный файл рядом с path и переименовывает его.
+    """
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "wb") as file:
+            file.write(_HEADER.pack(MAGIC, FORMAT_VERSION, count))
+            file.write(records)
+            file.write(names)
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+
+def read_snapshot(path: str | None) -> list[Task] | None:
+    """
+    Читает снимок задач через mmap.
+
+    :param path: Путь к файлу снимка или None
+    :return: Задачи или None, если снимка нет или он поврежден
+        (другая версия формата, обрезанный файл)
+    """
+    if path is None:
+        return None
+    try:
+        with open(path, "rb") as file, mmap.mmap(
+            file.fileno(), 0, access=mmap.ACCESS_READ
+        ) as data:
+            return _parse(data)
+    except (OSError, ValueError, struct.error, UnicodeDecodeError):
+        return None
+
+
+def _parse(data: mmap.mmap) -> list[Task] | None:
+    magic, version, count = _HEADER.unpack_from(data)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        return None
+    position = _HEADER.size
+    offset = position + count * _RECORD.size
+    tasks = []
+    for _ in range(count):
+        start_time, total_time, task_version, length, running, finished = (
+            _RECORD.unpack_from(data, position)
+        )
+        position += _RECORD.size
+        if offset + length > len(data):
+            return None
+        tasks.append(
+            Task(
+                str(data[offset : offset + length], "utf-8"),
+                start_time,
+                total_time,
+                bool(running),
+                bool(finished),
+                task_version,
+            )
+        )
+        offset += length
+    if offset != len(data):
+        return None
+    return tasks
@@ -0,0 +1,255 @@
+from contextlib import AbstractContextManager
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, Protocol
+
+from model.task import Task
+from model.task_tree import Rollup
+
+if TYPE_CHECKING:
+    from model.task_store import TaskStore
+
+CONFLICT_POLICIES = ("skip", "overwrite", "rename")
+PAGE_SIZE = 100
+ARCHIVE_AFTER = timedelta(days=30)
+ARCHIVE_BATCH_SIZE = 1000
+LOG_SCHEME = "tasklog"
+DAEMON_SCHEME = "taskd"
+
+
+class ConflictError(Exception):
+    """
+    Задачи изменены другим процессом после того, как были прочитаны:
+    версия строки в базе данных не совпадает с ожидаемой.
+    """
+
+    def __init__(self, names: Iterable[str]):
+        self.names = list(names)
+        super().__init__(f"tasks changed concurrently: {', '.join(self.names)}")
+
+
+class Storage(Protocol):
+    """
+    Хранилище задач, с которым работают интерфейс, поток сохранения и
+    командная строка. Основу составляют методы add_task, update_task,
+    delete_task, fetch_all_tasks и get_task_by_name; остальные методы
+    нужны разделу завершенных задач, синхронизации с другими процессами,
+    иерархии задач (set_parent, get_rollup, fetch_children), отчетам,
+    выгрузке и загрузке. Реализации: Database (SQLAlchemy),
+    LogStorage (журнал операций) и RemoteStorage (клиент демона);
+    выбирается по схеме URL в open_storage.
+    Семантика методов (версии, конфликты, порядок задач) задается
+    Database и проверяется общими тестами tests/test_database.py.
+    """
+
+    engine: object | None
+
+    def add_task(self, task: Task) -> bool: ...
+
+    def add_tasks(self, tasks: Iterable[Task]) -> bool: ...
+
+    def update_task(self, task_name: str, task: Task) -> bool: ...
+
+    def update_tasks(self, updates: dict[str, Task], check_version=True) -> int: ...
+
+    def delete_task(self, task_name: str, version: int | None = None) -> bool: ...
+
+    def delete_tasks(self, task_names: Iterable[str]) -> int: ...
+
+    def fetch_all_tasks(self, finished=False) -> list[Task]: ...
+
+    def fetch_page(
+        self,
+        after_key: tuple | None = None,
+        limit=PAGE_SIZE,
+        finished=False,
+        backward=False,
+        query: str | None = None,
+    ) -> list[Task]: ...
+
+    def count_tasks(self, finished=False, query: str | None = None) -> int: ...
+
+    def get_task_by_name(self, task_name: str) -> Task | None: ...
+
+    def get_tasks(self, task_names: Iterable[str]) -> list[Task]: ...
+
+    def iter_tasks(
+        self, finished: bool | None = None, batch_size=1000
+    ) -> Iterator[Task]: ...
+
+    def last_change(self) -> int: ...
+
+    def changes_since(self, seq: int) -> tuple[int, list[Task], list[str]]: ...
+
+    def load_store(
+        self, finished: bool | None = None, batch_size=10_000
+    ) -> "TaskStore": ...
+
+    def import_tasks(
+        self, tasks: Iterable[Task], batch_size=1000, on_conflict="skip"
+    ) -> dict[str, int]: ...
+
+    def time_spent(
+        self, since: datetime, until: datetime, task_name: str | None = None
+    ) -> float: ...
+
+    def task_names(self) -> dict[int, str]: ...
+
+    def iter_interval_batches(
+        self, since: datetime, until: datetime, batch_size=100_000
+    ) -> Iterator[list[tuple[int, int, int]]]: ...
+
+    def set_parent(self, task_name: str, parent_name: str | None) -> bool: ...
+
+    def get_rollup(self, task_name: str) -> Rollup | None: ...
+
+    def fetch_children(
+        self, parent_name: str | None = None, finished: bool | None = None
+    ) -> list[tuple[Task, Rollup]]: ...
+
+    def archive_finished(
+        self,
+        older_than: timedelta = ARCHIVE_AFTER,
+        batch_size=ARCHIVE_BATCH_SIZE,
+        now: float | None = None,
+    ) -> int: ...
+
+    def archive(
+        self,
+        older_than: timedelta = ARCHIVE_AFTER,
+        batch_size=ARCHIVE_BATCH_SIZE,
+        vacuum=True,
+    ) -> int: ...
+
+    def optimize(self, vacuum=False): ...
+
+    def transaction(self) -> AbstractContextManager: ...
+
+    def flush(self): ...
+
+    def flush_if_due(self): ...
+
+    def pending_timeout(self) -> float | None: ...
+
+    def close(self): ...
+
+
+def _open_database(url: str, **options) -> Storage:
+    from model.database import Database
+
+    return Database(url, **options)
+
+
+def _open_log(url: str, **options) -> Storage:
+    from model.log_storage import LogStorage
+
+    return LogStorage(url_path(url), **options)
+
+
+def _open_remote(url: str, **options) -> Storage:
+    from model.remote_storage import RemoteStorage
+
+    return RemoteStorage(url_path(url), **options)
+
+
+BACKENDS: dict[str, Callable[..., Storage]] = {
+    LOG_SCHEME: _open_log,
+    DAEMON_SCHEME: _open_remote,
+}
+
+
+def open_storage(url: str, **options) -> Storage:
+    """
+    Открывает хранилище задач по URL. Схема tasklog:///путь выбирает журнал
+    операций (LogStorage), taskd:///путь — подключение к демону через сокет
+    (RemoteStorage), остальные URL открываются как база данных SQLite
+    (Database). Модуль реализации импортируется только при
+    открытии, поэтому журнал операций не загружает SQLAlchemy.
+
+    :param url: URL хранилища
+    :param options: Параметры конструктора реализации (например, write_behind)
+    :return: Открытое хранилище
+    """
+    return BACKENDS.get(url.split(":", 1)[0], _open_database)(url, **options)
+
+
+def url_path(url: str) -> str:
+    """
+    Путь к файлу из URL вида схема:///путь (относительный)
+    или схема:////путь (абсолютный).
+
+    :raises ValueError: Если в URL нет пути.
+    """
+    path = url.split(":///", 1)[-1].split("?", 1)[0]
+    if path == url or not path:
+        raise ValueError(f"storage URL has no path: {url}")
+    return path
+
+
+def import_tasks(
+    storage: Storage,
+    tasks: Iterable[Task],
+    batch_size: int,
+    on_conflict: str,
+    existing_names: Callable[[set[str]], set[str]],
+) -> dict[str, int]:
+    """
+    Импортирует задачи пачками по batch_size, каждая пачка — одной
+    транзакцией хранилища. Задачи читаются из tasks лениво, поэтому расход
+    памяти не зависит от общего количества задач.
+
+    :param storage: Хранилище, в которое импортируются задачи
+    :param tasks: Задачи для импорта
+    :param batch_size: Количество задач в одной пачке
+    :param on_conflict: Что делать с задачей, имя которой уже занято:
+        "skip" — пропустить, "overwrite" — заменить существующую,
+        "rename" — добавить под именем вида "имя (2)"
+    :param existing_names: Функция, возвращающая уже занятые имена из набора
+    :return: Количество добавленных, пропущенных, перезаписанных
+        и переименованных задач
+    """
+    if on_conflict not in CONFLICT_POLICIES:
+        raise ValueError(f"unknown conflict policy: {on_conflict}")
+    counts = dict.fromkeys(("added", "skipped", "overwritten", "renamed"), 0)
+    tasks = iter(tasks)
+    while chunk := list(islice(tasks, batch_size)):
+        with storage.transaction():
+            taken = existing_names({task.name for task in chunk})
+            added: dict[str, Task] = {}
+            overwritten: dict[str, Task] = {}
+            for task in chunk:
+                if task.name not in taken:
+                    added[task.name] = task
+                    taken.add(task.name)
+                    counts["added"] += 1
+                elif on_conflict == "skip":
+                    counts["skipped"] += 1
+                elif on_conflict == "overwrite":
+                    if task.name in added:
+                        added[task.name] = task
+                    else:
+                        overwritten[task.name] = task
+                    counts["overwritten"] += 1
+                else:
+                    task.name = _free_name(task.name, taken, existing_names)
+                    added[task.name] = task
+                    taken.add(task.name)
+                    counts["renamed"] += 1
+            if not storage.add_tasks(added.values()):
+                raise ValueError("task names were taken during import")
+            storage.update_tasks(overwritten, check_version=False)
+    return counts
+
+
+def _free_name(
+    name: str, taken: set[str], existing_names: Callable[[set[str]], set[str]]
+) -> str:
+    """
+    Первое свободное имя вида "имя (N)".
+    """
+    number = 2
+    while True:
+        candidate = f"{name} ({number})"
+        if candidate not in taken and not existing_names({candidate}):
+            return candidate
+        number += 1
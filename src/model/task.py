@@ -1,27 +1,95 @@
+import time
 from datetime import datetime
 
 
 class Task:
+    """
+    Задача с учетом затраченного времени.
+
+    Время хранится числами с плавающей точкой (секунды от начала эпохи Unix),
+    в datetime оно переводится только на границе с хранилищем. Источник
+    текущего времени — Task.clock; методы, зависящие от времени, принимают
+    необязательный момент now, чтобы весь кадр или пакет операций использовал
+    одну отметку времени.
+    """
+
+    __slots__ = (
+        "name",
+        "version",
+        "budget",
+        "__start_time",
+        "__total_time",
+        "__running",
+        "__finished",
+        "__intervals",
+    )
+
+    clock = time.time
+
     def __init__(
-        self, name, start_time=None, total_time=0.0, running=True, finished=False
+        self,
+        name,
+        start_time=None,
+        total_time=0.0,
+        running=True,
+        finished=False,
+        version=0,
+        budget=None,
     ):
         """
         Конструктор для создания новой задачи.
 
         :param name: Название задачи
-        :param start_time: Время начала задачи (по умолчанию текущее время)
+        :param start_time: Время начала задачи: datetime или секунды от начала эпохи (по умолчанию текущее время)
         :param total_time: Общее время, потраченное на задачу до start_time
         :param running: Статус активности задачи (по умолчанию True)
         :param finished: Статус завершенности задачи (по умолчанию False)
+        :param version: Версия строки задачи в базе данных, известная этому объекту
+        :param budget: Бюджет времени на задачу в секундах или None, если не задан
         """
         self.name = name
-        self.__start_time = start_time or datetime.now()
+        self.version = version
+        self.budget = budget
+        if start_time is None:
+            start_time = Task.clock()
+        elif isinstance(start_time, datetime):
+            start_time = start_time.timestamp()
+        self.__start_time = float(start_time)
         self.__total_time = total_time
         self.__running = running
         self.__finished = finished
+        self.__intervals = []
+
+    @classmethod
+    def snapshot(cls, task) -> "Task":
+        """
+        Независимая копия состояния задачи (Task или представления строки
+        хранилища) вместе с её несохраненными интервалами.
+
+        :param task: Копируемая задача
+        :return: Новый объект Task
+        """
+        copy = cls(
+            task.name,
+            task.start_timestamp,
+            task.total_time,
+            task.running,
+            task.finished,
+            task.version,
+            task.budget,
+        )
+        copy.__intervals = task.unsaved_intervals
+        return copy
 
     @property
     def start_time(self):
+        return datetime.fromtimestamp(self.__start_time)
+
+    @property
+    def start_timestamp(self):
+        """
+        Время начала задачи в секундах от начала эпохи.
+        """
         return self.__start_time
 
     @property
@@ -36,42 +104,66 @@ class Task:
     def finished(self):
         return self.__finished
 
-    def stop(self):
+    @property
+    def unsaved_intervals(self):
+        """
+        Закрытые, но еще не сохраненные интервалы работы над задачей
+        в виде пар (начало, конец) в секундах от начала эпохи.
+        """
+        return list(self.__intervals)
+
+    def mark_intervals_saved(self, count):
+        """
+        Отмечает первые count интервалов как сохраненные.
+
+        :param count: Количество сохраненных интервалов
+        """
+        del self.__intervals[:count]
+
+    def stop(self, now=None):
         """
         Останавливает задачу, вычисляя и добавляя время, прошедшее с момента её начала.
-        Задача помечается как остановленная.
+        Задача помечается как остановленная, а закрытый интервал работы
+        запоминается до сохранения в базе данных.
+
+        :param now: Момент остановки (по умолчанию Task.clock())
         """
         if self.__running:
-            elapsed = (datetime.now() - self.__start_time).total_seconds()
-            self.__total_time += elapsed
+            now = Task.clock() if now is None else now
+            self.__total_time += now - self.__start_time
             self.__running = False
+            self.__intervals.append((self.__start_time, now))
 
-    def finish(self):
+    def finish(self, now=None):
         """
         Завершает задачу. Задача помечается как завершенная и останавливается.
+
+        :param now: Момент завершения (по умолчанию Task.clock())
         """
         self.__finished = True
-        self.stop()
+        self.stop(now)
 
-    def resume(self):
+    def resume(self, now=None):
         """
         Возобновляет задачу, если она была остановлена.
+
+        :param now: Момент возобновления (по умолчанию Task.clock())
         """
         if not self.__running:
-            self.__start_time = datetime.now()
+            self.__start_time = Task.clock() if now is None else now
             self.__running = True
 
-    def elapsed_time(self):
+    def elapsed_time(self, now=None):
         """
         Возвращает общее время, прошедшее с момента начала задачи.
 
+        :param now: Момент, на который считается время (по умолчанию Task.clock())
         :return: Общее время, прошедшее с момента начала задачи
         """
         if self.__running:
-            elapsed = (datetime.now() - self.__start_time).total_seconds()
-        else:
-            elapsed = 0.0
-        return self.__total_time + elapsed
+            now = Task.clock() if now is None else now
+            return self.__total_time + (now - self.__start_time)
+        return self.__total_time
 
     def __str__(self):
         status = "Running" if self.__running else "Stopped"
@@ -79,3 +171,24 @@ class Task:
         return (
             f"Task: {self.name}, Status: {status}, Time Elapsed: {elapsed:.2f} seconds"
         )
+
+
+def seconds_to_us(seconds: float) -> int:
+    """
+    Переводит секунды от начала эпохи Unix в целое число микросекунд.
+    """
+    return round(seconds * 1_000_000)
+
+
+def to_epoch_us(moment: datetime) -> int:
+    """
+    Переводит время в целое число микросекунд от начала эпохи Unix.
+    """
+    return seconds_to_us(moment.timestamp())
+
+
+def from_epoch_us(epoch_us: int) -> datetime:
+    """
+    Переводит целое число микросекунд от начала эпохи Unix в локальное время.
+    """
+    return datetime.fromtimestamp(epoch_us / 1_000_000)
@@ -0,0 +1,138 @@
+from bisect import bisect_left
+from typing import Iterable
+
+from model.name_index import NameIndex
+from model.task import Task
+
+SCAN_FRACTION = 8
+
+
+class TaskIndex:
+    """
+    Индекс задач в памяти: словарь по имени и два раздела (активные и
+    завершенные задачи), каждый из которых хранится в порядке отображения —
+    сначала запущенные задачи, затем остановленные, внутри группы по имени.
+    Место задачи в разделе находится двоичным поиском за O(log n), но вставка
+    и удаление в списке сдвигают его хвост, то есть занимают O(n) (копирование
+    указателей: около 40 мкс на 100 тысяч задач). Индекс имен для поиска
+    строится при первом поиске и дальше обновляется вместе с индексом.
+    """
+
+    def __init__(self, tasks: Iterable[Task] = ()):
+        """
+        Построение индекса по набору задач.
+
+        :param tasks: Задачи, которыми заполняется индекс.
+        """
+        self.__tasks: dict[str, Task] = {}
+        self.__keys: dict[str, tuple] = {}
+        self.__partitions = {False: ([], []), True: ([], [])}
+        self.__names: NameIndex | None = None
+        for task in tasks:
+            self.add(task)
+
+    @staticmethod
+    def sort_key(task: Task) -> tuple:
+        """
+        Ключ порядка отображения задачи внутри раздела.
+        """
+        return not task.running, task.name
+
+    def view(self, finished: bool) -> list[Task]:
+        """
+        Возвращает раздел индекса в порядке отображения.
+        Список живой: он меняется вместе с индексом и не должен изменяться снаружи.
+
+        :param finished: True — завершенные задачи, False — активные.
+        """
+        return self.__partitions[finished][1]
+
+    def get(self, name: str) -> Task | None:
+        return self.__tasks.get(name)
+
+    def has_running(self) -> bool:
+        """
+        Проверяет, есть ли запущенные задачи (запущенные идут первыми в разделе).
+        """
+        active = self.view(False)
+        return bool(active) and active[0].running
+
+    def add(self, task: Task):
+        """
+        Добавляет задачу в индекс.
+
+        :raises KeyError: Если задача с таким именем уже есть в индексе.
+        """
+        if task.name in self.__tasks:
+            raise KeyError(task.name)
+        key = self.sort_key(task)
+        keys, tasks = self.__partitions[task.finished]
+        position = bisect_left(keys, key)
+        keys.insert(position, key)
+        tasks.insert(position, task)
+        self.__tasks[task.name] = task
+        self.__keys[task.name] = (task.finished, key)
+        if self.__names is not None:
+            self.__names.add(task.name)
+
+    def remove(self, name: str) -> Task:
+        """
+        Удаляет задачу из индекса по имени.
+
+        :return: Удаленная задача.
+        """
+        task = self.__tasks.pop(name)
+        finished, key = self.__keys.pop(name)
+        keys, tasks = self.__partitions[finished]
+        position = bisect_left(keys, key)
+        del keys[position]
+        del tasks[position]
+        if self.__names is not None:
+            self.__names.remove(name)
+        return task
+
+    def update(self, name: str, task: Task):
+        """
+        Перемещает задачу на новое место после изменения её состояния или имени.
+
+        :param name: Имя, под которым задача хранилась в индексе.
+        :param task: Задача с актуальным состоянием.
+        """
+        self.remove(name)
+        self.add(task)
+
+    def search(self, query: str, finished: bool) -> list[Task]:
+        """
+        Задачи раздела, имена которых подходят под запрос (см. NameIndex),
+        в порядке отображения. Если совпадений больше 1/SCAN_FRACTION раздела,
+        раздел просматривается по порядку, иначе совпадения сортируются
+        по ключу отображения.
+
+        :param query: Строка поиска.
+        :param finished: True — завершенные задачи, False — активные.
+        :return: Новый список задач (не живой, в отличие от view()).
+        """
+        if self.__names is None:
+            self.__names = NameIndex(self.__tasks)
+        names = self.__names.search(query)
+        keys, tasks = self.__partitions[finished]
+        if len(names) * SCAN_FRACTION > len(keys):
+            return [task for key, task in zip(keys, tasks) if key[1] in names]
+        matches = sorted(
+            key for partition, key in map(self.__keys.__getitem__, names)
+            if partition == finished
+        )
+        return [self.__tasks[name] for _, name in matches]
+
+    def index_of(self, task: Task) -> int:
+        """
+        Позиция задачи в её разделе.
+        """
+        finished, key = self.__keys[task.name]
+        return bisect_left(self.__partitions[finished][0], key)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.__tasks
+
+    def __len__(self) -> int:
+        return len(self.__tasks)
@@ -1,9 +1,8 @@
-from datetime import datetime
-
-from sqlalchemy import Boolean, Column, Float, String
+from sqlalchemy import (DDL, Boolean, Column, Float, ForeignKey, Index,
+                        Integer, PrimaryKeyConstraint, String, event)
 from sqlalchemy.orm import declarative_base
 
-from model.task import Task
+from model.task import Task, seconds_to_us
 
 Base = declarative_base()
 
@@ -13,27 +12,395 @@ class TaskModel(Base):
     ORM Модель задачи
     """
     __tablename__ = "tasks"
-    name = Column(String, primary_key=True)
-    start_time = Column(String)
+    __table_args__ = {"sqlite_autoincrement": True}
+    id = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False, unique=True, index=True)
+    start_time = Column(Integer)
     total_time = Column(Float, default=0.0)
     running = Column(Boolean, default=True)
     finished = Column(Boolean, default=False)
+    version = Column(Integer, nullable=False, default=0, server_default="0")
+    budget = Column(Float)
+    parent_id = Column(Integer, index=True)
+
+    @staticmethod
+    def values_from_task(task: Task) -> dict:
+        """
+        Значения колонок для задачи, пригодные для пакетных INSERT/UPDATE.
+        """
+        return {
+            "name": task.name,
+            "start_time": seconds_to_us(task.start_timestamp),
+            "total_time": task.total_time,
+            "running": task.running,
+            "finished": task.finished,
+            "budget": task.budget,
+        }
 
     @staticmethod
     def from_task(task: Task):
-        return TaskModel(
-            name=task.name,
-            start_time=task.start_time.isoformat(),
-            total_time=task.total_time,
-            running=task.running,
-            finished=task.finished,
-        )
+        return TaskModel(**TaskModel.values_from_task(task))
 
     def to_task(self) -> Task:
-        return Task(
-            name=self.name,
-            start_time=datetime.fromisoformat(self.start_time),
-            total_time=self.total_time,
-            running=self.running,
-            finished=self.finished,
+        return task_from_row(self)
+
+    @staticmethod
+    def columns():
+        """
+        Колонки таблицы, необходимые для построения Task по строке выборки.
+        """
+        table = TaskModel.__table__
+        return (
+            table.c.name,
+            table.c.start_time,
+            table.c.total_time,
+            table.c.running,
+            table.c.finished,
+            table.c.version,
+            table.c.budget,
         )
+
+
+def task_from_row(row) -> Task:
+    """
+    Строит Task по строке выборки или ORM объекту с колонками задачи.
+    """
+    return Task(
+        name=row.name,
+        start_time=row.start_time / 1_000_000,
+        total_time=row.total_time,
+        running=row.running,
+        finished=row.finished,
+        version=row.version,
+        budget=row.budget,
+    )
+
+
+Index(
+    "ix_tasks_finished_running",
+    TaskModel.finished,
+    TaskModel.running.desc(),
+    TaskModel.name,
+)
+
+
+class TaskIntervalModel(Base):
+    """
+    ORM Модель закрытого интервала работы над задачей.
+    Интервалы только добавляются; total_time задачи — их накопленная сумма.
+    """
+    __tablename__ = "task_intervals"
+    id = Column(Integer, primary_key=True)
+    task_id = Column(
+        Integer, ForeignKey("tasks.id", ondelete="CASCADE"), nullable=False
+    )
+    start_time = Column(Integer, nullable=False)
+    end_time = Column(Integer, nullable=False)
+
+
+Index(
+    "ix_task_intervals_task",
+    TaskIntervalModel.task_id,
+    TaskIntervalModel.start_time,
+)
+Index(
+    "ix_task_intervals_range",
+    TaskIntervalModel.start_time,
+    TaskIntervalModel.end_time,
+)
+
+
+class TaskChangeModel(Base):
+    """
+    ORM Модель журнала изменений задач. Строки добавляются триггерами на
+    таблице tasks при каждой вставке, изменении и удалении задачи, поэтому
+    журнал видит изменения любого процесса. Порядковый номер seq
+    (AUTOINCREMENT) только растет, и экземпляр приложения перечитывает лишь
+    задачи, изменившиеся после последнего увиденного номера. Старые записи
+    имен, у которых есть более поздние, удаляет Database.prune_changes().
+    """
+    __tablename__ = "task_changes"
+    __table_args__ = {"sqlite_autoincrement": True}
+    seq = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False)
+
+
+TASK_CHANGE_TRIGGERS = (
+    "CREATE TRIGGER IF NOT EXISTS tasks_log_insert AFTER INSERT ON tasks "
+    "BEGIN INSERT INTO task_changes (name) VALUES (NEW.name); END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_log_update AFTER UPDATE ON tasks "
+    "BEGIN INSERT INTO task_changes (name) VALUES (NEW.name); "
+    "INSERT INTO task_changes (name) SELECT OLD.name WHERE OLD.name <> NEW.name; "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_log_delete AFTER DELETE ON tasks "
+    "BEGIN INSERT INTO task_changes (name) VALUES (OLD.name); END",
+)
+
+
+class TaskCountModel(Base):
+    """
+    ORM Модель счетчиков задач по разделам (активные и завершенные).
+    Счетчики поддерживаются триггерами на таблицах tasks и tasks_archive
+    (архивные задачи входят в раздел завершенных), поэтому размер раздела
+    известен без подсчета строк.
+    """
+    __tablename__ = "task_counts"
+    finished = Column(Boolean, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+TASK_COUNT_TRIGGERS = (
+    "CREATE TRIGGER IF NOT EXISTS tasks_count_insert AFTER INSERT ON tasks "
+    "BEGIN INSERT INTO task_counts (finished, count) VALUES (NEW.finished, 1) "
+    "ON CONFLICT (finished) DO UPDATE SET count = count + 1; END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_count_update AFTER UPDATE OF finished "
+    "ON tasks WHEN OLD.finished IS NOT NEW.finished "
+    "BEGIN UPDATE task_counts SET count = count - 1 "
+    "WHERE finished = OLD.finished; "
+    "INSERT INTO task_counts (finished, count) VALUES (NEW.finished, 1) "
+    "ON CONFLICT (finished) DO UPDATE SET count = count + 1; END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_count_delete AFTER DELETE ON tasks "
+    "BEGIN UPDATE task_counts SET count = count - 1 "
+    "WHERE finished = OLD.finished; END",
+)
+
+
+class TaskArchiveModel(Base):
+    """
+    ORM Модель архива завершенных задач. Строки переносятся сюда из tasks
+    вместе с идентификаторами, поэтому интервалы и отчеты продолжают
+    ссылаться на те же id, а новые задачи (AUTOINCREMENT) их не переиспользуют.
+    """
+    __tablename__ = "tasks_archive"
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    name = Column(String, nullable=False, unique=True, index=True)
+    start_time = Column(Integer)
+    total_time = Column(Float, default=0.0)
+    running = Column(Boolean, default=False)
+    finished = Column(Boolean, default=True)
+    version = Column(Integer, nullable=False, default=0, server_default="0")
+    budget = Column(Float)
+
+
+class TaskIntervalArchiveModel(Base):
+    """
+    ORM Модель интервалов работы над архивными задачами.
+    """
+    __tablename__ = "task_intervals_archive"
+    id = Column(Integer, primary_key=True)
+    task_id = Column(Integer, nullable=False)
+    start_time = Column(Integer, nullable=False)
+    end_time = Column(Integer, nullable=False)
+
+
+Index(
+    "ix_task_intervals_archive_task",
+    TaskIntervalArchiveModel.task_id,
+    TaskIntervalArchiveModel.start_time,
+)
+Index(
+    "ix_task_intervals_archive_range",
+    TaskIntervalArchiveModel.start_time,
+    TaskIntervalArchiveModel.end_time,
+)
+
+TASK_ARCHIVE_TRIGGERS = (
+    "CREATE TRIGGER IF NOT EXISTS tasks_archive_name_insert BEFORE INSERT ON tasks "
+    "WHEN EXISTS (SELECT 1 FROM tasks_archive WHERE name = NEW.name) "
+    "BEGIN SELECT RAISE(ABORT, 'UNIQUE constraint failed: tasks.name'); END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_archive_name_update BEFORE UPDATE OF name "
+    "ON tasks WHEN NEW.name <> OLD.name "
+    "AND EXISTS (SELECT 1 FROM tasks_archive WHERE name = NEW.name) "
+    "BEGIN SELECT RAISE(ABORT, 'UNIQUE constraint failed: tasks.name'); END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_archive_count_insert AFTER INSERT "
+    "ON tasks_archive "
+    "BEGIN INSERT INTO task_counts (finished, count) VALUES (NEW.finished, 1) "
+    "ON CONFLICT (finished) DO UPDATE SET count = count + 1; END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_archive_count_delete AFTER DELETE "
+    "ON tasks_archive "
+    "BEGIN UPDATE task_counts SET count = count - 1 "
+    "WHERE finished = OLD.finished; END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_archive_log_delete AFTER DELETE "
+    "ON tasks_archive "
+    "BEGIN INSERT INTO task_changes (name) VALUES (OLD.name); END",
+)
+
+# Два символа \x01 перед именем: триграммы с ними есть только в начале
+# имени, поэтому префиксы из одного и двух символов тоже ищутся по индексу.
+NAME_SEARCH_MARK = "\x01\x01"
+
+
+def name_search_table(table: str) -> str:
+    """
+    Имя таблицы полнотекстового поиска по именам задач таблицы table.
+    """
+    return f"{table}_name_fts"
+
+
+def _name_search_ddl(table: str) -> tuple:
+    """
+    Таблица FTS5 с триграммным токенизатором (без учета регистра) по именам
+    задач table (колонка term — имя с NAME_SEARCH_MARK в начале) и триггеры,
+    которые поддерживают её вместе с table. Таблица не хранит сами имена
+    (content=''), строки связаны с задачами через rowid = id.
+    """
+    fts = name_search_table(table)
+    insert = (
+        f"INSERT INTO {fts} (rowid, term) "
+        "VALUES (NEW.id, char(1, 1) || NEW.name); "
+    )
+    delete = (
+        f"INSERT INTO {fts} ({fts}, rowid, term) "
+        "VALUES ('delete', OLD.id, char(1, 1) || OLD.name); "
+    )
+    return (
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} "
+        "USING fts5(term, content='', tokenize='trigram')",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_search_insert AFTER INSERT "
+        f"ON {table} BEGIN {insert}END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_search_delete AFTER DELETE "
+        f"ON {table} BEGIN {delete}END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_search_update AFTER UPDATE OF name "
+        f"ON {table} WHEN NEW.name <> OLD.name BEGIN {delete}{insert}END",
+    )
+
+
+TASK_NAME_SEARCH = _name_search_ddl("tasks")
+TASK_ARCHIVE_NAME_SEARCH = _name_search_ddl("tasks_archive")
+
+
+class TaskTreeModel(Base):
+    """
+    ORM Модель таблицы замыкания иерархии задач: строка на каждую пару
+    (предок, потомок) с расстоянием depth между ними, включая пару задачи
+    с самой собой (depth = 0). Родитель задачи хранится в tasks.parent_id,
+    а таблица поддерживается триггерами: предки задачи читаются по первичному
+    ключу (descendant, ancestor) за O(глубины), поддерево — по индексу
+    (ancestor, depth). Архивные задачи в иерархию не входят.
+    """
+    __tablename__ = "task_tree"
+    __table_args__ = (PrimaryKeyConstraint("descendant", "ancestor"),)
+    ancestor = Column(Integer, nullable=False)
+    descendant = Column(Integer, nullable=False)
+    depth = Column(Integer, nullable=False)
+
+
+Index("ix_task_tree_ancestor", TaskTreeModel.ancestor, TaskTreeModel.depth)
+
+
+class TaskRollupModel(Base):
+    """
+    ORM Модель сводок поддеревьев задач (model.task_tree.Rollup): суммарное
+    время, количество запущенных задач и сумма моментов их начала (секунды),
+    размер поддерева и количество детей. Сводки обновляются триггерами только
+    у предков измененной задачи, поэтому читаются одной строкой.
+    """
+    __tablename__ = "task_rollups"
+    task_id = Column(Integer, primary_key=True, autoincrement=False)
+    total_time = Column(Float, nullable=False)
+    running = Column(Integer, nullable=False)
+    running_since = Column(Float, nullable=False)
+    size = Column(Integer, nullable=False)
+    children = Column(Integer, nullable=False)
+
+
+_ANCESTORS = "task_id IN (SELECT ancestor FROM task_tree WHERE descendant = {})"
+_STRICT_ANCESTORS = (
+    "task_id IN (SELECT ancestor FROM task_tree WHERE descendant = {} AND depth > 0)"
+)
+_SUBTREE = "(SELECT s.{0} FROM task_rollups AS s WHERE s.task_id = NEW.id)"
+
+
+def _shift_rollups(sign: str, where: str) -> str:
+    """
+    UPDATE сводок: прибавляет (sign = "+") или вычитает сводку поддерева NEW.id.
+    """
+    columns = ("total_time", "running", "running_since", "size")
+    assignments = ", ".join(
+        f"{column} = {column} {sign} {_SUBTREE.format(column)}" for column in columns
+    )
+    return f"UPDATE task_rollups SET {assignments} WHERE {where}; "
+
+
+TASK_TREE_TRIGGERS = (
+    "CREATE TRIGGER IF NOT EXISTS tasks_tree_insert AFTER INSERT ON tasks BEGIN "
+    "INSERT INTO task_tree (ancestor, descendant, depth) "
+    "SELECT ancestor, NEW.id, depth + 1 FROM task_tree "
+    "WHERE descendant = NEW.parent_id UNION ALL SELECT NEW.id, NEW.id, 0; "
+    "INSERT INTO task_rollups "
+    "(task_id, total_time, running, running_since, size, children) "
+    "VALUES (NEW.id, 0, 0, 0, 0, 0); "
+    "UPDATE task_rollups SET total_time = total_time + NEW.total_time, "
+    "running = running + NEW.running, "
+    "running_since = running_since + NEW.running * NEW.start_time / 1000000.0, "
+    "size = size + 1 WHERE " + _ANCESTORS.format("NEW.id") + "; "
+    "UPDATE task_rollups SET children = children + 1 WHERE task_id = NEW.parent_id; "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_tree_update "
+    "AFTER UPDATE OF total_time, running, start_time ON tasks "
+    "WHEN OLD.total_time IS NOT NEW.total_time OR OLD.running IS NOT NEW.running "
+    "OR NEW.running AND OLD.start_time IS NOT NEW.start_time BEGIN "
+    "UPDATE task_rollups SET "
+    "total_time = total_time + NEW.total_time - OLD.total_time, "
+    "running = running + NEW.running - OLD.running, "
+    "running_since = running_since "
+    "+ (NEW.running * NEW.start_time - OLD.running * OLD.start_time) / 1000000.0 "
+    "WHERE " + _ANCESTORS.format("NEW.id") + "; END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_tree_check BEFORE UPDATE OF parent_id "
+    "ON tasks WHEN NEW.parent_id IS NOT NULL "
+    "AND (NOT EXISTS (SELECT 1 FROM tasks WHERE id = NEW.parent_id) "
+    "OR EXISTS (SELECT 1 FROM task_tree "
+    "WHERE descendant = NEW.parent_id AND ancestor = NEW.id)) "
+    "BEGIN SELECT RAISE(ABORT, 'invalid task parent'); END",
+    # Перенос поддерева. Дети удаленной задачи переходят к её родителю
+    # в tasks_tree_delete, который уже исправил для них таблицу замыкания:
+    # связи со старым родителем у них нет, и триггер не срабатывает.
+    "CREATE TRIGGER IF NOT EXISTS tasks_tree_move AFTER UPDATE OF parent_id "
+    "ON tasks WHEN OLD.parent_id IS NOT NEW.parent_id "
+    "AND (OLD.parent_id IS NULL OR EXISTS (SELECT 1 FROM task_tree "
+    "WHERE descendant = NEW.id AND ancestor = OLD.parent_id)) BEGIN "
+    + _shift_rollups("-", _STRICT_ANCESTORS.format("NEW.id"))
+    + "UPDATE task_rollups SET children = children - 1 "
+    "WHERE task_id = OLD.parent_id; "
+    "DELETE FROM task_tree "
+    "WHERE descendant IN (SELECT descendant FROM task_tree WHERE ancestor = NEW.id) "
+    "AND ancestor IN "
+    "(SELECT ancestor FROM task_tree WHERE descendant = NEW.id AND depth > 0); "
+    "INSERT INTO task_tree (ancestor, descendant, depth) "
+    "SELECT a.ancestor, d.descendant, a.depth + d.depth + 1 "
+    "FROM task_tree AS a, task_tree AS d "
+    "WHERE a.descendant = NEW.parent_id AND d.ancestor = NEW.id; "
+    + _shift_rollups("+", _STRICT_ANCESTORS.format("NEW.id"))
+    + "UPDATE task_rollups SET children = children + 1 "
+    "WHERE task_id = NEW.parent_id; END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_tree_delete AFTER DELETE ON tasks BEGIN "
+    "UPDATE task_rollups SET total_time = total_time - OLD.total_time, "
+    "running = running - OLD.running, "
+    "running_since = running_since - OLD.running * OLD.start_time / 1000000.0, "
+    "size = size - 1 WHERE " + _STRICT_ANCESTORS.format("OLD.id") + "; "
+    "UPDATE task_rollups SET children = children - 1 + (SELECT s.children "
+    "FROM task_rollups AS s WHERE s.task_id = OLD.id) "
+    "WHERE task_id = OLD.parent_id; "
+    "UPDATE task_tree SET depth = depth - 1 "
+    "WHERE descendant IN "
+    "(SELECT descendant FROM task_tree WHERE ancestor = OLD.id AND depth > 0) "
+    "AND ancestor IN "
+    "(SELECT ancestor FROM task_tree WHERE descendant = OLD.id AND depth > 0); "
+    "DELETE FROM task_tree WHERE ancestor = OLD.id OR descendant = OLD.id; "
+    "DELETE FROM task_rollups WHERE task_id = OLD.id; "
+    "UPDATE tasks SET parent_id = OLD.parent_id WHERE parent_id = OLD.id; END",
+)
+
+for _trigger in (
+    TASK_CHANGE_TRIGGERS + TASK_COUNT_TRIGGERS + TASK_TREE_TRIGGERS + TASK_NAME_SEARCH
+):
+    event.listen(
+        TaskModel.__table__, "after_create", DDL(_trigger).execute_if(dialect="sqlite")
+    )
+
+for _trigger in TASK_ARCHIVE_TRIGGERS + TASK_ARCHIVE_NAME_SEARCH:
+    event.listen(
+        TaskArchiveModel.__table__,
+        "after_create",
+        DDL(_trigger).execute_if(dialect="sqlite"),
+    )
@@ -0,0 +1,595 @@
+from datetime import datetime
+from typing import Iterable, Sequence
+
+import numpy as np
+
+from model.task import Task
+
+
+class TaskStore:
+    """
+    Колоночное хранилище задач. Имена хранятся в списке и словаре имя → строка,
+    а время начала, накопленное время и флаги — в непрерывных массивах NumPy,
+    поэтому расчет времени, остановка и сортировка большого набора задач
+    выполняются одной векторной операцией без обхода объектов Task.
+
+    Номер строки задачи не меняется за время её жизни. Удаленная строка
+    помечается как неживая и попадает в список свободных строк, которые
+    занимают следующие добавленные задачи, поэтому при добавлении и удалении
+    задач массивы не растут. Представление (TaskView) удаленной задачи после
+    remove() использовать нельзя: его строка может достаться другой задаче.
+    """
+
+    def __init__(self, capacity=1024):
+        """
+        :param capacity: Начальная емкость массивов (растет по мере добавления).
+        """
+        self.__names: list[str | None] = []
+        self.__rows: dict[str, int] = {}
+        self.__start = np.zeros(capacity)
+        self.__total = np.zeros(capacity)
+        self.__running = np.zeros(capacity, dtype=bool)
+        self.__finished = np.zeros(capacity, dtype=bool)
+        self.__alive = np.zeros(capacity, dtype=bool)
+        self.__version = np.zeros(capacity, dtype=np.int64)
+        self.__budget = np.full(capacity, np.nan)
+        self.__intervals: dict[int, list[tuple[float, float]]] = {}
+        self.__free: list[int] = []
+
+    @property
+    def start_times(self) -> np.ndarray:
+        """
+        Время начала задач в секундах от начала эпохи (только для чтения).
+        """
+        return self.__column(self.__start)
+
+    @property
+    def total_times(self) -> np.ndarray:
+        """
+        Накопленное время задач в секундах (только для чтения).
+        """
+        return self.__column(self.__total)
+
+    @property
+    def running(self) -> np.ndarray:
+        return self.__column(self.__running)
+
+    @property
+    def finished(self) -> np.ndarray:
+        return self.__column(self.__finished)
+
+    @property
+    def versions(self) -> np.ndarray:
+        """
+        Версии строк задач в базе данных (только для чтения).
+        """
+        return self.__column(self.__version)
+
+    @property
+    def budgets(self) -> np.ndarray:
+        """
+        Бюджеты времени задач в секундах, NaN — бюджет не задан
+        (только для чтения).
+        """
+        return self.__column(self.__budget)
+
+    @property
+    def alive(self) -> np.ndarray:
+        """
+        Маска строк, задачи которых не удалены.
+        """
+        return self.__column(self.__alive)
+
+    def add(self, task: Task) -> "TaskView":
+        """
+        Копирует задачу в хранилище вместе с её несохраненными интервалами.
+
+        :return: Представление строки новой задачи.
+        :raises KeyError: Если задача с таким именем уже есть в хранилище.
+        """
+        row = self.extend(
+            [task.name],
+            [task.start_timestamp],
+            [task.total_time],
+            [task.running],
+            [task.finished],
+            [task.version],
+            [task.budget],
+        )[0]
+        if intervals := task.unsaved_intervals:
+            self.__intervals[row] = intervals
+        return TaskView(self, row)
+
+    def extend(
+        self,
+        names: Sequence[str],
+        start_times: Iterable[float],
+        total_times: Iterable[float],
+        running: Iterable[bool],
+        finished: Iterable[bool],
+        versions: Iterable[int] | None = None,
+        budgets: Iterable[float | None] | None = None,
+    ) -> Sequence[int]:
+        """
+        Добавляет пачку задач по колонкам. Сначала занимаются свободные строки
+        удаленных задач, остальные задачи добавляются в конец.
+
+        :param names: Имена задач
+        :param start_times: Время начала в секундах от начала эпохи
+        :param total_times: Накопленное время в секундах
+        :param running: Флаги запущенности
+        :param finished: Флаги завершенности
+        :param versions: Версии строк в базе данных (по умолчанию 0)
+        :param budgets: Бюджеты времени в секундах или None (по умолчанию не заданы)
+        :return: Номера строк добавленных задач в порядке names.
+        :raises KeyError: Если имя уже занято или повторяется в пачке.
+        """
+        count = len(names)
+        taken = [name for name in names if name in self.__rows]
+        if taken or len(set(names)) != count:
+            raise KeyError(taken[0] if taken else "duplicate name in batch")
+        reused = self.__free[len(self.__free) - min(len(self.__free), count) :]
+        del self.__free[len(self.__free) - len(reused) :]
+        first = len(self.__names)
+        self.__reserve(count - len(reused))
+        fresh = range(first, first + count - len(reused))
+        if reused:
+            rows = [*reused, *fresh]
+            index = np.array(rows, dtype=np.intp)
+            for row, name in zip(reused, names):
+                self.__names[row] = name
+            self.__names.extend(names[len(reused) :])
+        else:
+            rows = fresh
+            index = slice(fresh.start, fresh.stop)
+            self.__names.extend(names)
+        self.__start[index] = np.fromiter(start_times, float, count)
+        self.__total[index] = np.fromiter(total_times, float, count)
+        self.__running[index] = np.fromiter(running, bool, count)
+        self.__finished[index] = np.fromiter(finished, bool, count)
+        self.__alive[index] = True
+        self.__version[index] = (
+            0 if versions is None else np.fromiter(versions, np.int64, count)
+        )
+        self.__budget[index] = (
+            np.nan
+            if budgets is None
+            else np.array(list(budgets), dtype=np.float64)
+        )
+        self.__rows.update(zip(names, rows))
+        return rows
+
+    def extend_rows(self, rows: Sequence) -> Sequence[int]:
+        """
+        Добавляет пачку задач по строкам выборки из таблицы tasks
+        (время начала в микросекундах от начала эпохи).
+
+        :param rows: Строки с колонками TaskModel.columns()
+        :return: Номера строк добавленных задач.
+        """
+        if not rows:
+            return range(len(self.__names), len(self.__names))
+        names, start_us, total_times, running, finished, versions, budgets = zip(
+            *rows
+        )
+        return self.extend(
+            names,
+            np.array(start_us, dtype=np.float64) / 1_000_000,
+            total_times,
+            running,
+            finished,
+            versions,
+            budgets,
+        )
+
+    def remove(self, name: str):
+        """
+        Удаляет задачу по имени; её строка освобождается для новых задач.
+
+        :raises KeyError: Если задачи нет в хранилище.
+        """
+        row = self.__rows.pop(name)
+        self.__names[row] = None
+        self.__alive[row] = False
+        self.__intervals.pop(row, None)
+        self.__free.append(row)
+
+    def assign(self, row: int, task: Task):
+        """
+        Заменяет состояние задачи в строке row состоянием task (например,
+        перечитанным из базы данных). Несохраненные интервалы строки
+        отбрасываются.
+        """
+        self.__start[row] = task.start_timestamp
+        self.__total[row] = task.total_time
+        self.__running[row] = task.running
+        self.__finished[row] = task.finished
+        self.__version[row] = task.version
+        self.__budget[row] = _budget(task.budget)
+        self.__intervals.pop(row, None)
+
+    def set_version(self, row: int, version: int):
+        self.__version[row] = version
+
+    def set_budget(self, row: int, budget: float | None):
+        self.__budget[row] = _budget(budget)
+
+    def rename(self, row: int, name: str):
+        """
+        Переименовывает задачу в строке row.
+
+        :raises KeyError: Если имя уже занято другой задачей.
+        """
+        old_name = self.__names[row]
+        if name == old_name:
+            return
+        if name in self.__rows:
+            raise KeyError(name)
+        del self.__rows[old_name]
+        self.__rows[name] = row
+        self.__names[row] = name
+
+    def copy(self) -> "TaskStore":
+        """
+        Независимая копия хранилища без несохраненных интервалов. Колонки
+        копируются векторно, поэтому копия снимается за миллисекунды и может
+        читаться в другом потоке, пока оригинал продолжает меняться.
+        """
+        size = len(self.__names)
+        copy = TaskStore(0)
+        copy.__names = list(self.__names)
+        copy.__rows = dict(self.__rows)
+        copy.__free = list(self.__free)
+        copy.__start = self.__start[:size].copy()
+        copy.__total = self.__total[:size].copy()
+        copy.__running = self.__running[:size].copy()
+        copy.__finished = self.__finished[:size].copy()
+        copy.__alive = self.__alive[:size].copy()
+        copy.__version = self.__version[:size].copy()
+        copy.__budget = self.__budget[:size].copy()
+        return copy
+
+    def name_of(self, row: int) -> str | None:
+        return self.__names[row]
+
+    def row_of(self, name: str) -> int:
+        return self.__rows[name]
+
+    # Скалярные чтения строки для TaskView берут значение прямо из массива
+    # (ndarray.item), без создания представления колонки.
+
+    def start_of(self, row: int) -> float:
+        return self.__start.item(row)
+
+    def total_of(self, row: int) -> float:
+        return self.__total.item(row)
+
+    def running_of(self, row: int) -> bool:
+        return self.__running.item(row)
+
+    def finished_of(self, row: int) -> bool:
+        return self.__finished.item(row)
+
+    def version_of(self, row: int) -> int:
+        return self.__version.item(row)
+
+    def budget_of(self, row: int) -> float | None:
+        budget = self.__budget.item(row)
+        return None if budget != budget else budget
+
+    def elapsed_of(self, row: int, now: float | None = None) -> float:
+        """
+        Общее время задачи строки row на момент now (как Task.elapsed_time).
+        """
+        total = self.__total.item(row)
+        if self.__running.item(row):
+            now = Task.clock() if now is None else now
+            return total + (now - self.__start.item(row))
+        return total
+
+    def get(self, name: str) -> "TaskView | None":
+        row = self.__rows.get(name)
+        return None if row is None else TaskView(self, row)
+
+    def views(self, rows: Iterable[int] | None = None) -> list["TaskView"]:
+        """
+        Представления строк rows (по умолчанию всех живых задач).
+        """
+        if rows is None:
+            rows = self.__rows.values()
+        return [TaskView(self, int(row)) for row in rows]
+
+    def select(self, rows: np.ndarray) -> "TaskList":
+        """
+        Последовательность задач в строках rows, например результат sort().
+        """
+        return TaskList(self, rows)
+
+    def elapsed(self, now: float | None = None) -> np.ndarray:
+        """
+        Общее время всех задач на момент now одной векторной операцией.
+
+        :param now: Момент расчета (по умолчанию Task.clock())
+        :return: Массив времени в секундах по номерам строк.
+        """
+        now = Task.clock() if now is None else now
+        size = len(self.__names)
+        running = self.__running[:size]
+        return self.__total[:size] + np.where(
+            running, now - self.__start[:size], 0.0
+        )
+
+    def mask(
+        self,
+        finished: bool | None = None,
+        running: bool | None = None,
+        min_elapsed: float | None = None,
+        now: float | None = None,
+    ) -> np.ndarray:
+        """
+        Маска живых задач, удовлетворяющих фильтрам.
+
+        :param finished: Фильтр по завершенности; None — без фильтра.
+        :param running: Фильтр по запущенности; None — без фильтра.
+        :param min_elapsed: Минимальное общее время в секундах.
+        :param now: Момент расчета времени для min_elapsed.
+        """
+        result = self.alive.copy()
+        if finished is not None:
+            result &= self.finished == finished
+        if running is not None:
+            result &= self.running == running
+        if min_elapsed is not None:
+            result &= self.elapsed(now) >= min_elapsed
+        return result
+
+    def sort(
+        self,
+        mask: np.ndarray | None = None,
+        by="elapsed",
+        descending=False,
+        now: float | None = None,
+    ) -> np.ndarray:
+        """
+        Сортирует строки задач.
+
+        :param mask: Какие строки сортировать (по умолчанию все живые).
+        :param by: "elapsed" — по общему времени, "name" — по имени.
+        :param descending: Порядок по убыванию.
+        :param now: Момент расчета времени для by="elapsed".
+        :return: Номера строк в порядке сортировки.
+        """
+        rows = np.flatnonzero(self.alive if mask is None else mask)
+        if by == "elapsed":
+            rows = rows[np.argsort(self.elapsed(now)[rows], kind="stable")]
+        elif by == "name":
+            names = self.__names
+            rows = np.array(sorted(rows, key=names.__getitem__), dtype=np.intp)
+        else:
+            raise ValueError(f"unknown sort key: {by}")
+        return rows[::-1] if descending else rows
+
+    def stop(self, rows, now: float | None = None) -> np.ndarray:
+        """
+        Останавливает запущенные задачи в строках rows и запоминает закрытые
+        интервалы до сохранения в базе данных.
+
+        :param rows: Маска или номера строк.
+        :param now: Момент остановки (по умолчанию Task.clock())
+        :return: Номера фактически остановленных строк.
+        """
+        now = Task.clock() if now is None else now
+        rows = self.__rows_of(rows)
+        rows = rows[self.__running[rows] & self.__alive[rows]]
+        starts = self.__start[rows]
+        self.__total[rows] += now - starts
+        self.__running[rows] = False
+        for row, start in zip(rows.tolist(), starts.tolist()):
+            self.__intervals.setdefault(row, []).append((start, now))
+        return rows
+
+    def resume(self, rows, now: float | None = None) -> np.ndarray:
+        """
+        Возобновляет остановленные задачи в строках rows.
+
+        :param rows: Маска или номера строк.
+        :param now: Момент возобновления (по умолчанию Task.clock())
+        :return: Номера фактически возобновленных строк.
+        """
+        now = Task.clock() if now is None else now
+        rows = self.__rows_of(rows)
+        rows = rows[~self.__running[rows] & self.__alive[rows]]
+        self.__start[rows] = now
+        self.__running[rows] = True
+        return rows
+
+    def finish(self, rows, now: float | None = None) -> np.ndarray:
+        """
+        Завершает задачи в строках rows, останавливая запущенные.
+
+        :param rows: Маска или номера строк.
+        :param now: Момент завершения (по умолчанию Task.clock())
+        :return: Номера завершенных строк.
+        """
+        rows = self.__rows_of(rows)
+        rows = rows[self.__alive[rows]]
+        self.__finished[rows] = True
+        self.stop(rows, now)
+        return rows
+
+    def unsaved_intervals(self, row: int) -> list[tuple[float, float]]:
+        return list(self.__intervals.get(row, ()))
+
+    def mark_intervals_saved(self, row: int, count: int):
+        intervals = self.__intervals.get(row)
+        if intervals is not None:
+            del intervals[:count]
+            if not intervals:
+                del self.__intervals[row]
+
+    def __len__(self) -> int:
+        return len(self.__rows)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.__rows
+
+    def __rows_of(self, rows) -> np.ndarray:
+        """
+        Приводит маску или номера строк к массиву номеров строк.
+        """
+        rows = np.asarray(rows)
+        if rows.dtype == bool:
+            return np.flatnonzero(rows)
+        return rows.astype(np.intp, copy=False).reshape(-1)
+
+    def __column(self, column: np.ndarray) -> np.ndarray:
+        """
+        Представление заполненной части колонки, защищенное от записи.
+        """
+        view = column[: len(self.__names)]
+        view.flags.writeable = False
+        return view
+
+    def __reserve(self, count: int):
+        """
+        Увеличивает емкость массивов вдвое, если в них не помещается count строк.
+        """
+        needed = len(self.__names) + count
+        capacity = len(self.__start)
+        if needed <= capacity:
+            return
+        capacity = max(capacity * 2, needed)
+        self.__start = _grow(self.__start, capacity)
+        self.__total = _grow(self.__total, capacity)
+        self.__running = _grow(self.__running, capacity)
+        self.__finished = _grow(self.__finished, capacity)
+        self.__alive = _grow(self.__alive, capacity)
+        self.__version = _grow(self.__version, capacity)
+        self.__budget = _grow(self.__budget, capacity, np.nan)
+
+
+def _grow(column: np.ndarray, capacity: int, fill=0) -> np.ndarray:
+    grown = np.full(capacity, fill, dtype=column.dtype)
+    grown[: len(column)] = column
+    return grown
+
+
+def _budget(budget: float | None) -> float:
+    return np.nan if budget is None else budget
+
+
+class TaskView:
+    """
+    Легковесное представление строки TaskStore с интерфейсом Task: все
+    чтения и изменения идут напрямую в колонки хранилища.
+    """
+
+    __slots__ = ("__store", "__row")
+
+    def __init__(self, store: TaskStore, row: int):
+        self.__store = store
+        self.__row = row
+
+    @property
+    def row(self) -> int:
+        return self.__row
+
+    @property
+    def name(self) -> str:
+        return self.__store.name_of(self.__row)
+
+    @name.setter
+    def name(self, name: str):
+        self.__store.rename(self.__row, name)
+
+    @property
+    def version(self) -> int:
+        return self.__store.version_of(self.__row)
+
+    @version.setter
+    def version(self, version: int):
+        self.__store.set_version(self.__row, version)
+
+    @property
+    def budget(self) -> float | None:
+        return self.__store.budget_of(self.__row)
+
+    @budget.setter
+    def budget(self, budget: float | None):
+        self.__store.set_budget(self.__row, budget)
+
+    @property
+    def start_time(self) -> datetime:
+        return datetime.fromtimestamp(self.start_timestamp)
+
+    @property
+    def start_timestamp(self) -> float:
+        return self.__store.start_of(self.__row)
+
+    @property
+    def total_time(self) -> float:
+        return self.__store.total_of(self.__row)
+
+    @property
+    def running(self) -> bool:
+        return self.__store.running_of(self.__row)
+
+    @property
+    def finished(self) -> bool:
+        return self.__store.finished_of(self.__row)
+
+    @property
+    def unsaved_intervals(self) -> list[tuple[float, float]]:
+        return self.__store.unsaved_intervals(self.__row)
+
+    def mark_intervals_saved(self, count: int):
+        self.__store.mark_intervals_saved(self.__row, count)
+
+    def stop(self, now: float | None = None):
+        self.__store.stop([self.__row], now)
+
+    def finish(self, now: float | None = None):
+        self.__store.finish([self.__row], now)
+
+    def resume(self, now: float | None = None):
+        self.__store.resume([self.__row], now)
+
+    def elapsed_time(self, now: float | None = None) -> float:
+        return self.__store.elapsed_of(self.__row, now)
+
+    def __str__(self):
+        status = "Running" if self.running else "Stopped"
+        elapsed = self.elapsed_time()
+        return (
+            f"Task: {self.name}, Status: {status}, Time Elapsed: {elapsed:.2f} seconds"
+        )
+
+
+class TaskList(Sequence):
+    """
+    Последовательность задач хранилища в заданном порядке строк.
+    Подходит для отрисовки таблицы без создания объектов для всех строк:
+    представление создается только при обращении к элементу.
+    """
+
+    def __init__(self, store: TaskStore, rows: np.ndarray):
+        self.__store = store
+        self.__rows = np.asarray(rows, dtype=np.intp)
+
+    @property
+    def rows(self) -> np.ndarray:
+        return self.__rows
+
+    def elapsed(self, now: float | None = None) -> np.ndarray:
+        """
+        Общее время задач последовательности на момент now.
+        """
+        return self.__store.elapsed(now)[self.__rows]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return TaskList(self.__store, self.__rows[index])
+        return TaskView(self.__store, int(self.__rows[index]))
+
+    def __len__(self) -> int:
+        return len(self.__rows)
@@ -0,0 +1,151 @@
+from typing import NamedTuple
+
+from model.task import Task
+
+
+class Rollup(NamedTuple):
+    """
+    Сводка поддерева задачи (сама задача и все её потомки). Время запущенных
+    задач растет, поэтому вместо него хранится сумма моментов их начала
+    running_since, и текущее время поддерева считается elapsed_time()
+    без обхода потомков.
+    """
+
+    total_time: float
+    running: int
+    running_since: float
+    size: int
+    children: int
+
+    def elapsed_time(self, now=None) -> float:
+        """
+        Общее время поддерева на момент now (по умолчанию Task.clock()).
+        """
+        if not self.running:
+            return self.total_time
+        now = Task.clock() if now is None else now
+        return self.total_time + self.running * now - self.running_since
+
+
+def own_rollup(task) -> tuple[float, int, float]:
+    """
+    Вклад одной задачи в сводку: (total_time, running, running_since).
+    """
+    running = int(task.running)
+    return task.total_time, running, task.start_timestamp * running
+
+
+class TaskTree:
+    """
+    Иерархия задач в памяти для хранилищ без SQL: ссылка на родителя
+    и множество детей каждой задачи, а также сводки поддеревьев (Rollup).
+    Изменение задачи, удаление и перенос поддерева обновляют сводки только
+    у предков, то есть за O(глубины); чтение сводки — O(1).
+
+    Ключ задачи — её id, None обозначает корень иерархии.
+    """
+
+    def __init__(self):
+        self.__parents: dict[int, int | None] = {}
+        self.__children: dict[int | None, set] = {None: set()}
+        self.__own: dict[int, tuple[float, int, float]] = {}
+        self.__rollups: dict[int, list] = {}
+
+    def clear(self):
+        self.__parents.clear()
+        self.__children.clear()
+        self.__children[None] = set()
+        self.__own.clear()
+        self.__rollups.clear()
+
+    def add(self, key: int, task: Task):
+        """
+        Добавляет задачу в корень иерархии.
+        """
+        own = self.__own[key] = own_rollup(task)
+        self.__parents[key] = None
+        self.__children[None].add(key)
+        self.__rollups[key] = [*own, 1, 0]
+
+    def update(self, key: int, task: Task):
+        """
+        Учитывает новое состояние задачи в сводках её и предков.
+        """
+        own = own_rollup(task)
+        previous = self.__own[key]
+        if own != previous:
+            self.__own[key] = own
+            self.__add(key, [new - old for new, old in zip(own, previous)] + [0])
+
+    def move(self, key: int, parent: int | None):
+        """
+        Переносит задачу вместе с поддеревом к новому родителю.
+
+        :raises ValueError: Если parent — сама задача или её потомок.
+        """
+        if parent is not None and self.contains(key, parent):
+            raise ValueError(f"task tree cycle: {key!r} -> {parent!r}")
+        previous = self.__parents[key]
+        if previous == parent:
+            return
+        subtree = self.__rollups[key][:4]
+        self.__children[previous].discard(key)
+        if previous is not None:
+            self.__add(previous, [-value for value in subtree])
+            self.__rollups[previous][4] -= 1
+        self.__parents[key] = parent
+        self.__children.setdefault(parent, set()).add(key)
+        if parent is not None:
+            self.__add(parent, subtree)
+            self.__rollups[parent][4] += 1
+
+    def remove(self, key: int):
+        """
+        Удаляет задачу; её дети переходят к её родителю.
+        """
+        parent = self.__parents.pop(key)
+        siblings = self.__children[parent]
+        siblings.discard(key)
+        children = self.__children.pop(key, set())
+        for child in children:
+            self.__parents[child] = parent
+        siblings.update(children)
+        del self.__rollups[key]
+        total_time, running, running_since = self.__own.pop(key)
+        if parent is not None:
+            self.__rollups[parent][4] += len(children) - 1
+            self.__add(parent, [-total_time, -running, -running_since, -1])
+
+    def parent(self, key: int) -> int | None:
+        return self.__parents.get(key)
+
+    def children(self, key: int | None) -> set:
+        """
+        Ключи детей задачи (для None — корневых задач).
+        """
+        return set(self.__children.get(key, ()))
+
+    def rollup(self, key: int) -> Rollup | None:
+        values = self.__rollups.get(key)
+        return Rollup(*values) if values is not None else None
+
+    def contains(self, ancestor: int, key: int) -> bool:
+        """
+        Входит ли задача key в поддерево ancestor (в том числе совпадает с ней).
+        """
+        while key is not None:
+            if key == ancestor:
+                return True
+            key = self.__parents[key]
+        return False
+
+    def __add(self, key: int | None, delta: list):
+        """
+        Прибавляет delta (total_time, running, running_since, size) к сводкам
+        задачи key и всех её предков.
+        """
+        while key is not None:
+            rollup = self.__rollups[key]
+            for index, value in enumerate(delta):
+                rollup[index] += value
+            key = self.__parents[key]
@@ -0,0 +1,164 @@
+from collections.abc import Sequence
+from typing import Callable
+
+from model.task import Task
+from model.task_tree import Rollup
+
+INDENT = "  "
+
+
+class TreeRow:
+    """
+    Строка дерева задач: задача, сводка её поддерева и глубина. Для таблицы
+    строка ведет себя как задача: время и признак активности берутся из
+    сводки, поэтому у проекта видно время и количество запущенных задач
+    всего поддерева.
+    """
+
+    __slots__ = ("task", "rollup", "depth", "expanded")
+
+    def __init__(self, task: Task, rollup: Rollup, depth: int):
+        """
+        :param task: Задача
+        :param rollup: Сводка поддерева задачи
+        :param depth: Глубина строки (0 — корневая задача)
+        """
+        self.task = task
+        self.rollup = rollup
+        self.depth = depth
+        self.expanded = False
+
+    @property
+    def name(self) -> str:
+        return self.task.name
+
+    @property
+    def running(self) -> int:
+        """
+        Количество запущенных задач поддерева.
+        """
+        return self.rollup.running
+
+    @property
+    def label(self) -> str:
+        """
+        Имя с отступом по глубине и отметкой раскрытия для задач с детьми.
+        """
+        if not self.rollup.children:
+            marker = INDENT
+        else:
+            marker = "▾ " if self.expanded else "▸ "
+        return INDENT * self.depth + marker + self.task.name
+
+    def elapsed_time(self, now=None) -> float:
+        return self.rollup.elapsed_time(now)
+
+
+class TreeList(Sequence):
+    """
+    Дерево задач в виде списка видимых строк (TreeRow) для таблицы.
+
+    Корневые задачи читаются при первом обращении, дети — только при
+    раскрытии узла, поэтому в памяти лишь раскрытые поддеревья, а время узла
+    берется из сводки (Rollup) без обхода потомков. reset() забывает строки,
+    но помнит раскрытые узлы: следующее обращение перечитает корни и дети
+    только раскрытых узлов.
+
+    Функция чтения может не отдавать детей сразу (чтение выполняется
+    в другом потоке) и возвращать None: пока корни не прочитаны, дерево
+    пусто (loading), а раскрытый узел показывается без детей; после прихода
+    результата владелец вызывает reset(), и дерево строится заново.
+    """
+
+    def __init__(
+        self,
+        fetch_children: Callable[[str | None], list[tuple[Task, Rollup]] | None],
+    ):
+        """
+        :param fetch_children: Функция (имя родителя или None для корня) ->
+            пары (задача, сводка), как Storage.fetch_children, или None,
+            если дети еще не прочитаны.
+        """
+        self.__fetch_children = fetch_children
+        self.__expanded: set[str] = set()
+        self.__rows: list[TreeRow] | None = None
+
+    def reset(self):
+        """
+        Забывает загруженные строки (после изменения задач).
+        """
+        self.__rows = None
+
+    @property
+    def loading(self) -> bool:
+        """
+        Корневые задачи еще не прочитаны.
+        """
+        self.__load()
+        return self.__rows is None
+
+    def __len__(self) -> int:
+        return len(self.__load())
+
+    def __getitem__(self, index):
+        return self.__load()[index]
+
+    def expand(self, index: int) -> bool:
+        """
+        Раскрывает строку index, читая её детей.
+
+        :return: True, если строка раскрыта; False, если детей нет или она
+            уже раскрыта.
+        """
+        rows = self.__load()
+        row = rows[index]
+        if row.expanded or not row.rollup.children:
+            return False
+        row.expanded = True
+        self.__expanded.add(row.name)
+        rows[index + 1 : index + 1] = self.__rows_of(row.name, row.depth + 1) or []
+        return True
+
+    def collapse(self, index: int) -> int:
+        """
+        Сворачивает раскрытую строку index; для свернутой строки
+        выбирается её родитель (корневая строка остается активной).
+
+        :return: Индекс строки, которая должна стать активной.
+        """
+        rows = self.__load()
+        row = rows[index]
+        if not row.expanded:
+            while row.depth and rows[index].depth >= row.depth:
+                index -= 1
+            return index
+        row.expanded = False
+        self.__expanded.discard(row.name)
+        end = index + 1
+        while end < len(rows) and rows[end].depth > row.depth:
+            self.__expanded.discard(rows[end].name)
+            end += 1
+        del rows[index + 1 : end]
+        return index
+
+    def __load(self) -> list[TreeRow]:
+        if self.__rows is None:
+            self.__rows = self.__rows_of(None, 0)
+        return self.__rows or []
+
+    def __rows_of(self, parent_name: str | None, depth: int) -> list[TreeRow] | None:
+        """
+        Строки детей parent_name вместе с поддеревьями раскрытых из них
+        или None, если дети parent_name еще не прочитаны.
+        """
+        children = self.__fetch_children(parent_name)
+        if children is None:
+            return None
+        rows = []
+        for task, rollup in children:
+            row = TreeRow(task, rollup, depth)
+            rows.append(row)
+            if rollup.children and task.name in self.__expanded:
+                row.expanded = True
+                rows.extend(self.__rows_of(task.name, depth + 1) or [])
+        return rows
@@ -0,0 +1,38 @@
+import asyncio
+import tempfile
+import threading
+
+import pytest
+
+from model.daemon import TrackerDaemon
+from model.storage import DAEMON_SCHEME
+
+
+@pytest.fixture
+def start_daemon():
+    """
+    Фикстура запуска демона над хранилищем в отдельном потоке; возвращает
+    URL для подключения и объект демона. После теста демоны останавливаются,
+    а их хранилища закрываются.
+    """
+    started = []
+    directory = tempfile.TemporaryDirectory(prefix="taskd-")
+
+    def start(storage, **options):
+        path = f"{directory.name}/{len(started)}.sock"
+        daemon = TrackerDaemon(storage, path, **options)
+        ready = threading.Event()
+        thread = threading.Thread(
+            target=asyncio.run, args=(daemon.serve(ready),), daemon=True
+        )
+        thread.start()
+        assert ready.wait(5)
+        started.append((daemon, thread, storage))
+        return f"{DAEMON_SCHEME}:///{path}", daemon
+
+    yield start
+    for daemon, thread, storage in started:
+        daemon.stop()
+        thread.join(5)
+        storage.close()
+    directory.cleanup()
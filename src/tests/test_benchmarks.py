@@ -0,0 +1,120 @@
+import curses
+import io
+import json
+
+import pytest
+
+from benchmarks.fake_curses import FakeWindow, fake_curses
+from benchmarks.replay import replay
+from benchmarks.suite import compare, make_tasks, run_suite
+from controller.recorder import RecordingWindow, read_trace
+from model.database import Database
+from view.console_view import draw_table
+
+
+def results(**seconds):
+    return {
+        "meta": {},
+        "results": {name: {"seconds": value} for name, value in seconds.items()},
+    }
+
+
+def test_compare_statuses():
+    """Тест сравнения с базовой линией: замедление сверх порога — регрессия."""
+    rows = compare(
+        results(slow=1.0, fast=1.0, same=1.0, removed=1.0),
+        results(slow=1.2, fast=0.5, same=1.05, added=1.0),
+        threshold=0.1,
+    )
+    assert {row["name"]: row["status"] for row in rows} == {
+        "fast": "improvement",
+        "same": "ok",
+        "slow": "regression",
+    }
+
+
+def test_fake_window_draw_table():
+    """Тест отрисовки таблицы задач в окне curses, эмулируемом в памяти."""
+    window = FakeWindow(lines=20, columns=80)
+    with fake_curses():
+        draw_table(window, list(make_tasks(3)), 0, False)
+    screen = "\n".join(window.line(y) for y in range(window.lines))
+    assert "task-0000001" in screen
+    assert window.writes > 0
+
+
+def test_fake_window_bounds():
+    """Тест ошибки curses при выводе за пределы окна."""
+    window = FakeWindow(lines=2, columns=10)
+    with pytest.raises(curses.error):
+        window.addstr(5, 0, "x")
+
+
+def test_run_suite_smoke():
+    """Тест выполнения минимального набора замеров."""
+    suite = run_suite(sizes=(100,), backends=("memory",), repeat=1)
+    assert suite["meta"]["sqlite"]
+    assert "db.update_task[memory,100]" in suite["results"]
+    assert "render.table_view_tick[100]" in suite["results"]
+    assert "startup.snapshot[100]" in suite["results"]
+    assert "tree.rollup[memory,100]" in suite["results"]
+    assert "replay.frame[scroll_and_toggle]" in suite["results"]
+    assert all(result["seconds"] > 0 for result in suite["results"].values())
+
+
+class KeyWindow(FakeWindow):
+    """
+    FakeWindow с заранее заданным вводом.
+    """
+
+    def __init__(self, keys, text=b""):
+        super().__init__()
+        self.keys = list(keys)
+        self.text = text
+
+    def getch(self):
+        return self.keys.pop(0) if self.keys else -1
+
+    def getstr(self, y, x, limit):
+        return self.text
+
+
+def test_recording_window_round_trip():
+    """Тест записи ввода сессии: пустые опросы getch() не попадают в трассу."""
+    file = io.StringIO()
+    window = RecordingWindow(KeyWindow([-1, ord("s"), -1]), file)
+    assert [window.getch() for _ in range(3)] == [-1, ord("s"), -1]
+    assert window.getstr(4, 1, 40) == b""
+    assert window.getmaxyx() == (50, 120)
+    file.seek(0)
+    header, events = read_trace(file)
+    assert (header["lines"], header["columns"]) == (50, 120)
+    assert [event.get("key", event.get("str")) for event in events] == [ord("s"), ""]
+    with pytest.raises(ValueError):
+        read_trace(io.StringIO('{"t": 0, "key": 1}\n'))
+
+
+def test_replay_session(tmp_path):
+    """Тест воспроизведения сессии: ввод по трассе, кадры по таймеру и счетчики."""
+    trace = tmp_path / "session.jsonl"
+    records = [
+        {"version": 1, "lines": 30, "columns": 100, "start": 1_700_000_000.0},
+        {"t": 0.5, "key": ord("e")},
+        {"t": 1.0, "str": "Новая"},
+        {"t": 3.2, "key": ord("s")},
+        {"t": 4.0, "key": ord("q")},
+    ]
+    trace.write_text("".join(json.dumps(record) + "\n" for record in records))
+    db_url = f"sqlite:///{tmp_path / 'tasks.db'}"
+    report = replay(str(trace), db_url)
+    summary = report["summary"]
+    assert (summary["keys"], summary["skipped"], summary["duration"]) == (4, 0, 4.0)
+    assert summary["frames"] > 4
+    assert summary["db_calls"] >= 2 and summary["sql"] > 0
+    assert summary["bytes"] > 0
+    assert report["frames"][0]["bytes"] > report["frames"][-1]["bytes"]
+    database = Database(db_url)
+    task = database.get_task_by_name("Новая")
+    assert not task.running
+    assert task.total_time == pytest.approx(2.2)
+    database.close()
@@ -0,0 +1,201 @@
+import io
+import json
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+from cli import CommandError, run, update
+from model.database import Database
+from model.storage import LOG_SCHEME, open_storage
+from model.task import Task, to_epoch_us
+from model.task_model import TaskIntervalModel
+
+
+@pytest.fixture
+def sqlite_url(tmp_path):
+    """Фикстура URL временной файловой базы данных."""
+    return f"sqlite:///{tmp_path / 'tasks.db'}"
+
+
+@pytest.fixture(params=["sqlite", LOG_SCHEME])
+def db_url(request, tmp_path, sqlite_url):
+    """Фикстура URL временного хранилища: база данных или журнал операций."""
+    if request.param == LOG_SCHEME:
+        return f"{LOG_SCHEME}:///{tmp_path / 'tasks.log'}"
+    return sqlite_url
+
+
+def call(capsys, db_url, *argv):
+    code = run(["--db", db_url, *argv])
+    lines = capsys.readouterr().out.splitlines()
+    return code, [json.loads(line) for line in lines]
+
+
+def test_cli_add_and_ls(capsys, db_url):
+    """Тест добавления задачи и вывода списка."""
+    code, [result] = call(capsys, db_url, "add", "A")
+    assert code == 0
+    assert result["task"]["running"] is True
+
+    code, [result] = call(capsys, db_url, "ls")
+    assert [task["name"] for task in result["tasks"]] == ["A"]
+
+
+def test_cli_errors(capsys, db_url):
+    """Тест ошибок команд: дубликат имени и несуществующая задача."""
+    call(capsys, db_url, "add", "A")
+    code, [result] = call(capsys, db_url, "add", "A")
+    assert code == 1
+    assert result == {"ok": False, "error": "task already exists: A"}
+
+    code, [result] = call(capsys, db_url, "stop", "Missing")
+    assert code == 1
+
+
+def test_cli_update_reports_missing_task(db_url):
+    """Тест: изменение задачи, удаленной после чтения, — ошибка команды."""
+    database = open_storage(db_url)
+    try:
+        with pytest.raises(CommandError, match="task not found: A"):
+            update(database, Task("A"))
+    finally:
+        database.close()
+
+
+def test_cli_lifecycle(capsys, db_url):
+    """Тест остановки, переименования, завершения и удаления задачи."""
+    call(capsys, db_url, "add", "A")
+    _, [result] = call(capsys, db_url, "stop", "A")
+    assert result["task"]["running"] is False
+    call(capsys, db_url, "rename", "A", "B")
+    call(capsys, db_url, "finish", "B")
+    _, [result] = call(capsys, db_url, "ls", "--finished")
+    assert [task["name"] for task in result["tasks"]] == ["B"]
+    code, [result] = call(capsys, db_url, "rm", "B")
+    assert code == 0
+
+
+def test_cli_batch_single_transaction(capsys, monkeypatch, db_url):
+    """Тест пакетного режима: все команды применяются одной транзакцией."""
+    commands = "add A\nadd 'B C' --stopped\n\nstop A\n"
+    monkeypatch.setattr("sys.stdin", io.StringIO(commands))
+    code, results = call(capsys, db_url, "--batch")
+    assert code == 0
+    assert [result["command"] for result in results] == ["add", "add", "stop"]
+
+    _, [result] = call(capsys, db_url, "status")
+    assert result["running"] == []
+
+
+def test_cli_batch_rolls_back_on_error(capsys, monkeypatch, db_url):
+    """Тест отката всего пакета при ошибке в одной из команд."""
+    monkeypatch.setattr("sys.stdin", io.StringIO("add A\nstop Missing\n"))
+    code, [result] = call(capsys, db_url, "--batch")
+    assert code == 1
+    assert result["error"] == "line 2: task not found: Missing"
+
+    _, [result] = call(capsys, db_url, "ls")
+    assert result["tasks"] == []
+
+
+def test_cli_archive(capsys, sqlite_url):
+    """Тест переноса завершенных задач в архив: задача остается в списке завершенных."""
+    call(capsys, sqlite_url, "add", "A")
+    call(capsys, sqlite_url, "finish", "A")
+    _, [result] = call(capsys, sqlite_url, "archive", "--days", "1")
+    assert result["archived"] == 0
+    _, [result] = call(capsys, sqlite_url, "archive", "--days", "0")
+    assert result["archived"] == 1
+    _, [result] = call(capsys, sqlite_url, "ls", "--finished")
+    assert [task["name"] for task in result["tasks"]] == ["A"]
+    code, _ = call(capsys, sqlite_url, "rm", "A")
+    assert code == 0
+
+
+def test_cli_report(capsys, sqlite_url):
+    """Тест отчета по периодам: JSON по умолчанию и ячейки отчета в CSV."""
+    call(capsys, sqlite_url, "add", "A", "--stopped")
+    database = Database(db_url=sqlite_url)
+    with database.Session() as session:
+        session.add(
+            TaskIntervalModel(
+                task_id=1,
+                start_time=to_epoch_us(datetime(2024, 5, 1, 22)),
+                end_time=to_epoch_us(datetime(2024, 5, 2, 2)),
+            )
+        )
+        session.commit()
+    database.close()
+
+    argv = ["report", "--since", "2024-05-01", "--until", "2024-05-03"]
+    _, [result] = call(capsys, sqlite_url, *argv)
+    assert result["tasks"] == [{"name": "A", "total_time": 14400.0}]
+    assert [period["total_time"] for period in result["periods"]] == [7200, 7200]
+
+    assert run(["--db", sqlite_url, *argv, "--csv"]) == 0
+    assert capsys.readouterr().out.splitlines() == [
+        "task,period_start,seconds",
+        "A,2024-05-01T00:00:00,7200.0",
+        "A,2024-05-02T00:00:00,7200.0",
+    ]
+    code, _ = call(capsys, sqlite_url, "report", "--since", "2024-05-03", *argv[3:])
+    assert code == 1
+
+
+def test_cli_budget_and_status(capsys, db_url):
+    """Тест бюджета времени: задачи сверх бюджета и ближайший срок в status."""
+    call(capsys, db_url, "add", "A")
+    call(capsys, db_url, "add", "B")
+    _, [result] = call(capsys, db_url, "budget", "A", "0.0000001")
+    assert result["task"]["budget"] == pytest.approx(0.00036)
+    call(capsys, db_url, "budget", "B", "2")
+    code, [result] = call(capsys, db_url, "budget", "B", "-1")
+    assert code == 1
+
+    _, [result] = call(capsys, db_url, "status")
+    assert result["over_budget"] == ["A"]
+    assert result["next_alert"] is not None
+
+    call(capsys, db_url, "budget", "B")
+    _, [result] = call(capsys, db_url, "status")
+    assert result["next_alert"] is None
+
+
+def test_cli_tree(capsys, db_url):
+    """Тест проектов: add --parent, перенос задачи и вывод дерева со сводками."""
+    call(capsys, db_url, "add", "project", "--stopped")
+    call(capsys, db_url, "add", "design", "--parent", "project")
+    call(capsys, db_url, "add", "review", "--stopped")
+    code, [result] = call(capsys, db_url, "add", "orphan", "--parent", "missing")
+    assert code == 1
+    code, [result] = call(capsys, db_url, "move", "review", "design")
+    assert code == 0
+    code, [result] = call(capsys, db_url, "move", "project", "review")
+    assert code == 1
+
+    _, [result] = call(capsys, db_url, "tree")
+    [project] = result["tree"]
+    assert project["rollup"]["size"] == 3 and project["rollup"]["running"] == 1
+    [design] = project["children"]
+    assert [child["task"]["name"] for child in design["children"]] == ["review"]
+    _, [result] = call(capsys, db_url, "tree", "design", "--depth", "1")
+    assert "children" not in result["tree"][0]
+    _, [result] = call(capsys, db_url, "ls")
+    assert "orphan" not in [task["name"] for task in result["tasks"]]
+
+
+def test_cli_import_skips_numpy():
+    """Тест: импорт CLI, клиента демона и хранилищ не загружает numpy."""
+    subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, cli, model.daemon, model.database, model.log_storage; "
+            "assert 'numpy' not in sys.modules",
+        ],
+        cwd=Path(__file__).resolve().parent.parent,
+        check=True,
+    )
@@ -0,0 +1,26 @@
+from view.console_view import format_elapsed_time, scroll_viewport
+
+
+def test_scroll_viewport_fits_on_screen():
+    """Тест: если все строки помещаются, прокрутки нет."""
+    assert scroll_viewport(5, 3, 10, 8) == 0
+
+
+def test_scroll_viewport_follows_active_field():
+    """Тест прокрутки видимой области за активной строкой."""
+    assert scroll_viewport(0, 12, 10, 100) == 3
+    assert scroll_viewport(3, 2, 10, 100) == 2
+    assert scroll_viewport(3, 7, 10, 100) == 3
+
+
+def test_scroll_viewport_wraps_to_end():
+    """Тест перехода с первой строки на последнюю."""
+    assert scroll_viewport(0, 99, 10, 100) == 90
+
+
+def test_format_elapsed_time():
+    """Тест форматирования времени."""
+    assert format_elapsed_time(59.9) == "59сек"
+    assert format_elapsed_time(61) == "1мин 1сек"
+    assert format_elapsed_time(3661) == "1ч 1мин 1сек"
+    assert format_elapsed_time(90061) == "1д 1ч 1мин"
@@ -0,0 +1,193 @@
+import asyncio
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+from cli import run
+from model.daemon import TrackerDaemon
+from model.database import Database
+from model.remote_storage import RemoteStorage
+from model.storage import ConflictError, open_storage, url_path
+from model.task import Task
+
+
+@pytest.fixture
+def database(tmp_path):
+    """Фикстура файловой базы данных, которой владеет демон."""
+    return Database(f"sqlite:///{tmp_path / 'tasks.db'}")
+
+
+@pytest.fixture
+def clients():
+    """Фикстура подключения клиентов демона; закрывает их после теста."""
+    opened = []
+
+    def connect(url):
+        opened.append(open_storage(url))
+        return opened[-1]
+
+    yield connect
+    for client in opened:
+        client.close()
+
+
+def test_concurrent_writes_share_transaction(database, start_daemon, clients):
+    """Тест: записи, накопившиеся за время транзакции, выполняются одной пачкой."""
+    url, daemon = start_daemon(database)
+    holder = clients(url)
+    writers = [clients(url) for _ in range(8)]
+    results = []
+    with holder.transaction():
+        threads = [
+            threading.Thread(
+                target=lambda c=client, i=i: results.append(c.add_task(Task(f"T{i}")))
+            )
+            for i, client in enumerate(writers)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.2)
+    for thread in threads:
+        thread.join()
+    assert results == [True] * 8
+    assert daemon.batches == 1
+    assert len(holder.fetch_all_tasks()) == 8
+
+
+def test_failed_write_does_not_affect_batch(database, start_daemon, clients):
+    """Тест: конфликт версий одного клиента не откатывает записи других."""
+    url, _ = start_daemon(database)
+    first, second = clients(url), clients(url)
+    first.add_task(Task("A", start_time=1000.0))
+    stale = first.get_task_by_name("A")
+    fresh = second.get_task_by_name("A")
+    fresh.stop(now=1100.0)
+    assert second.update_task("A", fresh)
+    stale.stop(now=1010.0)
+    with pytest.raises(ConflictError):
+        first.update_task("A", stale)
+    assert first.add_task(Task("B"))
+    assert first.get_task_by_name("A").total_time == 100.0
+
+
+def test_status_and_cache(database, start_daemon, clients):
+    """Тест: status и активные задачи отвечают из памяти демона."""
+    url, _ = start_daemon(database)
+    client = clients(url)
+    client.add_tasks(
+        [
+            Task("over", budget=1e-6),
+            Task("later", budget=3600.0),
+            Task("stopped", running=False),
+        ]
+    )
+    running, over_budget, next_alert = client.status()
+    assert [task.name for task in running] == ["later", "over"]
+    assert over_budget == ["over"]
+    assert next_alert == pytest.approx(Task.clock() + 3600.0, abs=5)
+    assert [task.name for task in client.fetch_all_tasks()] == [
+        "later",
+        "over",
+        "stopped",
+    ]
+
+
+def test_subscribers_receive_changes(database, start_daemon, clients):
+    """Тест рассылки изменений подписчикам после записи другого клиента."""
+    url, _ = start_daemon(database)
+    listener, writer = clients(url), clients(url)
+    received = []
+    arrived = threading.Event()
+
+    def on_changes(seq, tasks, removed):
+        received.append(([task.name for task in tasks], removed))
+        arrived.set()
+
+    listener.subscribe(on_changes)
+    writer.add_task(Task("A"))
+    assert arrived.wait(5)
+    assert received == [(["A"], [])]
+
+
+def test_foreign_writes_are_synced(database, tmp_path, start_daemon, clients):
+    """Тест: записи других процессов в базу данных попадают в память демона."""
+    url, _ = start_daemon(database, sync_interval=0.05)
+    client = clients(url)
+    direct = Database(f"sqlite:///{tmp_path / 'tasks.db'}")
+    direct.add_task(Task("direct"))
+    direct.close()
+    for _ in range(100):
+        if client.fetch_all_tasks():
+            break
+        time.sleep(0.02)
+    assert [task.name for task in client.fetch_all_tasks()] == ["direct"]
+
+
+def test_dropped_transaction_is_rolled_back(database, start_daemon, clients):
+    """Тест: разрыв соединения откатывает транзакцию и освобождает хранилище."""
+    url, _ = start_daemon(database)
+    client = clients(url)
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    connection.connect(url_path(url))
+    file = connection.makefile("rwb")
+    file.write(b'{"id":1,"method":"begin"}\n')
+    file.write(b'{"id":2,"method":"add_task","args":[{"$task":{"name":"X",'
+               b'"start_time":0,"total_time":0,"running":false,"finished":false,'
+               b'"version":0,"budget":null,"intervals":[]}}]}\n')
+    file.flush()
+    assert file.readline() and file.readline()
+    file.close()
+    connection.close()
+    assert client.add_task(Task("Y"))
+    assert client.get_task_by_name("X") is None
+
+
+def test_second_daemon_refuses_socket(database, start_daemon):
+    """Тест: второй демон не занимает сокет работающего."""
+    url, _ = start_daemon(database)
+    with pytest.raises(RuntimeError):
+        asyncio.run(TrackerDaemon(database, url_path(url)).serve())
+
+
+def test_cli_through_daemon(capsys, database, start_daemon):
+    """Тест команд командной строки через демона."""
+    url, _ = start_daemon(database)
+    assert run(["--db", url, "add", "A"]) == 0
+    assert run(["--db", url, "status"]) == 0
+    assert '"name": "A"' in capsys.readouterr().out.splitlines()[-1]
+    assert run(["--db", url, "daemon"]) == 1
+    client = open_storage(url)
+    assert isinstance(client, RemoteStorage)
+    client.close()
+
+
+def test_idle_transaction_is_rolled_back(database, start_daemon, clients):
+    """Тест: молчащий клиент теряет транзакцию, и хранилище освобождается."""
+    url, _ = start_daemon(database, transaction_timeout=0.2)
+    client = clients(url)
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    connection.connect(url_path(url))
+    file = connection.makefile("rwb")
+    file.write(b'{"id":1,"method":"begin"}\n')
+    file.write(b'{"id":2,"method":"add_task","args":[{"$task":{"name":"X",'
+               b'"start_time":0,"total_time":0,"running":false,"finished":false,'
+               b'"version":0,"budget":null,"intervals":[]}}]}\n')
+    file.flush()
+    assert file.readline() and file.readline()
+    assert client.add_task(Task("Y"))
+    assert client.get_task_by_name("X") is None
+    file.write(b'{"id":3,"method":"get_task_by_name","args":["X"]}\n')
+    file.write(b'{"id":4,"method":"commit"}\n')
+    file.write(b'{"id":5,"method":"get_task_by_name","args":["Y"]}\n')
+    file.flush()
+    responses = [json.loads(file.readline()) for _ in range(3)]
+    assert [response.get("error", {}).get("type") for response in responses] == [
+        "TimeoutError",
+        "TimeoutError",
+        None,
+    ]
+    file.close()
+    connection.close()
@@ -1,16 +1,75 @@
-from datetime import datetime
+from datetime import datetime, timedelta
+from sqlite3 import dbapi2
 
 import pytest
+from sqlalchemy.exc import IntegrityError
 
-from model.database import Database
-from model.task import Task
+from model.database import ConflictError, Database
+from model.storage import LOG_SCHEME, open_storage
+from model.task import Task, seconds_to_us
+from model.task_model import TaskChangeModel, TaskIntervalModel, TaskModel
+
+
+@pytest.fixture(params=[False, True], ids=["orm", "core"])
+def core(request):
+    """Фикстура реализации горячих методов Database: ORM или SQLAlchemy Core."""
+    return request.param
+
+
+@pytest.fixture(params=["orm", "core", "log", "daemon"])
+def backend(request):
+    """
+    Фикстура реализации хранилища: Database (ORM или Core), LogStorage
+    или RemoteStorage (демон над файловой базой данных).
+    """
+    return request.param
+
+
+@pytest.fixture
+def shared_url(tmp_path, backend, start_daemon):
+    """Фикстура URL файлового хранилища для нескольких его экземпляров."""
+    if backend == "log":
+        return f"{LOG_SCHEME}:///{tmp_path / 'tasks.log'}"
+    url = f"sqlite:///{tmp_path / 'tasks.db'}"
+    if backend == "daemon":
+        return start_daemon(Database(url))[0]
+    return url
+
+
+@pytest.fixture
+def db_url(backend, shared_url):
+    """Фикстура URL хранилища одного теста (для SQLite — в памяти)."""
+    if backend in ("log", "daemon"):
+        return shared_url
+    return "sqlite:///:memory:"
+
+
+@pytest.fixture
+def connect(backend, shared_url):
+    """Фикстура открытия хранилища выбранной реализации; закрывает его после теста."""
+    opened = []
+
+    def connect(url, **options):
+        if backend in ("orm", "core"):
+            options["core"] = backend == "core"
+        opened.append(open_storage(url, **options))
+        return opened[-1]
+
+    yield connect
+    for storage in opened:
+        storage.close()
 
 
 @pytest.fixture
-def db():
-    """Фикстура для создания нового сеанса базы данных для каждого теста."""
-    database = Database(db_url="sqlite:///:memory:")
-    yield database
+def db(connect, db_url):
+    """Фикстура для создания нового хранилища для каждого теста."""
+    return connect(db_url)
+
+
+@pytest.fixture
+def sql_db(core):
+    """Фикстура базы данных для проверок, специфичных для Database (архив, таблицы)."""
+    return Database(db_url="sqlite:///:memory:", core=core)
 
 
 @pytest.fixture
@@ -91,3 +150,519 @@ def test_get_task_by_non_existent_name(db):
     """Тест получения задачи по несуществующему имени."""
     task_from_db = db.get_task_by_name("Non Existent Task")
     assert task_from_db is None
+
+
+def test_add_tasks_bulk(db):
+    """Тест пакетного добавления задач."""
+    tasks = [Task(name=f"Task {i}", running=False) for i in range(5)]
+    assert db.add_tasks(tasks) is True
+    assert len(db.fetch_all_tasks()) == 5
+
+
+def test_add_tasks_bulk_duplicate_is_atomic(db, sample_task):
+    """Тест атомарности пакетного добавления при дублирующемся имени."""
+    db.add_task(sample_task)
+    result = db.add_tasks([Task(name="Another Task"), Task(name=sample_task.name)])
+    assert result is False
+    assert db.get_task_by_name("Another Task") is None
+
+
+def test_update_tasks_bulk(db):
+    """Тест пакетного обновления и переименования задач."""
+    db.add_tasks([Task(name="A", running=False), Task(name="B", running=False)])
+    updated = db.update_tasks(
+        {"A": Task(name="A", total_time=5.0, running=False), "B": Task(name="C")}
+    )
+    assert updated == 2
+    assert db.get_task_by_name("A").total_time == 5.0
+    assert db.get_task_by_name("B") is None
+    assert db.get_task_by_name("C") is not None
+
+
+def test_update_tasks_reports_constraint_errors(core):
+    """Тест: занятое имя дает 0, другие нарушения ограничений не скрываются."""
+    db = Database(db_url="sqlite:///:memory:", core=core)
+    db.add_tasks([Task(name="A", running=False), Task(name="B", running=False)])
+    assert db.update_tasks({"A": Task(name="B")}) == 0
+    assert db.update_task("A", Task(name="B")) is False
+    with pytest.raises(IntegrityError):
+        db.update_tasks({"A": Task(name=None)})
+    with pytest.raises(IntegrityError):
+        db.update_task("A", Task(name=None))
+    assert db.get_task_by_name("A").version == 0
+
+
+def test_delete_tasks_bulk(db):
+    """Тест пакетного удаления задач."""
+    db.add_tasks([Task(name="A"), Task(name="B"), Task(name="C")])
+    assert db.delete_tasks(["A", "C", "Missing"]) == 2
+    assert [task.name for task in db.fetch_all_tasks()] == ["B"]
+
+
+def test_write_behind_merges_updates(core):
+    """Тест отложенной записи: обновления копятся в буфере и сливаются."""
+    db = Database(db_url="sqlite:///:memory:", write_behind=True, flush_size=10, core=core)
+    db.add_task(Task(name="A", running=False))
+    for total_time in (1.0, 2.0, 3.0):
+        assert db.update_task("A", Task(name="A", total_time=total_time, running=False))
+    with db.Session() as session:
+        assert session.query(TaskModel.total_time).scalar() == 0.0
+    assert db.get_task_by_name("A").total_time == 3.0
+    db.close()
+
+
+def test_write_behind_flushes_on_size(core):
+    """Тест сброса буфера отложенной записи при достижении порога размера."""
+    db = Database(db_url="sqlite:///:memory:", write_behind=True, flush_size=2, core=core)
+    db.add_tasks([Task(name="A", running=False), Task(name="B", running=False)])
+    db.update_task("A", Task(name="A", total_time=1.0, running=False))
+    db.update_task("B", Task(name="B", total_time=2.0, running=False))
+    with db.Session() as session:
+        totals = dict(session.query(TaskModel.name, TaskModel.total_time))
+    assert totals == {"A": 1.0, "B": 2.0}
+    db.close()
+
+
+def test_write_behind_buffers_task_state(core):
+    """Тест: в буфер попадает состояние задачи на момент update_task."""
+    db = Database(db_url="sqlite:///:memory:", write_behind=True, core=core)
+    task = Task(name="A", running=False)
+    db.add_task(task)
+    task.budget = 60.0
+    assert db.update_task("A", task)
+    task.name = "B"
+    assert db.update_task("A", task) is True
+    assert db.get_task_by_name("A") is None
+    renamed = db.get_task_by_name("B")
+    assert (renamed.budget, renamed.version, task.version) == (60.0, 2, 2)
+    db.close()
+
+
+def test_write_behind_flush_raises_constraint_error(core):
+    """Тест: ошибка целостности при сбросе буфера не скрывается."""
+    db = Database(db_url="sqlite:///:memory:", write_behind=True, core=core)
+    db.add_tasks([Task(name="A", running=False), Task(name="B", running=False)])
+    db.update_task("A", Task(name="A", total_time=1.0, running=False))
+    db.update_task("B", Task(name="B", total_time=None, running=False))
+    with db.engine.begin() as connection:
+        connection.exec_driver_sql(
+            "CREATE TRIGGER reject BEFORE UPDATE ON tasks WHEN NEW.total_time IS NULL "
+            "BEGIN SELECT RAISE(ABORT, 'total_time is required'); END"
+        )
+    with pytest.raises(IntegrityError):
+        db.flush()
+    assert db.get_task_by_name("A").total_time == 0.0
+    db.close()
+
+
+def test_write_behind_delete_drops_pending_update(connect, db_url):
+    """Тест удаления задачи с отложенным обновлением."""
+    db = connect(db_url, write_behind=True)
+    db.add_task(Task(name="A", running=False))
+    db.update_task("A", Task(name="A", total_time=1.0, running=False))
+    assert db.delete_task("A") is True
+    assert db.fetch_all_tasks() == []
+
+
+def _interval_count(db):
+    """Количество закрытых интервалов (без незакрытых отрезков запущенных задач)."""
+    now_us = seconds_to_us(Task.clock())
+    batches = db.iter_interval_batches(datetime.fromtimestamp(0), datetime(3000, 1, 1))
+    return sum(end < now_us for batch in batches for _, _, end in batch)
+
+
+def test_update_task_appends_intervals(db):
+    """Тест добавления закрытых интервалов в журнал при обновлении задачи."""
+    task = Task(name="A", start_time=datetime.now() - timedelta(hours=1))
+    db.add_task(task)
+    task.stop()
+    task.resume()
+    task.stop()
+    assert db.update_task("A", task) is True
+    assert _interval_count(db) == 2
+    assert task.unsaved_intervals == []
+
+
+def test_write_behind_keeps_all_intervals(connect, db_url):
+    """Тест: слияние отложенных обновлений не теряет интервалы."""
+    db = connect(db_url, write_behind=True)
+    task = Task(name="A")
+    db.add_task(task)
+    for _ in range(3):
+        task.stop()
+        db.update_task("A", task)
+        task.resume()
+        db.update_task("A", task)
+    db.flush()
+    assert _interval_count(db) == 3
+
+
+def test_delete_task_removes_intervals(db):
+    """Тест удаления интервалов вместе с задачей."""
+    task = Task(name="A")
+    db.add_task(task)
+    task.stop()
+    db.update_task("A", task)
+    db.delete_task("A")
+    assert _interval_count(db) == 0
+
+
+def test_time_spent(db):
+    """Тест подсчета времени за промежуток по журналу интервалов."""
+    now = datetime.now()
+    task = Task(name="A", start_time=now - timedelta(hours=3))
+    db.add_task(task)
+    task.stop()
+    db.update_task("A", task)
+    db.add_task(Task(name="B", start_time=now - timedelta(hours=1)))
+
+    since = now - timedelta(hours=2)
+    assert db.time_spent(since, now, "A") == pytest.approx(7200, abs=1)
+    assert db.time_spent(since, now, "B") == pytest.approx(3600, abs=1)
+    assert db.time_spent(since, now) == pytest.approx(10800, abs=1)
+    assert db.time_spent(now - timedelta(days=2), now - timedelta(days=1)) == 0
+
+
+def test_load_store(db):
+    """Тест загрузки задач в колоночное хранилище и сохранения её строк."""
+    db.add_tasks(
+        [
+            Task(name="A", start_time=1000.0, total_time=5.0),
+            Task(name="B", running=False, total_time=7.0, finished=True),
+        ]
+    )
+    store = db.load_store()
+    assert len(store) == 2
+    task = store.get("A")
+    assert task.start_timestamp == 1000.0
+    assert task.elapsed_time(now=1010.0) == 15.0
+    assert len(db.load_store(finished=True)) == 1
+
+    task.stop(now=1020.0)
+    assert db.update_task("A", task) is True
+    assert _interval_count(db) == 1
+    assert task.unsaved_intervals == []
+    assert db.get_task_by_name("A").total_time == 25.0
+
+
+def test_budget_round_trip(db):
+    """Тест сохранения бюджета времени в задаче и колоночном хранилище."""
+    db.add_task(Task(name="A", start_time=1000.0, budget=7200.0))
+    task = db.get_task_by_name("A")
+    assert task.budget == 7200.0
+    assert db.load_store().get("A").budget == 7200.0
+    task.budget = None
+    task.finish(now=2000.0)
+    assert db.update_task("A", task)
+    assert db.get_task_by_name("A").budget is None
+    task.budget = 60.0
+    assert db.update_task("A", task)
+    assert db.get_task_by_name("A").budget == 60.0
+
+
+def test_update_conflict(connect, shared_url):
+    """Тест оптимистичной блокировки: устаревшая копия задачи не перезаписывает строку."""
+    first = connect(shared_url)
+    second = connect(shared_url)
+    first.add_task(Task(name="A", start_time=1000.0))
+    mine, theirs = first.get_task_by_name("A"), second.get_task_by_name("A")
+    theirs.stop(now=1100.0)
+    assert second.update_task("A", theirs) is True
+    assert theirs.version == 1
+    mine.stop(now=1010.0)
+    with pytest.raises(ConflictError) as error:
+        first.update_task("A", mine)
+    assert error.value.names == ["A"]
+    assert first.get_task_by_name("A").total_time == 100.0
+    with pytest.raises(ConflictError):
+        first.delete_task("A", version=mine.version)
+    assert first.delete_task("A", version=1) is True
+
+
+def test_write_behind_merged_versions(connect, db_url):
+    """Тест: слитые отложенные обновления ожидают версию первого из них."""
+    db = connect(db_url, write_behind=True)
+    db.add_task(Task(name="A"))
+    first, second = db.get_task_by_name("A"), db.get_task_by_name("A")
+    second.version = 1
+    db.update_task("A", first)
+    db.update_task("A", second)
+    db.flush()
+    assert second.version == 2
+    assert db.get_task_by_name("A").version == 2
+
+
+def test_changes_since(db):
+    """Тест журнала изменений: добавление, переименование и удаление задач."""
+    seq = db.last_change()
+    db.add_tasks([Task(name="A"), Task(name="B")])
+    seq, tasks, removed = db.changes_since(seq)
+    assert sorted(task.name for task in tasks) == ["A", "B"]
+    assert removed == []
+    assert db.changes_since(seq) == (seq, [], [])
+
+    task = db.get_task_by_name("A")
+    task.name = "C"
+    db.update_task("A", task)
+    db.delete_task("B")
+    seq, tasks, removed = db.changes_since(seq)
+    assert [task.name for task in tasks] == ["C"]
+    assert removed == ["A", "B"]
+
+
+def test_prune_changes_keeps_changes_since(sql_db):
+    """Тест сжатия журнала изменений: ответы changes_since не меняются."""
+    sql_db.add_tasks([Task(name="A"), Task(name="B"), Task(name="C")])
+    seqs = [0, sql_db.last_change()]
+    task = sql_db.get_task_by_name("A")
+    for _ in range(50):
+        if task.running:
+            task.stop()
+        else:
+            task.resume()
+        sql_db.update_task("A", task)
+        task = sql_db.get_task_by_name("A")
+    seqs.append(sql_db.last_change())
+    sql_db.delete_task("B")
+    seqs.append(sql_db.last_change())
+
+    def answers():
+        return [
+            (last, sorted(task.name for task in tasks), removed)
+            for last, tasks, removed in map(sql_db.changes_since, seqs)
+        ]
+
+    before = answers()
+    assert sql_db.prune_changes() == 54 - 3
+    assert answers() == before
+    with sql_db.Session() as session:
+        assert session.query(TaskChangeModel).count() == 3
+    sql_db.archive()
+    assert sql_db.prune_changes() == 0
+
+
+def test_fetch_page_keyset(db):
+    """Тест постраничной выборки по ключу в порядке отображения, вперед и назад."""
+    db.add_tasks(
+        [Task(f"run {i:02d}") for i in range(5)]
+        + [Task(f"stop {i:02d}", running=False) for i in range(7)]
+        + [Task("done", running=False, finished=True)]
+    )
+    expected = [task.name for task in db.fetch_all_tasks()]
+    names, key = [], None
+    while page := db.fetch_page(key, limit=4):
+        names += [task.name for task in page]
+        key = (not page[-1].running, page[-1].name)
+    assert names == expected
+    assert [task.name for task in db.fetch_page(limit=3, backward=True)] == expected[-3:]
+    before = db.fetch_page((True, "stop 01"), limit=3, backward=True)
+    assert [task.name for task in before] == ["run 03", "run 04", "stop 00"]
+    assert [task.name for task in db.fetch_page(finished=True)] == ["done"]
+
+
+def test_fetch_page_query_and_counts(db):
+    """Тест фильтра по имени и счетчиков разделов, поддерживаемых триггерами."""
+    db.add_tasks([Task("Отчет"), Task("отчет за март"), Task("Звонок")])
+    assert db.count_tasks() == 3
+    assert [task.name for task in db.fetch_page(query="ОТЧ")] == [
+        "Отчет",
+        "отчет за март",
+    ]
+    assert db.count_tasks(query="от") == 2
+    assert db.count_tasks(query="чет за") == 1
+    task = db.get_task_by_name("Звонок")
+    task.finish()
+    db.update_task("Звонок", task)
+    db.delete_task("Отчет")
+    assert (db.count_tasks(), db.count_tasks(finished=True)) == (1, 1)
+
+
+def test_rollups_follow_changes(db):
+    """Тест сводок поддеревьев при остановке, завершении, удалении и переносе."""
+    db.add_tasks(
+        [
+            Task("project", start_time=100.0, total_time=5.0, running=False),
+            Task("stage", start_time=100.0),
+            Task("step", start_time=200.0, total_time=3.0, running=False),
+            Task("call", start_time=300.0),
+        ]
+    )
+    assert db.set_parent("stage", "project")
+    assert db.set_parent("step", "stage")
+    assert db.set_parent("call", "step")
+    rollup = db.get_rollup("project")
+    assert (rollup.size, rollup.running, rollup.children) == (4, 2, 1)
+    assert rollup.elapsed_time(now=1000.0) == pytest.approx(8.0 + 900.0 + 700.0)
+
+    task = db.get_task_by_name("call")
+    task.stop(now=400.0)
+    assert db.update_task("call", task)
+    task = db.get_task_by_name("stage")
+    task.finish(now=1000.0)
+    assert db.update_task("stage", task)
+    rollup = db.get_rollup("project")
+    assert rollup.running == 0
+    assert rollup.elapsed_time() == pytest.approx(5.0 + 900.0 + 3.0 + 100.0)
+
+    assert db.delete_task("stage")
+    children = db.fetch_children("project")
+    assert [(task.name, rollup.size) for task, rollup in children] == [("step", 2)]
+    assert db.get_rollup("project").total_time == pytest.approx(108.0)
+    assert db.set_parent("step", None)
+    assert db.get_rollup("project") == (5.0, 0, 0.0, 1, 0)
+    assert [task.name for task, _ in db.fetch_children()] == ["project", "step"]
+    assert db.get_rollup("step").total_time == pytest.approx(103.0)
+
+
+def test_set_parent_rejects_cycles(db):
+    """Тест: задачу нельзя перенести в её поддерево или к несуществующему родителю."""
+    db.add_tasks([Task("A"), Task("B"), Task("C", finished=True)])
+    assert db.set_parent("B", "A")
+    with pytest.raises(ValueError):
+        db.set_parent("A", "B")
+    with pytest.raises(ValueError):
+        db.set_parent("A", "A")
+    assert not db.set_parent("A", "missing")
+    assert not db.set_parent("missing", None)
+    assert db.get_rollup("missing") is None
+    assert db.set_parent("C", "B")
+    assert [task.name for task, _ in db.fetch_children("B", finished=False)] == []
+    assert db.get_rollup("A").size == 3
+
+
+ARCHIVE_NOW = 1000.0 + timedelta(days=31).total_seconds()
+
+
+def add_finished(db, name, start, end):
+    task = Task(name=name, start_time=start)
+    task.finish(now=end)
+    assert db.add_task(task)
+
+
+def test_archive_keeps_tiers_transparent(sql_db):
+    """Тест: старые завершенные задачи уходят в архив, но видны при чтении."""
+    sql_db.add_task(Task(name="active", start_time=1000.0))
+    add_finished(sql_db, "old task", 1000.0, 2000.0)
+    add_finished(sql_db, "recent", ARCHIVE_NOW - 100.0, ARCHIVE_NOW - 50.0)
+    assert sql_db.archive_finished(timedelta(days=30), now=ARCHIVE_NOW) == 1
+    assert sql_db.archive_finished(timedelta(days=30), now=ARCHIVE_NOW) == 0
+    with sql_db.Session() as session:
+        assert session.query(TaskModel).count() == 2
+        assert session.query(TaskIntervalModel).count() == 1
+
+    assert [task.name for task in sql_db.fetch_all_tasks()] == ["active"]
+    assert [task.name for task in sql_db.fetch_all_tasks(True)] == ["old task", "recent"]
+    assert [task.name for task in sql_db.fetch_page(finished=True)] == ["old task", "recent"]
+    assert [task.name for task in sql_db.fetch_page((True, "old task"), finished=True)] == [
+        "recent"
+    ]
+    assert [task.name for task in sql_db.fetch_page(finished=True, query="OLD")] == [
+        "old task"
+    ]
+    assert sql_db.count_tasks(True) == 2
+    assert sql_db.count_tasks(True, "task") == 1
+    assert sql_db.get_task_by_name("old task").total_time == 1000.0
+    assert {task.name for task in sql_db.get_tasks(["old task", "active"])} == {
+        "old task",
+        "active",
+    }
+    assert sorted(sql_db.task_names().values()) == ["active", "old task", "recent"]
+    assert len(list(sql_db.iter_tasks())) == 3
+    since = datetime.fromtimestamp(0)
+    assert sql_db.time_spent(since, datetime.fromtimestamp(3000), "old task") == 1000.0
+    assert not sql_db.add_task(Task(name="old task"))
+
+
+def test_archived_task_is_restored_on_write(sql_db):
+    """Тест: изменение архивной задачи возвращает её в tasks, удаление удаляет из архива."""
+    add_finished(sql_db, "A", 1000.0, 2000.0)
+    add_finished(sql_db, "B", 1000.0, 1500.0)
+    assert sql_db.archive_finished(timedelta(days=30), now=ARCHIVE_NOW) == 2
+    task = sql_db.get_task_by_name("A")
+    task.name = "A2"
+    assert sql_db.update_task("A", task)
+    assert sql_db.get_task_by_name("A2").version == 1
+    since, until = datetime.fromtimestamp(0), datetime.fromtimestamp(3000)
+    assert sql_db.time_spent(since, until, "A2") == 1000.0
+    with pytest.raises(ConflictError):
+        sql_db.delete_task("B", version=5)
+    assert sql_db.delete_task("B", version=0)
+    assert sql_db.get_task_by_name("B") is None
+    assert sql_db.count_tasks(True) == 1
+    assert sql_db.time_spent(since, until) == 1000.0
+
+
+def test_search_finished_and_archive(sql_db):
+    """Тест поиска завершенных задач по таблицам поиска имен в tasks и архиве."""
+    for name in ("Отчет за май", 'Звонок "срочно"', "ОТЧЁТ", "Обзор"):
+        add_finished(sql_db, name, 1000.0, 2000.0)
+    assert sql_db.archive_finished(timedelta(days=30), now=ARCHIVE_NOW) == 4
+    add_finished(sql_db, "отчет за июнь", ARCHIVE_NOW - 100.0, ARCHIVE_NOW - 50.0)
+    task = sql_db.get_task_by_name("Обзор")
+    task.name = "Итоги"
+    assert sql_db.update_task("Обзор", task)
+
+    def search(query):
+        return [task.name for task in sql_db.fetch_page(finished=True, query=query)]
+
+    assert search("ОТЧЕТ") == ["Отчет за май", "отчет за июнь"]
+    assert search("тчё") == ["ОТЧЁТ"]
+    assert search("о") == ["ОТЧЁТ", "Отчет за май", "отчет за июнь"]
+    assert search("от") == search("о")
+    assert search("за") == []
+    assert search('"срочно"') == ['Звонок "срочно"']
+    assert search("обзор") == []
+    assert search("итог") == ["Итоги"]
+    assert [sql_db.count_tasks(True, query) for query in ("о", "отчет", "и")] == [
+        3,
+        2,
+        1,
+    ]
+    assert sql_db.delete_task("Отчет за май")
+    assert search("отчет") == ["отчет за июнь"]
+
+
+def test_archive_keeps_budget(sql_db):
+    """Тест сохранения бюджета времени в архиве."""
+    add_finished(sql_db, "A", 1000.0, 2000.0)
+    task = sql_db.get_task_by_name("A")
+    task.budget = 60.0
+    assert sql_db.update_task("A", task)
+    assert sql_db.archive_finished(timedelta(days=30), now=ARCHIVE_NOW) == 1
+    assert sql_db.get_task_by_name("A").budget == 60.0
+
+
+def test_archive_skips_hierarchy(sql_db):
+    """Тест: задачи иерархии не уходят в архив, set_parent возвращает архивную."""
+    add_finished(sql_db, "project", 1000.0, 2000.0)
+    add_finished(sql_db, "done", 1000.0, 1500.0)
+    add_finished(sql_db, "old", 1000.0, 1200.0)
+    assert sql_db.set_parent("done", "project")
+    assert sql_db.archive_finished(timedelta(days=30), now=ARCHIVE_NOW) == 1
+    assert sql_db.get_rollup("old") == (200.0, 0, 0.0, 1, 0)
+    assert sql_db.set_parent("old", "project")
+    assert sql_db.get_rollup("project").total_time == pytest.approx(1700.0)
+    assert sql_db.archive_finished(timedelta(days=30), now=ARCHIVE_NOW) == 0
+
+
+def test_archive_in_batches(tmp_path, core):
+    """Тест переноса в архив пачками с последующими ANALYZE и VACUUM."""
+    db = Database(f"sqlite:///{tmp_path / 'tasks.db'}", core=core)
+    for i in range(5):
+        add_finished(db, f"task {i}", 1000.0, 1000.0 + i)
+    seq = db.last_change()
+    assert db.archive(timedelta(seconds=0), batch_size=2) == 5
+    assert db.count_tasks(True) == 5
+    assert db.fetch_all_tasks(False) == []
+    _, tasks, removed = db.changes_since(seq)
+    assert len(tasks) == 5 and removed == []
+    db.close()
+
+
+def test_requires_sqlite_with_trigram_search(monkeypatch):
+    """Тест: другие СУБД и SQLite старше 3.34 отвергаются при открытии."""
+    with pytest.raises(ValueError, match="only SQLite"):
+        Database(db_url="postgresql://localhost/tasks")
+    monkeypatch.setattr(dbapi2, "sqlite_version_info", (3, 31, 1))
+    with pytest.raises(RuntimeError, match="3.34.0 or newer is required"):
+        Database(db_url="sqlite:///:memory:")
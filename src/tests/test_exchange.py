@@ -0,0 +1,82 @@
+import io
+from datetime import datetime
+
+import pytest
+
+from model.database import Database
+from model.exchange import detect_format, read_tasks, write_tasks
+from model.task import Task
+
+
+@pytest.fixture
+def db():
+    """Фикстура базы данных с двумя задачами."""
+    database = Database(db_url="sqlite:///:memory:")
+    database.add_tasks(
+        [
+            Task(name="A", start_time=datetime(2024, 5, 1, 9), total_time=60.0),
+            Task(name="B", running=False, finished=True),
+        ]
+    )
+    yield database
+
+
+@pytest.mark.parametrize("fmt", ["csv", "jsonl"])
+def test_export_import_round_trip(db, fmt):
+    """Тест выгрузки и загрузки задач без потери данных."""
+    file = io.StringIO()
+    assert write_tasks(db.iter_tasks(), file, fmt) == 2
+    file.seek(0)
+    tasks = list(read_tasks(file, fmt))
+    assert [task.name for task in tasks] == ["A", "B"]
+    assert tasks[0].start_time == datetime(2024, 5, 1, 9)
+    assert tasks[0].total_time == 60.0
+    assert tasks[0].running is True
+    assert tasks[1].finished is True
+
+
+def test_iter_tasks_filter(db):
+    """Тест потокового перебора задач с фильтром по завершенности."""
+    assert [task.name for task in db.iter_tasks(finished=True, batch_size=1)] == ["B"]
+    assert [task.name for task in db.iter_tasks(finished=False)] == ["A"]
+
+
+def test_read_tasks_is_lazy():
+    """Тест ленивого чтения: записи разбираются по мере перебора."""
+    file = io.StringIO('{"name": "A"}\n{"broken json\n')
+    tasks = read_tasks(file, "jsonl")
+    assert next(tasks).name == "A"
+    with pytest.raises(ValueError):
+        next(tasks)
+
+
+@pytest.mark.parametrize(
+    "policy, names, counts",
+    [
+        ("skip", ["A", "B", "C"], {"added": 1, "skipped": 2}),
+        ("overwrite", ["A", "B", "C"], {"added": 1, "overwritten": 2}),
+        ("rename", ["A", "A (2)", "A (3)", "B", "C"], {"added": 1, "renamed": 2}),
+    ],
+)
+def test_import_conflict_policies(db, policy, names, counts):
+    """Тест политик разрешения конфликтов имен при импорте."""
+    incoming = [Task(name="A", total_time=5.0), Task(name="C"), Task(name="A")]
+    result = db.import_tasks(incoming, batch_size=2, on_conflict=policy)
+    assert {key: value for key, value in result.items() if value} == counts
+    stored = sorted(task.name for task in db.iter_tasks())
+    assert stored == names
+    if policy == "overwrite":
+        assert db.get_task_by_name("A").total_time == 0.0
+
+
+def test_import_unknown_policy(db):
+    """Тест неизвестной политики конфликтов."""
+    with pytest.raises(ValueError):
+        db.import_tasks([], on_conflict="merge")
+
+
+def test_detect_format():
+    """Тест определения формата по расширению файла."""
+    assert detect_format("tasks.CSV") == "csv"
+    assert detect_format("tasks.jsonl") == "jsonl"
+    assert detect_format("tasks") == "jsonl"
@@ -0,0 +1,120 @@
+import json
+import pstats
+
+import pytest
+
+from benchmarks.fake_curses import FakeWindow, fake_curses
+from model.database import Database
+from model.instrumentation import (Instrumentation, LatencyHistogram,
+                                   format_latency, instrumented,
+                                   statement_name)
+from model.persistence import PersistenceWorker
+from model.task import Task
+from view.console_view import TableView
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_histogram_percentiles():
+    """Тест перцентилей гистограммы с относительной погрешностью не больше 1/64."""
+    histogram = LatencyHistogram()
+    for us in range(1, 10_001):
+        histogram.record(us / 1_000_000)
+    assert histogram.count == 10_000
+    assert histogram.percentile(50) == pytest.approx(0.005, rel=1 / 64)
+    assert histogram.percentile(99) == pytest.approx(0.0099, rel=1 / 64)
+    assert histogram.percentile(100) <= histogram.max == 0.01
+    assert LatencyHistogram().percentile(50) == 0.0
+
+
+def test_histogram_small_values_exact():
+    """Тест точного учета значений меньше 128 мкс."""
+    histogram = LatencyHistogram()
+    for _ in range(3):
+        histogram.record(0.000_005)
+    histogram.record(0.000_100)
+    assert histogram.percentile(50) == pytest.approx(0.000_005)
+    assert histogram.summary()["p99"] == pytest.approx(0.000_100)
+
+
+def test_call_and_fps():
+    """Тест замера вызова и расчета частоты кадров по окну."""
+    clock = FakeClock()
+    stats = Instrumentation(clock)
+
+    def work(x):
+        clock.now += 0.25
+        return x * 2
+
+    assert stats.call("key.test", work, 21) == 42
+    assert stats.histogram("key.test").total == pytest.approx(0.25)
+    for _ in range(10):
+        clock.now += 1.0
+        stats.frame(0.001)
+    assert stats.fps() == pytest.approx(1.0)
+    assert stats.histogram("render.frame").count == 10
+
+
+def test_statement_name():
+    """Тест группировки SQL-запросов с разной длиной списков IN."""
+    assert statement_name("SELECT a\n FROM t WHERE a IN (?, ?,?)") == (
+        "sql.SELECT a FROM t WHERE a IN (?)"
+    )
+    assert format_latency(0.0005) == "500мкс"
+    assert format_latency(0.0125) == "12.5мс"
+
+
+def test_sql_and_worker_timings():
+    """Тест замеров SQL-запросов и команд потока сохранения."""
+    stats = Instrumentation()
+    database = Database("sqlite:///:memory:")
+    stats.attach_engine(database.engine)
+    worker = PersistenceWorker(database, instrumentation=stats)
+    assert worker.add_task(Task("A")).result()
+    assert worker.submit(database.get_task_by_name, "A").result().name == "A"
+    worker.close()
+    summary = stats.summary()
+    assert summary["worker.add_task"]["count"] == 1
+    assert summary["worker.get_task_by_name"]["count"] == 1
+    assert any(name.startswith("sql.INSERT INTO tasks") for name in summary)
+    assert any(name.startswith("sql.SELECT") for name in summary)
+
+
+def test_overlay_drawn_over_table():
+    """Тест панели статистики поверх таблицы и её скрытия."""
+    stats = Instrumentation()
+    stats.frame(0.002)
+    window = FakeWindow(lines=20, columns=100)
+    tasks = [Task(f"task {i}", total_time=5.0, running=False) for i in range(3)]
+    with fake_curses():
+        view = TableView(window)
+        view.draw(tasks, 0, False, overlay=stats.overlay_lines(5))
+        assert "render.frame" in window.line(5)
+        assert "Кадров/с" in window.line(3)
+        view.draw(tasks, 0, False)
+    assert "render.frame" not in window.line(5)
+    assert "task 2" in window.line(5)
+
+
+def test_instrumented_disabled():
+    """Тест: без переменных окружения статистика не собирается."""
+    with instrumented({}) as stats:
+        assert stats is None
+
+
+def test_instrumented_dumps(tmp_path):
+    """Тест сохранения сводки и профиля cProfile при выходе."""
+    stats_path = tmp_path / "stats.json"
+    profile_path = tmp_path / "profile.out"
+    environ = {"TASKS_STATS": str(stats_path), "TASKS_PROFILE": str(profile_path)}
+    with instrumented(environ) as stats:
+        stats.record("key.add_task", 0.01)
+    data = json.loads(stats_path.read_text(encoding="utf-8"))
+    assert data["histograms"]["key.add_task"]["count"] == 1
+    assert pstats.Stats(str(profile_path)).total_calls > 0
@@ -0,0 +1,114 @@
+import pytest
+
+from model.lazy_task_list import LazyTaskList
+from model.task import Task
+from model.task_index import TaskIndex
+
+
+class FakeSource:
+    """Источник страниц по списку задач с подсчетом обращений."""
+
+    def __init__(self, size):
+        self.tasks = [Task(f"task {i:04d}", running=False) for i in range(size)]
+        self.fetches = []
+        self.counts = 0
+
+    def fetch_page(self, after_key, limit, backward):
+        self.fetches.append((after_key, limit, backward))
+        keys = [TaskIndex.sort_key(task) for task in self.tasks]
+        if backward:
+            end = len(keys) if after_key is None else keys.index(after_key)
+            return self.tasks[max(end - limit, 0) : end]
+        start = 0 if after_key is None else keys.index(after_key) + 1
+        return self.tasks[start : start + limit]
+
+    def count(self):
+        self.counts += 1
+        return len(self.tasks)
+
+
+@pytest.fixture
+def source():
+    """Фикстура источника из 1000 задач."""
+    return FakeSource(1000)
+
+
+def test_open_loads_one_page(source):
+    """Тест: открытие раздела читает размер и одну страницу."""
+    tasks = LazyTaskList(source.fetch_page, source.count, page_size=10)
+    assert len(tasks) == 1000
+    assert [task.name for task in tasks[:3]] == ["task 0000", "task 0001", "task 0002"]
+    assert source.fetches == [(None, 10, False)]
+
+
+def test_sequential_and_wrap_to_end(source):
+    """Тест: соседние страницы читаются от границ, конец раздела — назад."""
+    tasks = LazyTaskList(source.fetch_page, source.count, page_size=10)
+    assert tasks[15].name == "task 0015"
+    assert source.fetches[-1] == ((True, "task 0009"), 10, False)
+    assert tasks[-1].name == "task 0999"
+    assert source.fetches[-1] == (None, 10, True)
+    assert tasks[985].name == "task 0985"
+    assert source.fetches[-1] == ((True, "task 0990"), 10, True)
+    assert len(source.fetches) == 4
+
+
+def test_last_partial_page(source):
+    """Тест чтения неполной последней страницы назад."""
+    source.tasks = source.tasks[:25]
+    tasks = LazyTaskList(source.fetch_page, source.count, page_size=10)
+    assert [task.name for task in tasks[20:]] == [f"task {i:04d}" for i in range(20, 25)]
+    assert source.fetches == [(None, 5, True)]
+
+
+def test_lru_bound(source):
+    """Тест вытеснения давно использованных страниц."""
+    tasks = LazyTaskList(source.fetch_page, source.count, page_size=10, max_pages=3)
+    for i in range(0, 100, 10):
+        tasks[i]
+    assert tasks.loaded_pages == [7, 8, 9]
+    tasks[5]
+    assert tasks[5].name == "task 0005"
+    assert tasks.loaded_pages == [8, 9, 0]
+
+
+def test_far_jump_walks_from_known_page(source):
+    """Тест перехода далеко от загруженных страниц."""
+    tasks = LazyTaskList(source.fetch_page, source.count, page_size=10, max_pages=2)
+    assert tasks[42].name == "task 0042"
+    assert len(source.fetches) == 5
+
+
+def test_reset_after_change(source):
+    """Тест перечитывания раздела после изменения задач."""
+    tasks = LazyTaskList(source.fetch_page, source.count, page_size=10)
+    assert tasks[5].name == "task 0005"
+    del source.tasks[:10]
+    tasks.reset()
+    assert len(tasks) == 990
+    assert tasks[5].name == "task 0015"
+    with pytest.raises(IndexError):
+        tasks[990]
+
+
+def test_pending_reads_are_placeholders(source):
+    """Тест: пока чтение не пришло, раздел пуст, а строки страницы — None."""
+    pending = {"count", "page"}
+
+    def count():
+        return None if "count" in pending else source.count()
+
+    def fetch_page(after_key, limit, backward):
+        if "page" in pending:
+            return None
+        return source.fetch_page(after_key, limit, backward)
+
+    tasks = LazyTaskList(fetch_page, count, page_size=10)
+    assert tasks.loading and len(tasks) == 0
+    pending.discard("count")
+    assert not tasks.loading and len(tasks) == 1000
+    assert tasks[5] is None and tasks[42] is None
+    assert tasks.loaded_pages == []
+    pending.discard("page")
+    assert tasks[42].name == "task 0042"
+    assert tasks.loaded_pages == [0, 1, 2, 3, 4]
@@ -0,0 +1,143 @@
+import os
+import subprocess
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+from model.log_storage import LogStorage
+from model.storage import LOG_SCHEME, open_storage
+from model.task import Task
+
+
+@pytest.fixture
+def path(tmp_path):
+    """Фикстура пути к файлу журнала."""
+    return str(tmp_path / "tasks.log")
+
+
+def test_open_storage_selects_log(path):
+    """Тест выбора журнала операций по схеме URL."""
+    storage = open_storage(f"{LOG_SCHEME}:///{path}")
+    assert isinstance(storage, LogStorage)
+    assert storage.engine is None
+    storage.close()
+
+
+def test_replay_after_reopen(path):
+    """Тест: задачи, версии и интервалы восстанавливаются проигрыванием журнала."""
+    storage = LogStorage(path)
+    task = Task(name="A", start_time=1000.0)
+    storage.add_tasks([task, Task(name="B", running=False)])
+    task.stop(now=1100.0)
+    storage.update_task("A", task)
+    storage.delete_task("B")
+    storage.close()
+
+    storage = LogStorage(path)
+    assert [task.name for task in storage.fetch_all_tasks()] == ["A"]
+    restored = storage.get_task_by_name("A")
+    assert (restored.total_time, restored.version) == (100.0, 1)
+    since, until = datetime.fromtimestamp(0), datetime.fromtimestamp(2000)
+    assert storage.time_spent(since, until, "A") == 100.0
+    assert storage.archive_finished(timedelta(days=30)) == 0
+    storage.close()
+
+
+def test_torn_tail_is_truncated(path):
+    """Тест: недописанная при сбое последняя строка отбрасывается при открытии."""
+    storage = LogStorage(path)
+    storage.add_task(Task(name="A"))
+    storage.close()
+    with open(path, "ab") as file:
+        file.write(b'{"seq":2,"op":"put","id":2,"task":{"na')
+    size = os.path.getsize(path)
+
+    storage = LogStorage(path)
+    assert [task.name for task in storage.fetch_all_tasks()] == ["A"]
+    assert os.path.getsize(path) < size
+    assert storage.add_task(Task(name="B"))
+    storage.close()
+    storage = LogStorage(path)
+    assert [task.name for task in storage.fetch_all_tasks()] == ["A", "B"]
+    storage.close()
+
+
+def test_transaction_rollback(path):
+    """Тест: исключение в транзакции не оставляет записей ни в журнале, ни в памяти."""
+    storage = LogStorage(path)
+    storage.add_task(Task(name="A"))
+    size = os.path.getsize(path)
+    with pytest.raises(RuntimeError):
+        with storage.transaction():
+            storage.add_task(Task(name="B"))
+            storage.delete_task("A")
+            raise RuntimeError("stop")
+    assert os.path.getsize(path) == size
+    assert [task.name for task in storage.fetch_all_tasks()] == ["A"]
+    storage.close()
+
+
+def test_background_compaction(path):
+    """Тест: журнал сжимается в фоне, когда вырастает в compact_ratio раз."""
+    storage = LogStorage(path, compact_ratio=2, compact_min_size=4096)
+    task = Task(name="A", start_time=0.0)
+    storage.add_task(task)
+    for second in range(1, 200):
+        task.stop(now=second - 0.5)
+        task.resume(now=second)
+        storage.update_task("A", task)
+    storage.close()
+    assert os.path.getsize(path) < 200 * 100
+
+    storage = LogStorage(path)
+    restored = storage.get_task_by_name("A")
+    assert (restored.total_time, restored.version) == (99.5, 199)
+    since, until = datetime.fromtimestamp(0), datetime.fromtimestamp(150)
+    assert storage.time_spent(since, until, "A") == 75.0
+    storage.close()
+
+
+def test_hierarchy_survives_compaction(path):
+    """Тест: родители задач и сводки восстанавливаются после сжатия журнала."""
+    storage = LogStorage(path)
+    storage.add_tasks([Task("child", running=False, total_time=2.0), Task("parent")])
+    assert storage.set_parent("child", "parent")
+    storage.optimize(vacuum=True)
+    storage.close()
+
+    storage = LogStorage(path)
+    rollup = storage.get_rollup("parent")
+    assert (rollup.size, rollup.children, rollup.total_time) == (2, 1, 2.0)
+    assert [task.name for task, _ in storage.fetch_children("parent")] == ["child"]
+    storage.close()
+
+
+def test_other_process_sees_changes_and_compaction(path):
+    """Тест: второй экземпляр дочитывает чужие записи и замену журнала сжатием."""
+    first, second = LogStorage(path), LogStorage(path)
+    seq = second.last_change()
+    first.add_tasks([Task(name="A"), Task(name="B")])
+    seq, tasks, removed = second.changes_since(seq)
+    assert sorted(task.name for task in tasks) == ["A", "B"]
+
+    first.delete_task("B")
+    first.optimize(vacuum=True)
+    seq, tasks, removed = second.changes_since(seq)
+    assert (tasks, removed) == ([], ["B"])
+    assert not second.add_task(Task(name="A"))
+    assert second.add_task(Task(name="C"))
+    assert [task.name for task in first.fetch_all_tasks()] == ["A", "C"]
+    first.close()
+    second.close()
+
+
+def test_log_does_not_load_sqlalchemy(path):
+    """Тест: журнал операций открывается без загрузки SQLAlchemy."""
+    code = (
+        "import sys; from model.storage import open_storage; "
+        f"open_storage('{LOG_SCHEME}:///{path}').close(); "
+        "assert 'sqlalchemy' not in sys.modules"
+    )
+    source = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run([sys.executable, "-c", code], cwd=source, check=True)
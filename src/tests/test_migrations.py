@@ -0,0 +1,123 @@
+import sqlite3
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, inspect
+
+from model.database import Database
+from model.migrations import LATEST_VERSION, get_version, upgrade
+from model.task import Task
+
+
+@pytest.fixture
+def legacy_db(tmp_path):
+    """Фикстура базы данных в исходной схеме (имя — первичный ключ, ISO-время)."""
+    path = tmp_path / "tasks.db"
+    connection = sqlite3.connect(path)
+    connection.execute(
+        "CREATE TABLE tasks (name VARCHAR NOT NULL, start_time VARCHAR, "
+        "total_time FLOAT, running BOOLEAN, finished BOOLEAN, PRIMARY KEY (name))"
+    )
+    connection.executemany(
+        "INSERT INTO tasks VALUES (?, ?, ?, ?, ?)",
+        [
+            ("Old Task", "2024-05-01T10:20:30.123456", 42.5, 0, 1),
+            ("Running Task", "2024-05-02T08:00:00", 0.0, 1, 0),
+        ],
+    )
+    connection.commit()
+    connection.close()
+    return f"sqlite:///{path}"
+
+
+def test_new_database_has_latest_version():
+    """Тест: новая база данных сразу создается в последней версии схемы."""
+    engine = create_engine("sqlite:///:memory:")
+    assert upgrade(engine) == LATEST_VERSION
+    with engine.connect() as connection:
+        assert get_version(connection) == LATEST_VERSION
+
+
+def test_upgrade_legacy_database(legacy_db):
+    """Тест обновления базы данных исходной схемы на месте."""
+    db = Database(legacy_db)
+    task = db.get_task_by_name("Old Task")
+    assert task.start_time == datetime(2024, 5, 1, 10, 20, 30, 123456)
+    assert task.total_time == 42.5
+    assert task.finished is True
+    assert task.budget is None
+    assert [task.name for task in db.fetch_all_tasks()] == ["Running Task"]
+
+    indexes = {index["name"] for index in inspect(db.engine).get_indexes("tasks")}
+    assert {"ix_tasks_name", "ix_tasks_finished_running"} <= indexes
+    with db.engine.connect() as connection:
+        assert get_version(connection) == LATEST_VERSION
+
+
+def test_upgrade_backfills_intervals(legacy_db):
+    """Тест заполнения журнала синтетическими интервалами из total_time."""
+    db = Database(legacy_db)
+    since = datetime(2024, 5, 1)
+    until = datetime(2024, 5, 2)
+    assert db.time_spent(since, until, "Old Task") == pytest.approx(42.5)
+    assert db.time_spent(since, until, "Running Task") == 0
+
+
+def test_upgrade_is_idempotent(legacy_db):
+    """Тест повторного открытия уже обновленной базы данных."""
+    Database(legacy_db).close()
+    db = Database(legacy_db)
+    assert len(db.fetch_all_tasks(finished=True)) == 1
+
+
+def test_upgrade_adds_versions_and_change_log(legacy_db):
+    """Тест: после обновления изменения задач попадают в журнал, версии растут."""
+    db = Database(legacy_db)
+    assert db.get_task_by_name("Old Task").version == 0
+    seq = db.last_change()
+    task = db.get_task_by_name("Running Task")
+    task.stop()
+    assert db.update_task("Running Task", task) is True
+    assert db.get_task_by_name("Running Task").version == 1
+    _, tasks, removed = db.changes_since(seq)
+    assert [task.name for task in tasks] == ["Running Task"]
+    assert removed == []
+
+
+def test_upgrade_counts_tasks(legacy_db):
+    """Тест: после обновления размеры разделов берутся из счетчиков."""
+    db = Database(legacy_db)
+    assert db.count_tasks() == len(db.fetch_all_tasks())
+    db.add_task(Task("New Task"))
+    assert db.count_tasks() == len(db.fetch_all_tasks())
+
+
+def test_upgrade_archives_finished(legacy_db):
+    """Тест: в обновленной базе завершенные задачи переносятся в архив."""
+    db = Database(legacy_db)
+    assert db.archive() == 1
+    assert [task.name for task in db.fetch_all_tasks(True)] == ["Old Task"]
+    assert db.count_tasks(True) == 1
+    assert not db.add_task(Task("Old Task"))
+    db.close()
+
+
+def test_upgrade_builds_hierarchy(legacy_db):
+    """Тест: после обновления задачи становятся корневыми со своими сводками."""
+    db = Database(legacy_db)
+    assert db.get_rollup("Old Task") == (42.5, 0, 0.0, 1, 0)
+    assert db.set_parent("Old Task", "Running Task")
+    rollup = db.get_rollup("Running Task")
+    assert (rollup.size, rollup.running, rollup.total_time) == (2, 1, 42.5)
+    db.close()
+
+
+def test_upgrade_indexes_names(legacy_db):
+    """Тест: после обновления существующие имена находятся через таблицы поиска."""
+    db = Database(legacy_db)
+    assert [task.name for task in db.fetch_page(finished=True, query="old")] == [
+        "Old Task"
+    ]
+    assert db.archive() == 1
+    assert db.count_tasks(True, "TASK") == 1
+    db.close()
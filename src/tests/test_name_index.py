@@ -0,0 +1,39 @@
+from model.name_index import NameIndex, trigrams
+
+
+def test_trigrams():
+    """Тест разбиения строки на триграммы."""
+    assert trigrams("abcd") == {"abc", "bcd"}
+    assert trigrams("ab") == set()
+
+
+def test_search_substring_ignores_case():
+    """Тест поиска подстроки без учета регистра."""
+    index = NameIndex(["Write Report", "report draft", "Call Bob"])
+    assert index.search("REPORT") == {"Write Report", "report draft"}
+    assert index.search("port d") == {"report draft"}
+    assert index.search("xyz") == set()
+
+
+def test_search_checks_trigram_order():
+    """Тест: наличие всех триграмм еще не означает вхождение подстроки."""
+    index = NameIndex(["abcXbcd"])
+    assert index.search("abcd") == set()
+    assert index.search("bcd") == {"abcXbcd"}
+
+
+def test_short_query_matches_prefix():
+    """Тест поиска по префиксу для запросов короче трех символов."""
+    index = NameIndex(["alpha", "Alps", "beta", "gamma al"])
+    assert index.search("al") == {"Alps", "alpha"}
+    assert len(index.search("")) == 4
+
+
+def test_add_remove():
+    """Тест добавления и удаления имен."""
+    index = NameIndex(["alpha"])
+    index.add("alphabet")
+    index.remove("alpha")
+    assert index.search("alph") == {"alphabet"}
+    assert index.search("al") == {"alphabet"}
+    assert len(index) == 1
@@ -0,0 +1,87 @@
+import threading
+import time
+
+import pytest
+from sqlalchemy import text
+
+from model.database import Database
+from model.persistence import PersistenceWorker
+from model.task import Task
+from model.task_model import TaskIntervalModel
+
+
+@pytest.fixture
+def db():
+    """Фикстура базы данных в памяти с отложенной записью."""
+    return Database(db_url="sqlite:///:memory:", write_behind=True)
+
+
+def test_worker_returns_results(db):
+    """Тест: команды выполняются в отдельном потоке и возвращают результат через Future."""
+    notified = threading.Event()
+    worker = PersistenceWorker(db, notify=notified.set)
+    assert worker.add_task(Task(name="A")).result(timeout=5) is True
+    assert worker.add_task(Task(name="A")).result(timeout=5) is False
+    thread_name = worker.submit(lambda: threading.current_thread().name)
+    assert thread_name.result(timeout=5) == "persistence"
+    assert notified.is_set()
+    assert worker.delete_task("A").result(timeout=5) is True
+    worker.close()
+
+
+def _interval_count(db):
+    with db.Session() as session:
+        return session.query(TaskIntervalModel).count()
+
+
+def test_worker_hands_off_intervals(db):
+    """Тест: интервалы задачи передаются в поток вместе со снимком и сохраняются."""
+    worker = PersistenceWorker(db)
+    task = Task(name="A", start_time=1000.0)
+    worker.add_task(task).result(timeout=5)
+    for now in (1010.0, 1030.0):
+        task.stop(now=now)
+        worker.update_task("A", task)
+        assert task.unsaved_intervals == []
+        task.resume(now=now + 10.0)
+        worker.update_task("A", task)
+    assert worker.submit(_interval_count, db).result(timeout=5) == 2
+    saved = worker.submit(db.get_task_by_name, "A").result(timeout=5)
+    assert saved.total_time == 20.0
+    worker.close()
+
+
+def test_worker_reports_exceptions(db):
+    """Тест передачи исключения команды через Future."""
+    worker = PersistenceWorker(db)
+    future = worker.submit(lambda: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        future.result(timeout=5)
+    worker.close()
+
+
+def test_worker_counts_flushes():
+    """Тест: фоновый сброс буфера отложенной записи увеличивает счетчик сбросов."""
+    db = Database(db_url="sqlite:///:memory:", write_behind=True, flush_interval=0.05)
+    worker = PersistenceWorker(db)
+    task = Task(name="A", start_time=1000.0)
+    worker.add_task(task).result(timeout=5)
+    assert worker.flushes == 0
+    task.stop(now=1010.0)
+    worker.update_task("A", task).result(timeout=5)
+    for _ in range(500):
+        if worker.flushes:
+            break
+        time.sleep(0.01)
+    assert worker.flushes == 1
+    worker.close()
+
+
+def test_sqlite_pragmas(tmp_path):
+    """Тест настройки подключения SQLite: WAL, synchronous=NORMAL, busy_timeout."""
+    db = Database(f"sqlite:///{tmp_path / 'tasks.db'}")
+    with db.engine.connect() as connection:
+        assert connection.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert connection.execute(text("PRAGMA synchronous")).scalar() == 1
+        assert connection.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+    db.close()
@@ -0,0 +1,142 @@
+import io
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from model.database import Database
+from model.report import aggregate, build_report, merge_rows
+from model.storage import LOG_SCHEME, open_storage
+from model.task import Task, to_epoch_us
+from model.task_model import TaskIntervalModel
+
+HOUR = 3_600_000_000
+DAY = 24 * HOUR
+
+
+def test_aggregate_splits_across_days():
+    """Тест разбиения интервалов по границам суток."""
+    totals = aggregate(
+        task_rows=np.array([0, 1, 1]),
+        starts=np.array([1 * HOUR, 23 * HOUR, 2 * DAY]),
+        ends=np.array([3 * HOUR, DAY + 2 * HOUR, 2 * DAY + HOUR]),
+        origin=0,
+        period=DAY,
+        n_tasks=2,
+        n_periods=3,
+    )
+    assert totals.tolist() == [[7200, 0, 0], [3600, 7200, 3600]]
+
+
+def test_aggregate_clips_to_report_range():
+    """Тест обрезки интервалов границами отчета."""
+    totals = aggregate(
+        task_rows=np.array([0, 0]),
+        starts=np.array([-HOUR, DAY - HOUR]),
+        ends=np.array([HOUR, 5 * DAY]),
+        origin=0,
+        period=DAY,
+        n_tasks=1,
+        n_periods=2,
+    )
+    assert totals.tolist() == [[3600 + 3600, DAY / 1_000_000]]
+
+
+@pytest.fixture
+def db():
+    """Фикстура базы данных с двумя задачами и историей интервалов."""
+    database = Database(db_url="sqlite:///:memory:")
+    database.add_tasks([Task(name="A", running=False), Task(name="B", running=False)])
+    since = datetime(2024, 5, 1)
+    intervals = [
+        (1, since + timedelta(hours=22), since + timedelta(days=1, hours=2)),
+        (2, since + timedelta(days=1, hours=1), since + timedelta(days=1, hours=2)),
+        (2, since + timedelta(days=2), since + timedelta(days=2, minutes=30)),
+    ]
+    with database.Session() as session:
+        session.add_all(
+            TaskIntervalModel(
+                task_id=task_id, start_time=to_epoch_us(start), end_time=to_epoch_us(end)
+            )
+            for task_id, start, end in intervals
+        )
+        session.commit()
+    yield database
+
+
+def test_build_report_per_day(db):
+    """Тест отчета по дням."""
+    report = build_report(db, datetime(2024, 5, 1), datetime(2024, 5, 4))
+    assert report.task_names == ["A", "B"]
+    assert [start.day for start in report.period_starts] == [1, 2, 3]
+    assert report.totals.tolist() == [[7200, 7200, 0], [0, 3600, 1800]]
+    assert report.top(1) == [("A", 14400.0)]
+
+
+def test_build_report_per_week(db):
+    """Тест отчета по неделям."""
+    report = build_report(db, datetime(2024, 5, 1), datetime(2024, 5, 8), "week")
+    assert report.totals.tolist() == [[14400], [5400]]
+
+
+def test_build_report_with_workers(tmp_path):
+    """Тест распределения агрегации между процессами."""
+    db = Database(f"sqlite:///{tmp_path / 'tasks.db'}")
+    task = Task(name="A", start_time=datetime(2024, 5, 1, 12), running=False)
+    db.add_task(task)
+    with db.Session() as session:
+        session.add(
+            TaskIntervalModel(
+                task_id=1,
+                start_time=to_epoch_us(datetime(2024, 5, 1, 12)),
+                end_time=to_epoch_us(datetime(2024, 5, 3, 12)),
+            )
+        )
+        session.commit()
+    report = build_report(db, datetime(2024, 5, 1), datetime(2024, 5, 5), workers=2)
+    assert report.totals.tolist() == [[43200, 86400, 43200, 0]]
+
+
+def test_build_report_on_log_storage_with_workers(tmp_path):
+    """Тест: хранилище без SQLAlchemy агрегируется в текущем процессе."""
+    storage = open_storage(f"{LOG_SCHEME}:///{tmp_path / 'tasks.log'}")
+    task = Task(name="A", start_time=datetime(2024, 5, 1, 12))
+    storage.add_tasks([task, Task(name="idle", running=False)])
+    task.stop(datetime(2024, 5, 2, 12).timestamp())
+    storage.update_task("A", task)
+    since, until = datetime(2024, 5, 1), datetime(2024, 5, 4)
+    report = build_report(storage, since, until, workers=2)
+    assert report.task_names == ["A"]
+    assert report.totals.tolist() == [[43200, 43200, 0]]
+    storage.close()
+
+
+def test_merge_rows():
+    """Тест сложения матриц отчета по номерам задач."""
+    ids, totals = merge_rows(
+        np.array([2, 5]),
+        np.array([[1.0], [2.0]]),
+        np.array([3, 5]),
+        np.array([[4.0], [8.0]]),
+    )
+    assert ids.tolist() == [2, 3, 5]
+    assert totals.tolist() == [[1.0], [4.0], [10.0]]
+
+
+def test_report_export_csv(db):
+    """Тест выгрузки отчета в CSV."""
+    report = build_report(db, datetime(2024, 5, 1), datetime(2024, 5, 4))
+    file = io.StringIO()
+    report.to_csv(file)
+    lines = file.getvalue().splitlines()
+    assert lines[0] == "task,period_start,seconds"
+    assert lines[1] == "A,2024-05-01T00:00:00,7200.0"
+    assert len(lines) == 5
+
+
+def test_report_utilization(db):
+    """Тест гистограммы загрузки по периодам."""
+    report = build_report(db, datetime(2024, 5, 1), datetime(2024, 5, 4))
+    counts, edges = report.utilization(bins=4)
+    assert counts.sum() == 3
+    assert edges[-1] == 1.0
@@ -0,0 +1,107 @@
+import pytest
+
+from model.scheduler import (BUDGET, COMPACT_MIN, REMINDER, Scheduler,
+                             budget_deadline, next_reminder)
+from model.task import Task
+from model.task_store import TaskStore
+
+
+@pytest.fixture
+def scheduler():
+    """Фикстура планировщика с напоминанием каждые 100 секунд."""
+    return Scheduler(remind_after=100.0)
+
+
+def test_budget_deadline():
+    """Тест срока бюджета: start_time + (budget - total_time) только для запущенной задачи."""
+    task = Task("A", start_time=1000.0, total_time=30.0, budget=50.0)
+    assert budget_deadline(task) == 1020.0
+    task.stop(now=1010.0)
+    assert budget_deadline(task) is None
+    assert budget_deadline(Task("B", start_time=1000.0)) is None
+    assert budget_deadline(Task("C", start_time=1000.0, total_time=60.0, budget=50.0)) is None
+
+
+def test_next_reminder():
+    """Тест: напоминания повторяются с шагом remind_after от момента запуска."""
+    assert next_reminder(1000.0, 100.0, 1000.0) == 1100.0
+    assert next_reminder(1000.0, 100.0, 1250.0) == 1300.0
+    assert next_reminder(1000.0, 100.0, 1300.0) == 1400.0
+
+
+def test_budget_fires_once(scheduler):
+    """Тест: исчерпание бюджета срабатывает один раз и отмечает задачу."""
+    task = Task("A", start_time=1000.0, budget=50.0)
+    scheduler.update("A", task, now=1000.0)
+    assert scheduler.next_deadline() == 1050.0
+    assert scheduler.pop_due(1049.0) == []
+    assert scheduler.pop_due(1060.0) == [("A", BUDGET)]
+    assert scheduler.exceeded == {"A"}
+    assert scheduler.next_deadline() == 1100.0
+    assert scheduler.pop_due(1120.0) == [("A", REMINDER)]
+    assert scheduler.next_deadline() == 1200.0
+
+
+def test_update_on_stop_resume_finish(scheduler):
+    """Тест пересчета сроков при остановке, возобновлении, переименовании и завершении."""
+    task = Task("A", start_time=1000.0, budget=50.0)
+    scheduler.update("A", task, now=1000.0)
+    task.stop(now=1030.0)
+    scheduler.update("A", task, now=1030.0)
+    assert scheduler.next_deadline() is None
+    task.resume(now=2000.0)
+    task.name = "B"
+    scheduler.update("A", task, now=2000.0)
+    assert scheduler.next_deadline() == 2020.0
+    assert scheduler.pop_due(2020.0) == [("B", BUDGET)]
+    task.finish(now=2030.0)
+    scheduler.update("B", task, now=2030.0)
+    assert scheduler.exceeded == set()
+    assert scheduler.next_deadline() is None
+    assert len(scheduler) == 0
+
+
+def test_stopped_over_budget_is_exceeded():
+    """Тест: остановленная задача сверх бюджета отмечается без срока в куче."""
+    scheduler = Scheduler()
+    task = Task("A", start_time=1000.0, total_time=60.0, running=False, budget=50.0)
+    scheduler.update("A", task, now=1000.0)
+    assert scheduler.exceeded == {"A"}
+    assert scheduler.next_deadline() is None
+    task.budget = None
+    scheduler.update("A", task, now=1000.0)
+    assert scheduler.exceeded == set()
+
+
+def test_cancelled_entries_are_compacted():
+    """Тест: отмененные записи не копятся в куче при частых изменениях."""
+    scheduler = Scheduler()
+    task = Task("A", start_time=1000.0, budget=50.0)
+    for step in range(10 * COMPACT_MIN):
+        task.budget = 50.0 + step
+        scheduler.update("A", task, now=1000.0)
+    assert len(scheduler) == 1
+    assert scheduler.pop_due(1060.0 + 10 * COMPACT_MIN) == [("A", BUDGET)]
+    assert scheduler.pop_due(1e12) == []
+
+
+def test_load_from_store(scheduler):
+    """Тест векторной загрузки сроков из колонок хранилища."""
+    store = TaskStore()
+    store.extend(
+        ["A", "B", "C", "D", "E"],
+        [1000.0, 1000.0, 1000.0, 1000.0, 1000.0],
+        [0.0, 0.0, 80.0, 10.0, 0.0],
+        [True, True, False, True, True],
+        [False, False, False, False, True],
+        budgets=[30.0, None, 50.0, 100.0, 10.0],
+    )
+    scheduler.load(store, now=1050.0)
+    assert scheduler.exceeded == {"A", "C"}
+    assert scheduler.pop_due(1100.0) == [
+        ("D", BUDGET),
+        ("A", REMINDER),
+        ("B", REMINDER),
+        ("D", REMINDER),
+    ]
+    assert scheduler.exceeded == {"A", "C", "D"}
@@ -0,0 +1,88 @@
+import os
+
+import pytest
+
+from model.snapshot import (read_snapshot, snapshot_path, write_snapshot,
+                            write_store_snapshot)
+from model.task import Task
+from model.task_index import TaskIndex
+from model.task_store import TaskStore
+
+
+@pytest.fixture
+def path(tmp_path):
+    """Фикстура пути к файлу снимка во временном каталоге."""
+    return str(tmp_path / "tasks.db.snapshot")
+
+
+def state(task):
+    return (
+        task.name,
+        task.start_timestamp,
+        task.total_time,
+        task.running,
+        task.finished,
+        task.version,
+    )
+
+
+def test_snapshot_round_trip(path):
+    """Тест: снимок сохраняет порядок и состояние задач, включая строки хранилища."""
+    store = TaskStore()
+    tasks = [
+        Task("Задача", 1_700_000_000.5, 12.25, running=True, version=3),
+        Task("b", 1_700_000_100.0, 0.0, running=False),
+        Task("", 1_700_000_200.0, 7.0, running=False, finished=True, version=70000),
+    ]
+    views = [store.add(task) for task in tasks]
+    write_snapshot(path, views)
+    assert [state(task) for task in read_snapshot(path)] == [
+        state(task) for task in tasks
+    ]
+    assert os.listdir(os.path.dirname(path)) == ["tasks.db.snapshot"]
+
+
+def test_store_snapshot_matches_index_order(path):
+    """Тест: снимок по колонкам хранилища совпадает со снимком по TaskIndex."""
+    store = TaskStore()
+    for i, running in enumerate([False, True, False, True]):
+        store.add(Task(f"task {3 - i}", 1_700_000_000.0 + i, i, running, version=i))
+    store.add(Task("done", 1_700_000_000.0, running=False, finished=True))
+    store.remove("task 1")
+    copy = store.copy()
+    store.add(Task("later", 1_700_000_000.0))
+    write_store_snapshot(path, copy)
+    with open(path, "rb") as file:
+        data = file.read()
+    write_snapshot(path, TaskIndex(copy.views()).view(False))
+    with open(path, "rb") as file:
+        assert file.read() == data
+    names = [task.name for task in read_snapshot(path)]
+    assert names == ["task 0", "task 2", "task 3"]
+
+
+def test_snapshot_empty_and_missing(path):
+    """Тест: пустой список задач сохраняется, отсутствующий снимок дает None."""
+    assert read_snapshot(path) is None
+    assert read_snapshot(None) is None
+    write_snapshot(path, [])
+    assert read_snapshot(path) == []
+
+
+def test_snapshot_rejects_damaged_file(path):
+    """Тест: обрезанный или чужой файл не читается как снимок."""
+    write_snapshot(path, [Task("task", 1_700_000_000.0)])
+    with open(path, "rb") as file:
+        data = file.read()
+    for damaged in (data[:-1], data + b"x", b"XXXX" + data[4:], b""):
+        with open(path, "wb") as file:
+            file.write(damaged)
+        assert read_snapshot(path) is None
+
+
+def test_snapshot_path():
+    """Тест: снимок ведется только для файловой базы данных SQLite."""
+    assert snapshot_path("sqlite:///tasks.db") == "tasks.db.snapshot"
+    assert snapshot_path("sqlite:////tmp/t.db?timeout=5") == "/tmp/t.db.snapshot"
+    assert snapshot_path("sqlite:///:memory:") is None
+    assert snapshot_path("postgresql://host/tasks") is None
@@ -77,4 +77,45 @@ def test_task_elapsed_time_increase(test_task):
     initial_time = task.elapsed_time()
     task.stop()
     final_time = task.elapsed_time()
-    assert final_time >= initial_time
\ No newline at end of file
+    assert final_time >= initial_time
+
+
+def test_task_stop_records_interval(test_task):
+    """Тестирование записи закрытого интервала при остановке задачи"""
+    task = test_task
+    start_time = task.start_timestamp
+    task.stop()
+    [(start, end)] = task.unsaved_intervals
+    assert start == start_time
+    assert end - start == task.total_time
+    task.mark_intervals_saved(1)
+    assert task.unsaved_intervals == []
+
+
+def test_task_shared_clock():
+    """Тестирование расчетов времени с явным моментом now"""
+    task = Task(name="Clock Task", start_time=1000.0)
+    assert task.elapsed_time(now=1010.0) == 10.0
+    task.stop(now=1015.0)
+    assert task.total_time == 15.0
+    task.resume(now=1100.0)
+    assert task.elapsed_time(now=1105.0) == 20.0
+    task.finish(now=1110.0)
+    assert task.unsaved_intervals == [(1000.0, 1015.0), (1100.0, 1110.0)]
+
+
+def test_task_fake_clock(monkeypatch):
+    """Тестирование подмены источника времени"""
+    now = [500.0]
+    monkeypatch.setattr(Task, "clock", lambda: now[0])
+    task = Task(name="Fake Clock Task")
+    now[0] = 530.0
+    assert task.elapsed_time() == 30.0
+    assert str(task) == (
+        "Task: Fake Clock Task, Status: Running, Time Elapsed: 30.00 seconds"
+    )
+
+
+def test_task_has_slots(test_task):
+    """Тестирование отсутствия словаря атрибутов у задачи"""
+    assert not hasattr(test_task, "__dict__")
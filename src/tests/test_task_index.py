@@ -0,0 +1,104 @@
+import pytest
+
+from model.task import Task
+from model.task_index import TaskIndex
+
+
+@pytest.fixture
+def index():
+    """Фикстура для создания индекса с активными и завершенными задачами."""
+    return TaskIndex(
+        [
+            Task(name="B", running=False),
+            Task(name="C"),
+            Task(name="A", running=False),
+            Task(name="D", running=False, finished=True),
+        ]
+    )
+
+
+def test_index_display_order(index):
+    """Тест порядка отображения: сначала запущенные, затем по имени."""
+    assert [task.name for task in index.view(False)] == ["C", "A", "B"]
+    assert [task.name for task in index.view(True)] == ["D"]
+    assert index.has_running() is True
+
+
+def test_index_add_duplicate(index):
+    """Тест добавления задачи с существующим именем."""
+    with pytest.raises(KeyError):
+        index.add(Task(name="A"))
+
+
+def test_index_update_moves_task(index):
+    """Тест перемещения задачи после остановки и завершения."""
+    task = index.get("C")
+    task.stop()
+    index.update("C", task)
+    assert [task.name for task in index.view(False)] == ["A", "B", "C"]
+    assert index.has_running() is False
+
+    task.finish()
+    index.update("C", task)
+    assert [task.name for task in index.view(False)] == ["A", "B"]
+    assert [task.name for task in index.view(True)] == ["C", "D"]
+
+
+def test_index_rename(index):
+    """Тест переименования задачи в индексе."""
+    task = index.get("A")
+    task.name = "Z"
+    index.update("A", task)
+    assert "A" not in index
+    assert index.get("Z") is task
+    assert index.index_of(task) == 2
+
+
+def test_index_remove(index):
+    """Тест удаления задачи из индекса."""
+    view = index.view(False)
+    index.remove("B")
+    assert [task.name for task in view] == ["C", "A"]
+    assert len(index) == 3
+
+
+def test_index_search_order_and_partition():
+    """Тест поиска: совпадения раздела в порядке отображения."""
+    index = TaskIndex(
+        [
+            Task(name="Отчет за март", running=False),
+            Task(name="отчет за апрель"),
+            Task(name="Звонок"),
+            Task(name="Старый отчет", running=False, finished=True),
+        ]
+    )
+    assert [task.name for task in index.search("ОТЧЕТ", False)] == [
+        "отчет за апрель",
+        "Отчет за март",
+    ]
+    assert [task.name for task in index.search("отчет", True)] == ["Старый отчет"]
+    assert [task.name for task in index.search("зв", False)] == ["Звонок"]
+
+
+def test_index_search_follows_changes():
+    """Тест обновления индекса имен при добавлении, переименовании и удалении."""
+    index = TaskIndex([Task(name=f"task {i}", running=False) for i in range(20)])
+    assert len(index.search("task 1", False)) == 11
+    task = index.get("task 15")
+    task.name = "renamed"
+    index.update("task 15", task)
+    index.add(Task(name="task 100"))
+    index.remove("task 1")
+    assert [task.name for task in index.search("task 1", False)] == [
+        "task 100",
+        "task 10",
+        "task 11",
+        "task 12",
+        "task 13",
+        "task 14",
+        "task 16",
+        "task 17",
+        "task 18",
+        "task 19",
+    ]
+    assert [task.name for task in index.search("nam", False)] == ["renamed"]
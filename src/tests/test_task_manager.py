@@ -0,0 +1,30 @@
+import os
+
+import pytest
+
+from controller.task_manager import Commands, drain, seconds_until_next_tick
+
+
+def test_seconds_until_next_tick():
+    """Тест выравнивания таймера по началу следующей секунды."""
+    assert seconds_until_next_tick(100.25) == pytest.approx(0.75)
+    assert seconds_until_next_tick(100.0) == pytest.approx(1.0)
+
+
+def test_drain_empties_pipe():
+    """Тест вычитывания неблокирующего канала пробуждения."""
+    read_fd, write_fd = os.pipe()
+    os.set_blocking(read_fd, False)
+    os.write(write_fd, b"\x1c\x1c")
+    drain(read_fd)
+    with pytest.raises(BlockingIOError):
+        os.read(read_fd, 1)
+    os.close(read_fd)
+    os.close(write_fd)
+
+
+def test_match_command():
+    """Тест сопоставления клавиш и команд."""
+    assert Commands.match_command(ord("s")) == Commands.STOP_RESUME
+    assert Commands.match_command(ord("Q")) == Commands.QUIT
+    assert Commands.match_command(-1) is None
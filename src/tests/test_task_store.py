@@ -0,0 +1,141 @@
+import numpy as np
+import pytest
+
+from model.task import Task
+from model.task_index import TaskIndex
+from model.task_store import TaskStore
+
+
+@pytest.fixture
+def store():
+    """Фикстура для создания хранилища с запущенными, остановленными и завершенными задачами."""
+    store = TaskStore(capacity=2)
+    store.extend(
+        ["A", "B", "C", "D"],
+        [100.0, 100.0, 150.0, 100.0],
+        [10.0, 50.0, 0.0, 20.0],
+        [True, False, True, False],
+        [False, False, False, True],
+    )
+    return store
+
+
+def test_store_elapsed(store):
+    """Тест векторного расчета времени всех задач на один момент."""
+    np.testing.assert_allclose(store.elapsed(now=200.0), [110.0, 50.0, 50.0, 20.0])
+
+
+def test_store_stop_resume_mask(store):
+    """Тест остановки и возобновления задач по маске."""
+    stopped = store.stop(store.mask(finished=False), now=200.0)
+    assert stopped.tolist() == [0, 2]
+    assert not store.running.any()
+    np.testing.assert_allclose(store.total_times, [110.0, 50.0, 50.0, 20.0])
+    assert store.unsaved_intervals(0) == [(100.0, 200.0)]
+
+    resumed = store.resume(store.mask(finished=False), now=300.0)
+    assert resumed.tolist() == [0, 1, 2]
+    np.testing.assert_allclose(store.elapsed(now=310.0), [120.0, 60.0, 60.0, 20.0])
+
+
+def test_store_sort_and_filter(store):
+    """Тест сортировки и фильтрации по общему времени."""
+    rows = store.sort(store.mask(finished=False), descending=True, now=200.0)
+    assert [store.name_of(row) for row in rows] == ["A", "C", "B"]
+    busy = store.mask(min_elapsed=50.0, now=200.0)
+    assert [task.name for task in store.select(store.sort(busy, by="name"))] == [
+        "A",
+        "B",
+        "C",
+    ]
+
+
+def test_store_columns_read_only(store):
+    """Тест защиты колонок хранилища от записи снаружи."""
+    with pytest.raises(ValueError):
+        store.total_times[0] = 1.0
+
+
+def test_store_duplicate_name(store):
+    """Тест добавления задачи с существующим именем."""
+    with pytest.raises(KeyError):
+        store.add(Task(name="A"))
+    with pytest.raises(KeyError):
+        store.get("B").name = "A"
+
+
+def test_store_remove(store):
+    """Тест удаления задачи: строка становится неживой и достается новой задаче."""
+    store.remove("B")
+    assert "B" not in store
+    assert len(store) == 3
+    assert store.alive.tolist() == [True, False, True, True]
+    task = store.add(Task(name="E", start_time=300.0, running=False))
+    assert task.row == 1
+    assert store.alive.tolist() == [True, True, True, True]
+    assert (task.name, task.total_time, store.unsaved_intervals(1)) == ("E", 0.0, [])
+
+
+def test_store_reuses_rows_under_churn(store):
+    """Тест: при добавлении и удалении задач массивы хранилища не растут."""
+    for i in range(100):
+        store.remove("A" if i == 0 else f"new {i - 1}")
+        store.add(Task(name=f"new {i}", running=False))
+    assert len(store.alive) == 4
+    rows = store.extend(["X", "Y"], [0.0, 0.0], [1.0, 2.0], [False] * 2, [False] * 2)
+    assert list(rows) == [4, 5]
+    store.remove("C")
+    store.remove("X")
+    rows = store.extend(
+        ["P", "Q", "R"], [0.0] * 3, [3.0, 4.0, 5.0], [False] * 3, [False] * 3
+    )
+    assert sorted(rows) == [2, 4, 6]
+    assert [store.name_of(row) for row in rows] == ["P", "Q", "R"]
+    assert [store.get(name).total_time for name in "PQR"] == [3.0, 4.0, 5.0]
+
+
+def test_task_view_matches_task(store):
+    """Тест: представление строки ведет себя как Task."""
+    view = store.add(Task(name="E", start_time=1000.0, total_time=5.0))
+    task = Task(name="E", start_time=1000.0, total_time=5.0)
+    for item in (view, task):
+        item.stop(now=1010.0)
+        item.resume(now=1020.0)
+        item.finish(now=1030.0)
+    assert view.total_time == task.total_time == 25.0
+    assert view.finished and not view.running
+    assert view.unsaved_intervals == task.unsaved_intervals
+    view.mark_intervals_saved(2)
+    assert view.unsaved_intervals == []
+
+
+def test_task_view_reads_python_scalars(store):
+    """Тест: скалярные чтения представления возвращают значения Python."""
+    view = store.get("A")
+    values = (view.running, view.finished, view.version, view.total_time)
+    assert [type(value) for value in values] == [bool, bool, int, float]
+    assert view.elapsed_time(now=200.0) == store.elapsed(now=200.0)[0] == 110.0
+    assert store.get("B").elapsed_time(now=200.0) == 50.0
+
+
+def test_task_index_over_store(store):
+    """Тест построения индекса отображения над строками хранилища."""
+    index = TaskIndex(store.views())
+    assert [task.name for task in index.view(False)] == ["A", "C", "B"]
+    task = index.get("A")
+    task.stop(now=200.0)
+    index.update("A", task)
+    assert [task.name for task in index.view(False)] == ["C", "A", "B"]
+
+
+def test_store_budgets(store):
+    """Тест колонки бюджетов: NaN в колонке, None в представлении строки."""
+    assert np.isnan(store.budgets).all()
+    task = store.add(Task("E", start_time=100.0, budget=60.0))
+    assert task.budget == 60.0
+    store.get("A").budget = 30.0
+    np.testing.assert_array_equal(store.budgets[[0, 4]], [30.0, 60.0])
+    task.budget = None
+    assert task.budget is None
+    store.assign(0, Task("A", start_time=100.0))
+    assert store.get("A").budget is None
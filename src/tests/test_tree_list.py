@@ -0,0 +1,87 @@
+import pytest
+
+from model.task import Task
+from model.task_tree import Rollup
+from model.tree_list import TreeList
+
+TREE = {
+    None: ["a", "b"],
+    "a": ["a1", "a2"],
+    "a1": ["a11"],
+}
+
+
+class FakeTree:
+    """Источник детей по словарю TREE с подсчетом обращений."""
+
+    def __init__(self):
+        self.fetches = []
+
+    def fetch_children(self, parent_name):
+        self.fetches.append(parent_name)
+        return [
+            (
+                Task(name, running=False),
+                Rollup(10.0, 0, 0.0, 1, len(TREE.get(name, ()))),
+            )
+            for name in TREE.get(parent_name, ())
+        ]
+
+
+@pytest.fixture
+def tree():
+    """Фикстура источника детей."""
+    return FakeTree()
+
+
+def test_expand_loads_only_opened_nodes(tree):
+    """Тест: корни читаются сразу, дети — только при раскрытии узла."""
+    rows = TreeList(tree.fetch_children)
+    assert [row.label for row in rows] == ["▸ a", "  b"]
+    assert rows.expand(0)
+    assert not rows.expand(0)
+    assert not rows.expand(3)
+    assert [row.label for row in rows] == ["▾ a", "  ▸ a1", "    a2", "  b"]
+    assert tree.fetches == [None, "a"]
+
+
+def test_collapse_selects_parent(tree):
+    """Тест сворачивания узла и перехода от свернутой строки к родителю."""
+    rows = TreeList(tree.fetch_children)
+    rows.expand(0)
+    rows.expand(1)
+    assert [row.name for row in rows] == ["a", "a1", "a11", "a2", "b"]
+    assert rows.collapse(3) == 0
+    assert rows.collapse(4) == 4
+    assert rows.collapse(0) == 0
+    assert [row.name for row in rows] == ["a", "b"]
+
+
+def test_reset_keeps_expanded_nodes(tree):
+    """Тест: после reset() перечитываются корни и раскрытые поддеревья."""
+    rows = TreeList(tree.fetch_children)
+    rows.expand(0)
+    rows.expand(1)
+    rows.reset()
+    assert [row.name for row in rows] == ["a", "a1", "a11", "a2", "b"]
+    assert tree.fetches == [None, "a", "a1", None, "a", "a1"]
+
+
+def test_pending_children_rebuilt_after_reset(tree):
+    """Тест: непрочитанные корни дают пустое дерево, дети — узел без строк."""
+    pending = {None}
+
+    def fetch_children(parent_name):
+        if parent_name in pending:
+            return None
+        return tree.fetch_children(parent_name)
+
+    rows = TreeList(fetch_children)
+    assert rows.loading and len(rows) == 0
+    pending = {"a"}
+    assert not rows.loading
+    assert rows.expand(0)
+    assert [row.label for row in rows] == ["▾ a", "  b"]
+    pending = set()
+    rows.reset()
+    assert [row.label for row in rows] == ["▾ a", "  ▸ a1", "    a2", "  b"]
@@ -1,5 +1,8 @@
 import curses
-import time
+
+from model.task import Task
+
+LOADING = "..."
 
 
 def init_colors():
@@ -17,20 +20,6 @@ def init_colors():
     curses.curs_set(0)
 
 
-def error_screen(stdscr: curses.window, message: str):
-    """
-    Отображает экран с ошибкой и задерживает на 2 секунды перед возвратом.
-
-    :param stdscr: Объект окна curses
-    :param message: Сообщение об ошибке для отображения
-    """
-    stdscr.clear()
-    stdscr.addstr(3, 1, message)
-    stdscr.border()
-    stdscr.refresh()
-    time.sleep(2)
-
-
 def confirmation(stdscr: curses.window, action: str, task_name: str) -> bool:
     """
     Отображает окно подтверждения для выполнения действия с задачей.
@@ -77,60 +66,253 @@ def get_task_name(stdscr: curses.window, message: str = "Введите имя 
     return task_name
 
 
-def draw_table(stdscr: curses.window, tasks: list, active_field, finished):
+def draw_table(
+    stdscr: curses.window,
+    tasks: list,
+    active_field,
+    finished,
+    alerts: set[str] | None = None,
+    tree=False,
+):
     """
-    Отображает таблицу с задачами на экране.
+    Отображает таблицу с задачами на экране за один проход, без учета
+    предыдущего кадра. Для постоянной перерисовки используется TableView.
 
     :param stdscr: Объект окна curses
     :param tasks: Список задач для отображения
     :param active_field: Индекс активной задачи
     :param finished: Флаг, указывающий, показывать ли завершенные задачи
+    :param alerts: Имена задач с исчерпанным бюджетом времени или None
+    :param tree: tasks — строки дерева проектов (model.tree_list.TreeRow)
     """
-    stdscr.clear()
-    h, w = stdscr.getmaxyx()
-    max_rows = h - 2
-    max_columns = w - 2
-    if max_columns < 60 or max_rows < 3:
-        stdscr.addstr(0, 0, "Недостаточный размер окна", curses.A_BOLD)
-        stdscr.refresh()
-        return
-    draw_header(stdscr, max_columns, finished)
-    for i, task in enumerate(tasks):
-        row = i + 3
-        if row > max_rows:
-            break
-        col_pair = i % 2 + (5, 1)[task.running] if i != active_field else 4
-        stdscr.addstr(row, 1, task.name.ljust(41), curses.color_pair(col_pair))
-        stdscr.addstr(
-            row,
-            42,
-            format_elapsed_time(task.elapsed_time()).ljust(18),
-            curses.color_pair(col_pair),
-        )
-        stdscr.addstr(
-            row,
-            60,
-            ("Да" if task.running else "Нет").ljust(max_columns - 59),
-            curses.color_pair(col_pair),
-        )
-    stdscr.border()
-    print_help(stdscr)
-    stdscr.refresh()
+    TableView(stdscr).draw(tasks, active_field, finished, alerts=alerts, tree=tree)
+
+
+class TableView:
+    """
+    Таблица задач с инкрементальной перерисовкой.
+
+    Запоминает содержимое каждой строки экрана (имя, отображаемую секунду,
+    статус и цвет) и при следующем кадре переписывает только изменившиеся
+    строки. Видимая область прокручивается так, чтобы активная задача всегда
+    была на экране. Заголовок, рамка и подсказки рисуются заново только при
+    смене размера окна, раздела или после invalidate(). Строка состояния
+    (сообщения об ошибках) рисуется поверх разделителя под таблицей и не
+    задерживает интерфейс. Панель статистики рисуется поверх таблицы
+    в правом верхнем углу; пока она открыта, строки таблицы перерисовываются
+    каждый кадр. В режиме дерева проектов строки — TreeRow: имя рисуется
+    с отступом и отметкой раскрытия, время и активность — по сводке
+    поддерева (для проекта — количество запущенных задач). Строки раздела,
+    которые еще читаются из хранилища (None в списке задач), рисуются
+    заглушкой.
+    """
+
+    def __init__(self, stdscr: curses.window):
+        """
+        :param stdscr: Объект окна curses
+        """
+        self.__stdscr = stdscr
+        self.__top = 0
+        self.__layout = None
+        self.__rows: dict[int, tuple | None] = {}
+        self.__status = None
+        self.__overlay = False
+        self.__search = None
 
+    def invalidate(self):
+        """
+        Сбрасывает запомненное состояние экрана, чтобы следующий кадр был
+        нарисован полностью (например, после диалогов, очищающих экран).
+        """
+        self.__layout = None
 
-def draw_header(stdscr: curses.window, max_columns: int, finished: bool):
+    def draw(
+        self,
+        tasks: list,
+        active_field,
+        finished,
+        status: str | None = None,
+        overlay: list[str] | None = None,
+        search: str | None = None,
+        alerts: set[str] | None = None,
+        tree=False,
+    ):
+        """
+        Рисует кадр таблицы задач.
+
+        :param tasks: Список задач для отображения
+        :param active_field: Индекс активной задачи
+        :param finished: Флаг, указывающий, показывать ли завершенные задачи
+        :param status: Сообщение строки состояния или None
+        :param overlay: Строки панели статистики или None
+        :param search: Строка поиска для заголовка или None
+        :param alerts: Имена задач с исчерпанным бюджетом времени (их строки
+            выделяются красным) или None; проверяются только видимые строки
+        :param tree: tasks — строки дерева проектов (model.tree_list.TreeRow)
+        """
+        stdscr = self.__stdscr
+        h, w = stdscr.getmaxyx()
+        max_rows = h - 2
+        max_columns = w - 2
+        if max_columns < 60 or max_rows < 3:
+            stdscr.erase()
+            stdscr.addstr(0, 0, "Недостаточный размер окна", curses.A_BOLD)
+            self.__layout = None
+            stdscr.noutrefresh()
+            curses.doupdate()
+            return
+        layout = (h, w, finished, tree)
+        if layout != self.__layout:
+            stdscr.erase()
+            draw_header(stdscr, max_columns, finished, search, tree)
+            stdscr.border()
+            print_help(stdscr, tree)
+            self.__layout = layout
+            self.__rows = {}
+            self.__status = None
+        elif search != self.__search:
+            draw_header(stdscr, max_columns, finished, search, tree)
+        self.__search = search
+        first_row = 3
+        last_row = h - 5 if h > 8 else max_rows
+        visible = last_row - first_row + 1
+        if overlay or self.__overlay:
+            self.__rows = {}
+        total = len(tasks)
+        self.__top = scroll_viewport(self.__top, active_field, visible, total)
+        now = Task.clock()
+        for offset in range(visible):
+            i = self.__top + offset
+            try:
+                task = tasks[i] if i < total else None
+            except IndexError:
+                # Раздел, читаемый страницами, мог сократиться во время кадра.
+                task = None
+            if task is not None:
+                if i == active_field:
+                    col_pair = 4
+                elif alerts and task.name in alerts:
+                    col_pair = 7
+                else:
+                    col_pair = i % 2 + (5, 1)[task.running]
+                cells = (
+                    task.label if tree else task.name,
+                    int(task.elapsed_time(now)),
+                    task.running,
+                    col_pair,
+                )
+            elif i < total:
+                cells = (LOADING, None, 0, 4 if i == active_field else i % 2 + 5)
+            else:
+                cells = None
+            row = first_row + offset
+            if self.__rows.get(row) != cells:
+                self.__draw_row(row, cells, max_columns)
+                self.__rows[row] = cells
+        if overlay:
+            self.__draw_overlay(overlay[:visible], first_row, w)
+        self.__overlay = bool(overlay)
+        if status != self.__status:
+            self.__draw_status(status, h, w)
+            self.__status = status
+        stdscr.noutrefresh()
+        curses.doupdate()
+
+    def __draw_status(self, status: str | None, h: int, w: int):
+        """
+        Рисует строку состояния на разделителе под таблицей (или на нижней
+        рамке маленького окна) либо восстанавливает линию, если сообщения нет.
+        """
+        if h > 8:
+            row = h - 4
+            self.__stdscr.addstr(row, 1, "─" * (w - 2))
+        else:
+            row = h - 1
+            self.__stdscr.hline(row, 1, curses.ACS_HLINE, w - 2)
+        if status:
+            self.__stdscr.addstr(
+                row, 2, f" {status} "[: w - 4], curses.color_pair(7) | curses.A_BOLD
+            )
+
+    def __draw_overlay(self, lines: list[str], first_row: int, w: int):
+        """
+        Рисует панель статистики в правом верхнем углу таблицы.
+        """
+        width = max(map(len, lines)) + 2
+        x = max(w - 1 - width, 1)
+        for offset, line in enumerate(lines):
+            self.__stdscr.addstr(
+                first_row + offset, x, f" {line} "[: w - 1 - x], curses.A_REVERSE
+            )
+
+    def __draw_row(self, row: int, cells: tuple | None, max_columns: int):
+        """
+        Рисует одну строку таблицы или очищает её, если задачи для строки нет.
+        """
+        if cells is None:
+            self.__stdscr.addstr(row, 1, " " * max_columns)
+            return
+        name, seconds, running, col_pair = cells
+        attr = curses.color_pair(col_pair)
+        elapsed = "" if seconds is None else format_elapsed_time(seconds)
+        self.__stdscr.addstr(row, 1, name[:40].ljust(41), attr)
+        self.__stdscr.addstr(row, 42, elapsed.ljust(18), attr)
+        if not running:
+            active = "Нет"
+        else:
+            active = "Да" if running == 1 else f"Да ({running})"
+        self.__stdscr.addstr(row, 60, active.ljust(max_columns - 59), attr)
+
+
+def scroll_viewport(top: int, active_field: int, visible: int, total: int) -> int:
+    """
+    Вычисляет первую видимую строку так, чтобы активная строка попадала в окно.
+
+    :param top: Текущая первая видимая строка
+    :param active_field: Индекс активной строки
+    :param visible: Количество строк, помещающихся на экране
+    :param total: Общее количество строк
+    :return: Новая первая видимая строка
+    """
+    if total <= visible:
+        return 0
+    if active_field < top:
+        top = active_field
+    elif active_field >= top + visible:
+        top = active_field - visible + 1
+    return max(0, min(top, total - visible))
+
+
+def draw_header(
+    stdscr: curses.window,
+    max_columns: int,
+    finished: bool,
+    search: str | None = None,
+    tree=False,
+):
     """
     Рисует заголовок таблицы.
 
     :param stdscr: Объект окна curses
     :param max_columns: Максимальное количество колонок в окне
     :param finished: Флаг, указывающий, показывать ли завершенные задачи
+    :param search: Строка поиска или None
+    :param tree: Показывается дерево проектов
     """
-    if finished:
+    if tree:
+        header = "Проекты"
+    elif finished:
         header = "Завершенные задачи"
     else:
         header = "Текущие задачи"
-    stdscr.addstr(1, 1, header.ljust(max_columns), curses.A_BOLD | curses.color_pair(3))
+    if search is not None:
+        header = f"{header}   Поиск: {search}"
+    stdscr.addstr(
+        1,
+        1,
+        header[:max_columns].ljust(max_columns),
+        curses.A_BOLD | curses.color_pair(3),
+    )
     stdscr.addstr(2, 1, "Задача".ljust(41), curses.A_BOLD | curses.color_pair(2))
     stdscr.addstr(
         2, 42, "Время выполнения".ljust(18), curses.A_BOLD | curses.color_pair(2)
@@ -140,6 +322,52 @@ def draw_header(stdscr: curses.window, max_columns: int, finished: bool):
     )
 
 
+def report_screen(stdscr: curses.window, report):
+    """
+    Отображает отчет о затраченном времени: задачи с наибольшим временем
+    по строкам, периоды по столбцам (последние периоды, помещающиеся в окно).
+    Закрывается нажатием любой клавиши.
+
+    :param stdscr: Объект окна curses
+    :param report: Объект Report
+    """
+    stdscr.clear()
+    stdscr.nodelay(False)
+    h, w = stdscr.getmaxyx()
+    columns = max(min((w - 33) // 10, len(report.period_starts)), 0)
+    first_period = len(report.period_starts) - columns
+    header = "Задача".ljust(21) + "Всего".ljust(10)
+    for start in report.period_starts[first_period:]:
+        header += start.strftime("%d.%m").ljust(10)
+    stdscr.addstr(
+        1, 1, "Отчет"[: w - 2].ljust(w - 2), curses.A_BOLD | curses.color_pair(3)
+    )
+    stdscr.addstr(
+        2, 1, header[: w - 2].ljust(w - 2), curses.A_BOLD | curses.color_pair(2)
+    )
+    for offset, i in enumerate(report.top_rows(max(h - 4, 0))):
+        line = report.task_names[i][:20].ljust(21)
+        line += format_hours(report.totals[i].sum()).ljust(10)
+        for seconds in report.totals[i, first_period:]:
+            line += format_hours(seconds).ljust(10)
+        stdscr.addstr(3 + offset, 1, line[: w - 2], curses.color_pair(offset % 2 + 1))
+    stdscr.border()
+    stdscr.refresh()
+    stdscr.getch()
+    stdscr.nodelay(True)
+
+
+def format_hours(seconds):
+    """
+    Форматирует время в часы и минуты для отчета.
+
+    :param seconds: Время в секундах
+    :return: Строка вида "3ч 05м"
+    """
+    minutes = int(seconds) // 60
+    return f"{minutes // 60}ч {minutes % 60:02d}м"
+
+
 def format_elapsed_time(seconds):
     """
     Форматирует время в читаемый вид (секунды, минуты, часы, дни).
@@ -159,25 +387,28 @@ def format_elapsed_time(seconds):
     return f"{int(days)}д {int(hours)}ч {int(minutes)}мин"
 
 
-def print_help(stdscr: curses.window):
+def print_help(stdscr: curses.window, tree=False):
     """
     Рисует подсказки по управлению внизу экрана.
 
     :param stdscr: Объект окна curses
+    :param tree: Подсказки режима дерева проектов
     """
     h, w = stdscr.getmaxyx()
     if h > 8:
         for i in range(1, w - 1):
             stdscr.addch(h - 4, i, "─")
-        stdscr.addstr(
-            h - 3,
-            1,
-            "'e'-добавить 's'-пауза/продолжить 'd'-удалить 'r'-переименовать"[
-                : w - 2
-            ].ljust(w - 2),
-        )
-        stdscr.addstr(
-            h - 2,
-            1,
-            "'↑↓'-выбор 'x'-завершить 'f'-текущие/завершенные 'q'-выход ".ljust(w - 2),
-        )
+        if tree:
+            lines = (
+                "'→'/Enter-раскрыть '←'-свернуть 'm'-перенести в проект",
+                "'↑↓'-выбор 't'-список задач 'p'-отчет 'q'-выход",
+            )
+        else:
+            lines = (
+                "'e'-добавить 's'-пауза/продолжить 'd'-удалить 'r'-переименовать "
+                "'b'-бюджет 'm'-в проект",
+                "'↑↓'-выбор 'x'-завершить 'f'-текущие/завершенные 't'-проекты "
+                "'p'-отчет 'q'-выход",
+            )
+        for row, line in zip((h - 3, h - 2), lines):
+            stdscr.addstr(row, 1, line[: w - 2].ljust(w - 2))